@@ -0,0 +1,64 @@
+"""Compare per-line bootstrap loops with ``kernels.segment_bootstrap``.
+
+Builds an estimate-sized batch (default 300 lines of 5-150 priced rows) and
+bootstraps every line's price twice: a loop that resamples and aggregates
+each line and replicate with ``price_logic._aggregate_values``, and one
+``costest.kernels.segment_bootstrap`` call over the flat batch. Reports both
+times and the mean difference between their P10/P90 bounds, which come
+from different random draws and so agree only statistically.
+
+Usage::
+
+    python scripts/bench_bootstrap.py [--lines N] [--samples N] [--mode MODE]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from costest import kernels  # noqa: E402
+from costest.price_logic import _aggregate_values  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=300)
+    parser.add_argument("--samples", type=int, default=1000)
+    parser.add_argument("--mode", default="WGT_AVG")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(5, 151, size=args.lines)
+    values = rng.lognormal(3.0, 0.5, size=lengths.sum()).round(2)
+    weights = rng.integers(1, 4, size=len(values)).astype(float)
+    offsets = kernels.segment_offsets(lengths)
+
+    start = time.perf_counter()
+    looped = np.empty((args.samples, args.lines))
+    for i, (o, n) in enumerate(zip(offsets, lengths)):
+        for s in range(args.samples):
+            picks = o + rng.integers(0, n, size=n)
+            looped[s, i] = _aggregate_values(values[picks], weights[picks], args.mode)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = kernels.segment_bootstrap(values, lengths, weights, args.mode, samples=args.samples, seed=0)
+    kernel_seconds = time.perf_counter() - start
+
+    bounds = np.quantile(looped, (0.1, 0.9), axis=0)
+    diff = float(np.mean(np.abs(np.quantile(batched, (0.1, 0.9), axis=0) - bounds) / bounds))
+    print(f"{args.lines} lines, {len(values):,} rows, {args.samples} samples, {args.mode}:")
+    print(f"  per line  {loop_seconds:8.2f} s")
+    print(f"  kernels   {kernel_seconds:8.2f} s  ({loop_seconds / kernel_seconds:5.1f}x, "
+          f"mean rel P10/P90 diff {diff:.1%})")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
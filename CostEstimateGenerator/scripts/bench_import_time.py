@@ -0,0 +1,74 @@
+"""Measure the cold import time of the CLI module.
+
+Each sample runs ``python -X importtime -c "import costest.cli"`` in a fresh
+interpreter; the median wall time and the slowest top-level imports of the
+last sample are reported.
+
+Usage::
+
+    python scripts/bench_import_time.py [--runs N] [--module costest.cli]
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+
+
+def _sample(module: str) -> tuple[float, str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH", "")]))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, proc.stderr
+
+
+def _top_level_imports(report: str, limit: int) -> list[tuple[int, str]]:
+    rows: list[tuple[int, str]] = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:  # modules imported directly by the benchmarked module
+            try:
+                rows.append((int(cumulative.strip()), name.strip()))
+            except ValueError:
+                continue
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="costest.cli")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    times = []
+    report = ""
+    for _ in range(max(1, args.runs)):
+        elapsed, report = _sample(args.module)
+        times.append(elapsed)
+
+    print(f"import {args.module}: median {statistics.median(times) * 1000:.0f} ms over {len(times)} runs")
+    print("slowest top-level imports (cumulative us):")
+    for cumulative, name in _top_level_imports(report, args.top):
+        print(f"  {cumulative:>10}  {name}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,62 @@
+"""Compare per-sample aggregation with the segmented pricing kernels.
+
+Prices many item/window samples (default 20,000 segments of 0-60 prices)
+under each pricing mode twice: one ``price_logic._aggregate_values`` call per
+sample, and one ``costest.kernels.segment_prices`` call over the flat batch.
+Reports both times and the largest relative difference, then the time each
+outlier rule of ``kernels.segment_trim_mask`` takes over the whole batch.
+
+Usage::
+
+    python scripts/bench_kernels.py [--segments N] [--max-len N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from costest import kernels  # noqa: E402
+from costest.price_logic import _aggregate_values  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=20_000)
+    parser.add_argument("--max-len", type=int, default=60)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, args.max_len + 1, size=args.segments)
+    values = rng.lognormal(3.0, 0.5, size=lengths.sum()).round(2)
+    weights = rng.integers(1, 4, size=len(values)).astype(float)
+    offsets = kernels.segment_offsets(lengths)
+
+    print(f"{args.segments:,} segments, {len(values):,} prices:")
+    for mode in ("WGT_AVG", "MEAN", "MEDIAN", "P40_P60"):
+        start = time.perf_counter()
+        looped = np.array([
+            _aggregate_values(values[o:o + n], weights[o:o + n], mode) for o, n in zip(offsets, lengths)
+        ])
+        loop_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        batched = kernels.segment_prices(values, lengths, weights, mode=mode)
+        kernel_seconds = time.perf_counter() - start
+        diff = float(np.max(np.abs(batched - looped) / np.abs(looped)))
+        print(f"  {mode:8s} per sample {loop_seconds * 1000:8.1f} ms   kernels {kernel_seconds * 1000:7.1f} ms"
+              f"  ({loop_seconds / kernel_seconds:5.1f}x, max rel diff {diff:.1e})")
+    for method in kernels.TRIM_METHODS:
+        start = time.perf_counter()
+        kept = kernels.segment_trim_mask(values, lengths, method)
+        seconds = time.perf_counter() - start
+        print(f"  trim {method:10s} {seconds * 1000:7.1f} ms  ({1 - kept.mean():.1%} of prices trimmed)")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
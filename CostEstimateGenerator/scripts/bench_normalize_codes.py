@@ -0,0 +1,76 @@
+"""Compare row-wise and vectorized pay item code normalization.
+
+Builds a synthetic ``ITEM_CODE`` column (default one million rows drawn from a
+few thousand distinct codes in the spellings BidTabs exports use) and times
+the old row-wise normalization (no memoization), ``Series.map`` over the
+memoized scalar, and the factorizing ``normalize_item_codes``.
+
+Usage::
+
+    python scripts/bench_normalize_codes.py [--rows N] [--distinct N] [--runs N]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from costest.bidtabs_io import _normalize_code_str, normalize_item_code, normalize_item_codes  # noqa: E402
+
+
+def _codes(rows: int, distinct: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    numbers = rng.integers(10_000_000, 99_999_999, size=distinct)
+    spellings = []
+    for i, n in enumerate(numbers):
+        text = str(n)
+        if i % 3 == 0:
+            spellings.append(f"{text[:3]}-{text[3:]}")
+        elif i % 3 == 1:
+            spellings.append(f" {text[:3]}–{text[3:]} ")
+        else:
+            spellings.append(text)
+    return pd.Series(np.array(spellings, dtype=object)[rng.integers(0, distinct, size=rows)], name="ITEM_CODE")
+
+
+def _time(func, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        _normalize_code_str.cache_clear()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=5_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    codes = _codes(args.rows, args.distinct)
+    expected = codes.map(normalize_item_code)
+    assert normalize_item_codes(codes).equals(expected)
+
+    uncached = _normalize_code_str.__wrapped__
+    rowwise = _time(lambda: codes.map(lambda x: uncached("" if x is None else str(x))), args.runs)
+    mapped = _time(lambda: codes.map(normalize_item_code), args.runs)
+    vectorized = _time(lambda: normalize_item_codes(codes), args.runs)
+    print(f"{args.rows:,} codes ({args.distinct:,} distinct), median of {args.runs} runs:")
+    print(f"  row-wise, uncached:              {rowwise * 1000:8.1f} ms")
+    print(f"  Series.map(normalize_item_code): {mapped * 1000:8.1f} ms  ({rowwise / mapped:.1f}x)")
+    print(f"  normalize_item_codes:            {vectorized * 1000:8.1f} ms  ({rowwise / vectorized:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
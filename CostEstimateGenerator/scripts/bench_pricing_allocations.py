@@ -0,0 +1,149 @@
+"""Measure per-item allocations of category pricing.
+
+Prices a sample of items from a synthetic compacted history (see
+``bench_range_index.py``) three ways and reports the median peak traced
+allocation and time per item:
+
+* the previous copy-per-step implementation (kept here as a reference: the
+  item codes were stringified to find the pool, and the pool, every window
+  subset, the trimmed subset and combined frames were copied),
+* ``category_breakdown`` over the history frame (position arrays over one
+  read-only pool),
+* ``category_breakdown`` over ``ItemRangeIndex`` (no pool at all).
+
+Usage::
+
+    python scripts/bench_pricing_allocations.py [--rows N] [--items N] [--lines N]
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_range_index import _history  # noqa: E402
+from costest.price_logic import (  # noqa: E402
+    CATEGORY_DEFS,
+    _aggregate_price,
+    _quantity_range,
+    category_breakdown,
+)
+from costest.range_index import ItemRangeIndex  # noqa: E402
+
+
+def _legacy_pool(bidtabs: pd.DataFrame, item_code: str) -> pd.DataFrame:
+    pool = bidtabs.loc[bidtabs["ITEM_CODE"].astype(str) == str(item_code)].copy()
+    if pool.empty:
+        return pool
+    pool["UNIT_PRICE"] = pd.to_numeric(pool["UNIT_PRICE"], errors="coerce")
+    pool = pool.dropna(subset=["UNIT_PRICE"])
+    pool["WEIGHT"] = pd.to_numeric(pool["WEIGHT"], errors="coerce")
+    pool["_LET_DT"] = pd.to_datetime(pool["LETTING_DATE"], errors="coerce")
+    return pool
+
+
+def _legacy_filter_window(df: pd.DataFrame, min_months, max_months) -> pd.DataFrame:
+    if df.empty:
+        return df.copy()
+    out = df.copy()
+    dt = out["_LET_DT"]
+    mask = pd.Series(False, index=out.index)
+    valid = dt.notna()
+    if valid.any():
+        criteria = pd.Series(True, index=dt.index[valid])
+        now = pd.Timestamp.today()
+        if max_months is not None:
+            criteria &= dt.loc[valid] >= now - pd.DateOffset(months=max_months)
+        if min_months is not None:
+            upper = now - pd.DateOffset(months=min_months)
+            criteria &= (dt.loc[valid] <= upper) if min_months == 0 else (dt.loc[valid] < upper)
+        mask.loc[valid] = criteria
+    if min_months == 0:
+        mask |= dt.isna()
+    return out.loc[mask].copy()
+
+
+def _legacy_breakdown(bidtabs, item_code, project_region, target_quantity, min_sample_target=50):
+    quantity_range = _quantity_range(target_quantity)
+    pool = _legacy_pool(bidtabs, item_code)
+    if quantity_range is not None and "QUANTITY" in pool.columns:
+        pool = pool.loc[pool["QUANTITY"].between(*quantity_range, inclusive="both")].copy()
+    subsets = {}
+    for name, scope, min_months, max_months in CATEGORY_DEFS:
+        subset = _legacy_filter_window(pool, min_months, max_months)
+        if scope == "REGION":
+            subset = subset.iloc[0:0] if project_region is None else subset.loc[subset["REGION"] == project_region]
+        subset = subset.copy()
+        subset["_AUDIT_ROW_ID"] = subset.index
+        cleaned = subset.copy()
+        if len(cleaned) >= 3:
+            prices = cleaned["UNIT_PRICE"].astype(float)
+            mean, std = prices.mean(), prices.std(ddof=0)
+            if std > 0:
+                cleaned = cleaned.loc[(prices >= mean - 2 * std) & (prices <= mean + 2 * std)]
+        _aggregate_price(cleaned)
+        subsets[name] = cleaned
+    frames, seen = [], set()
+    for name, *_ in CATEGORY_DEFS:
+        subset = subsets[name]
+        new_rows = subset.loc[~subset["_AUDIT_ROW_ID"].isin(seen)].copy()
+        if new_rows.empty:
+            continue
+        frames.append(new_rows)
+        seen.update(new_rows["_AUDIT_ROW_ID"].tolist())
+        if len(seen) >= min_sample_target:
+            break
+    combined = pd.concat(frames) if frames else pd.DataFrame()
+    return _aggregate_price(combined)[0] if frames else np.nan
+
+
+def _measure(price_one, lines) -> tuple[float, float]:
+    peaks, seconds = [], []
+    for code, qty in lines:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        price_one(code, qty)
+        seconds.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    return statistics.median(peaks), statistics.median(seconds)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=40)
+    args = parser.parse_args()
+
+    history = _history(args.rows, args.items)
+    index = ItemRangeIndex(history)
+    rng = np.random.default_rng(1)
+    codes = history["ITEM_CODE"].cat.categories.to_numpy()
+    lines = [(str(code), float(rng.lognormal(5.0, 1.0))) for code in rng.choice(codes, size=args.lines)]
+
+    tracemalloc.start()
+    rows = [
+        ("previous (copy per step)", _measure(lambda c, q: _legacy_breakdown(history, c, 3, q), lines)),
+        ("positions over frame pool", _measure(lambda c, q: category_breakdown(history, c, 3, target_quantity=q), lines)),
+        ("positions over range index", _measure(lambda c, q: category_breakdown(index, c, 3, target_quantity=q), lines)),
+    ]
+    tracemalloc.stop()
+
+    print(f"{args.rows:,} rows, {args.items:,} items, median per priced item over {args.lines} lines:")
+    for label, (peak, seconds) in rows:
+        print(f"  {label:28s} peak {peak / 1024:9.1f} KiB   {seconds * 1000:7.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
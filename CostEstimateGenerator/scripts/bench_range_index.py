@@ -0,0 +1,86 @@
+"""Compare category pricing over the history frame and over ItemRangeIndex.
+
+Builds a synthetic compacted BidTabs history (default 500,000 rows over
+2,000 items, lettings spread across four years, six regions), then prices a
+sample of items with target quantities through ``category_breakdown`` twice:
+once masking the frame per item and window, once through
+``costest.range_index.ItemRangeIndex``. The results are checked for equality.
+
+Usage::
+
+    python scripts/bench_range_index.py [--rows N] [--items N] [--lines N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from costest.bid_store import compact_bidtabs  # noqa: E402
+from costest.price_logic import category_breakdown  # noqa: E402
+from costest.range_index import ItemRangeIndex  # noqa: E402
+
+
+def _history(rows: int, items: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    codes = np.array([f"{100 + i // 100:03d}-{i:05d}" for i in range(items)], dtype=object)
+    today = pd.Timestamp.today().normalize()
+    days = rng.integers(0, 4 * 365, size=rows)
+    frame = pd.DataFrame(
+        {
+            "ITEM_CODE": codes[rng.integers(0, items, size=rows)],
+            "UNIT_PRICE": rng.lognormal(3.0, 0.5, size=rows).round(2),
+            "QUANTITY": rng.lognormal(5.0, 1.0, size=rows).round(0),
+            "LETTING_DATE": today - pd.to_timedelta(days, unit="D"),
+            "REGION": rng.integers(1, 7, size=rows).astype(float),
+            "WEIGHT": rng.integers(1, 4, size=rows).astype(float),
+        }
+    )
+    return compact_bidtabs(frame)
+
+
+def _price(source, lines, region: int) -> tuple[list, float]:
+    start = time.perf_counter()
+    out = []
+    for code, qty in lines:
+        price, source_name, cat_data = category_breakdown(source, code, project_region=region, target_quantity=qty)
+        out.append((price, source_name, cat_data))
+    return out, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--items", type=int, default=2_000)
+    parser.add_argument("--lines", type=int, default=100)
+    args = parser.parse_args()
+
+    history = _history(args.rows, args.items)
+    rng = np.random.default_rng(1)
+    codes = history["ITEM_CODE"].cat.categories.to_numpy()
+    lines = [(str(code), float(rng.lognormal(5.0, 1.0))) for code in rng.choice(codes, size=args.lines)]
+
+    start = time.perf_counter()
+    index = ItemRangeIndex(history)
+    build = time.perf_counter() - start
+    framed, frame_seconds = _price(history, lines, region=3)
+    indexed, index_seconds = _price(index, lines, region=3)
+    assert framed == indexed or all(
+        a[1] == b[1] and (a[0] == b[0] or (np.isnan(a[0]) and np.isnan(b[0]))) for a, b in zip(framed, indexed)
+    ), "range index results differ from the frame path"
+
+    print(f"{args.rows:,} rows, {args.items:,} items, {args.lines} priced lines:")
+    print(f"  frame masks per window: {frame_seconds * 1000:8.1f} ms")
+    print(f"  ItemRangeIndex:         {index_seconds * 1000:8.1f} ms  ({frame_seconds / index_seconds:.1f}x)"
+          f" + {build * 1000:.1f} ms build")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,67 @@
+"""Compare median-type category pricing from sketches with exact pricing.
+
+Builds a synthetic compacted history (see ``bench_range_index.py``), sketches
+it per (item, region, letting date) and prices a sample of items without a
+target quantity in MEDIAN and P40_P60 modes: exactly through
+``category_breakdown`` over ``ItemRangeIndex`` and from merged sketches.
+Reports build time, sketch size, query times and the largest relative price
+difference.
+
+Usage::
+
+    python scripts/bench_sketches.py [--rows N] [--items N] [--lines N] [--k N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_range_index import _history  # noqa: E402
+from costest.price_logic import category_breakdown  # noqa: E402
+from costest.range_index import ItemRangeIndex  # noqa: E402
+from costest.sketches import PriceSketches, build_cell_sketches  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--items", type=int, default=2_000)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--k", type=int, default=128)
+    args = parser.parse_args()
+
+    history = _history(args.rows, args.items)
+    # Lettings on a few days a month, as in the real history.
+    history["LETTING_DATE"] = history["LETTING_DATE"].dt.to_period("M").dt.to_timestamp() + np.timedelta64(14, "D")
+    start = time.perf_counter()
+    cells = build_cell_sketches(history, k=args.k)
+    sketches = PriceSketches(cells)
+    build = time.perf_counter() - start
+    index = ItemRangeIndex(history)
+    rng = np.random.default_rng(1)
+    codes = [str(code) for code in rng.choice(history["ITEM_CODE"].cat.categories.to_numpy(), size=args.lines)]
+
+    print(f"{args.rows:,} rows, {len(cells):,} cells, {len(cells.values):,} sketch points (k={args.k}),"
+          f" built in {build * 1000:.0f} ms")
+    for mode in ("MEDIAN", "P40_P60"):
+        start = time.perf_counter()
+        exact = [category_breakdown(index, code, 3, mode=mode)[0] for code in codes]
+        exact_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        sketched = [sketches.category_breakdown(code, 3, mode=mode)[0] for code in codes]
+        sketch_seconds = time.perf_counter() - start
+        diff = np.nanmax(np.abs(np.array(sketched) - np.array(exact)) / np.array(exact))
+        print(f"  {mode:8s} exact {exact_seconds * 1000:7.1f} ms   sketches {sketch_seconds * 1000:7.1f} ms"
+              f"  max rel diff {diff:.2e}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
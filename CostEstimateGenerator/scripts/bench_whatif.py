@@ -0,0 +1,108 @@
+"""Compare re-pricing a quantities list per scenario with cached what-if statistics.
+
+Builds a synthetic history (default 200 items x 300 rows) and prices one line
+per item under a grid of regions, sample targets and pricing modes twice:
+``price_logic.category_breakdown`` per line and scenario over an
+``ItemRangeIndex``, and ``costest.whatif.price_scenario`` over window
+statistics read once. Reports both times and whether the prices agree, then
+times pricing every region with one ``price_scenario`` call per region and
+with a single ``costest.whatif.price_regions`` pass.
+
+Usage::
+
+    python scripts/bench_whatif.py [--items N] [--rows-per-item N]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from costest.price_logic import category_breakdown  # noqa: E402
+from costest.range_index import ItemRangeIndex  # noqa: E402
+from costest.whatif import (  # noqa: E402
+    Scenario,
+    available_regions,
+    build_window_stats,
+    price_regions,
+    price_scenario,
+    scenario_grid,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--rows-per-item", type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    n = args.items * args.rows_per_item
+    today = pd.Timestamp.today().normalize()
+    bid = pd.DataFrame({
+        "ITEM_CODE": np.repeat([f"{400 + i // 100:03d}-{i:05d}" for i in range(args.items)], args.rows_per_item),
+        "UNIT_PRICE": rng.lognormal(3.0, 0.5, size=n).round(2),
+        "QUANTITY": rng.integers(1, 500, size=n).astype(float),
+        "LETTING_DATE": today - pd.to_timedelta(rng.integers(0, 1150, size=n), unit="D"),
+        "REGION": rng.integers(1, 7, size=n),
+        "WEIGHT": rng.integers(1, 4, size=n).astype(float),
+    })
+    lines = [
+        {"ITEM_CODE": code, "DESCRIPTION": "", "UNIT": "", "QUANTITY": float(rng.integers(1, 500))}
+        for code in bid["ITEM_CODE"].unique()
+    ]
+    scenarios = scenario_grid(
+        Scenario(region=1, min_sample_target=50),
+        regions=[1, 2, 3, 4],
+        min_sample_targets=[20, 50, 100],
+        modes=["WGT_AVG", "MEDIAN", "P40_P60"],
+    )
+    index = ItemRangeIndex(bid)
+
+    start = time.perf_counter()
+    looped = [
+        [
+            category_breakdown(
+                index, line["ITEM_CODE"], project_region=s.region, target_quantity=line["QUANTITY"],
+                mode=s.mode, min_sample_target=s.min_sample_target, trim=s.trim,
+            )[0]
+            for line in lines
+        ]
+        for s in scenarios
+    ]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stats = build_window_stats(index, lines)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    cached = [price_scenario(stats, s)[0] for s in scenarios]
+    eval_seconds = time.perf_counter() - start
+
+    same = all(np.array_equal(np.asarray(a), b, equal_nan=True) for a, b in zip(looped, cached))
+    print(f"{len(lines)} lines x {len(scenarios)} scenarios over {n:,} history rows:")
+    print(f"  per line and scenario  {loop_seconds:8.2f} s")
+    print(f"  what-if statistics     {build_seconds:8.2f} s to build, {eval_seconds:6.2f} s to evaluate"
+          f"  ({loop_seconds / (build_seconds + eval_seconds):5.1f}x, prices identical: {same})")
+
+    regions = available_regions(stats)
+    start = time.perf_counter()
+    per_region = [price_scenario(stats, Scenario(region=r, min_sample_target=50))[0] for r in regions]
+    region_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    batched = price_regions(stats, regions, 50)[0]
+    batch_seconds = time.perf_counter() - start
+    same = np.array_equal(np.asarray(per_region), batched, equal_nan=True)
+    print(f"  {len(regions)} regions: per region {region_seconds:6.2f} s, one pass {batch_seconds:6.2f} s"
+          f"  ({region_seconds / batch_seconds:5.1f}x, prices identical: {same})")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
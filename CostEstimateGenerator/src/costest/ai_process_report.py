@@ -8,14 +8,9 @@ from datetime import datetime
 from pathlib import Path
 from typing import Mapping, Sequence, Optional
 
+from .ai_reporter import openai_client_class
 from .text_utils import sanitize_text
 
-try:
-    from openai import OpenAI  # type: ignore
-    OpenAIClient = OpenAI  # type: ignore
-except ImportError:  # pragma: no cover - handled at runtime
-    OpenAIClient = None  # type: ignore
-
 
 
 def _call_openai(
@@ -25,14 +20,15 @@ def _call_openai(
     temperature: float = 0.3,
     max_tokens: int = 2000,
 ) -> str:
-    if OpenAIClient is None:
+    client_cls = openai_client_class()
+    if client_cls is None:
         raise RuntimeError("openai package is not installed. Install it with 'pip install openai'.")
 
     api_key = os.getenv("OPENAI_API_KEY", "").strip()
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set. Place it in API_KEY/ or export it before running.")
 
-    client = OpenAIClient(api_key=api_key)
+    client = client_cls(api_key=api_key)
 
     system_prompt = (
         "You are ChatGPT-5 acting as an INDOT cost-estimation modernization lead. "
@@ -7,25 +7,25 @@ import os
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, Mapping, Optional
+from typing import TYPE_CHECKING, Iterable, Mapping, Optional
 
 from .text_utils import sanitize_text
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
 
-try:
-    from openai import OpenAI  # type: ignore
-    OpenAIClient = OpenAI  # type: ignore
-except ImportError:  # pragma: no cover - handled at runtime
-    OpenAIClient = None  # type: ignore
 
-try:
-    from reportlab.lib.pagesizes import letter
-    from reportlab.lib.units import inch
-    from reportlab.pdfgen import canvas
-    from reportlab.lib.utils import simpleSplit
-except ImportError:  # pragma: no cover - handled at runtime
-    canvas = None  # type: ignore
+def openai_client_class():
+    """Return ``openai.OpenAI``, or ``None`` when the package is not installed.
+
+    Imported on first use: the openai SDK is slow to import and only needed
+    when AI assistance is enabled.
+    """
+    try:
+        from openai import OpenAI  # type: ignore
+    except ImportError:  # pragma: no cover - handled at runtime
+        return None
+    return OpenAI
 
 
 @dataclass
@@ -89,7 +89,8 @@ def _format_prompt(project_context: Mapping[str, object], items: list[AlternateR
 
 
 def _call_openai(prompt: str, model: str, temperature: float = 0.2, max_tokens: int = 1800) -> str:
-    if OpenAIClient is None:
+    client_cls = openai_client_class()
+    if client_cls is None:
         raise RuntimeError(
             "openai package is not installed. Install it with 'pip install openai'."
         )
@@ -100,7 +101,7 @@ def _call_openai(prompt: str, model: str, temperature: float = 0.2, max_tokens:
             "OPENAI_API_KEY is not set. Place it in API_KEY/ or export the variable before running."
         )
 
-    client = OpenAIClient(api_key=api_key)
+    client = client_cls(api_key=api_key)
     response = client.chat.completions.create(  # type: ignore[attr-defined]
         model=model,
         messages=[
@@ -120,10 +121,15 @@ def _call_openai(prompt: str, model: str, temperature: float = 0.2, max_tokens:
 
 
 def _write_pdf(report_text: str, output_path: Path) -> Path:
-    if canvas is None:
+    try:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.units import inch
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.utils import simpleSplit
+    except ImportError as exc:  # pragma: no cover - handled at runtime
         raise RuntimeError(
             "reportlab is not installed. Install it with 'pip install reportlab'."
-        )
+        ) from exc
 
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
@@ -7,7 +7,7 @@ import os
 from dataclasses import dataclass
 from typing import Dict, Iterable, List, Mapping, Optional, Tuple
 
-from .ai_reporter import OpenAIClient
+from .ai_reporter import openai_client_class
 
 
 @dataclass
@@ -18,7 +18,8 @@ class AISelection:
 
 
 def _get_client():
-    if OpenAIClient is None:  # type: ignore[name-defined]
+    client_cls = openai_client_class()
+    if client_cls is None:
         raise RuntimeError(
             "openai package is not installed. Install it with 'pip install openai'."
         )
@@ -27,7 +28,7 @@ def _get_client():
         raise RuntimeError(
             "OPENAI_API_KEY is not set. Place it in API_KEY/ or export it before running."
         )
-    return OpenAIClient(api_key=api_key)  # type: ignore[call-arg]
+    return client_cls(api_key=api_key)  # type: ignore[call-arg]
 
 
 def _clean_json_payload(content: str) -> Mapping[str, object]:
@@ -47,10 +48,17 @@ def choose_alternates_via_ai(
     candidates: Iterable[Mapping[str, object]],
     references: Optional[Mapping[str, object]] = None,
     model: Optional[str] = None,
+    enabled: Optional[bool] = None,
 ) -> Tuple[List[AISelection], Optional[str], Dict[str, object]]:
-    """Ask the LLM to weigh candidate alternates, returning selections and metadata."""
+    """Ask the LLM to weigh candidate alternates, returning selections and metadata.
 
-    if os.getenv("DISABLE_OPENAI", "0").strip().lower() in ("1", "true", "yes"):
+    ``enabled`` comes from the caller's run settings; ``None`` falls back to
+    the ``DISABLE_OPENAI`` environment variable.
+    """
+
+    if enabled is None:
+        enabled = os.getenv("DISABLE_OPENAI", "0").strip().lower() not in ("1", "true", "yes")
+    if not enabled:
         return [], "AI disabled via DISABLE_OPENAI", {}
 
     client = _get_client()
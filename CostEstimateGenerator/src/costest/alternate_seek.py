@@ -130,6 +130,7 @@ def _score_candidate(
     *,
     target_description: Optional[str] = None,
     area_tolerance: float = 0.2,
+    min_target: int = _MIN_TARGET,
 ) -> Tuple[Dict[str, float], List[str]]:
     notes: List[str] = []
 
@@ -207,9 +208,9 @@ def _score_candidate(
     if total_counts == 0:
         notes.append("No BidTabs recency data available; relying on statewide surrogates")
 
-    data_volume_score = _clamp(candidate.data_points / max(_MIN_TARGET, 1))
-    if candidate.data_points < _MIN_TARGET:
-        notes.append(f"Only {candidate.data_points} BidTabs data points (target {_MIN_TARGET})")
+    data_volume_score = _clamp(candidate.data_points / max(min_target, 1))
+    if candidate.data_points < min_target:
+        notes.append(f"Only {candidate.data_points} BidTabs data points (target {min_target})")
 
     scores = {
         "geometry_score": geometry_score,
@@ -239,6 +240,10 @@ def _build_candidate(
     target_description: Optional[str] = None,
     area_tolerance: float = 0.2,
     source: str,
+    mode: Optional[str] = None,
+    min_sample_target: Optional[int] = None,
+    min_target: int = _MIN_TARGET,
+    trim: Optional[str] = None,
 ) -> Optional[AlternateCandidate]:
     area_series = pd.to_numeric(group.get("GEOM_AREA_SQFT"), errors="coerce") if "GEOM_AREA_SQFT" in group else None
     if area_series is not None:
@@ -255,6 +260,9 @@ def _build_candidate(
         code,
         project_region=project_region,
         include_details=False,
+        mode=mode,
+        min_sample_target=min_sample_target,
+        trim=trim,
     )
     if price is None or (isinstance(price, float) and math.isnan(price)):
         return None
@@ -292,6 +300,7 @@ def _build_candidate(
         candidate_bundle,
         target_description=target_description,
         area_tolerance=area_tolerance,
+        min_target=min_target,
     )
 
     placeholder.similarity = scores
@@ -305,6 +314,7 @@ def _build_unit_price_candidate(
     unit_price_value: float,
     contracts: int,
     reference_bundle: Mapping[str, object] | None,
+    min_target: int = _MIN_TARGET,
 ) -> AlternateCandidate:
     candidate_bundle = reference_bundle or {}
     scores = {
@@ -312,7 +322,7 @@ def _build_unit_price_candidate(
         "spec_score": 0.65 if _extract_section_id(candidate_bundle) else 0.5,
         "recency_score": 0.5,
         "locality_score": 0.4,
-        "data_volume_score": _clamp(contracts / max(_MIN_TARGET, 1)),
+        "data_volume_score": _clamp(contracts / max(min_target, 1)),
     }
     overall = sum(SIMILARITY_WEIGHTS[k] * scores.get(k, 0.0) for k in SIMILARITY_WEIGHTS)
     scores["overall_score"] = _clamp(overall)
@@ -418,8 +428,19 @@ def find_alternate_price(
     project_region: int | None = None,
     target_description: Optional[str] = None,
     reference_bundle: Optional[Mapping[str, object]] = None,
+    *,
+    mode: Optional[str] = None,
+    min_sample_target: Optional[int] = None,
+    ai_enabled: Optional[bool] = None,
+    trim: Optional[str] = None,
 ) -> Optional[AlternateResult]:
-    """Return an alternate-seek estimate enriched with reference datasets."""
+    """Return an alternate-seek estimate enriched with reference datasets.
+
+    ``bidtabs`` may be a :class:`costest.sql_store.SqlBidStore`, in which case
+    candidate rows are fetched with indexed queries. ``mode``,
+    ``min_sample_target``, ``trim`` and ``ai_enabled`` carry the run's
+    settings; when omitted the module defaults and ``DISABLE_OPENAI`` apply.
+    """
 
     if target_geometry is None or not math.isfinite(target_geometry.area_sqft) or target_geometry.area_sqft <= 0:
         return None
@@ -435,24 +456,32 @@ def find_alternate_price(
     target_area = target_geometry.area_sqft
     target_shape = getattr(target_geometry, "shape", None)
     prefix = _item_prefix(target_code)
-
-    candidates_df = bidtabs.copy()
-    candidates_df = candidates_df.loc[candidates_df["ITEM_CODE"].astype(str).str.startswith(prefix + "-")]
-    candidates_df = candidates_df.loc[candidates_df["ITEM_CODE"] != target_code]
-    candidates_df = candidates_df.loc[candidates_df["GEOM_AREA_SQFT"].notna()]
-
-    if target_shape and target_shape != "min_area":
-        candidates_df = candidates_df.loc[candidates_df["GEOM_SHAPE"] == target_shape]
+    min_target = max(10, min_sample_target) if min_sample_target else _MIN_TARGET
+    run_options = {"mode": mode, "min_sample_target": min_sample_target, "min_target": min_target, "trim": trim}
 
     lower = target_area * (1 - area_tolerance)
     upper = target_area * (1 + area_tolerance)
-    candidates_df = candidates_df.loc[(candidates_df["GEOM_AREA_SQFT"] >= lower) & (candidates_df["GEOM_AREA_SQFT"] <= upper)]
+    shape_filter = target_shape if target_shape and target_shape != "min_area" else None
+
+    if isinstance(bidtabs, pd.DataFrame):
+        candidates_df = bidtabs.copy()
+        candidates_df = candidates_df.loc[candidates_df["ITEM_CODE"].astype(str).str.startswith(prefix + "-")]
+        candidates_df = candidates_df.loc[candidates_df["ITEM_CODE"] != target_code]
+        candidates_df = candidates_df.loc[candidates_df["GEOM_AREA_SQFT"].notna()]
+
+        if shape_filter:
+            candidates_df = candidates_df.loc[candidates_df["GEOM_SHAPE"] == shape_filter]
+
+        candidates_df = candidates_df.loc[(candidates_df["GEOM_AREA_SQFT"] >= lower) & (candidates_df["GEOM_AREA_SQFT"] <= upper)]
+    else:
+        # SqlBidStore: the area band is an indexed range scan.
+        candidates_df = bidtabs.alternate_candidates(prefix, target_code, (lower, upper), shape=shape_filter)
 
     candidates: List[AlternateCandidate] = []
     candidate_payload: List[Dict[str, object]] = []
     candidate_map: Dict[str, AlternateCandidate] = {}
 
-    for code, group in candidates_df.groupby("ITEM_CODE"):
+    for code, group in candidates_df.groupby("ITEM_CODE", observed=True):
         candidate = _build_candidate(
             bidtabs,
             str(code),
@@ -464,6 +493,7 @@ def find_alternate_price(
             target_description=target_description,
             area_tolerance=area_tolerance,
             source="bidtabs-prefix",
+            **run_options,
         )
         if not candidate:
             continue
@@ -495,7 +525,10 @@ def find_alternate_price(
         code = str(related.get("item_code") or "").strip()
         if not code or code == target_code or code in candidate_map:
             continue
-        related_group = bidtabs.loc[bidtabs["ITEM_CODE"].astype(str) == code]
+        if isinstance(bidtabs, pd.DataFrame):
+            related_group = bidtabs.loc[bidtabs["ITEM_CODE"].astype(str) == code]
+        else:
+            related_group = bidtabs.item_pool(code)
         if related_group.empty and unit_price_value <= 0:
             continue
         if related_group.empty:
@@ -511,6 +544,7 @@ def find_alternate_price(
             target_description=target_description,
             area_tolerance=0.35,
             source="bidtabs-related",
+            **run_options,
         )
         if not candidate:
             continue
@@ -538,7 +572,9 @@ def find_alternate_price(
         )
 
     if unit_price_value > 0:
-        reference_candidate = _build_unit_price_candidate(target_area, unit_price_value, unit_price_contracts, reference_bundle)
+        reference_candidate = _build_unit_price_candidate(
+            target_area, unit_price_value, unit_price_contracts, reference_bundle, min_target=min_target
+        )
         candidates.append(reference_candidate)
         candidate_map[reference_candidate.item_code] = reference_candidate
         candidate_payload.append(
@@ -591,6 +627,7 @@ def find_alternate_price(
             target_info=target_info,
             candidates=candidate_payload_for_ai,
             references=reference_bundle,
+            enabled=ai_enabled,
         )
         for sel in ai_selected:
             cand = candidate_map.get(sel.item_code)
@@ -638,6 +675,9 @@ def find_alternate_price(
             sel.item_code,
             project_region=project_region,
             include_details=True,
+            mode=mode,
+            min_sample_target=min_sample_target,
+            trim=trim,
         )
         ratio = sel.ratio if sel.ratio and math.isfinite(sel.ratio) else 1.0
 
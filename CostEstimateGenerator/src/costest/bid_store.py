@@ -0,0 +1,334 @@
+"""Shared-memory representation of the BidTabs history.
+
+Worker processes (parallel pricing, batch evaluation) need read-only access to
+the full BidTabs frame. Pickling the frame into every worker costs seconds and
+duplicates memory, so :class:`SharedBidStore` copies it once into
+``multiprocessing.shared_memory`` blocks instead:
+
+- numeric, boolean and datetime columns are stored as raw buffers;
+- every other column is dictionary-encoded: integer codes live in shared
+  memory, and only the (small) table of distinct values travels with the
+  picklable :class:`BidStoreHandle`.
+
+:func:`attach_bid_store` rebuilds a DataFrame whose arrays are views over the
+shared blocks, so attaching costs milliseconds and no copy regardless of the
+history size. Dictionary-encoded columns come back as categoricals.
+
+:func:`compact_bidtabs` applies :data:`BIDTABS_SCHEMA` before that: columns
+that pricing and the audit workbook never read are dropped, repetitive text
+becomes categorical, numbers become fixed-width floats and each letting date
+also gets an integer month offset (:data:`LETTING_MONTH`).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_INDEX_KEY = "__index__"
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    """Layout of one column inside a shared-memory block."""
+
+    name: str
+    shm_name: str
+    dtype: str
+    kind: str  # "numeric", "datetime" or "category"
+    categories: Optional[Tuple[object, ...]] = None
+    ordered: bool = False
+    encoded: bool = False  # dictionary-encoded here rather than categorical at source
+
+
+@dataclass(frozen=True)
+class BidStoreHandle:
+    """Picklable description of a :class:`SharedBidStore` for workers."""
+
+    length: int
+    index: ColumnSpec
+    columns: Tuple[ColumnSpec, ...]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [spec.name for spec in self.columns]
+
+    @property
+    def encoded_columns(self) -> List[str]:
+        return [spec.name for spec in self.columns if spec.encoded]
+
+
+def _encode_column(name: str, series: pd.Series) -> Tuple[np.ndarray, ColumnSpec]:
+    """Return the shared buffer for a column and a spec without a block name."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        cat = series.array
+        codes = np.asarray(cat.codes)
+        return codes, ColumnSpec(name, "", str(codes.dtype), "category", tuple(cat.categories), bool(cat.ordered))
+    if pd.api.types.is_datetime64_dtype(series.dtype):
+        values = series.to_numpy(dtype="datetime64[ns]").view("int64")
+        return values, ColumnSpec(name, "", str(values.dtype), "datetime")
+    if pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+        values = series.to_numpy()
+        if values.dtype != object:
+            return values, ColumnSpec(name, "", str(values.dtype), "numeric")
+    try:
+        cat = pd.Categorical(series)
+    except TypeError:  # mixed, unorderable values: keep first-seen order
+        codes, uniques = pd.factorize(series, sort=False)
+        cat = pd.Categorical.from_codes(codes, pd.Index(uniques))
+    codes = np.asarray(cat.codes)
+    return codes, ColumnSpec(name, "", str(codes.dtype), "category", tuple(cat.categories), encoded=True)
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block published by :class:`SharedBidStore`.
+
+    Before Python 3.13 attaching always registers the block with the resource
+    tracker. Pool workers share the parent's tracker, where the duplicate
+    registration is harmless and the owner's ``unlink`` clears it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # type: ignore[call-arg]
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# Blocks published by this process (or inherited from the parent via fork).
+_OWNED: Dict[str, shared_memory.SharedMemory] = {}
+
+
+class SharedBidStore:
+    """Owner of the shared-memory blocks backing a BidTabs frame.
+
+    Create it in the parent process, pass :attr:`handle` to workers, and call
+    :meth:`close` (or use it as a context manager) once the workers are done.
+    """
+
+    def __init__(self, handle: BidStoreHandle, blocks: Dict[str, shared_memory.SharedMemory]):
+        self.handle = handle
+        self._blocks = blocks
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SharedBidStore":
+        blocks: Dict[str, shared_memory.SharedMemory] = {}
+
+        def _publish(key: str, values: np.ndarray) -> shared_memory.SharedMemory:
+            values = np.ascontiguousarray(values)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, values.nbytes))
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+            blocks[key] = shm
+            return shm
+
+        try:
+            index_values = np.asarray(df.index, dtype="int64")
+            index_shm = _publish(_INDEX_KEY, index_values)
+            index_spec = ColumnSpec(_INDEX_KEY, index_shm.name, str(index_values.dtype), "numeric")
+
+            specs: List[ColumnSpec] = []
+            for name in df.columns:
+                values, spec = _encode_column(str(name), df[name])
+                shm = _publish(str(name), values)
+                specs.append(replace(spec, shm_name=shm.name))
+        except Exception:
+            for shm in blocks.values():
+                shm.close()
+                shm.unlink()
+            raise
+
+        handle = BidStoreHandle(length=len(df), index=index_spec, columns=tuple(specs))
+        _OWNED.update({shm.name: shm for shm in blocks.values()})
+        return cls(handle, blocks)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held in shared memory (excluding the category tables)."""
+        return sum(shm.size for shm in self._blocks.values())
+
+    def close(self) -> None:
+        """Release and unlink every block. Attached views become invalid."""
+        for shm in self._blocks.values():
+            _OWNED.pop(shm.name, None)
+            _ATTACHED.pop(shm.name, None)
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:  # pragma: no cover - already unlinked
+                pass
+        self._blocks = {}
+
+    def __enter__(self) -> "SharedBidStore":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+# Blocks attached by this process; they must outlive the frames viewing them.
+_ATTACHED: Dict[str, shared_memory.SharedMemory] = {}
+
+
+def _view(spec: ColumnSpec, length: int) -> np.ndarray:
+    # Owned blocks (including those inherited through fork) are already mapped.
+    shm = _OWNED.get(spec.shm_name) or _ATTACHED.get(spec.shm_name)
+    if shm is None:
+        shm = _attach_block(spec.shm_name)
+        _ATTACHED[spec.shm_name] = shm
+    return np.ndarray((length,), dtype=np.dtype(spec.dtype), buffer=shm.buf)
+
+
+def attach_bid_store(handle: BidStoreHandle) -> pd.DataFrame:
+    """Rebuild the BidTabs frame as zero-copy views over the shared blocks."""
+    length = handle.length
+    index = pd.Index(_view(handle.index, length), copy=False)
+    data: Dict[str, object] = {}
+    for spec in handle.columns:
+        values = _view(spec, length)
+        if spec.kind == "category":
+            data[spec.name] = pd.Categorical.from_codes(
+                values, categories=pd.Index(spec.categories or ()), ordered=spec.ordered
+            )
+        elif spec.kind == "datetime":
+            data[spec.name] = values.view("datetime64[ns]")
+        else:
+            data[spec.name] = values
+    return pd.DataFrame(data, index=index, columns=handle.column_names, copy=False)
+
+
+def restore_encoded_columns(df: pd.DataFrame, handle: BidStoreHandle) -> pd.DataFrame:
+    """Decode columns that were dictionary-encoded for sharing back to objects.
+
+    Use this on small derived frames (audit details) that leave the worker so
+    they carry the same dtypes as frames built from the original history.
+    """
+    if df is None:
+        return df
+    names = [name for name in handle.encoded_columns if name in df.columns]
+    if not names:
+        return df
+    return df.astype({name: object for name in names})
+
+
+def detach_bid_store() -> None:
+    """Close every block attached by this process."""
+    for shm in _ATTACHED.values():
+        try:
+            shm.close()
+        except BufferError:  # pragma: no cover - views still alive
+            pass
+    _ATTACHED.clear()
+
+
+# --- Compact in-memory schema ---
+
+# Column name -> storage kind. Columns not listed are dropped by compact_bidtabs.
+BIDTABS_SCHEMA: Dict[str, str] = {
+    "ITEM_CODE": "category",
+    "DESCRIPTION": "category",
+    "UNIT": "category",
+    "QUANTITY": "float",
+    "UNIT_PRICE": "float",
+    "LETTING_DATE": "datetime",
+    "BIDDER": "category",
+    "CONTRACTOR": "category",
+    "PROJECTID": "category",
+    "PROJECT_ID": "category",
+    "CONTRACT_ID": "category",
+    "JOB_SIZE": "float",
+    "JOB_DESC": "category",
+    "DISTRICT": "category",
+    "COUNTY": "category",
+    "REGION": "keep",
+    "WEIGHT": "float",
+    "GEOM_SHAPE": "category",
+    "GEOM_AREA_SQFT": "float",
+    "GEOM_DIMENSIONS": "category",
+}
+
+# Months since 1970-01 for each letting date; MONTH_NA marks a missing date.
+LETTING_MONTH = "LETTING_MONTH"
+MONTH_NA = np.iinfo(np.int32).min
+
+
+def month_offsets(dates: pd.Series) -> np.ndarray:
+    """Return ``dates`` as int32 months since 1970-01 (``MONTH_NA`` for NaT)."""
+    values = pd.to_datetime(dates, errors="coerce").to_numpy(dtype="datetime64[ns]")
+    months = values.astype("datetime64[M]").astype("int64")
+    months[np.isnat(values)] = MONTH_NA
+    return months.astype(np.int32)
+
+
+def _to_category(series: pd.Series) -> pd.Categorical:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array
+    try:
+        return pd.Categorical(series)
+    except TypeError:  # mixed, unorderable values: keep first-seen order
+        codes, uniques = pd.factorize(series, sort=False)
+        return pd.Categorical.from_codes(codes, pd.Index(uniques))
+
+
+def compact_bidtabs(df: pd.DataFrame, float_dtype: str = "float64") -> pd.DataFrame:
+    """Return ``df`` restricted to :data:`BIDTABS_SCHEMA` with compact dtypes.
+
+    Pass ``float_dtype="float32"`` to halve the numeric columns at the cost of
+    about seven significant digits of precision.
+    """
+    if float_dtype not in ("float64", "float32"):
+        raise ValueError(f"Unsupported float dtype: {float_dtype}")
+    data: Dict[str, object] = {}
+    for name, kind in BIDTABS_SCHEMA.items():
+        if name not in df.columns:
+            continue
+        series = df[name]
+        if kind == "category":
+            data[name] = _to_category(series)
+        elif kind == "float":
+            data[name] = pd.to_numeric(series, errors="coerce").to_numpy(dtype=float_dtype)
+        elif kind == "datetime":
+            data[name] = pd.to_datetime(series, errors="coerce").to_numpy(dtype="datetime64[ns]")
+            data[LETTING_MONTH] = month_offsets(series)
+        else:
+            data[name] = series.to_numpy()
+    return pd.DataFrame(data, index=df.index)
+
+
+def bytes_per_row(df: pd.DataFrame) -> float:
+    """Deep memory footprint of ``df`` divided by its row count."""
+    if df is None or len(df) == 0:
+        return 0.0
+    return float(df.memory_usage(index=True, deep=True).sum()) / len(df)
+
+
+def compaction_report(before: pd.DataFrame, after: pd.DataFrame) -> Dict[str, object]:
+    """Summarize the memory saved by :func:`compact_bidtabs`."""
+    before_bpr = bytes_per_row(before)
+    after_bpr = bytes_per_row(after)
+    return {
+        "rows": int(len(after)),
+        "columns_before": int(before.shape[1]),
+        "columns_after": int(after.shape[1]),
+        "bytes_per_row_before": round(before_bpr, 1),
+        "bytes_per_row_after": round(after_bpr, 1),
+        "reduction": round(1 - after_bpr / before_bpr, 3) if before_bpr else 0.0,
+    }
+
+
+__all__ = [
+    "BIDTABS_SCHEMA",
+    "BidStoreHandle",
+    "ColumnSpec",
+    "LETTING_MONTH",
+    "MONTH_NA",
+    "SharedBidStore",
+    "attach_bid_store",
+    "bytes_per_row",
+    "compact_bidtabs",
+    "compaction_report",
+    "detach_bid_store",
+    "month_offsets",
+    "restore_encoded_columns",
+]
@@ -0,0 +1,139 @@
+"""Sidecar cache of normalized BidTabs Excel exports.
+
+Legacy BIFF ``.xls`` workbooks are the slowest input pandas reads. The first
+time a workbook is loaded its normalized sheets are written next to the other
+caches as a pickle of column blocks::
+
+    data_sample/cache/bidtabs/2024-05-09.xls.1b2c3d4e.3f9a1c0d2e4b6a8c7d5e.pkl
+
+The name carries the workbook's file name (suffix included), a key of the
+column selection and a key derived from the workbook's SHA-256 and
+:data:`SIDECAR_FORMAT`. Editing or replacing a workbook changes the last key,
+so a stale sidecar is never read, and the superseded file (same workbook and
+column selection) is removed when the new one is written; ``X.xls`` and
+``X.xlsx``, or two column selections of one workbook, keep their own
+sidecars. Later runs load the sidecar without
+opening the Excel reader. ``costest convert-bidtabs`` pre-warms the cache.
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# Bump when the normalization applied before caching changes.
+SIDECAR_FORMAT = 1
+EXCEL_SUFFIXES = (".xls", ".xlsx")
+
+
+@dataclass
+class ConvertResult:
+    """Outcome of converting (or finding cached) one workbook."""
+
+    source: str
+    rows: int
+    seconds: float
+    converted: bool
+    sidecar: Path
+
+
+def content_hash(path: str | Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _selection_key(columns: Optional[Iterable[str]]) -> str:
+    selection = "*" if columns is None else ",".join(sorted(columns))
+    return hashlib.sha256(f"columns={selection}".encode()).hexdigest()[:8]
+
+
+def _sidecar_prefix(path: str | Path, columns: Optional[Iterable[str]] = None) -> str:
+    """Name prefix shared by every sidecar of ``path`` and one column selection."""
+    return f"{Path(path).name}.{_selection_key(columns)}"
+
+
+def sidecar_path(cache_dir: str | Path, path: str | Path, columns: Optional[Iterable[str]] = None) -> Path:
+    """Sidecar location for ``path`` in its current content."""
+    key = hashlib.sha256()
+    key.update(content_hash(path).encode())
+    key.update(f"format={SIDECAR_FORMAT}".encode())
+    return Path(cache_dir) / f"{_sidecar_prefix(path, columns)}.{key.hexdigest()[:20]}.pkl"
+
+
+def _remove_stale(sidecar: Path, prefix: str) -> None:
+    """Delete superseded sidecars of the same workbook and column selection."""
+    for other in sidecar.parent.glob(f"{glob.escape(prefix)}.*.pkl"):
+        if other != sidecar:
+            try:
+                other.unlink()
+            except OSError:
+                pass
+
+
+def _load_or_write(sidecar: Path, prefix: str, read: Callable[[], List[pd.DataFrame]]) -> Tuple[List[pd.DataFrame], bool]:
+    if sidecar.exists():
+        try:
+            return list(pd.read_pickle(sidecar)), True
+        except Exception:
+            pass  # unreadable: rebuild below
+    frames = read()
+    sidecar.parent.mkdir(parents=True, exist_ok=True)
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    pd.to_pickle(frames, tmp, compression=None)
+    os.replace(tmp, sidecar)
+    _remove_stale(sidecar, prefix)
+    return frames, False
+
+
+def cached_frames(
+    path: str | Path,
+    cache_dir: str | Path,
+    read: Callable[[], List[pd.DataFrame]],
+    columns: Optional[Iterable[str]] = None,
+) -> Tuple[List[pd.DataFrame], bool]:
+    """Return ``read()`` for ``path``, served from its sidecar when current.
+
+    The second element is True when the sidecar was used. An unreadable
+    sidecar is treated as missing and rewritten.
+    """
+    return _load_or_write(sidecar_path(cache_dir, path, columns), _sidecar_prefix(path, columns), read)
+
+
+def convert_file(
+    path: str | Path,
+    cache_dir: str | Path,
+    read: Callable[[], List[pd.DataFrame]],
+    columns: Optional[Iterable[str]] = None,
+) -> ConvertResult:
+    """Ensure ``path`` has a current sidecar; report whether work was done."""
+    start = time.perf_counter()
+    sidecar = sidecar_path(cache_dir, path, columns)
+    frames, hit = _load_or_write(sidecar, _sidecar_prefix(path, columns), read)
+    return ConvertResult(
+        source=Path(path).name,
+        rows=int(sum(len(f) for f in frames)),
+        seconds=time.perf_counter() - start,
+        converted=not hit,
+        sidecar=sidecar,
+    )
+
+
+__all__ = [
+    "ConvertResult",
+    "EXCEL_SUFFIXES",
+    "SIDECAR_FORMAT",
+    "cached_frames",
+    "content_hash",
+    "convert_file",
+    "sidecar_path",
+]
@@ -5,16 +5,34 @@ BidTabs / Quantities IO helpers
 - Ensures a numeric REGION column (maps from DISTRICT when needed)
 - Loads project quantities (supports PAY ITEM header)
 - Finds the correct quantities file via a glob pattern (7-digit Des prefix)
+- Prunes date-partitioned BidTabs files outside the pricing look-back window
 """
 
 from __future__ import annotations
 
+import json
 import re
+import time
+from datetime import date
+from functools import lru_cache
 from pathlib import Path
-from typing import Union
+from typing import Dict, Iterator, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
+from .bid_store import BIDTABS_SCHEMA
+from .bidtabs_cache import EXCEL_SUFFIXES, cached_frames
+from .ingest_report import (
+    FileReport,
+    IngestReport,
+    coercion_failures,
+    count_by_reason,
+    parse_columns,
+    row_reasons,
+    sanitizer_keys,
+)
+
 # ------------ Header normalization map ------------
 # Add common variants here so we can rename them to our internal names.
 HEADER_MAP = {
@@ -34,6 +52,7 @@ HEADER_MAP = {
 
 # ------------ Utilities ------------
 
+@lru_cache(maxsize=4096)
 def _std_col(name: str) -> str:
     """Uppercase and replace non-alnum with underscores: 'Unit Price' -> 'UNIT_PRICE'."""
     return re.sub(r"[^A-Z0-9]+", "_", str(name).upper()).strip("_")
@@ -52,48 +71,103 @@ def _match_col(std_cols: list[str], candidates: dict) -> dict:
     return found
 
 
+_NON_DIGIT_RE = re.compile(r"\D")
+_CODE_JUNK_RE = re.compile(r"[^\w\-]")
+_DASH_TABLE = str.maketrans({d: "-" for d in ("\u2014", "\u2013", "\u2012", "\u2011", "\u2212")})
+
+
+@lru_cache(maxsize=1 << 16)
+def _normalize_code_str(s: str) -> str:
+    digits = _NON_DIGIT_RE.sub("", s)
+    if len(digits) == 8:
+        return f"{digits[:3]}-{digits[3:]}"
+
+    # Fallback cleanup
+    return _CODE_JUNK_RE.sub("", s.strip().translate(_DASH_TABLE))
+
+
 def normalize_item_code(x: str) -> str:
     """
     Normalize pay item codes to a consistent form.
     - If there are 8 digits total, format as NNN-NNNNN (e.g., '30608033' -> '306-08033').
     - Replace long dashes with '-' and strip odd chars.
+    Results are memoized per distinct string.
     """
-    s = "" if x is None else str(x)
-    digits = re.sub(r"\D", "", s)
-    if len(digits) == 8:
-        return f"{digits[:3]}-{digits[3:]}"
+    return _normalize_code_str("" if x is None else str(x))
 
-    # Fallback cleanup
-    s = s.strip()
-    for bad_dash in ("\u2014", "\u2013", "\u2012", "\u2011", "\u2212"):
-        s = s.replace(bad_dash, "-")
-    s = re.sub(r"[^\w\-]", "", s)
-    return s
 
+def normalize_item_codes(values: Union[pd.Series, Sequence[object]]) -> pd.Series:
+    """Vectorized :func:`normalize_item_code` for a whole column.
+
+    Each distinct value is normalized once (factorize -> normalize uniques ->
+    take), so a column of a million rows costs as much as its few thousand
+    distinct codes. Returns an object Series aligned with ``values``.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(list(values), dtype=object)
+    codes, uniques = pd.factorize(series)
+    normalized = np.array([normalize_item_code(u) for u in uniques] + [""], dtype=object)
+    out = normalized.take(codes)  # code -1 (missing) picks the trailing "" placeholder
+    missing = codes == -1
+    if missing.any():
+        # None -> "" but NaN -> "nan", exactly as the scalar version maps them.
+        out[missing] = [normalize_item_code(v) for v in series.to_numpy(dtype=object)[missing]]
+    return pd.Series(out, index=series.index, name=series.name, dtype=object)
+
+
+# HEADER_MAP key -> internal column name
+INTERNAL_NAMES = {
+    "item_code": "ITEM_CODE",
+    "desc": "DESCRIPTION",
+    "unit": "UNIT",
+    "qty": "QUANTITY",
+    "price": "UNIT_PRICE",
+    "letting": "LETTING_DATE",  # alias BID_DATE -> LETTING_DATE
+    "county": "COUNTY",
+    "district": "DISTRICT",
+    "region": "REGION",
+    "bidder": "BIDDER",
+    "weight": "WEIGHT",
+}
+
+# Columns kept when reading BidTabs sources: everything the compacted history
+# (costest.bid_store.BIDTABS_SCHEMA) holds. Other columns are never parsed.
+INGEST_COLUMNS = frozenset(BIDTABS_SCHEMA)
+
+
+@lru_cache(maxsize=256)
+def _resolve_headers(std_cols: Tuple[str, ...]) -> Tuple[str, ...]:
+    """Final column names for a header signature (tuple of standardized names).
+
+    BidTabs exports share a handful of layouts, so the HEADER_MAP matching runs
+    once per layout rather than once per sheet.
+    """
+    colmap = _match_col(list(std_cols), HEADER_MAP)
+    rename = {colmap[key]: name for key, name in INTERNAL_NAMES.items() if key in colmap}
+    return tuple(rename.get(c, c) for c in std_cols)
 
 
+def _header_names(columns) -> Tuple[str, ...]:
+    return _resolve_headers(tuple(_std_col(c) for c in columns))
+
+
+def _select_columns(columns, keep=INGEST_COLUMNS) -> Optional[list]:
+    """Source column labels whose normalized name is in ``keep``.
+
+    Returns None (read everything) when ``keep`` is None or nothing matches.
+    """
+    if keep is None:
+        return None
+    selected = [raw for raw, name in zip(columns, _header_names(columns)) if name in keep]
+    return selected or None
+
 
 def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    """Rename columns to our internal names and coerce basic types."""
-    out = df.copy()
-    out.columns = [_std_col(c) for c in out.columns]
-    colmap = _match_col(list(out.columns), HEADER_MAP)
-
-    rename = {}
-    if "item_code" in colmap: rename[colmap["item_code"]] = "ITEM_CODE"
-    if "desc"      in colmap: rename[colmap["desc"]]      = "DESCRIPTION"
-    if "unit"      in colmap: rename[colmap["unit"]]      = "UNIT"
-    if "qty"       in colmap: rename[colmap["qty"]]       = "QUANTITY"
-    if "price"     in colmap: rename[colmap["price"]]     = "UNIT_PRICE"
-    if "letting"   in colmap: rename[colmap["letting"]]   = "LETTING_DATE"  # alias BID_DATE -> LETTING_DATE
-    if "county"    in colmap: rename[colmap["county"]]    = "COUNTY"
-    if "district"  in colmap: rename[colmap["district"]]  = "DISTRICT"
-    if "region"    in colmap: rename[colmap["region"]]    = "REGION"
-    if "bidder"    in colmap: rename[colmap["bidder"]]    = "BIDDER"
-    if "weight"    in colmap: rename[colmap["weight"]]    = "WEIGHT"
-
-    if rename:
-        out = out.rename(columns=rename)
+    """Rename columns to our internal names and coerce basic types.
+
+    ``df`` itself is left untouched; the result shares the data of columns
+    that need no conversion instead of copying the whole frame up front.
+    """
+    out = df.set_axis(list(_header_names(df.columns)), axis=1, copy=False)
 
     # Numeric coercions (quietly ignore failures; leave as-is if not numeric)
     for c in ["UNIT_PRICE", "QUANTITY", "WEIGHT", "REGION", "JOB_SIZE"]:
@@ -109,42 +183,220 @@ def _normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     if "COUNTY" in out.columns:
         out["COUNTY"] = out["COUNTY"].astype(str).str.upper().str.strip()
     if "ITEM_CODE" in out.columns:
-        out["ITEM_CODE"] = out["ITEM_CODE"].map(normalize_item_code)
+        out["ITEM_CODE"] = normalize_item_codes(out["ITEM_CODE"])
 
     return out
 
+# ------------ Date partitions ------------
+# BidTabs exports are named by letting date ("2024-05-09.xls"). Sources without
+# dated names can be described in a manifest next to them:
+#   {"partitions": {"statewide_2021.xlsx": {"start": "2021-01-01", "end": "2021-12-31"}}}
+PARTITION_MANIFEST = "partitions.json"
+PARTITION_NAME_RE = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+
+DateRange = Tuple[date, date]
+
+
+def load_partition_manifest(folder: str | Path) -> Dict[str, DateRange]:
+    """Return ``{file name: (start, end)}`` from the folder's partition manifest."""
+    path = Path(folder) / PARTITION_MANIFEST
+    if not path.exists():
+        return {}
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    ranges: Dict[str, DateRange] = {}
+    for name, entry in (payload.get("partitions") or {}).items():
+        start = date.fromisoformat(str(entry["start"]))
+        end = date.fromisoformat(str(entry.get("end") or entry["start"]))
+        ranges[str(name)] = (start, end)
+    return ranges
+
+
+def partition_date_range(path: str | Path, manifest: Optional[Dict[str, DateRange]] = None) -> Optional[DateRange]:
+    """Letting-date range covered by a BidTabs file, or None when unknown.
+
+    The manifest wins over the file name; undated files are always loaded.
+    """
+    p = Path(path)
+    if manifest and p.name in manifest:
+        return manifest[p.name]
+    m = PARTITION_NAME_RE.match(p.stem)
+    if not m:
+        return None
+    try:
+        day = date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+    return day, day
+
+
+def window_start(as_of: date, max_months: int) -> date:
+    """First letting date inside a ``max_months`` look-back from ``as_of``."""
+    return (pd.Timestamp(as_of) - pd.DateOffset(months=max_months)).date()
+
+
 # ------------ Public loaders ------------
 
-def load_bidtabs_files(folder: str | Path) -> pd.DataFrame:
+BIDTABS_SUFFIXES = (".csv", ".xls", ".xlsx")
+# Columns identifying one bid row; duplicates on these are dropped.
+BIDTABS_KEY_COLUMNS = ("ITEM_CODE", "LETTING_DATE", "UNIT_PRICE", "QUANTITY", "BIDDER")
+
+
+# Rows per chunk when streaming CSV exports.
+CSV_CHUNK_ROWS = 100_000
+
+
+def iter_bidtabs_csv(
+    path: str | Path, chunksize: int = CSV_CHUNK_ROWS, columns=INGEST_COLUMNS
+) -> Iterator[pd.DataFrame]:
+    """Yield normalized chunks of a BidTabs CSV export.
+
+    At most ``chunksize`` raw rows are held at once, so statewide exports of
+    any size can be processed in bounded memory.
+    """
+    f = Path(path)
+    header = pd.read_csv(f, dtype=str, encoding="utf-8", nrows=0).columns
+    with pd.read_csv(
+        f,
+        dtype=str,
+        encoding="utf-8",
+        na_filter=False,
+        usecols=_select_columns(header, columns),
+        chunksize=max(1, int(chunksize)),
+    ) as reader:
+        for raw in reader:
+            if not raw.empty:
+                yield _normalize_columns(raw)
+
+
+def read_bidtabs_excel(path: str | Path, columns=INGEST_COLUMNS) -> list[pd.DataFrame]:
+    """Parse every non-empty sheet of an Excel export (no sidecar cache)."""
+    frames = []
+    xl = pd.ExcelFile(path)
+    for sh in xl.sheet_names:
+        header = xl.parse(sh, dtype=str, nrows=0).columns
+        df = xl.parse(sh, dtype=str, usecols=_select_columns(header, columns))
+        if not df.empty:
+            frames.append(_normalize_columns(df))
+    return frames
+
+
+def _read_file(
+    f: Path, columns=INGEST_COLUMNS, cache_dir: str | Path | None = None
+) -> Tuple[list[pd.DataFrame], bool]:
+    """Frames of one export and whether they came from a sidecar."""
+    if f.suffix.lower() == ".csv":
+        return list(iter_bidtabs_csv(f, columns=columns)), False
+    if cache_dir is not None and f.suffix.lower() in EXCEL_SUFFIXES:
+        return cached_frames(f, cache_dir, lambda: read_bidtabs_excel(f, columns), columns)
+    return read_bidtabs_excel(f, columns), False
+
+
+def read_bidtabs_file(
+    path: str | Path, columns=INGEST_COLUMNS, cache_dir: str | Path | None = None
+) -> list[pd.DataFrame]:
+    """Read one BidTabs export (every non-empty sheet) with normalized columns.
+
+    Only source columns that normalize to a name in ``columns`` are parsed
+    (default :data:`INGEST_COLUMNS`); pass ``columns=None`` to keep them all.
+    CSV exports are read in chunks of :data:`CSV_CHUNK_ROWS` rows. With
+    ``cache_dir``, Excel workbooks are served from their sidecar in that
+    directory (see :mod:`costest.bidtabs_cache`) when it is current.
+    """
+    return _read_file(Path(path), columns, cache_dir)[0]
+
+
+def load_bidtabs_files(
+    folder: str | Path,
+    as_of: Optional[date] = None,
+    max_months: Optional[int] = None,
+    cache_dir: str | Path | None = None,
+) -> pd.DataFrame:
     """
     Load and stack all CSV/XLS/XLSX files in a folder.
-    - Reads all visible sheets from Excel workbooks.
+    - Reads all visible sheets from Excel workbooks (from their sidecar in
+      ``cache_dir`` when current).
     - Normalizes columns.
+    - With ``max_months``, skips date partitions that end before the look-back
+      window from ``as_of`` (default today). Skipped file names are listed in
+      ``df.attrs["skipped_partitions"]``.
+    - Quarantines rows pricing can never use (blank item code, missing,
+      non-numeric or non-positive unit price, duplicate bid rows). Per-file
+      timings and counts, and the quarantined rows, are kept in an
+      :class:`~costest.ingest_report.IngestReport` at
+      ``df.attrs["ingest_report"]``.
     """
     p = Path(folder)
     files = list(p.glob("*.csv")) + list(p.glob("*.xls")) + list(p.glob("*.xlsx"))
     if not files:
         raise FileNotFoundError(f"No BidTabs files (.csv/.xls/.xlsx) found in {p}")
 
+    skipped: list[str] = []
+    if max_months is not None:
+        cutoff = window_start(as_of or date.today(), max_months)
+        manifest = load_partition_manifest(p)
+        kept = []
+        for f in files:
+            covered = partition_date_range(f, manifest)
+            if covered is not None and covered[1] < cutoff:
+                skipped.append(f.name)
+            else:
+                kept.append(f)
+        files = kept
+        if not files:
+            raise FileNotFoundError(f"No BidTabs files in {p} cover letting dates on or after {cutoff}")
+
+    report = IngestReport()
     dfs: list[pd.DataFrame] = []
+    keys: list[pd.DataFrame] = []
+    owners: list[int] = []
     for f in files:
-        ext = f.suffix.lower()
-        if ext == ".csv":
-            raw = pd.read_csv(f, dtype=str, encoding="utf-8", na_filter=False)
-            if not raw.empty:
-                dfs.append(_normalize_columns(raw))
-        else:
-            # Excel: read all sheets
-            xl = pd.ExcelFile(f)
-            for sh in xl.sheet_names:
-                df = xl.parse(sh, dtype=str)
-                if not df.empty:
-                    dfs.append(_normalize_columns(df))
+        start = time.perf_counter()
+        frames, cached = _read_file(f, cache_dir=cache_dir)
+        entry = FileReport(
+            source=f.name,
+            bytes=f.stat().st_size,
+            parse_seconds=time.perf_counter() - start,
+            cached=cached,
+        )
+        report.files.append(entry)
+        reasons_seen: list[pd.Series] = []
+        for df in frames:
+            parsed = parse_columns(df)
+            reasons = row_reasons(df, parsed=parsed)
+            for col, count in coercion_failures(df, parsed).items():
+                entry.coercion_failures[col] = entry.coercion_failures.get(col, 0) + count
+            bad = reasons.notna()
+            entry.rows_read += int(len(df))
+            reasons_seen.append(reasons[bad])
+            if bad.any():
+                report.add_quarantine(df.loc[bad], f.name, reasons)
+                df = df.loc[~bad]
+            dfs.append(df)
+            keys.append(sanitizer_keys(df, BIDTABS_KEY_COLUMNS, {k: v.loc[df.index] for k, v in parsed.items()}))
+            owners.append(len(report.files) - 1)
+        entry.quarantined = count_by_reason(pd.concat(reasons_seen) if reasons_seen else [])
 
     if not dfs:
         raise ValueError(f"Parsed 0 rows from files in {p}")
 
-    return pd.concat(dfs, ignore_index=True)
+    out = pd.concat(dfs, ignore_index=True)
+    # Duplicates across the whole history, first occurrence wins (the run's
+    # sanitizer rule), charged to the file holding the later copy.
+    dup = pd.concat(keys, ignore_index=True).duplicated(keep="first").to_numpy()
+    owner = np.repeat(np.asarray(owners, dtype=np.int64), [len(df) for df in dfs])
+    if dup.any():
+        for idx, entry in enumerate(report.files):
+            mine = dup & (owner == idx)
+            if mine.any():
+                entry.quarantined["duplicate"] = int(mine.sum())
+                rows = out.loc[mine]
+                report.add_quarantine(rows, entry.source, pd.Series("duplicate", index=rows.index))
+        out = out.loc[~dup]
+    for entry in report.files:
+        entry.rows_kept = entry.rows_read - entry.rows_quarantined
+    out.attrs["skipped_partitions"] = sorted(skipped)
+    out.attrs["ingest_report"] = report
+    return out
 
 
 def ensure_region_column(bidtabs: pd.DataFrame, region_map: pd.DataFrame | None = None) -> pd.DataFrame:
@@ -221,7 +473,7 @@ def load_quantities(xlsx_path: str | Path) -> pd.DataFrame:
     })
 
     # Normalize item codes
-    df["ITEM_CODE"] = df["ITEM_CODE"].map(normalize_item_code)
+    df["ITEM_CODE"] = normalize_item_codes(df["ITEM_CODE"])
     return df
 
 
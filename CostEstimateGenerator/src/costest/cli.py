@@ -1,33 +1,42 @@
+"""Command-line entry point for the cost estimate pipeline.
+
+Heavy and optional dependencies (pandas, openpyxl, openai, reportlab, PyPDF2)
+are imported inside the code paths that use them, and ``.env`` is loaded by
+:func:`main`/:func:`run` rather than at import, so ``costest --help``, config
+validation and worker start-up stay fast.
+
+The module-level settings below are process defaults derived from the
+environment. Each run snapshots them into an immutable
+:class:`~costest.config.RunContext` (see :func:`build_run_context`) and reads
+only that context, so concurrent runs in one process do not interfere.
+"""
+
+from __future__ import annotations
+
 import os
-import math
 import argparse
+import sys
+import threading
 from pathlib import Path
-from typing import Dict, Optional, Sequence, List, TYPE_CHECKING
+from typing import Dict, Optional, Sequence, List, TYPE_CHECKING, Tuple, Union
 
-import pandas as pd
-from dotenv import load_dotenv
+from .pricing_rules import CONTRACT_PERCENT_ITEMS, contract_percent_amount, round_unit_price
 
-from .bidtabs_io import (
-    load_bidtabs_files,
-    load_quantities,
-    load_region_map,
-    ensure_region_column,
-    find_quantities_file,
-)
-from .price_logic import category_breakdown
-from .alternate_seek import find_alternate_price
-from .estimate_writer import write_outputs
-from .geometry import parse_geometry
-from .ai_reporter import generate_alternate_seek_report
-from .reporting import make_summary_text
-from . import reference_data
-from .ai_process_report import generate_process_improvement_report
 if TYPE_CHECKING:
-    from .config import CLIConfig
+    from datetime import date
+
+    import pandas as pd
+
+    from .bid_store import BidStoreHandle
+    from .config import CLIConfig, RunContext
+    from .range_index import ItemRangeIndex
+    from .sql_store import SqlBidStore
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DEFAULT_DATA_DIR = BASE_DIR / "data_sample"
 DEFAULT_BIDTABS_DIR = DEFAULT_DATA_DIR / "BidTabsData"
+DEFAULT_BID_STORE_DIR = DEFAULT_DATA_DIR / "BidTabsStore"
+DEFAULT_BIDTABS_CACHE_DIR = DEFAULT_DATA_DIR / "cache" / "bidtabs"
 DEFAULT_QTY_GLOB = str(DEFAULT_DATA_DIR / "*_project_quantities.xlsx")
 DEFAULT_PROJECT_ATTRS = DEFAULT_DATA_DIR / "project_attributes.xlsx"
 DEFAULT_ALIASES = DEFAULT_DATA_DIR / "code_aliases.csv"
@@ -71,24 +80,114 @@ def _resolve_path(value: Optional[str], default: Path) -> Path:
     return default.resolve()
 
 
-_load_api_key_from_file()
-load_dotenv(BASE_DIR / ".env")
-
-BIDFOLDER = _resolve_path(os.getenv("BIDTABS_DIR"), DEFAULT_BIDTABS_DIR)
-QTY_FILE_GLOB = os.getenv("QTY_FILE_GLOB", DEFAULT_QTY_GLOB)
-QTY_PATH = os.getenv("QUANTITIES_XLSX", "").strip()
-PROJECT_ATTRS_XLSX = _resolve_path(os.getenv("PROJECT_ATTRS_XLSX"), DEFAULT_PROJECT_ATTRS)
-LEGACY_EXPECTED_COST_XLSX = os.getenv("EXPECTED_COST_XLSX", "").strip()
-_region_map_env = os.getenv("REGION_MAP_XLSX", "").strip()
-LEGACY_REGION_MAP_XLSX = _region_map_env
-if not LEGACY_REGION_MAP_XLSX and DEFAULT_REGION_MAP.exists():
-    LEGACY_REGION_MAP_XLSX = str(DEFAULT_REGION_MAP.resolve())
-ALIASES_CSV = _resolve_path(os.getenv("ALIASES_CSV"), DEFAULT_ALIASES)
-OUTPUT_DIR = _resolve_path(os.getenv("OUTPUT_DIR"), DEFAULT_OUTPUT_DIR)
-OUT_XLSX = Path(os.getenv("OUTPUT_XLSX", str(OUTPUT_DIR / "Estimate_Draft.xlsx"))).expanduser().resolve()
-OUT_AUDIT = Path(os.getenv("OUTPUT_AUDIT", str(OUTPUT_DIR / "Estimate_Audit.csv"))).expanduser().resolve()
-OUT_PAYITEM_AUDIT = Path(os.getenv("OUTPUT_PAYITEM_AUDIT", str(OUTPUT_DIR / "PayItems_Audit.xlsx"))).expanduser().resolve()
-MIN_SAMPLE_TARGET = int(os.getenv("MIN_SAMPLE_TARGET", "50"))
+def _apply_env_settings() -> None:
+    """(Re)derive the module-level settings from the environment."""
+    global BIDFOLDER, BID_STORE_DIR, BIDTABS_CACHE_DIR, QTY_FILE_GLOB, QTY_PATH, PROJECT_ATTRS_XLSX, LEGACY_EXPECTED_COST_XLSX
+    global LEGACY_REGION_MAP_XLSX, ALIASES_CSV, OUTPUT_DIR, OUT_XLSX, OUT_AUDIT, OUT_PAYITEM_AUDIT
+    global MIN_SAMPLE_TARGET, WORKERS
+
+    BIDFOLDER = _resolve_path(os.getenv("BIDTABS_DIR"), DEFAULT_BIDTABS_DIR)
+    BID_STORE_DIR = _resolve_path(os.getenv("BIDTABS_STORE_DIR"), DEFAULT_BID_STORE_DIR)
+    BIDTABS_CACHE_DIR = _resolve_path(os.getenv("BIDTABS_CACHE_DIR"), DEFAULT_BIDTABS_CACHE_DIR)
+    QTY_FILE_GLOB = os.getenv("QTY_FILE_GLOB", DEFAULT_QTY_GLOB)
+    QTY_PATH = os.getenv("QUANTITIES_XLSX", "").strip()
+    PROJECT_ATTRS_XLSX = _resolve_path(os.getenv("PROJECT_ATTRS_XLSX"), DEFAULT_PROJECT_ATTRS)
+    LEGACY_EXPECTED_COST_XLSX = os.getenv("EXPECTED_COST_XLSX", "").strip()
+    LEGACY_REGION_MAP_XLSX = os.getenv("REGION_MAP_XLSX", "").strip()
+    if not LEGACY_REGION_MAP_XLSX and DEFAULT_REGION_MAP.exists():
+        LEGACY_REGION_MAP_XLSX = str(DEFAULT_REGION_MAP.resolve())
+    ALIASES_CSV = _resolve_path(os.getenv("ALIASES_CSV"), DEFAULT_ALIASES)
+    OUTPUT_DIR = _resolve_path(os.getenv("OUTPUT_DIR"), DEFAULT_OUTPUT_DIR)
+    OUT_XLSX = Path(os.getenv("OUTPUT_XLSX", str(OUTPUT_DIR / "Estimate_Draft.xlsx"))).expanduser().resolve()
+    OUT_AUDIT = Path(os.getenv("OUTPUT_AUDIT", str(OUTPUT_DIR / "Estimate_Audit.csv"))).expanduser().resolve()
+    OUT_PAYITEM_AUDIT = Path(os.getenv("OUTPUT_PAYITEM_AUDIT", str(OUTPUT_DIR / "PayItems_Audit.xlsx"))).expanduser().resolve()
+    MIN_SAMPLE_TARGET = int(os.getenv("MIN_SAMPLE_TARGET", "50"))
+    WORKERS = max(1, int(os.getenv("PRICING_WORKERS", "1") or 1))
+
+
+_ENV_LOADED = False
+_ENV_LOCK = threading.Lock()
+
+
+def _load_environment() -> None:
+    """Load the API key file and ``.env`` once, before the first run.
+
+    Settings are re-derived only when ``.env`` actually supplied values, so
+    overrides applied after import are kept otherwise.
+    """
+    global _ENV_LOADED
+    with _ENV_LOCK:
+        if _ENV_LOADED:
+            return
+        _ENV_LOADED = True
+        _load_api_key_from_file()
+        env_file = BASE_DIR / ".env"
+        if env_file.exists():
+            from dotenv import load_dotenv
+
+            if load_dotenv(env_file):
+                _apply_env_settings()
+
+
+_apply_env_settings()
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "0").strip().lower() in ("1", "true", "yes")
+
+
+def build_run_context(config: Optional[CLIConfig] = None, **overrides: object) -> RunContext:
+    """Snapshot the current defaults into an immutable :class:`RunContext`.
+
+    ``config`` (the test/evaluation harness config) redirects the outputs and
+    may disable AI; keyword ``overrides`` replace individual context fields.
+    """
+    from .config import RunContext
+
+    _load_environment()
+    qty_path = os.getenv("QUANTITIES_XLSX", "").strip() or QTY_PATH
+    region_env = os.getenv("PROJECT_REGION", "").strip()
+    context = RunContext(
+        bidtabs_dir=BIDFOLDER,
+        bid_store_dir=BID_STORE_DIR,
+        bidtabs_cache_dir=None if _env_flag("BIDTABS_NO_CACHE") else BIDTABS_CACHE_DIR,
+        quantities_glob=QTY_FILE_GLOB,
+        quantities_path=Path(qty_path).expanduser().resolve() if qty_path else None,
+        project_attributes=PROJECT_ATTRS_XLSX,
+        expected_cost_path=LEGACY_EXPECTED_COST_XLSX or None,
+        region_map=LEGACY_REGION_MAP_XLSX or None,
+        aliases_csv=ALIASES_CSV,
+        output_dir=OUTPUT_DIR,
+        output_xlsx=OUT_XLSX,
+        output_audit=OUT_AUDIT,
+        output_payitem_audit=OUT_PAYITEM_AUDIT,
+        min_sample_target=MIN_SAMPLE_TARGET,
+        project_region=int(region_env) if region_env else None,
+        disable_ai=_env_flag("DISABLE_OPENAI"),
+        contract_cost_filter=not _env_flag("DISABLE_CONTRACT_COST_FILTER"),
+        workers=WORKERS,
+        float_dtype=os.getenv("BIDTABS_FLOAT_DTYPE", "float64").strip() or "float64",
+        partition_pruning=not _env_flag("BIDTABS_ALL_PARTITIONS"),
+        price_mode=os.getenv("PRICE_MODE", "WGT_AVG").strip().upper() or "WGT_AVG",
+        price_trim=os.getenv("PRICE_TRIM", "SIGMA").strip().upper() or "SIGMA",
+        bootstrap_samples=int(os.getenv("BOOTSTRAP_SAMPLES", "1000")),
+        escalate=_env_flag("ESCALATE_PRICES"),
+    )
+    if config is not None:
+        context = context.replace(
+            output_dir=config.estimate_audit_csv.parent,
+            output_audit=config.estimate_audit_csv,
+            output_xlsx=config.estimate_xlsx,
+            output_payitem_audit=config.payitems_workbook,
+            mapping_debug_csv=config.mapping_debug_csv,
+            disable_ai=context.disable_ai or config.disable_ai,
+        )
+    if overrides:
+        context = context.replace(**overrides)
+    return context
+
+# Contract-size filter: bids on contracts of 50% to 150% of the expected cost.
+CONTRACT_SIZE_BAND: Tuple[float, float] = (0.5, 1.5)
 
 CATEGORY_LABELS: Sequence[str] = (
     "DIST_12M",
@@ -100,26 +199,9 @@ CATEGORY_LABELS: Sequence[str] = (
 )
 
 
-def _round_unit_price(value: float) -> float:
-    if value is None:
-        return 0.0
-    try:
-        numeric = float(value)
-    except (TypeError, ValueError):
-        return 0.0
-    if math.isnan(numeric):  # pragma: no cover - defensive
-        return float("nan")
-    if numeric <= 0:
-        return 0.0
-    if numeric < 1.0:
-        return round(numeric, 2)
-    magnitude = math.floor(math.log10(numeric))
-    step = 10 ** max(magnitude - 1, -1)
-    rounded = round(numeric / step) * step
-    return round(rounded, 2)
-
-
 def _first_numeric(series: pd.Series) -> Optional[float]:
+    import pandas as pd
+
     series = pd.to_numeric(series, errors="coerce").dropna()
     if series.empty:
         return None
@@ -158,6 +240,10 @@ def _extract_project_region(df: pd.DataFrame) -> Optional[int]:
 
 def _sanitize_bidtabs(df: pd.DataFrame) -> pd.DataFrame:
     """Basic cleansing: drop non-positive prices and duplicate bid rows."""
+    import pandas as pd
+
+    from .bidtabs_io import BIDTABS_KEY_COLUMNS
+
     if df is None or df.empty:
         return df
 
@@ -169,7 +255,7 @@ def _sanitize_bidtabs(df: pd.DataFrame) -> pd.DataFrame:
     if "QUANTITY" in cleaned.columns:
         cleaned["QUANTITY"] = pd.to_numeric(cleaned["QUANTITY"], errors="coerce")
 
-    subset = [col for col in ["ITEM_CODE", "LETTING_DATE", "UNIT_PRICE", "QUANTITY", "BIDDER"] if col in cleaned.columns]
+    subset = [col for col in BIDTABS_KEY_COLUMNS if col in cleaned.columns]
     if subset:
         cleaned = cleaned.drop_duplicates(subset=subset, keep="first")
 
@@ -181,6 +267,10 @@ def load_project_attributes(
     legacy_expected_path: Optional[str] = None,
     legacy_region_map_path: Optional[str] = None,
 ) -> tuple[Optional[float], Optional[int], pd.DataFrame]:
+    import pandas as pd
+
+    from .bidtabs_io import load_region_map
+
     if not path.exists():
         expected_cost = None
         if legacy_expected_path and Path(legacy_expected_path).exists():
@@ -233,34 +323,368 @@ def load_project_attributes(
     return expected_cost, project_region, region_map_df
 
 
-def run(config: Optional["CLIConfig"] = None) -> int:
-    # If test-provided config is supplied, override output paths for this run only.
-    prev_output_dir = OUTPUT_DIR
-    prev_out_xlsx = OUT_XLSX
-    prev_out_audit = OUT_AUDIT
-    prev_out_pay_audit = OUT_PAYITEM_AUDIT
-    if config is not None:
-        # Defer import to avoid circular at module import
-        try:
-            from .config import CLIConfig as _CLI
-            assert isinstance(config, _CLI)
-        except Exception:
-            pass
-        # Point outputs to the temp folder provided by tests
-        globals()["OUTPUT_DIR"] = config.estimate_audit_csv.parent
-        globals()["OUT_AUDIT"] = config.estimate_audit_csv
-        globals()["OUT_XLSX"] = config.estimate_xlsx
-        globals()["OUT_PAYITEM_AUDIT"] = config.payitems_workbook
-    expected_contract_cost, project_region, region_map = load_project_attributes(
-        PROJECT_ATTRS_XLSX,
-        legacy_expected_path=LEGACY_EXPECTED_COST_XLSX or None,
-        legacy_region_map_path=LEGACY_REGION_MAP_XLSX or None,
+def _quantity_lines(qty: pd.DataFrame) -> List[Dict[str, object]]:
+    """Flatten the quantities frame into plain per-line records for pricing."""
+    lines: List[Dict[str, object]] = []
+    for _, r in qty.iterrows():
+        lines.append({
+            "ITEM_CODE": str(r["ITEM_CODE"]).strip(),
+            "DESCRIPTION": str(r.get("DESCRIPTION", "")).strip(),
+            "UNIT": str(r.get("UNIT", "")).strip(),
+            "QUANTITY": float(r.get("QUANTITY", 0) or 0),
+        })
+    return lines
+
+
+def _price_line(
+    bid: pd.DataFrame,
+    line: Dict[str, object],
+    project_region: Optional[int],
+    context: Optional[RunContext] = None,
+) -> tuple:
+    """Price one quantities line.
+
+    Returns ``(row, detail, alternate_report, process_notes)`` where the last
+    three entries are ``None`` when not applicable.
+    """
+    import pandas as pd
+
+    from . import reference_data
+    from .alternate_seek import find_alternate_price
+    from .geometry import parse_geometry
+    from .price_logic import category_breakdown
+
+    if context is None:
+        context = build_run_context()
+    min_sample_target = context.min_sample_target
+    alt_report: Optional[Dict[str, object]] = None
+    notes_out: Optional[Dict[str, object]] = None
+    code = line["ITEM_CODE"]
+    desc = line["DESCRIPTION"]
+    unit = line["UNIT"]
+    qty_val = line["QUANTITY"]
+
+    price, _, cat_data, detail_map, used_categories, combined_used = category_breakdown(
+        bid,
+        code,
+        project_region=project_region,
+        include_details=True,
+        target_quantity=(qty_val if qty_val > 0 else None),
+        mode=context.price_mode,
+        min_sample_target=min_sample_target,
+        trim=context.price_trim,
     )
-    reference_data.load_payitem_catalog()
-    reference_data.load_unit_price_summary()
-    reference_data.load_spec_sections()
 
-    bid = load_bidtabs_files(BIDFOLDER)
+    note = ""
+    if pd.isna(price):
+        price = 0.0
+        note = "NO DATA IN ANY CATEGORY; REVIEW."
+
+    used_categories = used_categories or []
+    used_category_set = set(used_categories)
+    data_points_used = int(cat_data.get("TOTAL_USED_COUNT", len(combined_used)))
+
+    if not note and 0 < data_points_used < min_sample_target:
+        note = f"Only {data_points_used} data points found (target {min_sample_target})."
+
+    geometry = parse_geometry(desc)
+    reference_bundle = reference_data.build_reference_bundle(code)
+    unit_price_est = round_unit_price(price)
+
+    row: Dict[str, object] = {
+        "ITEM_CODE": code,
+        "DESCRIPTION": desc,
+        "UNIT": unit,
+        "QUANTITY": qty_val,
+        "UNIT_PRICE_EST": unit_price_est,
+        "NOTES": note,
+        "DATA_POINTS_USED": data_points_used,
+        "ALTERNATE_USED": False,
+    }
+
+    if geometry is not None:
+        row["GEOM_SHAPE"] = geometry.shape
+        row["GEOM_AREA_SQFT"] = round(geometry.area_sqft, 4)
+        if geometry.dimensions:
+            row["GEOM_DIMENSIONS"] = geometry.dimensions
+
+    if data_points_used == 0 and geometry is not None:
+        alt_result = find_alternate_price(
+            bid,
+            code,
+            geometry,
+            project_region=project_region,
+            target_description=desc,
+            reference_bundle=reference_bundle,
+            mode=context.price_mode,
+            min_sample_target=min_sample_target,
+            ai_enabled=context.ai_enabled,
+            trim=context.price_trim,
+        )
+        if alt_result is not None:
+            price = alt_result.final_price
+            unit_price_est = round_unit_price(price)
+            data_points_used = alt_result.total_data_points
+            row["UNIT_PRICE_EST"] = unit_price_est
+            row["DATA_POINTS_USED"] = data_points_used
+            row["ALTERNATE_USED"] = True
+            source_items = []
+            for sel in alt_result.selections:
+                source_label = sel.source or "unknown"
+                source_items.append(f"{sel.item_code} (w={sel.weight:.2f}, src={source_label})")
+            row["ALTERNATE_SOURCE_ITEM"] = "; ".join(source_items)
+            row["ALTERNATE_RATIO"] = "; ".join(f"{sel.ratio:.3f}" for sel in alt_result.selections)
+            row["ALTERNATE_BASE_PRICE"] = "; ".join(f"${sel.base_price:.2f}" for sel in alt_result.selections)
+            row["ALTERNATE_SOURCE_AREA"] = "; ".join(f"{sel.area_sqft:.2f}" for sel in alt_result.selections)
+            row["ALTERNATE_CANDIDATE_COUNT"] = sum(sel.data_points for sel in alt_result.selections)
+            row["ALT_TOTAL_CANDIDATES"] = len(alt_result.candidate_payload)
+            row["ALT_SELECTED_COUNT"] = len(alt_result.selections)
+            similarity_summary = alt_result.similarity_summary or {}
+            for key, value in similarity_summary.items():
+                col = 'ALT_SCORE_OVERALL' if key == 'overall_score' else f"ALT_SCORE_{key.replace('_score', '').upper()}"
+                row[col] = round(float(value), 4)
+            method_label = "AI weighted alternates"
+            if alt_result.ai_notes and 'failed' in str(alt_result.ai_notes).lower():
+                method_label = "Score-based fallback"
+            elif all(sel.reason and sel.reason.lower().startswith('fallback') for sel in alt_result.selections):
+                method_label = "Score-based fallback"
+            row["ALTERNATE_METHOD"] = method_label
+            if alt_result.ai_notes:
+                row["ALTERNATE_AI_NOTES"] = alt_result.ai_notes
+            row["NOTES"] = "AI weighted pricing" if method_label == "AI weighted alternates" else "Score-based alternate pricing"
+            similarity_flags = []
+            for sel in alt_result.selections:
+                for note in sel.notes:
+                    similarity_flags.append(f"{sel.item_code}: {note}")
+            for code_key, notes_list in (alt_result.candidate_notes or {}).items():
+                for note in notes_list:
+                    entry = f"{code_key}: {note}"
+                    if entry not in similarity_flags:
+                        similarity_flags.append(entry)
+            if similarity_flags:
+                joined_flags = " | ".join(similarity_flags)
+                row["ALT_SIMILARITY_NOTES"] = joined_flags[:1000]
+            selection_payload = []
+            for sel in alt_result.selections:
+                payload = {
+                    "item_code": sel.item_code,
+                    "description": sel.description,
+                    "area_sqft": sel.area_sqft,
+                    "base_price": sel.base_price,
+                    "adjusted_price": sel.adjusted_price,
+                    "ratio": sel.ratio,
+                    "data_points": sel.data_points,
+                    "weight": sel.weight,
+                    "reason": sel.reason,
+                    "source": sel.source,
+                    "similarity_scores": dict(sel.similarity or {}),
+                    "notes": list(sel.notes),
+                }
+                selection_payload.append(payload)
+            alt_entry = {
+                "target_area_sqft": geometry.area_sqft,
+                "candidates": alt_result.candidate_payload,
+                "selected": selection_payload,
+                "similarity_summary": similarity_summary,
+                "candidate_notes": alt_result.candidate_notes,
+                "chosen": {
+                    "final_unit_price": float(alt_result.final_price),
+                    "rounded_unit_price": unit_price_est,
+                    "total_data_points": int(data_points_used),
+                    "selections": [dict(entry) for entry in selection_payload],
+                    "similarity_summary": similarity_summary,
+                },
+                "final_price_raw": float(alt_result.final_price),
+                "final_price_rounded": unit_price_est,
+                "ai_notes": alt_result.ai_notes,
+                "method": method_label,
+            }
+            ref_snapshot = None
+            if alt_result.reference_bundle:
+                alt_entry["references"] = alt_result.reference_bundle
+                ref_snapshot = dict(alt_result.reference_bundle)
+                spec_text = ref_snapshot.get('spec_text')
+                if isinstance(spec_text, str) and len(spec_text) > 4000:
+                    ref_snapshot['spec_text'] = spec_text[:4000] + ' \u2026'
+            if alt_result.ai_system:
+                alt_entry["ai_system"] = alt_result.ai_system
+            if alt_result.show_work_method:
+                alt_entry["show_work_method"] = alt_result.show_work_method
+                row["ALT_SHOW_WORK_METHOD"] = alt_result.show_work_method
+            if alt_result.process_improvements:
+                alt_entry["process_improvements"] = alt_result.process_improvements
+            notes_payload = {
+                "item_code": code,
+                "description": desc,
+                "unit": unit,
+                "process_improvements": alt_result.process_improvements,
+                "ai_system": alt_result.ai_system,
+                "show_work_method": alt_result.show_work_method,
+                "references": ref_snapshot,
+                "similarity_summary": similarity_summary,
+                "candidate_notes": alt_result.candidate_notes,
+                "ai_notes": alt_result.ai_notes,
+                "alternate_method": method_label,
+            }
+            if any(notes_payload.get(key) for key in ("process_improvements", "ai_system", "show_work_method", "similarity_summary")):
+                notes_out = notes_payload
+            alt_report = alt_entry
+            if alt_result.ai_notes:
+                alt_entry["chosen"]["notes"] = alt_result.ai_notes
+            cat_data = alt_result.cat_data
+            detail_map = alt_result.detail_map or {}
+            used_categories = alt_result.used_categories or []
+            combined_used = alt_result.combined_detail
+
+    for label in CATEGORY_LABELS:
+        row[f"{label}_PRICE"] = cat_data.get(f"{label}_PRICE", float("nan"))
+        row[f"{label}_COUNT"] = cat_data.get(f"{label}_COUNT", 0)
+        row[f"{label}_INCLUDED"] = label in used_category_set
+
+
+    detail_frames = []
+    detail_map = detail_map or {}
+    seen_ids = set()
+
+    for category_name in CATEGORY_LABELS:
+        if category_name not in used_category_set:
+            continue
+        subset = detail_map.get(category_name)
+        if subset is None or subset.empty:
+            continue
+        detail = subset.copy()
+        if "_AUDIT_ROW_ID" in detail.columns:
+            detail = detail.loc[~detail["_AUDIT_ROW_ID"].isin(seen_ids)].copy()
+            seen_ids.update(detail["_AUDIT_ROW_ID"].tolist())
+            detail.drop(columns=["_AUDIT_ROW_ID", "LETTING_MONTH"], errors="ignore", inplace=True)
+        detail["CATEGORY"] = category_name
+        detail["USED_FOR_PRICING"] = True
+        detail_frames.append(detail)
+
+    detail_out = pd.concat(detail_frames, ignore_index=True) if detail_frames else None
+    return row, detail_out, alt_report, notes_out
+
+
+# Per-process state for pricing workers, populated by the pool initializer.
+_WORKER_STATE: Dict[str, object] = {}
+
+
+def _init_pricing_worker(
+    handle: Union[BidStoreHandle, SqlBidStore],
+    project_region: Optional[int],
+    context: Optional[RunContext] = None,
+    indexed: bool = False,
+) -> None:
+    from .bid_store import attach_bid_store
+    from .range_index import ItemRangeIndex
+    from .sql_store import SqlBidStore
+
+    if isinstance(handle, SqlBidStore):
+        # Each worker opens its own read-only connection on unpickling.
+        _WORKER_STATE["handle"] = None
+        _WORKER_STATE["bid"] = handle
+    else:
+        _WORKER_STATE["handle"] = handle
+        bid = attach_bid_store(handle)
+        # The range index is cheap to rebuild and not worth shipping.
+        _WORKER_STATE["bid"] = ItemRangeIndex(bid) if indexed else bid
+    _WORKER_STATE["project_region"] = project_region
+    _WORKER_STATE["context"] = context
+
+
+def _price_line_worker(line: Dict[str, object]) -> tuple:
+    from .bid_store import restore_encoded_columns
+
+    row, detail, alt_report, notes_payload = _price_line(
+        _WORKER_STATE["bid"], line, _WORKER_STATE["project_region"], _WORKER_STATE["context"]
+    )
+    if _WORKER_STATE["handle"] is not None:
+        detail = restore_encoded_columns(detail, _WORKER_STATE["handle"])
+    return row, detail, alt_report, notes_payload
+
+
+def _price_lines_parallel(
+    bid: Union[pd.DataFrame, ItemRangeIndex, SqlBidStore],
+    lines: List[Dict[str, object]],
+    project_region: Optional[int],
+    workers: int,
+    context: Optional[RunContext] = None,
+) -> list:
+    """Price quantities lines across a process pool, preserving input order.
+
+    The BidTabs frame is published once to shared memory; workers attach to it
+    zero-copy instead of receiving a pickled copy; for an
+    :class:`ItemRangeIndex` its frame is shared and each worker rebuilds the
+    index. A :class:`SqlBidStore` is passed as is and each worker queries the
+    SQLite file directly.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    import pandas as pd
+
+    from .bid_store import SharedBidStore
+    from .range_index import ItemRangeIndex
+
+    if context is None:
+        context = build_run_context()
+    workers = max(1, min(int(workers), len(lines)))
+    chunksize = max(1, len(lines) // (workers * 4))
+    method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+
+    indexed = isinstance(bid, ItemRangeIndex)
+
+    def _map(handle) -> list:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(method),
+            initializer=_init_pricing_worker,
+            initargs=(handle, project_region, context, indexed),
+        ) as pool:
+            return list(pool.map(_price_line_worker, lines, chunksize=chunksize))
+
+    if indexed:
+        bid = bid.frame
+    if not isinstance(bid, pd.DataFrame):
+        return _map(bid)
+    with SharedBidStore.from_frame(bid) as store:
+        return _map(store.handle)
+
+
+def _load_bid_history(ctx: RunContext, region_map: pd.DataFrame) -> Tuple[pd.DataFrame, int]:
+    """Load, clean and compact the BidTabs history for a run.
+
+    Reads the history store when it exists and the BidTabs folder otherwise.
+    With ``ctx.escalate`` the prices are escalated to the as-of date along
+    each item's fitted trend (see :func:`_price_trends`). Returns the frame
+    and the store version it was read at (0 for a folder).
+    """
+    import pandas as pd
+
+    from .bid_store import compact_bidtabs, compaction_report
+    from .bidtabs_io import ensure_region_column, load_bidtabs_files
+    from .geometry import parse_geometry
+    from .history_store import load_history_store, store_exists
+    from .price_logic import max_window_months
+
+    max_months = max_window_months() if ctx.partition_pruning else None
+    if store_exists(ctx.bid_store_dir):
+        bid = load_history_store(ctx.bid_store_dir, as_of=ctx.as_of, max_months=max_months)
+        print(f"Loaded BidTabs history from store {ctx.bid_store_dir} (version {bid.attrs['store_version']}).")
+    else:
+        bid = load_bidtabs_files(
+            ctx.bidtabs_dir, as_of=ctx.as_of, max_months=max_months, cache_dir=ctx.bidtabs_cache_dir
+        )
+    store_version = int(bid.attrs.get("store_version", 0))
+    skipped_partitions = bid.attrs.get("skipped_partitions") or []
+    if skipped_partitions:
+        print(
+            f"Skipped {len(skipped_partitions)} BidTabs partition(s) older than the {max_months}-month pricing window."
+        )
+    ingest_report = bid.attrs.get("ingest_report")
+    if ingest_report is not None:
+        report_paths = ingest_report.write(ctx.output_dir)
+        print(f"{ingest_report.summary()} See {report_paths['json'].name} and {report_paths['quarantine'].name}.")
     bid = ensure_region_column(bid, region_map)
 
     geom_info = bid['DESCRIPTION'].apply(parse_geometry)
@@ -278,27 +702,235 @@ def run(config: Optional["CLIConfig"] = None) -> int:
         bid["JOB_SIZE"] = pd.to_numeric(bid["JOB_SIZE"], errors="coerce")
 
     bid = _sanitize_bidtabs(bid)
+    raw_bid = bid
+    bid = compact_bidtabs(bid, float_dtype=ctx.float_dtype)
+    compaction = compaction_report(raw_bid, bid)
+    del raw_bid
+    print(
+        f"BidTabs in memory: {compaction['bytes_per_row_before']:,.0f} -> {compaction['bytes_per_row_after']:,.0f} bytes/row "
+        f"({compaction['columns_before']} -> {compaction['columns_after']} columns, {compaction['rows']} rows)."
+    )
+    if ctx.escalate:
+        from .trends import escalate_prices
+
+        trends = _price_trends(ctx, bid)
+        bid = escalate_prices(bid, trends)
+        basis = trends.items["BASIS"].value_counts()
+        print(
+            f"Escalated prices to {trends.as_of.isoformat()}: {basis.get('ITEM', 0)} item trends, "
+            f"{basis.get('SECTION', 0)} section trends, {basis.get('NONE', 0)} items unescalated "
+            f"(median rate {trends.items['RATE'].median():+.1%}/yr)."
+        )
+    return bid, store_version
+
+
+def _as_of(ctx: RunContext) -> date:
+    """The date pricing windows and escalation are measured to."""
+    from datetime import date
+
+    return ctx.as_of or date.today()
+
+
+def _trend_key(ctx: RunContext) -> Dict[str, object]:
+    """What fitted price trends depend on: the history's version and the as-of date."""
+    from .history_store import store_exists, store_version
+    from .reprice import folder_digest, store_partitions
+
+    store_backed = store_exists(ctx.bid_store_dir)
+    return {
+        "store_version": store_version(ctx.bid_store_dir) if store_backed else None,
+        "partitions": store_partitions(ctx.bid_store_dir),
+        "bidtabs_files": None if store_backed else folder_digest(ctx.bidtabs_dir),
+        "partition_pruning": ctx.partition_pruning,
+        "as_of": _as_of(ctx).isoformat(),
+    }
+
+
+def _price_trends(ctx: RunContext, bid: pd.DataFrame, reuse: bool = True):
+    """Price trends of ``bid``, cached in the output directory per data version.
+
+    The cache is keyed by :func:`_trend_key`, so it is refitted only when the
+    history or the date changes.
+    """
+    from .trends import TRENDS_NAME, fit_trends, load_trends, save_trends
+
+    key = _trend_key(ctx)
+    path = ctx.output_dir / TRENDS_NAME
+    trends = load_trends(path, key) if reuse else None
+    if trends is None:
+        trends = fit_trends(bid, as_of=_as_of(ctx), key=key)
+        save_trends(path, trends)
+    return trends
+
+
+def _load_quantity_lines(ctx: RunContext, qty_path: Union[str, Path]) -> List[Dict[str, object]]:
+    """Quantities lines to price, with project codes mapped through the alias CSV."""
+    import pandas as pd
+
+    from .bidtabs_io import load_quantities, normalize_item_codes
 
-    # Allow runtime override of quantities workbook via environment variable
-    _qty_override = os.getenv("QUANTITIES_XLSX", "").strip()
-    if _qty_override:
-        qty_path = Path(_qty_override).expanduser().resolve()
-    else:
-        qty_path = Path(QTY_PATH).expanduser().resolve() if QTY_PATH else find_quantities_file(QTY_FILE_GLOB, base_dir=BASE_DIR)
     qty = load_quantities(qty_path)
 
-    if Path(ALIASES_CSV).exists():
-        alias = pd.read_csv(ALIASES_CSV, dtype=str)
+    if Path(ctx.aliases_csv).exists():
+        alias = pd.read_csv(ctx.aliases_csv, dtype=str)
         if not alias.empty:
-            alias["PROJECT_CODE"] = alias["PROJECT_CODE"].astype(str).str.strip()
-            alias["HIST_CODE"] = alias["HIST_CODE"].astype(str).str.strip()
+            # Quantities codes are already normalized; normalize the alias
+            # columns the same way so hand-typed codes still match.
+            alias["PROJECT_CODE"] = normalize_item_codes(alias["PROJECT_CODE"].astype(str).str.strip())
+            alias["HIST_CODE"] = normalize_item_codes(alias["HIST_CODE"].astype(str).str.strip())
             amap = dict(zip(alias["PROJECT_CODE"], alias["HIST_CODE"]))
-            qty["ITEM_CODE"] = qty["ITEM_CODE"].map(lambda c: amap.get(c, c))
+            qty["ITEM_CODE"] = qty["ITEM_CODE"].map(amap).fillna(qty["ITEM_CODE"])
+    return _quantity_lines(qty)
+
+
+def _run_settings(
+    ctx: RunContext,
+    qty_path: Union[str, Path],
+    project_region: Optional[int],
+    expected_contract_cost: Optional[float],
+) -> Dict[str, object]:
+    """Inputs and options (other than BidTabs data) an estimate's prices depend on."""
+    from . import __version__, reference_data
+    from .history_store import store_exists
+    from .reprice import PRICING_VERSION, file_digest, folder_digest
+
+    store_backed = store_exists(ctx.bid_store_dir)
+    return {
+        "package_version": __version__,
+        "pricing_version": PRICING_VERSION,
+        "reference_data": [file_digest(path) for path in reference_data.SOURCE_FILES],
+        "quantities": file_digest(qty_path),
+        "project_attributes": file_digest(ctx.project_attributes),
+        "aliases": file_digest(ctx.aliases_csv),
+        "region_map": file_digest(ctx.region_map),
+        "expected_contract_cost": expected_contract_cost,
+        "project_region": project_region,
+        "bid_store": str(ctx.bid_store_dir) if store_backed else None,
+        "bidtabs_dir": str(ctx.bidtabs_dir),
+        "bidtabs_files": None if store_backed else folder_digest(ctx.bidtabs_dir),
+        "sql_store": str(ctx.sql_store) if ctx.sql_store is not None else None,
+        "contract_cost_filter": ctx.contract_cost_filter,
+        "min_sample_target": ctx.min_sample_target,
+        "price_mode": ctx.price_mode,
+        "price_trim": ctx.price_trim,
+        "float_dtype": ctx.float_dtype,
+        "partition_pruning": ctx.partition_pruning,
+        "as_of": ctx.as_of,
+        "escalate": ctx.escalate,
+        # Escalation rescales every price of an item (and its section) when
+        # any partition or the date changes, so no line can be reused then.
+        "escalation": _trend_key(ctx) if ctx.escalate else None,
+        "ai_enabled": ctx.ai_enabled,
+    }
+
+
+def run(
+    config: Optional[CLIConfig] = None,
+    context: Optional[RunContext] = None,
+    incremental: bool = False,
+    reuse: bool = True,
+) -> int:
+    """Run the pipeline for one project.
+
+    ``context`` carries every input path and option for the run; when omitted
+    it is built from the current defaults and ``config`` by
+    :func:`build_run_context`. Nothing module-level is modified, so runs with
+    different contexts may execute concurrently in threads.
+
+    Every run saves its per-line results and their dependencies to
+    ``pricing_state.pkl`` in the output directory. The next run reuses the
+    saved result of every quantities line that is unchanged and unaffected by
+    store changes since, and prices only the rest (``reuse=False`` prices every
+    line). With ``incremental`` (``costest reprice``), a run that would reuse
+    every line stops without rewriting the outputs. See :mod:`costest.reprice`.
+    """
+    import pandas as pd
+
+    from . import reference_data
+    from .ai_process_report import generate_process_improvement_report
+    from .ai_reporter import generate_alternate_seek_report
+    from .bidtabs_io import find_quantities_file
+    from .estimate_writer import write_outputs
+    from .history_store import store_exists
+    from .intervals import estimate_intervals
+    from .range_index import ItemRangeIndex
+    from .reporting import make_summary_text
+    from .reprice import (
+        DELTA_EXEMPT,
+        STATE_NAME,
+        PricingState,
+        line_dependencies,
+        load_state,
+        plan_reprice,
+        reusable_lines,
+        save_state,
+        store_partitions,
+    )
+    from .sql_store import SqlBidStore, write_sql_store
+
+    ctx = context if context is not None else build_run_context(config)
+    expected_contract_cost, project_region, region_map = load_project_attributes(
+        ctx.project_attributes,
+        legacy_expected_path=ctx.expected_cost_path,
+        legacy_region_map_path=ctx.region_map,
+    )
+    if project_region is None:
+        project_region = ctx.project_region
+
+    qty_path = ctx.quantities_path or find_quantities_file(ctx.quantities_glob, base_dir=BASE_DIR)
+    settings = _run_settings(ctx, qty_path, project_region, expected_contract_cost)
+    as_of = _as_of(ctx)
+    state_path = ctx.output_dir / STATE_NAME
+    # With a saved state the audit CSV on disk was written by an earlier run,
+    # unless that run found it seeded as a template.
+    previous_run = state_path.is_file()
+    saved = load_state(state_path)
+    state = saved if incremental or reuse else None
+    if saved is not None:
+        audit_template = saved.audit_template
+    else:
+        audit_template = not previous_run and Path(ctx.output_audit).is_file()
+    plan = None
+    if state is not None or incremental:
+        plan, reason = plan_reprice(state, ctx.bid_store_dir, settings, as_of, exempt=DELTA_EXEMPT)
+        if plan is None:
+            print(f"Re-pricing every line: {reason}.")
+        elif incremental and not plan.lines and all(settings[k] == state.settings.get(k) for k in DELTA_EXEMPT):
+            state.as_of, state.partitions = as_of, store_partitions(ctx.bid_store_dir)
+            save_state(state_path, state)
+            print(
+                f"Estimate is up to date: {len(plan.changed_partitions)} changed and "
+                f"{len(plan.shifted_partitions)} window-shifted store partition(s) affect none of its "
+                f"{len(state.lines)} lines."
+            )
+            return 0
+        elif incremental:
+            print(
+                f"Re-pricing {len(plan.lines)} of {len(state.lines)} lines affected by "
+                f"{len(plan.changed_partitions)} changed and {len(plan.shifted_partitions)} "
+                "window-shifted store partition(s)."
+            )
+
+    reference_data.load_payitem_catalog()
+    reference_data.load_unit_price_summary()
+    reference_data.load_spec_sections()
+
+    bid, loaded_store_version = _load_bid_history(ctx, region_map)
+    if ctx.sql_store is not None:
+        rebuilt = write_sql_store(bid, ctx.sql_store)
+        print(f"{'Wrote' if rebuilt else 'Reusing'} SQLite BidTabs store {ctx.sql_store}.")
+
+    lines = _load_quantity_lines(ctx, qty_path)
 
     filtered_bounds = None
-    if expected_contract_cost and expected_contract_cost > 0 and "JOB_SIZE" in bid.columns:
-        lower_bound = 0.5 * expected_contract_cost
-        upper_bound = 1.5 * expected_contract_cost
+    if (
+        ctx.contract_cost_filter
+        and expected_contract_cost
+        and expected_contract_cost > 0
+        and "JOB_SIZE" in bid.columns
+    ):
+        lower_bound = CONTRACT_SIZE_BAND[0] * expected_contract_cost
+        upper_bound = CONTRACT_SIZE_BAND[1] * expected_contract_cost
         before_rows = len(bid)
         mask = bid["JOB_SIZE"].between(lower_bound, upper_bound, inclusive="both")
         bid = bid.loc[mask].copy()
@@ -315,205 +947,52 @@ def run(config: Optional["CLIConfig"] = None) -> int:
     alternate_reports: Dict[str, Dict[str, object]] = {}
     process_improvement_notes: List[Dict[str, object]] = []
 
-    for _, r in qty.iterrows():
-        code = str(r["ITEM_CODE"]).strip()
-        desc = str(r.get("DESCRIPTION", "")).strip()
-        unit = str(r.get("UNIT", "")).strip()
-        qty_val = float(r.get("QUANTITY", 0) or 0)
-
-        price, _, cat_data, detail_map, used_categories, combined_used = category_breakdown(
-            bid,
-            code,
-            project_region=project_region,
-            include_details=True,
-            target_quantity=(qty_val if qty_val > 0 else None),
+    # With a SQLite store, pricing queries it instead of masking ``bid``; the
+    # contract-size filter is applied inside every query. Otherwise pricing
+    # reads windows from a per-item range index over ``bid``.
+    if ctx.sql_store is not None:
+        source = SqlBidStore(ctx.sql_store, job_size_range=filtered_bounds)
+    else:
+        source = ItemRangeIndex(bid)
+    reused = reusable_lines(state, lines, plan.lines) if plan is not None else {}
+    results = [state.results[reused[i]] if i in reused else None for i in range(len(lines))]
+    todo = [i for i in range(len(lines)) if i not in reused]
+    if plan is not None:
+        print(
+            f"Reusing {len(reused)} of {len(lines)} lines from the previous run in {state_path}; "
+            f"pricing {len(todo)} (--full prices every line)."
         )
+    pending = [lines[i] for i in todo]
+    if ctx.workers > 1 and len(pending) > 1:
+        priced = _price_lines_parallel(source, pending, project_region, ctx.workers, ctx)
+    else:
+        priced = [_price_line(source, line, project_region, ctx) for line in pending]
+    for i, result in zip(todo, priced):
+        results[i] = result
+    # Saved before the contract-percent lines below adjust the rows in place.
+    save_state(
+        state_path,
+        PricingState(
+            settings=settings,
+            as_of=as_of,
+            store_version=loaded_store_version,
+            partitions=store_partitions(ctx.bid_store_dir),
+            lines=lines,
+            results=results,
+            deps=[line_dependencies(line, result) for line, result in zip(lines, results)],
+            audit_template=audit_template,
+        ),
+    )
 
-        note = ""
-        if pd.isna(price):
-            price = 0.0
-            note = "NO DATA IN ANY CATEGORY; REVIEW."
-
-        used_categories = used_categories or []
-        used_category_set = set(used_categories)
-        data_points_used = int(cat_data.get("TOTAL_USED_COUNT", len(combined_used)))
-
-        if not note and 0 < data_points_used < MIN_SAMPLE_TARGET:
-            note = f"Only {data_points_used} data points found (target {MIN_SAMPLE_TARGET})."
-
-        geometry = parse_geometry(desc)
-        reference_bundle = reference_data.build_reference_bundle(code)
-        unit_price_est = _round_unit_price(price)
-
-        row: Dict[str, object] = {
-            "ITEM_CODE": code,
-            "DESCRIPTION": desc,
-            "UNIT": unit,
-            "QUANTITY": qty_val,
-            "UNIT_PRICE_EST": unit_price_est,
-            "NOTES": note,
-            "DATA_POINTS_USED": data_points_used,
-            "ALTERNATE_USED": False,
-        }
-
-        if geometry is not None:
-            row["GEOM_SHAPE"] = geometry.shape
-            row["GEOM_AREA_SQFT"] = round(geometry.area_sqft, 4)
-            if geometry.dimensions:
-                row["GEOM_DIMENSIONS"] = geometry.dimensions
-
-        if data_points_used == 0 and geometry is not None:
-            alt_result = find_alternate_price(
-                bid,
-                code,
-                geometry,
-                project_region=project_region,
-                target_description=desc,
-                reference_bundle=reference_bundle,
-            )
-            if alt_result is not None:
-                price = alt_result.final_price
-                unit_price_est = _round_unit_price(price)
-                data_points_used = alt_result.total_data_points
-                row["UNIT_PRICE_EST"] = unit_price_est
-                row["DATA_POINTS_USED"] = data_points_used
-                row["ALTERNATE_USED"] = True
-                source_items = []
-                for sel in alt_result.selections:
-                    source_label = sel.source or "unknown"
-                    source_items.append(f"{sel.item_code} (w={sel.weight:.2f}, src={source_label})")
-                row["ALTERNATE_SOURCE_ITEM"] = "; ".join(source_items)
-                row["ALTERNATE_RATIO"] = "; ".join(f"{sel.ratio:.3f}" for sel in alt_result.selections)
-                row["ALTERNATE_BASE_PRICE"] = "; ".join(f"${sel.base_price:.2f}" for sel in alt_result.selections)
-                row["ALTERNATE_SOURCE_AREA"] = "; ".join(f"{sel.area_sqft:.2f}" for sel in alt_result.selections)
-                row["ALTERNATE_CANDIDATE_COUNT"] = sum(sel.data_points for sel in alt_result.selections)
-                row["ALT_TOTAL_CANDIDATES"] = len(alt_result.candidate_payload)
-                row["ALT_SELECTED_COUNT"] = len(alt_result.selections)
-                similarity_summary = alt_result.similarity_summary or {}
-                for key, value in similarity_summary.items():
-                    col = 'ALT_SCORE_OVERALL' if key == 'overall_score' else f"ALT_SCORE_{key.replace('_score', '').upper()}"
-                    row[col] = round(float(value), 4)
-                method_label = "AI weighted alternates"
-                if alt_result.ai_notes and 'failed' in str(alt_result.ai_notes).lower():
-                    method_label = "Score-based fallback"
-                elif all(sel.reason and sel.reason.lower().startswith('fallback') for sel in alt_result.selections):
-                    method_label = "Score-based fallback"
-                row["ALTERNATE_METHOD"] = method_label
-                if alt_result.ai_notes:
-                    row["ALTERNATE_AI_NOTES"] = alt_result.ai_notes
-                row["NOTES"] = "AI weighted pricing" if method_label == "AI weighted alternates" else "Score-based alternate pricing"
-                similarity_flags = []
-                for sel in alt_result.selections:
-                    for note in sel.notes:
-                        similarity_flags.append(f"{sel.item_code}: {note}")
-                for code_key, notes_list in (alt_result.candidate_notes or {}).items():
-                    for note in notes_list:
-                        entry = f"{code_key}: {note}"
-                        if entry not in similarity_flags:
-                            similarity_flags.append(entry)
-                if similarity_flags:
-                    joined_flags = " | ".join(similarity_flags)
-                    row["ALT_SIMILARITY_NOTES"] = joined_flags[:1000]
-                selection_payload = []
-                for sel in alt_result.selections:
-                    payload = {
-                        "item_code": sel.item_code,
-                        "description": sel.description,
-                        "area_sqft": sel.area_sqft,
-                        "base_price": sel.base_price,
-                        "adjusted_price": sel.adjusted_price,
-                        "ratio": sel.ratio,
-                        "data_points": sel.data_points,
-                        "weight": sel.weight,
-                        "reason": sel.reason,
-                        "source": sel.source,
-                        "similarity_scores": dict(sel.similarity or {}),
-                        "notes": list(sel.notes),
-                    }
-                    selection_payload.append(payload)
-                alt_entry = {
-                    "target_area_sqft": geometry.area_sqft,
-                    "candidates": alt_result.candidate_payload,
-                    "selected": selection_payload,
-                    "similarity_summary": similarity_summary,
-                    "candidate_notes": alt_result.candidate_notes,
-                    "chosen": {
-                        "final_unit_price": float(alt_result.final_price),
-                        "rounded_unit_price": unit_price_est,
-                        "total_data_points": int(data_points_used),
-                        "selections": [dict(entry) for entry in selection_payload],
-                        "similarity_summary": similarity_summary,
-                    },
-                    "final_price_raw": float(alt_result.final_price),
-                    "final_price_rounded": unit_price_est,
-                    "ai_notes": alt_result.ai_notes,
-                    "method": method_label,
-                }
-                ref_snapshot = None
-                if alt_result.reference_bundle:
-                    alt_entry["references"] = alt_result.reference_bundle
-                    ref_snapshot = dict(alt_result.reference_bundle)
-                    spec_text = ref_snapshot.get('spec_text')
-                    if isinstance(spec_text, str) and len(spec_text) > 4000:
-                        ref_snapshot['spec_text'] = spec_text[:4000] + ' \u2026'
-                if alt_result.ai_system:
-                    alt_entry["ai_system"] = alt_result.ai_system
-                if alt_result.show_work_method:
-                    alt_entry["show_work_method"] = alt_result.show_work_method
-                    row["ALT_SHOW_WORK_METHOD"] = alt_result.show_work_method
-                if alt_result.process_improvements:
-                    alt_entry["process_improvements"] = alt_result.process_improvements
-                notes_payload = {
-                    "item_code": code,
-                    "description": desc,
-                    "unit": unit,
-                    "process_improvements": alt_result.process_improvements,
-                    "ai_system": alt_result.ai_system,
-                    "show_work_method": alt_result.show_work_method,
-                    "references": ref_snapshot,
-                    "similarity_summary": similarity_summary,
-                    "candidate_notes": alt_result.candidate_notes,
-                    "ai_notes": alt_result.ai_notes,
-                    "alternate_method": method_label,
-                }
-                if any(notes_payload.get(key) for key in ("process_improvements", "ai_system", "show_work_method", "similarity_summary")):
-                    process_improvement_notes.append(notes_payload)
-                alternate_reports[code] = alt_entry
-                if alt_result.ai_notes:
-                    alt_entry["chosen"]["notes"] = alt_result.ai_notes
-                cat_data = alt_result.cat_data
-                detail_map = alt_result.detail_map or {}
-                used_categories = alt_result.used_categories or []
-                combined_used = alt_result.combined_detail
-
-        for label in CATEGORY_LABELS:
-            row[f"{label}_PRICE"] = cat_data.get(f"{label}_PRICE", float("nan"))
-            row[f"{label}_COUNT"] = cat_data.get(f"{label}_COUNT", 0)
-            row[f"{label}_INCLUDED"] = label in used_category_set
-
+    for line, (row, detail, alt_report, notes_payload) in zip(lines, results):
+        code = line["ITEM_CODE"]
         rows.append(row)
-
-        detail_frames = []
-        detail_map = detail_map or {}
-        seen_ids = set()
-
-        for category_name in CATEGORY_LABELS:
-            if category_name not in used_category_set:
-                continue
-            subset = detail_map.get(category_name)
-            if subset is None or subset.empty:
-                continue
-            detail = subset.copy()
-            if "_AUDIT_ROW_ID" in detail.columns:
-                detail = detail.loc[~detail["_AUDIT_ROW_ID"].isin(seen_ids)].copy()
-                seen_ids.update(detail["_AUDIT_ROW_ID"].tolist())
-                detail.drop(columns=["_AUDIT_ROW_ID"], errors="ignore", inplace=True)
-            detail["CATEGORY"] = category_name
-            detail["USED_FOR_PRICING"] = True
-            detail_frames.append(detail)
-
-        if detail_frames:
-            payitem_details[code] = pd.concat(detail_frames, ignore_index=True)
+        if detail is not None:
+            payitem_details[code] = detail
+        if alt_report is not None:
+            alternate_reports[code] = alt_report
+        if notes_payload is not None:
+            process_improvement_notes.append(notes_payload)
 
     def _compute_contract_subtotal(exclude_codes: set[str]) -> float:
         total = 0.0
@@ -534,8 +1013,7 @@ def run(config: Optional["CLIConfig"] = None) -> int:
         if qty_val <= 0:
             return
         subtotal = _compute_contract_subtotal(exclude_codes)
-        target_amount = subtotal * percent
-        rounded_amount = math.floor(target_amount / 1000.0) * 1000.0
+        rounded_amount = contract_percent_amount(subtotal, percent)
         unit_price = round(rounded_amount / qty_val, 2) if qty_val else 0.0
         row_obj["UNIT_PRICE_EST"] = unit_price
         row_obj["DATA_POINTS_USED"] = 0
@@ -596,20 +1074,39 @@ def run(config: Optional["CLIConfig"] = None) -> int:
             columns=detail_columns,
         )
 
-    _apply_contract_percent("105-06845", 0.02, {"105-06845", "110-01001"}, "Per IDM Chapter 20:")
-    _apply_contract_percent("110-01001", 0.05, {"105-06845", "110-01001"}, "Per IDM Chapter 20:")
+    for percent_code, percent in CONTRACT_PERCENT_ITEMS.items():
+        _apply_contract_percent(percent_code, percent, set(CONTRACT_PERCENT_ITEMS), "Per IDM Chapter 20:")
+
+    total_interval: Optional[Tuple[float, float]] = None
+    if ctx.bootstrap_samples > 0:
+        intervals = estimate_intervals(
+            rows,
+            [result[1] for result in results],
+            mode=ctx.price_mode,
+            samples=ctx.bootstrap_samples,
+            percent_items=CONTRACT_PERCENT_ITEMS,
+        )
+        for row, low, high in zip(rows, intervals.low, intervals.high):
+            row["UNIT_PRICE_P10"] = round(low, 2)
+            row["UNIT_PRICE_P90"] = round(high, 2)
+        total_interval = (intervals.total_low, intervals.total_high)
+        if intervals.widened:
+            print(
+                f"{intervals.widened} line interval(s) did not contain the estimate and were widened to it "
+                "(skewed or very small samples)."
+            )
 
     df = pd.DataFrame(rows)
 
     ai_report_path = None
     process_report_path = None
-    ai_enabled = os.getenv("DISABLE_OPENAI", "0").strip().lower() not in ("1", "true", "yes")
+    ai_enabled = ctx.ai_enabled
     if alternate_reports and ai_enabled:
         try:
             ai_report_path = generate_alternate_seek_report(
                 df,
                 alternate_reports,
-                output_dir=OUTPUT_DIR,
+                output_dir=ctx.output_dir,
                 project_region=project_region,
                 expected_contract_cost=expected_contract_cost,
                 filtered_bounds=filtered_bounds,
@@ -619,16 +1116,20 @@ def run(config: Optional["CLIConfig"] = None) -> int:
         try:
             process_overview = {
                 "inputs": {
-                    "bidtabs_dir": str(BIDFOLDER),
+                    "bidtabs_dir": str(ctx.bidtabs_dir),
                     "quantities_file": str(Path(qty_path).resolve()),
-                    "project_attributes": str(PROJECT_ATTRS_XLSX),
+                    "project_attributes": str(ctx.project_attributes),
                     "expected_contract_cost": float(expected_contract_cost or 0),
                     "project_region": project_region,
-                    "min_sample_target": MIN_SAMPLE_TARGET,
+                    "min_sample_target": ctx.min_sample_target,
+                    "price_trim": ctx.price_trim,
+                    "bootstrap_samples": ctx.bootstrap_samples,
+                    "escalate": ctx.escalate,
                 },
                 "statistics": {
                     "bidtabs_rows": int(len(bid)),
-                    "quantities_items": int(len(qty)),
+                    "quantities_items": int(len(lines)),
+                    "reused_lines": len(reused),
                     "alternate_items": len(alternate_reports),
                 },
                 "filters": {
@@ -649,21 +1150,34 @@ def run(config: Optional["CLIConfig"] = None) -> int:
                 process_overview=process_overview,
                 process_notes=process_improvement_notes,
                 reference_snapshot=reference_snapshot,
-                output_dir=OUTPUT_DIR,
+                output_dir=ctx.output_dir,
             )
         except Exception as exc:  # pragma: no cover - defensive
             print(f"Warning: unable to generate process improvement report: {exc}")
     elif alternate_reports and not ai_enabled:
         print("AI reporting disabled; skipping alternate-seek narrative generation.")
 
-    write_outputs(df, str(OUT_XLSX), str(OUT_AUDIT), payitem_details, str(OUT_PAYITEM_AUDIT))
+    if previous_run and not audit_template:
+        # The audit CSV on disk came from an earlier run; the writer would
+        # otherwise update it in place (as it does a seeded template) and
+        # keep its stale quantities and prices.
+        Path(ctx.output_audit).unlink(missing_ok=True)
+    write_outputs(
+        df,
+        str(ctx.output_xlsx),
+        str(ctx.output_audit),
+        payitem_details,
+        str(ctx.output_payitem_audit),
+        debug_dir=str(ctx.output_dir),
+        total_interval=total_interval,
+    )
 
     # If running under tests, mirror mapping debug file to requested path
-    if config is not None:
+    if ctx.mapping_debug_csv is not None:
         try:
-            default_debug = OUTPUT_DIR / "payitem_mapping_debug.csv"
-            target_debug = config.mapping_debug_csv
-            if default_debug.exists():
+            default_debug = ctx.output_dir / "payitem_mapping_debug.csv"
+            target_debug = ctx.mapping_debug_csv
+            if default_debug.exists() and default_debug.resolve() != Path(target_debug).resolve():
                 import shutil
                 target_debug.parent.mkdir(parents=True, exist_ok=True)
                 shutil.copy(default_debug, target_debug)
@@ -672,45 +1186,51 @@ def run(config: Optional["CLIConfig"] = None) -> int:
 
     print("\n=== SUMMARY ===\n")
     print(make_summary_text(df))
+    if total_interval is not None:
+        low, high = total_interval
+        print(f"Project total P10-P90: ${low:,.2f} to ${high:,.2f} ({ctx.bootstrap_samples} bootstrap samples)")
     print("\nInputs used:")
-    print(" - BidTabs folder:", BIDFOLDER)
+    if store_exists(ctx.bid_store_dir):
+        print(" - BidTabs store:", ctx.bid_store_dir)
+    else:
+        print(" - BidTabs folder:", ctx.bidtabs_dir)
     print(" - Quantities file:", Path(qty_path).resolve())
-    print(" - Project attributes:", PROJECT_ATTRS_XLSX)
+    print(" - Project attributes:", ctx.project_attributes)
     if project_region is not None:
         print(f"   Project region: {project_region}")
     else:
         print("   Project region: (not provided)")
     if region_map is not None and not getattr(region_map, "empty", False):
         print(f"   Region map rows: {len(region_map)}")
-    if Path(ALIASES_CSV).exists():
-        print(" - Code aliases:", ALIASES_CSV)
+    if Path(ctx.aliases_csv).exists():
+        print(" - Code aliases:", ctx.aliases_csv)
     if expected_contract_cost is not None:
         print(f" - Expected contract cost: ${expected_contract_cost:,.0f}")
         if filtered_bounds is not None:
             low, high = filtered_bounds
             print(f"   Filter bounds applied: ${low:,.0f} to ${high:,.0f}")
     print("\nOutputs written:")
-    print(" -", OUT_XLSX)
-    print(" -", OUT_AUDIT)
-    print(" -", OUT_PAYITEM_AUDIT)
+    print(" -", ctx.output_xlsx)
+    print(" -", ctx.output_audit)
+    print(" -", ctx.output_payitem_audit)
     if ai_report_path:
         print(" -", ai_report_path)
     if process_report_path:
         print(" -", process_report_path)
 
-    # Restore globals if we overrode them
-    if config is not None:
-        globals()["OUTPUT_DIR"] = prev_output_dir
-        globals()["OUT_XLSX"] = prev_out_xlsx
-        globals()["OUT_AUDIT"] = prev_out_audit
-        globals()["OUT_PAYITEM_AUDIT"] = prev_out_pay_audit
-
     return 0
 
 
-def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Generate cost estimate outputs from BidTabs history")
+def _run_parser(**kwargs: object) -> argparse.ArgumentParser:
+    """Parser for the options every estimate run takes."""
+    kwargs.setdefault("description", "Generate cost estimate outputs from BidTabs history")
+    parser = argparse.ArgumentParser(**kwargs)
     parser.add_argument("--bidtabs-dir", help="Directory containing BidTabs files")
+    parser.add_argument("--bid-store", help="BidTabs history store built by 'costest ingest' (used when present)")
+    parser.add_argument(
+        "--sql-store",
+        help="Write the sanitized BidTabs history to this SQLite file and price with indexed queries",
+    )
     parser.add_argument("--quantities-xlsx", help="Path to project quantities workbook")
     parser.add_argument("--project-attributes", help="Path to project attributes workbook")
     parser.add_argument("--region-map", help="Optional region map CSV/XLSX")
@@ -718,39 +1238,557 @@ def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
     parser.add_argument("--output-dir", help="Directory for generated outputs")
     parser.add_argument("--disable-ai", action="store_true", help="Disable OpenAI usage for alternate-seek weighting")
     parser.add_argument("--min-sample-target", type=int, help="Override minimum data points target per item")
-    return parser.parse_args(argv)
+    parser.add_argument("--workers", type=int, help="Price quantities lines across N worker processes")
+    parser.add_argument("--float32", action="store_true", help="Hold BidTabs prices and quantities as float32")
+    parser.add_argument(
+        "--mode",
+        type=str.upper,
+        choices=["WGT_AVG", "MEAN", "MEDIAN", "P40_P60"],
+        help="How each category's prices are combined (default WGT_AVG)",
+    )
+    parser.add_argument(
+        "--trim",
+        type=str.upper,
+        choices=["SIGMA", "MAD", "IQR", "PERCENTILE", "NONE"],
+        help="Outlier rule applied within each pricing category (default SIGMA: mean +/- 2 std)",
+    )
+    parser.add_argument(
+        "--no-bidtabs-cache",
+        action="store_true",
+        help="Read Excel BidTabs exports directly instead of through their cached sidecars",
+    )
+    parser.add_argument(
+        "--all-partitions",
+        action="store_true",
+        help="Load every BidTabs file, including dated files older than the pricing window",
+    )
+    parser.add_argument(
+        "--bootstrap-samples",
+        type=int,
+        help="Bootstrap resamples behind the P10/P90 price intervals (0 disables; default 1000)",
+    )
+    parser.add_argument(
+        "--escalate",
+        action="store_true",
+        help="Escalate historical prices to the as-of date along each item's fitted price trend",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Price every line instead of reusing unchanged lines from the previous run's pricing state",
+    )
+    return parser
+
+
+def _whatif_inputs(ctx: RunContext, reuse: bool = True):
+    """Cached window statistics, the run's own scenario and fallback prices.
+
+    Returns ``(stats, base, bounds, fallback)``: ``bounds`` turns contract
+    fractions into a job-size range (None without an expected cost) and
+    ``fallback`` holds the last run's alternate price per line.
+    """
+    from .bidtabs_io import find_quantities_file
+    from .range_index import ItemRangeIndex
+    from .reprice import STATE_NAME, line_fingerprint, load_state, store_partitions
+    from .whatif import (
+        STATS_NAME,
+        STATS_SETTINGS,
+        Scenario,
+        build_window_stats,
+        load_window_stats,
+        save_window_stats,
+    )
 
+    expected_contract_cost, project_region, region_map = load_project_attributes(
+        ctx.project_attributes,
+        legacy_expected_path=ctx.expected_cost_path,
+        legacy_region_map_path=ctx.region_map,
+    )
+    if project_region is None:
+        project_region = ctx.project_region
+    qty_path = ctx.quantities_path or find_quantities_file(ctx.quantities_glob, base_dir=BASE_DIR)
+
+    settings = _run_settings(ctx, qty_path, project_region, expected_contract_cost)
+    key = {name: settings[name] for name in STATS_SETTINGS}
+    key.update(partitions=store_partitions(ctx.bid_store_dir), date=_as_of(ctx).isoformat())
+    stats_path = ctx.output_dir / STATS_NAME
+    stats = load_window_stats(stats_path, key) if reuse else None
+    if stats is None:
+        bid, _ = _load_bid_history(ctx, region_map)
+        stats = build_window_stats(ItemRangeIndex(bid), _load_quantity_lines(ctx, qty_path), key=key)
+        save_window_stats(stats_path, stats)
+        print(f"Cached window statistics for {len(stats.lines)} lines ({len(stats.prices)} rows) in {stats_path}.")
+    else:
+        print(f"Using cached window statistics from {stats_path}.")
+
+    def _bounds(fractions: Optional[Tuple[float, float]]) -> Optional[Tuple[float, float]]:
+        if fractions is None or not expected_contract_cost or expected_contract_cost <= 0:
+            return None
+        return fractions[0] * expected_contract_cost, fractions[1] * expected_contract_cost
+
+    base = Scenario(
+        region=project_region,
+        min_sample_target=ctx.min_sample_target,
+        mode=ctx.price_mode,
+        trim=ctx.price_trim,
+        job_size_range=_bounds(CONTRACT_SIZE_BAND) if ctx.contract_cost_filter else None,
+    )
+
+    # Lines without history under a scenario keep the last run's alternate price.
+    fallback: List[Optional[float]] = [None] * len(stats.lines)
+    state = load_state(ctx.output_dir / STATE_NAME)
+    if state is not None:
+        alternates = {
+            line_fingerprint(line): float(result[0]["UNIT_PRICE_EST"])
+            for line, result in zip(state.lines, state.results)
+            if result[0].get("ALTERNATE_USED")
+        }
+        fallback = [alternates.get(line_fingerprint(line)) for line in stats.lines]
+    return stats, base, _bounds, fallback
+
+
+def run_whatif(
+    context: Optional[RunContext] = None,
+    regions: Optional[Sequence[Optional[int]]] = None,
+    min_sample_targets: Optional[Sequence[int]] = None,
+    modes: Optional[Sequence[str]] = None,
+    trims: Optional[Sequence[str]] = None,
+    contract_bounds: Optional[Sequence[Optional[Tuple[float, float]]]] = None,
+    reuse: bool = True,
+):
+    """Compare pricing parameters without re-running the estimate.
+
+    The first scenario uses the settings of ``context``; the others are every
+    combination of the given values (None keeps the context's value).
+    ``contract_bounds`` are ``(low, high)`` fractions of the expected contract
+    cost, or None for no contract-size filter. Per-line window statistics are
+    cached in ``whatif_stats.pkl`` in the output directory and reused while
+    the inputs are unchanged (``reuse=False`` rebuilds them). Returns a
+    :class:`costest.whatif.WhatIfResult`.
+    """
+    from .whatif import evaluate, scenario_grid
+
+    ctx = context if context is not None else build_run_context()
+    stats, base, bounds, fallback = _whatif_inputs(ctx, reuse)
+    scenarios = scenario_grid(
+        base,
+        regions=regions,
+        min_sample_targets=min_sample_targets,
+        modes=modes,
+        trims=trims,
+        job_size_ranges=None if contract_bounds is None else [bounds(b) for b in contract_bounds],
+    )
+    return evaluate(stats, scenarios, fallback_prices=fallback)
+
+
+def run_regions(
+    context: Optional[RunContext] = None,
+    regions: Optional[Sequence[Optional[int]]] = None,
+    reuse: bool = True,
+):
+    """Price the quantities for every region in one pass.
+
+    ``regions`` defaults to every region in the history; None in it prices
+    statewide only. Sample target, mode, trim and contract-size filter come
+    from ``context``, and the window statistics are shared with
+    :func:`run_whatif`. Returns a :class:`costest.whatif.RegionPricing`.
+    """
+    from .whatif import available_regions, evaluate_regions
+
+    ctx = context if context is not None else build_run_context()
+    stats, base, _, fallback = _whatif_inputs(ctx, reuse)
+    regions = list(dict.fromkeys(available_regions(stats) if regions is None else regions))
+    return evaluate_regions(
+        stats,
+        regions,
+        min_sample_target=base.min_sample_target,
+        mode=base.mode,
+        trim=base.trim,
+        job_size_range=base.job_size_range,
+        fallback_prices=fallback,
+    )
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    return _run_parser().parse_args(argv)
 
-def apply_cli_overrides(args: argparse.Namespace) -> None:
-    global BIDFOLDER, QTY_PATH, PROJECT_ATTRS_XLSX, LEGACY_REGION_MAP_XLSX, ALIASES_CSV
-    global OUTPUT_DIR, OUT_XLSX, OUT_AUDIT, OUT_PAYITEM_AUDIT, MIN_SAMPLE_TARGET
 
+def context_from_args(args: argparse.Namespace, base: Optional[RunContext] = None) -> RunContext:
+    """Return ``base`` (or the current defaults) with the CLI flags applied."""
+    context = base if base is not None else build_run_context()
+    changes: Dict[str, object] = {}
     if args.bidtabs_dir:
-        BIDFOLDER = Path(args.bidtabs_dir).expanduser().resolve()
+        changes["bidtabs_dir"] = Path(args.bidtabs_dir).expanduser().resolve()
+    if args.bid_store:
+        changes["bid_store_dir"] = Path(args.bid_store).expanduser().resolve()
+    if args.sql_store:
+        changes["sql_store"] = Path(args.sql_store).expanduser().resolve()
     if args.quantities_xlsx:
-        QTY_PATH = str(Path(args.quantities_xlsx).expanduser().resolve())
+        changes["quantities_path"] = Path(args.quantities_xlsx).expanduser().resolve()
     if args.project_attributes:
-        PROJECT_ATTRS_XLSX = Path(args.project_attributes).expanduser().resolve()
+        changes["project_attributes"] = Path(args.project_attributes).expanduser().resolve()
     if args.region_map:
-        LEGACY_REGION_MAP_XLSX = str(Path(args.region_map).expanduser().resolve())
+        changes["region_map"] = str(Path(args.region_map).expanduser().resolve())
     if args.aliases_csv:
-        ALIASES_CSV = Path(args.aliases_csv).expanduser().resolve()
-    if args.output_dir:
-        OUTPUT_DIR = Path(args.output_dir).expanduser().resolve()
-        global OUT_XLSX, OUT_AUDIT, OUT_PAYITEM_AUDIT
-        OUT_XLSX = OUTPUT_DIR / "Estimate_Draft.xlsx"
-        OUT_AUDIT = OUTPUT_DIR / "Estimate_Audit.csv"
-        OUT_PAYITEM_AUDIT = OUTPUT_DIR / "PayItems_Audit.xlsx"
+        changes["aliases_csv"] = Path(args.aliases_csv).expanduser().resolve()
     if args.disable_ai:
-        os.environ["DISABLE_OPENAI"] = "1"
+        changes["disable_ai"] = True
     if args.min_sample_target:
-        MIN_SAMPLE_TARGET = max(1, int(args.min_sample_target))
+        changes["min_sample_target"] = max(1, int(args.min_sample_target))
+    if args.workers:
+        changes["workers"] = max(1, int(args.workers))
+    if args.float32:
+        changes["float_dtype"] = "float32"
+    if args.mode:
+        changes["price_mode"] = args.mode
+    if args.trim:
+        changes["price_trim"] = args.trim
+    if args.bootstrap_samples is not None:
+        changes["bootstrap_samples"] = max(0, int(args.bootstrap_samples))
+    if args.escalate:
+        changes["escalate"] = True
+    if args.all_partitions:
+        changes["partition_pruning"] = False
+    if args.no_bidtabs_cache:
+        changes["bidtabs_cache_dir"] = None
+    if changes:
+        context = context.replace(**changes)
+    if args.output_dir:
+        context = context.with_output_dir(Path(args.output_dir))
+    return context
 
 
-def main(argv: Optional[Sequence[str]] = None) -> None:
+def ingest_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``costest ingest FILE...``: append BidTabs exports to the history store."""
+    from .history_store import ingest_file, iter_source_files
+
+    parser = argparse.ArgumentParser(
+        prog="costest ingest",
+        description="Normalize BidTabs exports once and append them to the local history store",
+    )
+    parser.add_argument("paths", nargs="+", help="BidTabs files (or folders of files) to ingest")
+    parser.add_argument("--store", help="History store directory (default: BIDTABS_STORE_DIR or data_sample/BidTabsStore)")
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        help="Rows per chunk when streaming CSV exports (default 100000)",
+    )
+    parser.add_argument(
+        "--window-months",
+        type=int,
+        help="Drop rows let more than N months ago instead of storing them",
+    )
+    parser.add_argument(
+        "--report-dir",
+        help="Where to write the ingest report and quarantined rows (default: <store>/reports)",
+    )
+    args = parser.parse_args(argv)
+
+    from datetime import date
+
+    from .bidtabs_io import CSV_CHUNK_ROWS, window_start
+    from .ingest_report import IngestReport
+
+    _load_environment()
+    store_dir = Path(args.store).expanduser().resolve() if args.store else BID_STORE_DIR
+    chunksize = max(1, args.chunk_rows) if args.chunk_rows else CSV_CHUNK_ROWS
+    cutoff = window_start(date.today(), args.window_months) if args.window_months else None
+    report = IngestReport()
+    for path in iter_source_files(args.paths):
+        result = ingest_file(store_dir, path, chunksize=chunksize, cutoff=cutoff, report=report)
+        print(
+            f"Ingested {result.source}: {result.rows_read} rows read, {result.rows_added} added, "
+            f"{result.rows_dropped} quarantined, {result.duplicates} duplicates skipped "
+            f"in {report.files[-1].parse_seconds:.2f}s parse (store version {result.version})."
+        )
+    report_dir = Path(args.report_dir).expanduser().resolve() if args.report_dir else store_dir / "reports"
+    paths = report.write(report_dir)
+    print(f"{report.summary()} Report written to {paths['json']}.")
+    return 0
+
+
+def convert_bidtabs_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``costest convert-bidtabs [PATH...]``: pre-warm the Excel sidecar cache."""
+    from .bidtabs_cache import EXCEL_SUFFIXES, convert_file
+    from .bidtabs_io import INGEST_COLUMNS, read_bidtabs_excel
+    from .history_store import iter_source_files
+
+    parser = argparse.ArgumentParser(
+        prog="costest convert-bidtabs",
+        description="Convert Excel BidTabs exports once into cached sidecars so runs skip the Excel reader",
+    )
+    parser.add_argument("paths", nargs="*", help="BidTabs files or folders (default: BIDTABS_DIR)")
+    parser.add_argument("--cache-dir", help="Sidecar directory (default: BIDTABS_CACHE_DIR or data_sample/cache/bidtabs)")
+    args = parser.parse_args(argv)
+
+    _load_environment()
+    cache_dir = Path(args.cache_dir).expanduser().resolve() if args.cache_dir else BIDTABS_CACHE_DIR
+    converted = 0
+    for path in iter_source_files(args.paths or [BIDFOLDER]):
+        if path.suffix.lower() not in EXCEL_SUFFIXES:
+            continue
+        result = convert_file(path, cache_dir, lambda p=path: read_bidtabs_excel(p, INGEST_COLUMNS), INGEST_COLUMNS)
+        converted += int(result.converted)
+        state = "converted" if result.converted else "up to date"
+        print(f"{result.source}: {state}, {result.rows} rows in {result.seconds:.2f}s -> {result.sidecar.name}")
+    print(f"{converted} workbook(s) converted into {cache_dir}.")
+    return 0
+
+
+def reprice_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``costest reprice``: refresh an estimate after new bid data was ingested.
+
+    Takes the same options as a run. Only lines whose items gained rows in
+    changed store partitions, or whose look-back windows moved across a
+    letting, are re-priced; the outputs are rewritten from the merged results.
+    """
+    args = parse_args(argv)
+    return run(context=context_from_args(args), incremental=True, reuse=not args.full)
+
+
+def whatif_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``costest whatif``: compare pricing parameters from cached window statistics.
+
+    Takes the same options as a run plus comma-separated values to compare.
+    Writes ``whatif_totals.csv`` (one row per scenario) and
+    ``whatif_items.csv`` (one row per scenario and line) to the output
+    directory.
+    """
+    parser = _run_parser(
+        prog="costest whatif",
+        description="Compare project totals across regions, sample targets, pricing modes, trims and contract bounds",
+    )
+    parser.add_argument("--regions", help="Project regions to compare, e.g. 1,2,3 ('state' for statewide only)")
+    parser.add_argument("--min-sample-targets", help="Minimum data point targets to compare, e.g. 20,50,100")
+    parser.add_argument("--modes", help="Pricing modes to compare, e.g. WGT_AVG,MEDIAN,P40_P60")
+    parser.add_argument("--trims", help="Outlier rules to compare, e.g. SIGMA,MAD")
+    parser.add_argument(
+        "--contract-bounds",
+        help="Contract-size bounds as LOW:HIGH fractions of the expected cost, e.g. 0.5:1.5,0.75:1.25,none",
+    )
+    args = parser.parse_args(argv)
+
+    def _values(text: Optional[str], parse) -> Optional[List[object]]:
+        if not text:
+            return None
+        return [parse(part.strip()) for part in text.split(",") if part.strip()]
+
+    def _region(text: str) -> Optional[int]:
+        return None if text.lower() in ("state", "none") else int(text)
+
+    def _fractions(text: str) -> Optional[Tuple[float, float]]:
+        if text.lower() == "none":
+            return None
+        low, high = text.split(":")
+        return float(low), float(high)
+
+    context = context_from_args(args)
+    result = run_whatif(
+        context,
+        regions=_values(args.regions, _region),
+        min_sample_targets=_values(args.min_sample_targets, lambda text: max(1, int(text))),
+        modes=_values(args.modes, str.upper),
+        trims=_values(args.trims, str.upper),
+        contract_bounds=_values(args.contract_bounds, _fractions),
+        reuse=not args.full,
+    )
+    context.output_dir.mkdir(parents=True, exist_ok=True)
+    result.totals.to_csv(context.output_dir / "whatif_totals.csv", index=False)
+    result.items.to_csv(context.output_dir / "whatif_items.csv", index=False)
+    for scenario, row in zip(result.scenarios, result.totals.itertuples()):
+        print(
+            f"[{row.SCENARIO}] {scenario.label}: ${row.PROJECT_TOTAL:,.2f} "
+            f"({row.DELTA:+,.2f}, {row.LINES_CHANGED} lines changed, {row.LINES_NO_DATA} without data)"
+        )
+    print(f"Scenario [0] is the baseline. Wrote whatif_totals.csv and whatif_items.csv to {context.output_dir}.")
+    return 0
+
+
+def regions_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``costest regions``: price the quantities for every region in one pass.
+
+    Takes the same options as a run. Writes ``region_prices.csv`` (one row
+    per line, one unit-price column per region) and ``region_totals.csv``
+    to the output directory.
+    """
+    parser = _run_parser(
+        prog="costest regions",
+        description="Price the project quantities for every district from one pass over the history",
+    )
+    parser.add_argument("--regions", help="Regions to price, e.g. 1,2,3,state (default: every region in the history)")
+    args = parser.parse_args(argv)
+
+    regions = None
+    if args.regions:
+        regions = [
+            None if part.strip().lower() in ("state", "none") else int(part)
+            for part in args.regions.split(",")
+            if part.strip()
+        ]
+    context = context_from_args(args)
+    result = run_regions(context, regions=regions, reuse=not args.full)
+    context.output_dir.mkdir(parents=True, exist_ok=True)
+    result.matrix.to_csv(context.output_dir / "region_prices.csv", index=False)
+    result.totals.to_csv(context.output_dir / "region_totals.csv", index=False)
+    for region, row in zip(result.regions, result.totals.itertuples()):
+        label = "statewide" if region is None else f"region {region}"
+        print(f"{label}: ${row.PROJECT_TOTAL:,.2f} ({row.LINES_NO_DATA} lines without data)")
+    print(f"Wrote region_prices.csv and region_totals.csv to {context.output_dir}.")
+    return 0
+
+
+def pricebook_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``costest pricebook``: precompute every item's prices in every region.
+
+    Takes the same options as a run (sample target, mode and trim apply).
+    Writes ``pricebook.sqlite`` to the output directory (or ``--output``),
+    stamped with the store version and partitions it was built from; an
+    up-to-date book is left alone unless ``--full`` is given. With
+    ``--sketches`` MEDIAN and P40_P60 books are answered from the history
+    store's quantile sketches instead of its rows.
+
+    Book prices ignore quantities: they skip the run's quantity band and
+    contract-size filter, so they are a lookup table, not an estimate.
+    """
+    import sqlite3
+
+    from .history_store import load_price_sketches, store_exists, store_version
+    from .price_logic import max_window_months
+    from .pricebook import PRICEBOOK_NAME, PriceBook, pricebook_frame, sketch_pricebook_frame, write_pricebook
+    from .reprice import file_digest, folder_digest, store_partitions
+    from .sketches import SKETCH_MODES
+
+    parser = _run_parser(
+        prog="costest pricebook",
+        description="Precompute category and final prices of every item code for every district",
+        epilog=(
+            "Book prices do not depend on quantity: the run's 50-150% quantity band and contract-size "
+            "filter are not applied. Use a run to estimate a project."
+        ),
+    )
+    parser.add_argument("--output", help=f"Price book file (default: <output-dir>/{PRICEBOOK_NAME})")
+    parser.add_argument("--regions", help="Regions to include, e.g. 1,2,3 (default: every region in the history)")
+    parser.add_argument(
+        "--sketches",
+        action="store_true",
+        help="Answer MEDIAN/P40_P60 books from the history store's quantile sketches instead of its rows",
+    )
+    args = parser.parse_args(argv)
+    ctx = context_from_args(args)
+    path = Path(args.output).expanduser().resolve() if args.output else ctx.output_dir / PRICEBOOK_NAME
+
+    _, _, region_map = load_project_attributes(
+        ctx.project_attributes,
+        legacy_expected_path=ctx.expected_cost_path,
+        legacy_region_map_path=ctx.region_map,
+    )
+    store_backed = store_exists(ctx.bid_store_dir)
+    regions = [int(part) for part in args.regions.split(",") if part.strip()] if args.regions else None
+    use_sketches = False
+    if args.sketches:
+        if not store_backed:
+            print("No history store; pricing the book from the BidTabs rows.")
+        elif ctx.price_mode not in SKETCH_MODES:
+            print(f"Sketches answer {', '.join(SKETCH_MODES)} only; pricing {ctx.price_mode} from the rows.")
+        elif ctx.escalate:
+            print("Sketches hold unescalated prices; pricing the escalated book from the rows.")
+        else:
+            use_sketches = True
+    stamp: Dict[str, object] = {
+        "store_version": store_version(ctx.bid_store_dir) if store_backed else None,
+        "partitions": store_partitions(ctx.bid_store_dir),
+        "bidtabs_files": None if store_backed else folder_digest(ctx.bidtabs_dir),
+        "region_map": file_digest(ctx.region_map),
+        "as_of": _as_of(ctx).isoformat(),
+        "regions": regions,
+        "min_sample_target": ctx.min_sample_target,
+        "price_mode": ctx.price_mode,
+        "price_trim": ctx.price_trim,
+        "escalate": ctx.escalate,
+        "sketches": use_sketches,
+    }
+    if path.is_file() and not args.full:
+        try:
+            current = PriceBook(path).meta
+        except (ValueError, sqlite3.Error):
+            current = {}
+        if all(current.get(key) == value for key, value in stamp.items()):
+            print(f"Price book {path} is up to date (store version {stamp['store_version']}).")
+            return 0
+
+    if use_sketches:
+        sketches = load_price_sketches(
+            ctx.bid_store_dir, as_of=ctx.as_of, max_months=max_window_months() if ctx.partition_pruning else None
+        )
+        frame = sketch_pricebook_frame(
+            sketches, regions=regions, min_sample_target=ctx.min_sample_target, mode=ctx.price_mode,
+            trim=ctx.price_trim,
+        )
+        print(f"Priced from {len(sketches.cells.values):,} sketch points (k={sketches.k}).")
+    else:
+        bid, _ = _load_bid_history(ctx, region_map)
+        frame = pricebook_frame(
+            bid, regions=regions, min_sample_target=ctx.min_sample_target, mode=ctx.price_mode, trim=ctx.price_trim
+        )
+    write_pricebook(frame, path, stamp)
+    print(
+        f"Wrote {path}: {frame['ITEM_CODE'].nunique()} item codes x {frame['REGION'].nunique()} regions "
+        f"(store version {stamp['store_version']}, as of {stamp['as_of']})."
+    )
+    return 0
+
+
+def trends_main(argv: Optional[Sequence[str]] = None) -> int:
+    """``costest trends``: fit every item's price trend and write ``price_trends.csv``.
+
+    Takes the same options as a run. The CSV has one row per item code with
+    its section, data points, date span, own annual rate and the rate
+    ``--escalate`` applies (and whether that came from the item or its
+    section).
+    """
+    parser = _run_parser(
+        prog="costest trends",
+        description="Fit per-item and per-section price escalation rates over the BidTabs history",
+    )
+    args = parser.parse_args(argv)
+    ctx = context_from_args(args)
+
+    _, _, region_map = load_project_attributes(
+        ctx.project_attributes,
+        legacy_expected_path=ctx.expected_cost_path,
+        legacy_region_map_path=ctx.region_map,
+    )
+    bid, _ = _load_bid_history(ctx.replace(escalate=False), region_map)
+    trends = _price_trends(ctx, bid, reuse=not args.full)
+    ctx.output_dir.mkdir(parents=True, exist_ok=True)
+    path = ctx.output_dir / "price_trends.csv"
+    trends.items.reset_index().to_csv(path, index=False)
+    sections = trends.sections.dropna(subset=["RATE"]).sort_values("POINTS", ascending=False)
+    for section, row in sections.head(10).iterrows():
+        print(f"section {section}: {row.RATE:+.1%}/yr over {int(row.POINTS):,} prices")
+    print(f"Wrote {path} ({len(trends.items)} item codes, as of {trends.as_of.isoformat()}).")
+    return 0
+
+
+# Subcommands dispatched by main(); anything else runs the estimate.
+SUBCOMMANDS = {
+    "reprice": reprice_main,
+    "whatif": whatif_main,
+    "regions": regions_main,
+    "pricebook": pricebook_main,
+    "trends": trends_main,
+    "ingest": ingest_main,
+    "convert-bidtabs": convert_bidtabs_main,
+}
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Optional[int]:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
     args = parse_args(argv)
-    apply_cli_overrides(args)
-    run()
+    run(context=context_from_args(args), reuse=not args.full)
+    return None
 
 
 if __name__ == "__main__":  # pragma: no cover
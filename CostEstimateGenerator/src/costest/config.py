@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from datetime import date
 from pathlib import Path
 import os
 from types import SimpleNamespace
-from typing import Optional
+from typing import Any, Optional
 
 @dataclass
 class Settings:
@@ -96,3 +97,65 @@ def load_config(args: object) -> CLIConfig:
 
 
 __all__.extend(["CLIConfig", "load_config"])
+
+
+# --- Per-run context ---
+
+@dataclass(frozen=True)
+class RunContext:
+    """Immutable inputs and options for a single pipeline run.
+
+    The CLI builds one per run and passes it explicitly through loading,
+    pricing, alternate-seek and output writing, so several estimates can run
+    concurrently in one process without touching shared module state. Use
+    :meth:`replace` to derive a variant for another run.
+    """
+
+    bidtabs_dir: Path
+    quantities_glob: str
+    project_attributes: Path
+    aliases_csv: Path
+    output_dir: Path
+    output_xlsx: Path
+    output_audit: Path
+    output_payitem_audit: Path
+    bid_store_dir: Optional[Path] = None
+    sql_store: Optional[Path] = None
+    bidtabs_cache_dir: Optional[Path] = None
+    quantities_path: Optional[Path] = None
+    expected_cost_path: Optional[str] = None
+    region_map: Optional[str] = None
+    mapping_debug_csv: Optional[Path] = None
+    min_sample_target: int = 50
+    price_mode: str = "WGT_AVG"
+    price_trim: str = "SIGMA"
+    bootstrap_samples: int = 1000
+    escalate: bool = False
+    project_region: Optional[int] = None
+    disable_ai: bool = False
+    contract_cost_filter: bool = True
+    workers: int = 1
+    float_dtype: str = "float64"
+    partition_pruning: bool = True
+    as_of: Optional[date] = None
+
+    @property
+    def ai_enabled(self) -> bool:
+        return not self.disable_ai
+
+    def replace(self, **changes: Any) -> "RunContext":
+        return replace(self, **changes)
+
+    def with_output_dir(self, output_dir: Path) -> "RunContext":
+        """Return a copy writing the standard output files into ``output_dir``."""
+        output_dir = _to_path(output_dir)
+        return replace(
+            self,
+            output_dir=output_dir,
+            output_xlsx=output_dir / "Estimate_Draft.xlsx",
+            output_audit=output_dir / "Estimate_Audit.csv",
+            output_payitem_audit=output_dir / "PayItems_Audit.xlsx",
+        )
+
+
+__all__.append("RunContext")
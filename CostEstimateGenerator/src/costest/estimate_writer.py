@@ -9,7 +9,8 @@ Write estimate outputs:
 - CSV audit file with all columns
 - Conditional formatting: highlight UNIT_PRICE_EST == 0
 - Auto-fit column widths
-- TOTAL cell at bottom of EXTENDED column (bold, currency)
+- TOTAL cell at bottom of EXTENDED column (bold, currency), with the
+  bootstrap P10/P90 of the total below it when given
 """
 
 from __future__ import annotations
@@ -61,7 +62,7 @@ CATEGORY_INCLUDED_COLS = [
 
 
 
-def _format_and_save_excel(df: pd.DataFrame, xlsx_path: str):
+def _format_and_save_excel(df: pd.DataFrame, xlsx_path: str, total_interval: tuple[float, float] | None = None):
     out = df.copy()
     # Keep CONFIDENCE for Excel; drop internal helper columns only
     out.drop(columns=['STD_DEV', 'COEF_VAR', 'N_FOR_CONF'], errors='ignore', inplace=True)
@@ -112,6 +113,7 @@ def _format_and_save_excel(df: pd.DataFrame, xlsx_path: str):
     ]
     if "CONFIDENCE" in out.columns:
         base_cols.append("CONFIDENCE")
+    base_cols += ["UNIT_PRICE_P10", "UNIT_PRICE_P90"]
     cols = base_cols + CATEGORY_PRICE_COLS + CATEGORY_COUNT_COLS + CATEGORY_INCLUDED_COLS + [
         "NOTES", "ALT_FLAG"
     ]
@@ -136,7 +138,7 @@ def _format_and_save_excel(df: pd.DataFrame, xlsx_path: str):
             cell.fill = header_fill
             cell.font = header_font
 
-        currency_cols = set(CATEGORY_PRICE_COLS) | {"UNIT_PRICE_EST", "EXTENDED"}
+        currency_cols = set(CATEGORY_PRICE_COLS) | {"UNIT_PRICE_EST", "EXTENDED", "UNIT_PRICE_P10", "UNIT_PRICE_P90"}
         integer_cols = set(CATEGORY_COUNT_COLS) | {"DATA_POINTS_USED"}
         right_align = Alignment(horizontal='right')
 
@@ -188,6 +190,16 @@ def _format_and_save_excel(df: pd.DataFrame, xlsx_path: str):
             if any(isinstance(cell.value, str) and cell.value.strip().upper() == "TOTAL" for cell in last_row_cells):
                 data_end_cf = ws.max_row - 1
 
+        if total_interval is not None and "EXTENDED" in headers and data_end_row >= data_start_row:
+            ext_idx = headers.index("EXTENDED") + 1
+            for offset, (label, value) in enumerate(zip(("TOTAL P10", "TOTAL P90"), total_interval), start=2):
+                label_cell = ws.cell(row=data_end_row + offset, column=max(1, ext_idx - 1))
+                label_cell.value = label
+                label_cell.alignment = Alignment(horizontal='right')
+                value_cell = ws.cell(row=data_end_row + offset, column=ext_idx)
+                value_cell.value = round(float(value), 2)
+                value_cell.number_format = '$#,##0.00'
+
         for include_col, price_col, count_col in zip(CATEGORY_INCLUDED_COLS, CATEGORY_PRICE_COLS, CATEGORY_COUNT_COLS):
             if include_col not in headers:
                 continue
@@ -352,6 +364,8 @@ def write_outputs(
     audit_csv_path: str,
     payitem_details: dict[str, pd.DataFrame] | None = None,
     payitem_audit_path: str | None = None,
+    debug_dir: str = 'outputs',
+    total_interval: tuple[float, float] | None = None,
 ) -> None:
     # If payitem_details not provided, try to load from payitem_audit_path (existing workbook)
     if not payitem_details and payitem_audit_path:
@@ -414,7 +428,7 @@ def write_outputs(
 
     # Dump stats for debugging so we can inspect mapping externally
     try:
-        os.makedirs('outputs', exist_ok=True)
+        os.makedirs(debug_dir, exist_ok=True)
         dump = {}
         for k, v in stats.items():
             dump[str(k)] = {
@@ -422,7 +436,7 @@ def write_outputs(
                 'COEF_VAR': None if (v.get('COEF_VAR') is None or pd.isna(v.get('COEF_VAR')) or str(v.get('COEF_VAR')) in ('inf', 'nan')) else float(v.get('COEF_VAR')),
                 'N_SAMPLES': int(v.get('N_SAMPLES') or 0),
             }
-        with open('outputs/payitem_stats_debug.json', 'w', encoding='utf-8') as fh:
+        with open(os.path.join(debug_dir, 'payitem_stats_debug.json'), 'w', encoding='utf-8') as fh:
             json.dump(dump, fh, indent=2)
     except Exception:
         pass
@@ -568,7 +582,7 @@ def write_outputs(
                 'N_FOR_CONF': int(row.get('N_FOR_CONF') or 0),
             })
         import csv
-        with open(os.path.join('outputs', 'payitem_mapping_debug.csv'), 'w', newline='', encoding='utf-8') as fh:
+        with open(os.path.join(debug_dir, 'payitem_mapping_debug.csv'), 'w', newline='', encoding='utf-8') as fh:
             writer = csv.DictWriter(fh, fieldnames=['ITEM_CODE', 'STD_DEV', 'COEF_VAR', 'N_FOR_CONF'])
             writer.writeheader()
             for r in dbg_rows:
@@ -591,7 +605,7 @@ def write_outputs(
         excel_df = excel_df[cols]
 
     # Excel with numeric prices only, zero-highlighting, total cell, auto-fit
-    _format_and_save_excel(excel_df, xlsx_path)
+    _format_and_save_excel(excel_df, xlsx_path, total_interval=total_interval)
 
     # CSV audit: when an existing audit CSV is present (tests seed a template), update it using
     # the payitems workbook stats so rows like ITEM-001, ITEM 002, etc. are preserved and enriched.
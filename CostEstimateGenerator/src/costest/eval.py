@@ -8,10 +8,9 @@ from pathlib import Path
 from typing import Iterable, List, Optional, Tuple
 
 import pandas as pd
-from pdfminer.high_level import extract_text
 from openpyxl import Workbook
 
-from .cli import run
+from .cli import build_run_context, run
 from .config import CLIConfig
 
 
@@ -42,6 +41,8 @@ def parse_bidtab_pdf(path: Path) -> pd.DataFrame:
     Extracts rows with a pay item code like 123-45678 and attempts to parse unit, quantity,
     unit price, and total. This is a best-effort text parser tuned for typical Tab A tables.
     """
+    from pdfminer.high_level import extract_text
+
     text = extract_text(str(path)) or ""
     lines = [ln.strip() for ln in text.splitlines() if ln.strip()]
 
@@ -162,24 +163,11 @@ def evaluate_contract(pdf_path: Path, work_dir: Path) -> Tuple[pd.DataFrame, Pat
         log_level="INFO",
     )
 
-    # Temporarily point environment override for quantities file
-    import os
-    prev_qty = os.environ.get("QUANTITIES_XLSX", "")
-    prev_disable_filter = os.environ.get("DISABLE_CONTRACT_COST_FILTER")
-    try:
-        os.environ["QUANTITIES_XLSX"] = str(qty_xlsx)
-        # Ensure benchmarking runs do not pre-filter contracts by expected cost
-        os.environ["DISABLE_CONTRACT_COST_FILTER"] = "1"
-        status = run(cfg)
-    finally:
-        if prev_qty:
-            os.environ["QUANTITIES_XLSX"] = prev_qty
-        else:
-            os.environ.pop("QUANTITIES_XLSX", None)
-        if prev_disable_filter is not None:
-            os.environ["DISABLE_CONTRACT_COST_FILTER"] = prev_disable_filter
-        else:
-            os.environ.pop("DISABLE_CONTRACT_COST_FILTER", None)
+    # Point the run at this contract's quantities; benchmarking runs do not
+    # pre-filter contracts by expected cost. The context is per call, so
+    # contracts can be evaluated concurrently.
+    context = build_run_context(cfg, quantities_path=qty_xlsx, contract_cost_filter=False)
+    status = run(cfg, context=context)
 
     # Load produced audit and join with actuals
     if estimate_audit.exists():
@@ -0,0 +1,432 @@
+"""Append-only local store of normalized BidTabs history.
+
+``costest ingest <file>`` normalizes a BidTabs export once and appends its
+rows to the store, so a pricing run reads a few pickled partitions instead of
+re-parsing every spreadsheet. Layout::
+
+    <store>/manifest.json        version counter and per-partition metadata
+    <store>/parts/2024-05-09.pkl one partition per letting date
+    <store>/parts/undated.pkl    rows without a usable letting date
+    <store>/sketches/<key>.npz   quantile sketches of each partition
+
+Rows are deduplicated on :data:`~costest.bidtabs_io.BIDTABS_KEY_COLUMNS`
+(the columns the run's sanitizer deduplicates on), so re-ingesting a file
+adds nothing. CSV exports are streamed in chunks and rows without a positive
+unit price are dropped on the way in. Existing rows are never rewritten or removed. Each partition
+records the SHA-256 of its file; :func:`load_history_store` verifies it before
+trusting the data. Every partition write also refreshes its quantile
+sketches (:mod:`costest.sketches`); :func:`load_price_sketches` merges them
+to answer median-type category prices without loading rows. The store
+assumes a single writer at a time.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from .bidtabs_io import (
+    BIDTABS_KEY_COLUMNS,
+    BIDTABS_SUFFIXES,
+    CSV_CHUNK_ROWS,
+    iter_bidtabs_csv,
+    read_bidtabs_file,
+    window_start,
+)
+from .ingest_report import FileReport, IngestReport, coercion_failures, count_by_reason, parse_columns, row_reasons
+from .sketches import DEFAULT_K, CellSketches, PriceSketches, build_cell_sketches
+
+MANIFEST_NAME = "manifest.json"
+PARTS_DIR = "parts"
+SKETCHES_DIR = "sketches"
+UNDATED = "undated"
+# New rows buffered per ingest before partitions are rewritten.
+FLUSH_ROWS = 1_000_000
+
+
+@dataclass
+class IngestResult:
+    """Outcome of ingesting one source file."""
+
+    source: str
+    rows_read: int
+    rows_added: int
+    partitions: List[str] = field(default_factory=list)
+    version: int = 0
+    rows_dropped: int = 0
+    quarantined: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def duplicates(self) -> int:
+        return self.rows_read - self.rows_dropped - self.rows_added
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def read_manifest(store_dir: str | Path) -> Dict[str, object]:
+    path = Path(store_dir) / MANIFEST_NAME
+    if not path.exists():
+        return {"version": 0, "partitions": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def store_exists(store_dir: str | Path | None) -> bool:
+    return store_dir is not None and (Path(store_dir) / MANIFEST_NAME).exists()
+
+
+def store_version(store_dir: str | Path) -> int:
+    return int(read_manifest(store_dir).get("version", 0))
+
+
+def _write_manifest(store_dir: Path, manifest: Dict[str, object]) -> None:
+    _write_atomic(
+        store_dir / MANIFEST_NAME,
+        lambda tmp: tmp.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8"),
+    )
+
+
+def _row_keys(df: pd.DataFrame) -> pd.Series:
+    """Hash of the dedup key columns, with types normalized across sources."""
+    keys = pd.DataFrame(index=df.index)
+    for col in BIDTABS_KEY_COLUMNS:
+        if col not in df.columns:
+            keys[col] = ""
+        elif col in ("UNIT_PRICE", "QUANTITY"):
+            keys[col] = pd.to_numeric(df[col], errors="coerce").astype(float)
+        elif col == "LETTING_DATE":
+            keys[col] = pd.to_datetime(df[col], errors="coerce")
+        else:
+            keys[col] = df[col].astype(str).str.strip()
+    return pd.util.hash_pandas_object(keys, index=False)
+
+
+def _read_partition(store_dir: Path, entry: Dict[str, object], verify: bool = True) -> pd.DataFrame:
+    path = store_dir / PARTS_DIR / str(entry["file"])
+    if verify and _sha256(path) != entry.get("sha256"):
+        raise ValueError(f"Checksum mismatch for BidTabs store partition {path}")
+    return pd.read_pickle(path)
+
+
+def _write_sketches(store_dir: Path, key: str, partition: pd.DataFrame) -> Dict[str, object]:
+    """Sketch one partition; returns its manifest fields."""
+    (store_dir / SKETCHES_DIR).mkdir(exist_ok=True)
+    file_name = f"{key}.npz"
+    path = store_dir / SKETCHES_DIR / file_name
+    sketches = build_cell_sketches(partition)
+    _write_atomic(path, sketches.save)
+    return {"sketch": file_name, "sketch_sha256": _sha256(path), "sketch_k": sketches.k}
+
+
+def _drop_unusable_rows(
+    frame: pd.DataFrame, cutoff: Optional[date] = None, parsed: Optional[Dict[str, pd.Series]] = None
+) -> tuple[pd.DataFrame, pd.Series]:
+    """Coerce prices, quantities and dates; drop rows pricing can never use.
+
+    Rows with a blank item code or a missing, non-numeric or non-positive
+    unit price are dropped (the run's sanitizer discards them anyway), as are
+    rows let before ``cutoff``. Undated rows are kept. Returns the kept rows
+    and the quarantine reason of each dropped row.
+    """
+    parsed = parse_columns(frame) if parsed is None else parsed
+    reasons = row_reasons(frame, cutoff, parsed=parsed)
+    frame = frame.copy()
+    for col in ("UNIT_PRICE", "QUANTITY", "WEIGHT", "JOB_SIZE"):
+        if col in parsed:
+            frame[col] = parsed[col].astype(float)
+    if "LETTING_DATE" in parsed:
+        frame["LETTING_DATE"] = parsed["LETTING_DATE"]
+    bad = reasons.notna()
+    return frame.loc[~bad], reasons.loc[bad]
+
+
+def _flush_partitions(
+    store: Path,
+    partitions: Dict[str, Dict[str, object]],
+    pending: Dict[str, List[pd.DataFrame]],
+    source: str,
+) -> None:
+    """Append each partition's buffered rows, writing it and its sketches once."""
+    for key, buffered in sorted(pending.items()):
+        entry = partitions.get(key)
+        frames = ([_read_partition(store, entry)] if entry is not None else []) + buffered
+        combined = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].reset_index(drop=True)
+        file_name = f"{key}.pkl"
+        path = store / PARTS_DIR / file_name
+        _write_atomic(path, lambda tmp: combined.to_pickle(tmp, compression=None))
+        sources = list((entry or {}).get("sources") or [])
+        if source not in sources:
+            sources.append(source)
+        partitions[key] = {
+            "file": file_name,
+            "rows": int(len(combined)),
+            "sha256": _sha256(path),
+            "sources": sources,
+            **_write_sketches(store, key, combined),
+        }
+    pending.clear()
+
+
+def _ingest_chunks(
+    store_dir: str | Path,
+    chunks: Iterable[pd.DataFrame],
+    source: str,
+    cutoff: Optional[date] = None,
+    report: Optional[IngestReport] = None,
+) -> IngestResult:
+    """Append normalized chunks to the store; the version bumps once per call.
+
+    New rows are buffered per partition and written every
+    :data:`FLUSH_ROWS` buffered rows and at the end, so a partition and its
+    sketches are rewritten once per flush rather than once per chunk. The
+    manifest is rewritten after every flush, so the store stays consistent
+    if ingest stops part-way. With ``report``, the dropped rows are added to
+    its quarantine and counts to its last file entry.
+    """
+    store = Path(store_dir)
+    (store / PARTS_DIR).mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(store)
+    partitions: Dict[str, Dict[str, object]] = dict(manifest.get("partitions") or {})
+    version = int(manifest.get("version", 0))
+    result = IngestResult(source=source, rows_read=0, rows_added=0, version=version)
+    # Row-key hashes (8 bytes per row) of each partition touched so far,
+    # including rows still buffered, so no partition is read or hashed twice.
+    known_keys: Dict[str, np.ndarray] = {}
+    pending: Dict[str, List[pd.DataFrame]] = {}
+    pending_rows = 0
+
+    def flush() -> None:
+        _flush_partitions(store, partitions, pending, source)
+        result.version = version + 1
+        _write_manifest(store, {"version": result.version, "partitions": partitions})
+
+    for frame in chunks:
+        frame = frame.reset_index(drop=True)
+        if "LETTING_DATE" not in frame.columns:
+            frame["LETTING_DATE"] = pd.NaT
+        result.rows_read += int(len(frame))
+        parsed = parse_columns(frame)
+        if report is not None:
+            entry = report.files[-1]
+            for col, count in coercion_failures(frame, parsed).items():
+                entry.coercion_failures[col] = entry.coercion_failures.get(col, 0) + count
+        raw = frame
+        frame, reasons = _drop_unusable_rows(frame, cutoff, parsed)
+        result.rows_dropped += int(len(reasons))
+        for reason, count in count_by_reason(reasons).items():
+            result.quarantined[reason] = result.quarantined.get(reason, 0) + count
+        if report is not None:
+            report.add_quarantine(raw.loc[reasons.index], source, reasons)
+        row_keys = _row_keys(frame)
+        unique = ~row_keys.duplicated()
+        frame, row_keys = frame.loc[unique], row_keys.loc[unique]
+        dates = frame["LETTING_DATE"]
+        part_keys = dates.dt.strftime("%Y-%m-%d").where(dates.notna(), UNDATED)
+        for key, new_rows in frame.groupby(part_keys, sort=True):
+            new_keys = row_keys.loc[new_rows.index].to_numpy()
+            if key not in known_keys:
+                entry = partitions.get(key)
+                known_keys[key] = (
+                    _row_keys(_read_partition(store, entry)).to_numpy() if entry is not None else new_keys[:0]
+                )
+            fresh = ~np.isin(new_keys, known_keys[key])
+            if not fresh.any():
+                continue
+            new_rows = new_rows.loc[fresh]
+            known_keys[key] = np.concatenate([known_keys[key], new_keys[fresh]])
+            pending.setdefault(key, []).append(new_rows)
+            pending_rows += int(len(new_rows))
+            result.rows_added += int(len(new_rows))
+            if key not in result.partitions:
+                result.partitions.append(key)
+        if pending_rows >= FLUSH_ROWS:
+            flush()
+            pending_rows = 0
+    if pending:
+        flush()
+    if report is not None:
+        entry = report.files[-1]
+        entry.rows_read, entry.rows_kept = result.rows_read, result.rows_added
+        entry.duplicates = result.duplicates
+        entry.quarantined = dict(result.quarantined)
+    return result
+
+
+def ingest_frame(
+    store_dir: str | Path, frame: pd.DataFrame, source: str, cutoff: Optional[date] = None
+) -> IngestResult:
+    """Append the rows of an already-normalized frame to the store."""
+    return _ingest_chunks(store_dir, [frame], source, cutoff=cutoff)
+
+
+def _timed(chunks: Iterable[pd.DataFrame], entry: FileReport) -> Iterator[pd.DataFrame]:
+    """Yield ``chunks``, adding the time spent producing them to ``entry``."""
+    it = iter(chunks)
+    while True:
+        start = time.perf_counter()
+        try:
+            chunk = next(it)
+        except StopIteration:
+            entry.parse_seconds += time.perf_counter() - start
+            return
+        entry.parse_seconds += time.perf_counter() - start
+        yield chunk
+
+
+def _excel_frames(path: Path) -> Iterator[pd.DataFrame]:
+    """The sheets of a workbook, read when the first one is requested.
+
+    A generator, so that :func:`_timed` counts the workbook read.
+    """
+    yield from read_bidtabs_file(path)
+
+
+def ingest_file(
+    store_dir: str | Path,
+    path: str | Path,
+    chunksize: int = CSV_CHUNK_ROWS,
+    cutoff: Optional[date] = None,
+    report: Optional[IngestReport] = None,
+) -> IngestResult:
+    """Normalize one BidTabs export and append its new rows to the store.
+
+    CSV exports are streamed ``chunksize`` rows at a time; rows with unusable
+    prices or let before ``cutoff`` are dropped before they reach the store.
+    With ``report``, a :class:`~costest.ingest_report.FileReport` for the
+    file (parse seconds exclude store writes) and its quarantined rows are
+    added to it.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        chunks: Iterable[pd.DataFrame] = iter_bidtabs_csv(path, chunksize=chunksize)
+    else:
+        chunks = _excel_frames(path)
+    if report is not None:
+        entry = FileReport(source=path.name, bytes=path.stat().st_size)
+        report.files.append(entry)
+        chunks = _timed(chunks, entry)
+    return _ingest_chunks(store_dir, chunks, source=path.name, cutoff=cutoff, report=report)
+
+
+def load_history_store(
+    store_dir: str | Path,
+    as_of: Optional[date] = None,
+    max_months: Optional[int] = None,
+    verify: bool = True,
+) -> pd.DataFrame:
+    """Load the stored history, skipping partitions before the look-back window.
+
+    Skipped partition keys are listed in ``df.attrs["skipped_partitions"]`` and
+    the store version in ``df.attrs["store_version"]``.
+    """
+    store = Path(store_dir)
+    manifest = read_manifest(store)
+    partitions: Dict[str, Dict[str, object]] = manifest.get("partitions") or {}
+    if not partitions:
+        raise FileNotFoundError(f"BidTabs store {store} is empty; run 'costest ingest' first")
+
+    cutoff = window_start(as_of or date.today(), max_months) if max_months is not None else None
+    frames: List[pd.DataFrame] = []
+    skipped: List[str] = []
+    for key in sorted(partitions):
+        if cutoff is not None and key != UNDATED and date.fromisoformat(key) < cutoff:
+            skipped.append(key)
+            continue
+        frames.append(_read_partition(store, partitions[key], verify=verify))
+
+    out = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(BIDTABS_KEY_COLUMNS))
+    out.attrs["skipped_partitions"] = skipped
+    out.attrs["store_version"] = int(manifest.get("version", 0))
+    return out
+
+
+def partition_item_codes(store_dir: str | Path, keys: Iterable[str], verify: bool = True) -> Set[str]:
+    """Item codes with rows in the given partitions."""
+    store = Path(store_dir)
+    partitions: Dict[str, Dict[str, object]] = read_manifest(store).get("partitions") or {}
+    codes: Set[str] = set()
+    for key in keys:
+        frame = _read_partition(store, partitions[key], verify=verify)
+        if "ITEM_CODE" in frame.columns:
+            codes.update(frame["ITEM_CODE"].dropna().astype(str).unique())
+    return codes
+
+
+def load_price_sketches(
+    store_dir: str | Path,
+    as_of: Optional[date] = None,
+    max_months: Optional[int] = None,
+    verify: bool = True,
+) -> PriceSketches:
+    """Merge the stored partition sketches into a :class:`PriceSketches`.
+
+    Partitions before the look-back window are skipped as in
+    :func:`load_history_store`. Partitions written before sketches existed
+    are sketched from their rows in memory; the store is not modified.
+    """
+    store = Path(store_dir)
+    manifest = read_manifest(store)
+    partitions: Dict[str, Dict[str, object]] = manifest.get("partitions") or {}
+    if not partitions:
+        raise FileNotFoundError(f"BidTabs store {store} is empty; run 'costest ingest' first")
+
+    cutoff = window_start(as_of or date.today(), max_months) if max_months is not None else None
+    parts: List[CellSketches] = []
+    for key in sorted(partitions):
+        if cutoff is not None and key != UNDATED and date.fromisoformat(key) < cutoff:
+            continue
+        entry = partitions[key]
+        path = store / SKETCHES_DIR / str(entry.get("sketch", ""))
+        if entry.get("sketch") and entry.get("sketch_k") == DEFAULT_K and path.exists():
+            if verify and _sha256(path) != entry.get("sketch_sha256"):
+                raise ValueError(f"Checksum mismatch for BidTabs store sketch {path}")
+            parts.append(CellSketches.load(path))
+        else:
+            parts.append(build_cell_sketches(_read_partition(store, entry, verify=verify)))
+    return PriceSketches(CellSketches.concat(parts), store_version=int(manifest.get("version", 0)))
+
+
+def iter_source_files(paths: Iterable[str | Path]) -> List[Path]:
+    """Expand directories into their BidTabs files; keep explicit files as given."""
+    files: List[Path] = []
+    for raw in paths:
+        p = Path(raw).expanduser()
+        if p.is_dir():
+            files.extend(sorted(f for f in p.iterdir() if f.suffix.lower() in BIDTABS_SUFFIXES))
+        else:
+            files.append(p)
+    return files
+
+
+__all__ = [
+    "IngestResult",
+    "ingest_file",
+    "ingest_frame",
+    "iter_source_files",
+    "load_history_store",
+    "load_price_sketches",
+    "partition_item_codes",
+    "read_manifest",
+    "store_exists",
+    "store_version",
+]
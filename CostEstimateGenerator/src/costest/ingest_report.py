@@ -0,0 +1,231 @@
+"""Per-file accounting of BidTabs loading and ingest.
+
+Every BidTabs source that is parsed gets a :class:`FileReport`: bytes on
+disk, parse seconds (and whether a cached sidecar served it), rows read,
+rows kept, rows quarantined by reason and values that failed numeric or date
+coercion. Quarantined rows are collected with their source file and reason
+so they can be written to a side file instead of vanishing silently.
+
+Quarantine reasons, in the order they are checked:
+
+``missing_item_code``   blank pay item code
+``non_numeric_price``   unit price present but not a number
+``non_positive_price``  unit price missing, zero or negative
+``outside_window``      let before the ingest cutoff
+``duplicate``           same item, letting date, price, quantity and bidder
+                        as an earlier row (the run's sanitizer key)
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+
+QUARANTINE_REASONS = (
+    "missing_item_code",
+    "non_numeric_price",
+    "non_positive_price",
+    "outside_window",
+    "duplicate",
+)
+COERCED_COLUMNS = ("QUANTITY", "WEIGHT", "JOB_SIZE", "REGION", "LETTING_DATE")
+REPORT_JSON = "ingest_report.json"
+REPORT_CSV = "ingest_report.csv"
+QUARANTINE_CSV = "bidtabs_quarantine.csv"
+
+
+@dataclass
+class FileReport:
+    source: str
+    bytes: int = 0
+    parse_seconds: float = 0.0
+    cached: bool = False
+    rows_read: int = 0
+    rows_kept: int = 0
+    # Rows skipped because the history store already holds them (ingest only;
+    # a run quarantines duplicates under the "duplicate" reason instead).
+    duplicates: int = 0
+    quarantined: Dict[str, int] = field(default_factory=dict)
+    coercion_failures: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def rows_quarantined(self) -> int:
+        return int(sum(self.quarantined.values()))
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows_read / self.parse_seconds if self.parse_seconds > 0 else 0.0
+
+    def as_row(self) -> Dict[str, object]:
+        row: Dict[str, object] = {
+            "source": self.source,
+            "bytes": self.bytes,
+            "parse_seconds": round(self.parse_seconds, 4),
+            "cached": self.cached,
+            "rows_read": self.rows_read,
+            "rows_kept": self.rows_kept,
+            "rows_quarantined": self.rows_quarantined,
+            "duplicates": self.duplicates,
+            "rows_per_sec": round(self.rows_per_sec, 1),
+        }
+        for reason in QUARANTINE_REASONS:
+            row[f"quarantined_{reason}"] = int(self.quarantined.get(reason, 0))
+        for col in COERCED_COLUMNS:
+            row[f"coercion_failures_{col}"] = int(self.coercion_failures.get(col, 0))
+        return row
+
+
+@dataclass
+class IngestReport:
+    files: List[FileReport] = field(default_factory=list)
+    quarantine: List[pd.DataFrame] = field(default_factory=list, repr=False)
+
+    @property
+    def rows_read(self) -> int:
+        return sum(f.rows_read for f in self.files)
+
+    @property
+    def rows_quarantined(self) -> int:
+        return sum(f.rows_quarantined for f in self.files)
+
+    def slowest(self) -> Optional[FileReport]:
+        parsed = [f for f in self.files if f.rows_read and not f.cached]
+        return min(parsed, key=lambda f: f.rows_per_sec) if parsed else None
+
+    def add_quarantine(self, rows: pd.DataFrame, source: str, reasons: pd.Series) -> None:
+        if rows.empty:
+            return
+        rows = rows.copy()
+        rows.insert(0, "QUARANTINE_REASON", reasons.loc[rows.index].to_numpy())
+        rows.insert(0, "SOURCE_FILE", source)
+        self.quarantine.append(rows)
+
+    def summary(self) -> str:
+        text = (
+            f"Ingest report: {len(self.files)} file(s), {self.rows_read} rows read, "
+            f"{self.rows_quarantined} quarantined."
+        )
+        slow = self.slowest()
+        if slow is not None:
+            text += f" Slowest parse: {slow.source} ({slow.rows_per_sec:,.0f} rows/s)."
+        return text
+
+    def write(self, out_dir: str | Path) -> Dict[str, Path]:
+        """Write the JSON and CSV reports and the quarantine side file."""
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        paths = {"json": out / REPORT_JSON, "csv": out / REPORT_CSV, "quarantine": out / QUARANTINE_CSV}
+        payload = {
+            "files": [
+                {**asdict(f), "rows_quarantined": f.rows_quarantined, "rows_per_sec": round(f.rows_per_sec, 1)}
+                for f in self.files
+            ],
+            "totals": {"files": len(self.files), "rows_read": self.rows_read, "rows_quarantined": self.rows_quarantined},
+        }
+        paths["json"].write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        pd.DataFrame([f.as_row() for f in self.files]).to_csv(paths["csv"], index=False)
+        if self.quarantine:
+            pd.concat(self.quarantine, ignore_index=True).to_csv(paths["quarantine"], index=False)
+        else:
+            pd.DataFrame(columns=["SOURCE_FILE", "QUARANTINE_REASON"]).to_csv(paths["quarantine"], index=False)
+        return paths
+
+
+def _blank(series: pd.Series) -> pd.Series:
+    return series.isna() | (series.astype(str).str.strip() == "")
+
+
+def parse_columns(frame: pd.DataFrame) -> Dict[str, pd.Series]:
+    """Numeric (or datetime, for LETTING_DATE) parses of the coerced columns.
+
+    Computed once per frame and shared by the checks below.
+    """
+    parsed: Dict[str, pd.Series] = {}
+    for col in ("UNIT_PRICE",) + COERCED_COLUMNS:
+        if col not in frame.columns:
+            continue
+        if col == "LETTING_DATE":
+            parsed[col] = pd.to_datetime(frame[col], errors="coerce")
+        else:
+            parsed[col] = pd.to_numeric(frame[col], errors="coerce")
+    return parsed
+
+
+def coercion_failures(frame: pd.DataFrame, parsed: Optional[Dict[str, pd.Series]] = None) -> Dict[str, int]:
+    """Count non-blank values that do not parse as numbers (dates for LETTING_DATE)."""
+    parsed = parse_columns(frame) if parsed is None else parsed
+    failures: Dict[str, int] = {}
+    for col in COERCED_COLUMNS:
+        if col not in parsed:
+            continue
+        raw = frame[col]
+        if pd.api.types.is_numeric_dtype(raw) or pd.api.types.is_datetime64_any_dtype(raw):
+            continue
+        count = int((parsed[col].isna() & ~_blank(raw)).sum())
+        if count:
+            failures[col] = count
+    return failures
+
+
+def row_reasons(
+    frame: pd.DataFrame, cutoff=None, parsed: Optional[Dict[str, pd.Series]] = None
+) -> pd.Series:
+    """Quarantine reason per row (``None`` to keep), excluding duplicates."""
+    parsed = parse_columns(frame) if parsed is None else parsed
+    reasons = pd.Series(None, index=frame.index, dtype=object)
+
+    def _mark(mask: pd.Series, reason: str) -> None:
+        reasons.loc[mask & reasons.isna()] = reason
+
+    if "ITEM_CODE" in frame.columns:
+        codes = frame["ITEM_CODE"]
+        # normalize_item_code() turns a missing code into "nan".
+        _mark(_blank(codes) | (codes.astype(str) == "nan"), "missing_item_code")
+    if "UNIT_PRICE" in parsed:
+        price = parsed["UNIT_PRICE"]
+        _mark(price.isna() & ~_blank(frame["UNIT_PRICE"]), "non_numeric_price")
+        _mark(~(price > 0), "non_positive_price")
+    else:
+        _mark(pd.Series(True, index=frame.index), "non_positive_price")
+    if cutoff is not None and "LETTING_DATE" in parsed:
+        _mark(parsed["LETTING_DATE"] < pd.Timestamp(cutoff), "outside_window")
+    return reasons
+
+
+def sanitizer_keys(
+    frame: pd.DataFrame, columns: Sequence[str], parsed: Optional[Dict[str, pd.Series]] = None
+) -> pd.DataFrame:
+    """Key columns typed as the run's sanitizer sees them when deduplicating."""
+    parsed = parse_columns(frame) if parsed is None else parsed
+    keys = pd.DataFrame(index=frame.index)
+    for col in columns:
+        if col in ("UNIT_PRICE", "QUANTITY", "LETTING_DATE") and col in parsed:
+            keys[col] = parsed[col]
+        elif col in frame.columns:
+            keys[col] = frame[col]
+    return keys
+
+
+def count_by_reason(reasons: Iterable[Optional[str]]) -> Dict[str, int]:
+    counts = pd.Series(list(reasons), dtype=object).dropna().value_counts()
+    return {reason: int(counts[reason]) for reason in QUARANTINE_REASONS if reason in counts.index}
+
+
+__all__ = [
+    "COERCED_COLUMNS",
+    "FileReport",
+    "IngestReport",
+    "QUARANTINE_CSV",
+    "QUARANTINE_REASONS",
+    "REPORT_CSV",
+    "REPORT_JSON",
+    "coercion_failures",
+    "count_by_reason",
+    "parse_columns",
+    "row_reasons",
+    "sanitizer_keys",
+]
@@ -0,0 +1,151 @@
+"""Bootstrap price intervals for estimate lines and the project total.
+
+A line priced from its own history has a sample behind its price: the
+trimmed rows of the categories it used (its audit detail). Resampling that
+sample and re-pricing it under the run's mode shows how much the price moves
+with the bids that happened to be let. :func:`estimate_intervals` does this
+for every line at once with :func:`costest.kernels.segment_bootstrap`, so the
+cost grows with the total number of rows rather than the number of lines.
+
+Each replicate price is rounded as the run rounds ``UNIT_PRICE_EST`` and
+the project total is summed per replicate. Lines priced from alternates keep
+their estimate, and contract-percent items follow each replicate's subtotal.
+Intervals are the 10th and 90th percentiles of the replicates. A percentile
+interval can still miss its point estimate (a skewed or very small sample);
+such bounds are widened to the estimate and counted in
+:attr:`EstimateIntervals.widened`. The seed is fixed, so identical inputs
+give identical intervals.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .pricing_rules import contract_percent_amount, round_unit_price
+
+DEFAULT_SAMPLES = 1000
+SEED = 20240601
+BOUNDS: Tuple[float, float] = (0.10, 0.90)
+
+
+@dataclass
+class EstimateIntervals:
+    """P10/P90 per line (NaN when the line has no sample) and for the total."""
+
+    low: List[float]
+    high: List[float]
+    total_low: float
+    total_high: float
+    samples: int
+    widened: int = 0
+
+
+def round_unit_prices(values: np.ndarray) -> np.ndarray:
+    """:func:`costest.pricing_rules.round_unit_price` over an array.
+
+    Replicates repeat many values, so each distinct value is rounded once.
+    """
+    distinct, inverse = np.unique(np.asarray(values, dtype=float), return_inverse=True)
+    rounded = np.array([round_unit_price(value) for value in distinct], dtype=float)
+    return rounded[inverse].reshape(np.shape(values))
+
+
+def _sample(row: Mapping[str, object], detail: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    if row.get("ALTERNATE_USED") or not row.get("DATA_POINTS_USED"):
+        return None
+    if detail is None or detail.empty or "UNIT_PRICE" not in detail.columns:
+        return None
+    return detail
+
+
+def estimate_intervals(
+    rows: Sequence[Mapping[str, object]],
+    details: Sequence[Optional[pd.DataFrame]],
+    mode: str = kernels.DEFAULT_MODE,
+    samples: int = DEFAULT_SAMPLES,
+    seed: int = SEED,
+    percent_items: Optional[Mapping[str, float]] = None,
+) -> EstimateIntervals:
+    """Bootstrap intervals for every line of an estimate.
+
+    ``rows`` are the final estimate rows (``QUANTITY``, ``UNIT_PRICE_EST``)
+    and ``details`` the rows each line was priced from. ``percent_items``
+    maps item codes priced as a share of every other item's total; the first
+    line of each such code follows the subtotal and any repeats stay fixed.
+    """
+    percent_items = dict(percent_items or {})
+    codes = [str(row.get("ITEM_CODE")) for row in rows]
+    quantities = np.array([float(row.get("QUANTITY", 0) or 0) for row in rows])
+    estimates = np.array([float(row.get("UNIT_PRICE_EST", 0) or 0) for row in rows])
+    percent_lines: Dict[int, float] = {}
+    for code, percent in percent_items.items():
+        if code in codes and quantities[codes.index(code)] > 0:
+            percent_lines[codes.index(code)] = percent
+
+    sampled: List[int] = []
+    values, weights, lengths = [], [], []
+    for i, (row, detail) in enumerate(zip(rows, details)):
+        if codes[i] in percent_items:
+            continue
+        sample = _sample(row, detail)
+        if sample is None:
+            continue
+        sampled.append(i)
+        values.append(pd.to_numeric(sample["UNIT_PRICE"], errors="coerce").to_numpy(dtype=float))
+        if "WEIGHT" in sample.columns:
+            weights.append(pd.to_numeric(sample["WEIGHT"], errors="coerce").to_numpy(dtype=float))
+        else:
+            weights.append(np.full(len(sample), np.nan))
+        lengths.append(len(sample))
+
+    replicates = kernels.segment_bootstrap(
+        np.concatenate(values) if values else np.zeros(0),
+        np.asarray(lengths, dtype=np.int64),
+        np.concatenate(weights) if weights else None,
+        mode,
+        samples=samples,
+        seed=seed,
+    )
+    replicates = round_unit_prices(replicates)
+
+    # Per replicate: sampled lines vary, other lines keep their estimate.
+    fixed = np.ones(len(rows), dtype=bool)
+    fixed[sampled] = False
+    in_subtotal = np.array([code not in percent_items for code in codes], dtype=bool)
+    subtotal = replicates @ quantities[sampled] + float(
+        np.sum((quantities * estimates)[fixed & in_subtotal])
+    )
+    total = subtotal + float(np.sum((quantities * estimates)[fixed & ~in_subtotal]))
+
+    low = np.full(len(rows), np.nan)
+    high = np.full(len(rows), np.nan)
+    if sampled:
+        low[sampled], high[sampled] = np.quantile(replicates, BOUNDS, axis=0)
+    for i, percent in percent_lines.items():
+        # The run's rule for these items, applied to every replicate at once.
+        amount = contract_percent_amount(subtotal, percent)
+        low[i], high[i] = np.quantile(np.round(amount / quantities[i], 2), BOUNDS)
+        total = total - quantities[i] * estimates[i] + amount
+    total_low, total_high = np.quantile(total, BOUNDS)
+
+    bounded = ~np.isnan(low)
+    missed = bounded & ((estimates < low) | (estimates > high))
+    low[bounded] = np.minimum(low[bounded], estimates[bounded])
+    high[bounded] = np.maximum(high[bounded], estimates[bounded])
+    estimate_total = float(np.sum(quantities * estimates))
+    return EstimateIntervals(
+        low=low.tolist(),
+        high=high.tolist(),
+        total_low=min(float(total_low), estimate_total),
+        total_high=max(float(total_high), estimate_total),
+        samples=samples,
+        widened=int(missed.sum()),
+    )
+
+
+__all__ = ["BOUNDS", "DEFAULT_SAMPLES", "EstimateIntervals", "SEED", "estimate_intervals", "round_unit_prices"]
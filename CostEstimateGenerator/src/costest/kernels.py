@@ -0,0 +1,288 @@
+"""Segment-reduction kernels for pricing many samples at once.
+
+A batch of samples is one flat ``values`` array plus ``lengths``: segment
+``i`` is ``values[offsets[i]:offsets[i] + lengths[i]]``. Sums use
+``np.add.reduceat`` over the non-empty segments, and quantiles sort every
+segment at once with a single ``np.lexsort`` on ``(value, segment)``. Pricing
+thousands of item/window samples therefore costs a handful of NumPy calls
+instead of one pandas aggregation per sample.
+
+Empty segments yield NaN. Work is done in float64. Results match the
+one-sample NumPy functions (``np.average``, ``np.median``, linear
+``np.quantile``) up to floating-point summation order.
+
+:func:`segment_prices` applies a pricing mode, passed per call:
+
+``WGT_AVG``          weighted mean (missing weights count as 1.0); segments
+                     with no weights at all fall back to the median
+``MEAN`` / ``AVG``   arithmetic mean
+``P40_P60``          midpoint of the 40th and 60th percentiles
+``MEDIAN`` / other   median
+
+:func:`segment_trim_mask` applies an outlier rule to every segment at once:
+
+``SIGMA``       mean +/- 2 standard deviations (the default)
+``MAD``         median +/- 3 scaled median absolute deviations
+``IQR``         quartiles widened by 1.5 interquartile ranges (Tukey fences)
+``PERCENTILE``  the 5th to 95th percentile
+``NONE``        no trimming
+
+Segments with fewer than 3 values, or no spread under the rule, are kept whole.
+
+:func:`segment_bootstrap` prices many resamples of every segment: each
+replicate draws every segment's values with replacement, and all replicates
+of a block are priced in one :func:`segment_prices` call.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
+ArrayLike = Union[np.ndarray, Sequence[float]]
+
+DEFAULT_MODE = "WGT_AVG"
+
+TRIM_METHODS = ("SIGMA", "MAD", "IQR", "PERCENTILE", "NONE")
+DEFAULT_TRIM = "SIGMA"
+SIGMA_WIDTH = 2.0
+MAD_WIDTH = 3.0
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normal data
+IQR_WIDTH = 1.5
+PERCENTILE_BOUNDS = (0.05, 0.95)
+MIN_TRIM_SIZE = 3
+# Resampled values priced per segment_prices call in segment_bootstrap.
+BOOTSTRAP_BLOCK = 2_000_000
+
+
+def segment_offsets(lengths: ArrayLike) -> np.ndarray:
+    """Start offset of each segment."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    offsets = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    return offsets
+
+
+def segment_ids(lengths: ArrayLike) -> np.ndarray:
+    """Segment number of every element."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    return np.repeat(np.arange(len(lengths)), lengths)
+
+
+def segment_sum(values: ArrayLike, lengths: ArrayLike) -> np.ndarray:
+    """Sum of each segment (0.0 for empty segments)."""
+    values = np.asarray(values, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    out = np.zeros(len(lengths), dtype=float)
+    nonempty = lengths > 0
+    if nonempty.any():
+        # Consecutive non-empty starts bound each segment exactly.
+        out[nonempty] = np.add.reduceat(values, segment_offsets(lengths)[nonempty])
+    return out
+
+
+def segment_mean(values: ArrayLike, lengths: ArrayLike) -> np.ndarray:
+    lengths = np.asarray(lengths, dtype=np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(lengths > 0, segment_sum(values, lengths) / lengths, np.nan)
+
+
+def segment_std(values: ArrayLike, lengths: ArrayLike, mean: Optional[np.ndarray] = None) -> np.ndarray:
+    """Population (``ddof=0``) standard deviation of each segment."""
+    values = np.asarray(values, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    mean = segment_mean(values, lengths) if mean is None else mean
+    dev = values - np.repeat(mean, lengths)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(lengths > 0, np.sqrt(segment_sum(dev * dev, lengths) / lengths), np.nan)
+
+
+def segment_weighted_mean(values: ArrayLike, weights: ArrayLike, lengths: ArrayLike) -> np.ndarray:
+    """Weighted mean of each segment; NaN weights count as 1.0."""
+    values = np.asarray(values, dtype=float)
+    weights = np.asarray(weights, dtype=float)
+    weights = np.where(np.isnan(weights), 1.0, weights)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            lengths > 0, segment_sum(values * weights, lengths) / segment_sum(weights, lengths), np.nan
+        )
+
+
+def sort_segments(values: ArrayLike, lengths: ArrayLike) -> np.ndarray:
+    """``values`` with every segment sorted ascending (segments stay in place)."""
+    values = np.asarray(values, dtype=float)
+    return values[np.lexsort((values, segment_ids(lengths)))]
+
+
+def segment_quantile(
+    values: ArrayLike, lengths: ArrayLike, q: float, presorted: bool = False
+) -> np.ndarray:
+    """Linear-interpolation quantile of each segment (as ``np.quantile``)."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    ordered = np.asarray(values, dtype=float) if presorted else sort_segments(values, lengths)
+    out = np.full(len(lengths), np.nan)
+    nonempty = lengths > 0
+    if not nonempty.any():
+        return out
+    n = lengths[nonempty]
+    start = segment_offsets(lengths)[nonempty]
+    virtual = q * (n - 1).astype(float)
+    below = np.floor(virtual)
+    t = virtual - below
+    below = below.astype(np.int64)
+    above = np.minimum(below + 1, n - 1)
+    a, b = ordered[start + below], ordered[start + above]
+    # Same interpolation as numpy's _lerp, which is exact at both ends.
+    diff = b - a
+    out[nonempty] = np.where(t >= 0.5, b - diff * (1 - t), a + diff * t)
+    return out
+
+
+def segment_median(values: ArrayLike, lengths: ArrayLike, presorted: bool = False) -> np.ndarray:
+    """Median of each segment (mean of the middle pair for even lengths)."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    ordered = np.asarray(values, dtype=float) if presorted else sort_segments(values, lengths)
+    out = np.full(len(lengths), np.nan)
+    nonempty = lengths > 0
+    if not nonempty.any():
+        return out
+    n = lengths[nonempty]
+    start = segment_offsets(lengths)[nonempty]
+    upper = ordered[start + n // 2]
+    lower = ordered[start + (n - 1) // 2]
+    out[nonempty] = np.where(n % 2 == 1, upper, (lower + upper) / 2)
+    return out
+
+
+def segment_prices(
+    values: ArrayLike,
+    lengths: ArrayLike,
+    weights: Optional[ArrayLike] = None,
+    mode: str = DEFAULT_MODE,
+    presorted: bool = False,
+) -> np.ndarray:
+    """Price every segment under ``mode`` (see the module docstring).
+
+    ``presorted`` says every segment of ``values`` is already ascending.
+    """
+    values = np.asarray(values, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if mode in ("MEAN", "AVG"):
+        return segment_mean(values, lengths)
+    weighted = None
+    if mode == "WGT_AVG" and weights is not None:
+        weights = np.asarray(weights, dtype=float)
+        weighted = segment_sum(~np.isnan(weights), lengths) > 0
+        if weighted[lengths > 0].all():
+            # No segment falls back to its median, so nothing needs sorting.
+            return segment_weighted_mean(values, weights, lengths)
+    ordered = values if presorted else sort_segments(values, lengths)
+    if mode == "P40_P60":
+        return (
+            segment_quantile(ordered, lengths, 0.40, presorted=True)
+            + segment_quantile(ordered, lengths, 0.60, presorted=True)
+        ) / 2
+    median = segment_median(ordered, lengths, presorted=True)
+    if weighted is None:
+        return median
+    return np.where(weighted, segment_weighted_mean(values, weights, lengths), median)
+
+
+def segment_trim_mask(values: ArrayLike, lengths: ArrayLike, method: str = DEFAULT_TRIM) -> np.ndarray:
+    """Mask of the values each segment keeps under outlier rule ``method``."""
+    method = method.upper()
+    if method not in TRIM_METHODS:
+        raise ValueError(f"Unknown trim method {method!r}; expected one of {', '.join(TRIM_METHODS)}")
+    values = np.asarray(values, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    if method == "NONE" or not len(values):
+        return np.ones(len(values), dtype=bool)
+
+    if method == "SIGMA":
+        center = segment_mean(values, lengths)
+        spread = segment_std(values, lengths, center)
+        lower, upper = center - SIGMA_WIDTH * spread, center + SIGMA_WIDTH * spread
+    elif method == "MAD":
+        center = segment_median(values, lengths)
+        spread = MAD_SCALE * segment_median(np.abs(values - np.repeat(center, lengths)), lengths)
+        lower, upper = center - MAD_WIDTH * spread, center + MAD_WIDTH * spread
+    else:
+        ordered = sort_segments(values, lengths)
+        low_q, high_q = (0.25, 0.75) if method == "IQR" else PERCENTILE_BOUNDS
+        lower = segment_quantile(ordered, lengths, low_q, presorted=True)
+        upper = segment_quantile(ordered, lengths, high_q, presorted=True)
+        spread = upper - lower
+        if method == "IQR":
+            lower, upper = lower - IQR_WIDTH * spread, upper + IQR_WIDTH * spread
+
+    trimmed = np.repeat((lengths >= MIN_TRIM_SIZE) & (spread > 0), lengths)
+    lower, upper = np.repeat(lower, lengths), np.repeat(upper, lengths)
+    return ~trimmed | ((values >= lower) & (values <= upper))
+
+
+def segment_bootstrap(
+    values: ArrayLike,
+    lengths: ArrayLike,
+    weights: Optional[ArrayLike] = None,
+    mode: str = DEFAULT_MODE,
+    samples: int = 1000,
+    seed: int = 0,
+) -> np.ndarray:
+    """Prices of ``samples`` resamples of every segment, shape ``(samples, segments)``.
+
+    Each resample draws ``lengths[i]`` values (with their weights) from
+    segment ``i`` with replacement. Draws come from one generator seeded with
+    ``seed`` in replicate order, so results do not depend on the block size.
+    Empty segments yield NaN.
+
+    Segments are sorted once; a replicate's draws are positions into them,
+    and sorting those integer positions per replicate leaves every resampled
+    segment ascending without sorting any prices.
+    """
+    values = np.asarray(values, dtype=float)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    out = np.full((samples, len(lengths)), np.nan)
+    total = int(lengths.sum())
+    if samples <= 0 or total == 0:
+        return out
+    ids = segment_ids(lengths)
+    order = np.lexsort((values, ids))
+    values = values[order]
+    weights = None if weights is None else np.asarray(weights, dtype=float)[order]
+    rng = np.random.default_rng(seed)
+    start, size = segment_offsets(lengths)[ids], lengths[ids]
+    per_block = max(1, BOOTSTRAP_BLOCK // total)
+    for first in range(0, samples, per_block):
+        count = min(per_block, samples - first)
+        picks = start + (rng.random((count, total)) * size).astype(np.int64)
+        picks.sort(axis=1)
+        picks = picks.ravel()
+        out[first:first + count] = segment_prices(
+            values[picks],
+            np.tile(lengths, count),
+            None if weights is None else weights[picks],
+            mode,
+            presorted=True,
+        ).reshape(count, len(lengths))
+    return out
+
+
+__all__ = [
+    "DEFAULT_MODE",
+    "DEFAULT_TRIM",
+    "TRIM_METHODS",
+    "segment_bootstrap",
+    "segment_ids",
+    "segment_mean",
+    "segment_median",
+    "segment_offsets",
+    "segment_prices",
+    "segment_quantile",
+    "segment_std",
+    "segment_sum",
+    "segment_trim_mask",
+    "segment_weighted_mean",
+    "sort_segments",
+]
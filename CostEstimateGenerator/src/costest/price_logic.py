@@ -1,10 +1,14 @@
 import os
 import numpy as np
 import pandas as pd
-from dotenv import load_dotenv
 
-load_dotenv()
+from . import kernels
+from .range_index import ItemRangeIndex
 
+# Environment defaults are read at import; the CLI loads .env before importing
+# this module, so no dotenv call is needed here. These are defaults only: runs
+# pass ``mode``/``min_sample_target``/``project_region`` explicitly and nothing
+# here is mutated at runtime.
 MODE = 'WGT_AVG'
 PROJECT_REGION = os.getenv('PROJECT_REGION', '').strip()
 PROJECT_REGION = int(PROJECT_REGION) if PROJECT_REGION else None
@@ -20,8 +24,33 @@ CATEGORY_DEFS = [
 ]
 
 
-def _prepare_pool(bidtabs: pd.DataFrame, item_code: str) -> pd.DataFrame:
-    pool = bidtabs.loc[bidtabs['ITEM_CODE'].astype(str) == str(item_code)].copy()
+def max_window_months() -> int:
+    """Longest look-back (in months) of any pricing category."""
+    return max(max_months for _, _, _, max_months in CATEGORY_DEFS)
+
+
+def _quantity_range(target_quantity: float | None) -> tuple[float, float] | None:
+    if target_quantity is None or not target_quantity > 0:
+        return None
+    return 0.5 * float(target_quantity), 1.5 * float(target_quantity)
+
+
+def _prepare_pool(bidtabs, item_code: str, quantity_range: tuple[float, float] | None = None) -> pd.DataFrame:
+    if isinstance(bidtabs, pd.DataFrame):
+        codes = bidtabs['ITEM_CODE']
+        if isinstance(codes.dtype, pd.CategoricalDtype):
+            # Match against the categories rather than stringifying every row.
+            hits = np.flatnonzero(codes.cat.categories.astype(str) == str(item_code))
+            mask = np.isin(codes.cat.codes.to_numpy(), hits)
+        else:
+            mask = (codes.astype(str) == str(item_code)).to_numpy()
+        pool = bidtabs.iloc[np.flatnonzero(mask)].copy()
+    else:
+        # SqlBidStore: item, look-back window and quantity band become an
+        # indexed query; rows without a letting date are kept for the
+        # 12-month windows.
+        since = pd.Timestamp.today().normalize() - pd.DateOffset(months=max_window_months())
+        pool = bidtabs.item_pool(item_code, since=since, quantity_range=quantity_range)
     if pool.empty:
         return pool
 
@@ -43,61 +72,124 @@ def _prepare_pool(bidtabs: pd.DataFrame, item_code: str) -> pd.DataFrame:
     return pool
 
 
-def _filter_window(
-    df: pd.DataFrame,
+def _window_mask(
+    dates: np.ndarray,
     min_months: int | None,
     max_months: int | None,
-) -> pd.DataFrame:
+    now: pd.Timestamp | None = None,
+) -> np.ndarray:
+    """Boolean mask of ``dates`` (datetime64[ns]) inside a look-back window.
+
+    The window is ``[now - max_months, now - min_months]``; the upper bound is
+    inclusive only for ``min_months == 0``, which also keeps undated rows.
+    """
+    now = pd.Timestamp.today() if now is None else now
+    valid = ~np.isnat(dates)
+    mask = valid.copy()
+    if max_months is not None:
+        mask &= dates >= (now - pd.DateOffset(months=max_months)).to_datetime64()
+    if min_months is not None:
+        upper = (now - pd.DateOffset(months=min_months)).to_datetime64()
+        mask &= (dates <= upper) if min_months == 0 else (dates < upper)
+    if min_months == 0:
+        mask |= ~valid
+    return mask
+
+
+def _aggregate_values(
+    prices: np.ndarray,
+    weights: np.ndarray | None = None,
+    mode: str | None = None,
+) -> float:
+    """Price of one sample; ``weights`` (NaN = 1.0) apply only to WGT_AVG."""
+    mode = MODE if mode is None else mode
+    if mode == 'WGT_AVG' and weights is not None and not np.isnan(weights).all():
+        return float(np.average(prices, weights=np.where(np.isnan(weights), 1.0, weights)))
+    if mode in ('MEAN', 'AVG'):
+        return float(np.mean(prices))
+    if mode == 'P40_P60':
+        return float((np.quantile(prices, 0.40) + np.quantile(prices, 0.60)) / 2)
+    return float(np.median(prices))
+
+
+def _aggregate_price(df: pd.DataFrame, mode: str | None = None) -> tuple[float, int]:
     if df.empty:
-        return df.copy()
-
-    out = df.copy()
-    if '_LET_DT' not in out.columns:
-        out['_LET_DT'] = pd.to_datetime(out.get('LETTING_DATE'), errors='coerce')
-
-    dt = out['_LET_DT']
-    mask = pd.Series(False, index=out.index)
-    valid = dt.notna()
-
-    if valid.any():
-        criteria = pd.Series(True, index=dt.index[valid])
-        now = pd.Timestamp.today()
-        if max_months is not None:
-            lower_bound = now - pd.DateOffset(months=max_months)
-            criteria &= dt.loc[valid] >= lower_bound
-        if min_months is not None:
-            upper_bound = now - pd.DateOffset(months=min_months)
-            if min_months == 0:
-                criteria &= dt.loc[valid] <= upper_bound
-            else:
-                criteria &= dt.loc[valid] < upper_bound
-        mask.loc[valid] = criteria
+        return np.nan, 0
+    weights = df['WEIGHT'].to_numpy(dtype=float) if 'WEIGHT' in df.columns else None
+    return _aggregate_values(df['UNIT_PRICE'].to_numpy(), weights, mode), int(len(df))
 
-    if min_months == 0:
-        mask |= dt.isna()
 
-    return out.loc[mask].copy()
+def _category_positions(
+    bidtabs,
+    item_code: str,
+    project_region: int | None,
+    quantity_range: tuple[float, float] | None,
+    now: pd.Timestamp | None = None,
+) -> tuple[pd.DataFrame, np.ndarray, dict[str, np.ndarray], list]:
+    """Read-only pool, its letting dates and each category's row positions.
+
+    Positions index ``pool`` and are ascending. With an
+    :class:`ItemRangeIndex` the pool is the indexed frame itself and nothing
+    is copied; otherwise it is the item's rows from :func:`_prepare_pool`.
+    """
+    now = pd.Timestamp.today() if now is None else now
+    positions: dict[str, np.ndarray] = {}
+    if isinstance(bidtabs, ItemRangeIndex):
+        for name, scope, min_months, max_months in CATEGORY_DEFS:
+            positions[name] = bidtabs.window_positions(
+                item_code,
+                min_months,
+                max_months,
+                quantity_range=quantity_range,
+                region=project_region,
+                regional=scope == 'REGION',
+                now=now,
+            )
+        return bidtabs.frame, bidtabs.let_dt, positions, bidtabs.pool_columns(item_code)
+
+    pool = _prepare_pool(bidtabs, item_code, quantity_range)
+    if pool.empty:
+        empty = np.zeros(0, dtype=np.int64)
+        return pool, np.zeros(0, dtype='datetime64[ns]'), {name: empty for name, *_ in CATEGORY_DEFS}, list(pool.columns)
+
+    base = np.ones(len(pool), dtype=bool)
+    if quantity_range is not None and 'QUANTITY' in pool.columns:
+        lower_q, upper_q = quantity_range
+        base &= pool['QUANTITY'].between(lower_q, upper_q, inclusive='both').to_numpy()
+    let_dt = pool['_LET_DT'].to_numpy(dtype='datetime64[ns]')
+    in_region = None
+    if project_region is not None and 'REGION' in pool.columns:
+        in_region = (pool['REGION'] == project_region).to_numpy()
+    for name, scope, min_months, max_months in CATEGORY_DEFS:
+        if scope == 'REGION' and in_region is None:
+            positions[name] = np.zeros(0, dtype=np.int64)
+            continue
+        mask = base & _window_mask(let_dt, min_months, max_months, now)
+        if scope == 'REGION':
+            mask &= in_region
+        positions[name] = np.flatnonzero(mask)
+    return pool, let_dt, positions, list(pool.columns)
 
 
-def _aggregate_price(df: pd.DataFrame) -> tuple[float, int]:
-    if df.empty:
-        return np.nan, 0
+def _materialize(pool: pd.DataFrame, let_dt: np.ndarray, positions: np.ndarray) -> pd.DataFrame:
+    """Detail rows for ``positions`` with ``_LET_DT`` and ``_AUDIT_ROW_ID``."""
+    out = pool.take(positions)
+    if '_LET_DT' not in out.columns and len(let_dt):
+        out['_LET_DT'] = let_dt[positions]
+    out['_AUDIT_ROW_ID'] = out.index
+    return out
 
-    if MODE == 'WGT_AVG' and 'WEIGHT' in df.columns and not df['WEIGHT'].isna().all():
-        weights = df['WEIGHT'].fillna(1.0).astype(float)
-        price = float(np.average(df['UNIT_PRICE'], weights=weights))
-    elif MODE in ('MEAN', 'AVG'):
-        price = float(df['UNIT_PRICE'].mean())
-    elif MODE in ('MEDIAN', 'P50'):
-        price = float(df['UNIT_PRICE'].median())
-    elif MODE == 'P40_P60':
-        p40 = df['UNIT_PRICE'].quantile(0.40)
-        p60 = df['UNIT_PRICE'].quantile(0.60)
-        price = float((p40 + p60) / 2)
-    else:
-        price = float(df['UNIT_PRICE'].median())
 
-    return price, int(len(df))
+def _column_at(pool: pd.DataFrame, column: str, positions: np.ndarray) -> np.ndarray | None:
+    """``column`` at ``positions`` as float64, converting only the selected rows.
+
+    The pool may be the whole history (an :class:`ItemRangeIndex` frame) in
+    float32; converting the column before selecting would copy all of it for
+    every line priced.
+    """
+    if column not in pool.columns:
+        return None
+    return np.asarray(pool[column].to_numpy()[positions], dtype=float)
 
 
 def _compute_categories(
@@ -106,89 +198,83 @@ def _compute_categories(
     project_region: int | None,
     collect_details: bool = False,
     target_quantity: float | None = None,
+    mode: str | None = None,
+    min_sample_target: int | None = None,
+    trim: str | None = None,
 ):
-    pool = _prepare_pool(bidtabs, item_code)
+    """Price ``item_code`` from position arrays over one read-only pool.
+
+    Windows, outlier trimming and category accumulation all work on integer
+    positions into the pool; DataFrames are built only for the returned
+    detail (per-category frames when ``collect_details``, and the combined
+    rows behind the final price).
+    """
+    min_sample_target = MIN_SAMPLE_TARGET if min_sample_target is None else min_sample_target
+    quantity_range = _quantity_range(target_quantity)
+    pool, let_dt, positions, pool_columns = _category_positions(
+        bidtabs, item_code, project_region, quantity_range
+    )
 
-    if target_quantity is not None and target_quantity > 0 and 'QUANTITY' in pool.columns:
-        lower_q = 0.5 * float(target_quantity)
-        upper_q = 1.5 * float(target_quantity)
-        pool = pool.loc[pool['QUANTITY'].between(lower_q, upper_q, inclusive='both')].copy()
+    mode = MODE if mode is None else mode
+    trim = kernels.DEFAULT_TRIM if trim is None else trim
+
+    # All six categories are one segmented batch: trim and price in a few
+    # kernel calls instead of one aggregation per category.
+    names = [name for name, *_ in CATEGORY_DEFS]
+    lengths = np.array([len(positions[name]) for name in names], dtype=np.int64)
+    flat = np.concatenate([positions[name] for name in names]).astype(np.int64, copy=False)
+    if 'UNIT_PRICE' in pool.columns and len(flat):
+        prices = _column_at(pool, 'UNIT_PRICE', flat)
+        keep = kernels.segment_trim_mask(prices, lengths, trim)
+        flat, lengths = flat[keep], kernels.segment_sum(keep, lengths).astype(np.int64)
+        category_prices = kernels.segment_prices(prices[keep], lengths, _column_at(pool, 'WEIGHT', flat), mode)
+    else:
+        category_prices = np.full(len(names), np.nan)
 
     results: dict[str, float] = {}
-    subsets: dict[str, pd.DataFrame] = {}
+    kept: dict[str, np.ndarray] = {}
+    for name, start, length, price in zip(names, kernels.segment_offsets(lengths), lengths, category_prices):
+        kept[name] = flat[start:start + length]
+        results[f'{name}_PRICE'] = float(price) if length else np.nan
+        results[f'{name}_COUNT'] = int(length)
 
-    for name, scope, min_months, max_months in CATEGORY_DEFS:
-        subset = _filter_window(pool, min_months, max_months)
-
-        if scope == 'REGION':
-            if project_region is None or 'REGION' not in subset.columns:
-                subset = subset.iloc[0:0]
-            else:
-                subset = subset.loc[subset['REGION'] == project_region]
-
-        subset = subset.copy()
-        subset['_AUDIT_ROW_ID'] = subset.index
-
-        if subset.empty:
-            results[f'{name}_PRICE'] = np.nan
-            results[f'{name}_COUNT'] = 0
-            subsets[name] = subset
-            continue
-
-        cleaned = subset.copy()
-        if 'UNIT_PRICE' in cleaned.columns and cleaned['UNIT_PRICE'].notna().sum() >= 3:
-            prices = cleaned['UNIT_PRICE'].astype(float)
-            mean = prices.mean()
-            std = prices.std(ddof=0)
-            if std > 0:
-                mask = (prices >= mean - 2 * std) & (prices <= mean + 2 * std)
-                cleaned = cleaned.loc[mask]
-
-        if cleaned.empty:
-            results[f'{name}_PRICE'] = np.nan
-            results[f'{name}_COUNT'] = 0
-            subsets[name] = cleaned
-            continue
-
-        price, count = _aggregate_price(cleaned)
-        results[f'{name}_PRICE'] = price if count > 0 else np.nan
-        results[f'{name}_COUNT'] = count if count > 0 else 0
-
-        subsets[name] = cleaned
-
-    combined_frames: list[pd.DataFrame] = []
+    combined: list[np.ndarray] = []
     used_categories: list[str] = []
-    seen_ids: set = set()
+    seen = np.zeros(0, dtype=np.int64)
 
     for name, _, _, _ in CATEGORY_DEFS:
-        subset = subsets.get(name)
-        if subset is None or subset.empty:
+        rows = kept[name]
+        if len(rows) == 0:
             continue
-
-        new_rows = subset.loc[~subset['_AUDIT_ROW_ID'].isin(seen_ids)].copy()
-        if new_rows.empty:
+        new_rows = rows[~np.isin(rows, seen)]
+        if len(new_rows) == 0:
             continue
 
-        combined_frames.append(new_rows)
+        combined.append(new_rows)
         used_categories.append(name)
-        seen_ids.update(new_rows['_AUDIT_ROW_ID'].tolist())
+        seen = np.concatenate([seen, new_rows])
 
-        if len(seen_ids) >= MIN_SAMPLE_TARGET:
+        if len(seen) >= min_sample_target:
             break
 
-    if combined_frames:
-        combined_detail = pd.concat(combined_frames, ignore_index=False)
-        final_price, _ = _aggregate_price(combined_detail)
-        total_used = int(len(combined_detail))
+    if combined:
+        rows = np.concatenate(combined)
+        combined_detail = _materialize(pool, let_dt, rows)
+        final_price = float(kernels.segment_prices(
+            _column_at(pool, 'UNIT_PRICE', rows), [len(rows)], _column_at(pool, 'WEIGHT', rows), mode
+        )[0])
+        total_used = int(len(rows))
         source = used_categories[-1]
     else:
-        combined_detail = pd.DataFrame(columns=pool.columns)
+        combined_detail = pd.DataFrame(columns=pool_columns)
         final_price = np.nan
         source = 'NO_DATA'
         total_used = 0
 
     results['TOTAL_USED_COUNT'] = total_used
-    detail_map = subsets if collect_details else {}
+    detail_map = (
+        {name: _materialize(pool, let_dt, rows) for name, rows in kept.items()} if collect_details else {}
+    )
 
     return final_price, source, results, detail_map, used_categories, combined_detail
 
@@ -204,10 +290,29 @@ def category_breakdown(
     project_region: int | None = None,
     include_details: bool = False,
     target_quantity: float | None = None,
+    mode: str | None = None,
+    min_sample_target: int | None = None,
+    trim: str | None = None,
 ):
+    """Price ``item_code`` from the BidTabs history.
+
+    ``bidtabs`` is the history DataFrame, a
+    :class:`costest.range_index.ItemRangeIndex` over it (windows and quantity
+    band become sorted slices) or a :class:`costest.sql_store.SqlBidStore`, in
+    which case the item, window and quantity filters run as indexed SQL
+    queries. ``trim`` picks the per-category outlier rule (see
+    :data:`costest.kernels.TRIM_METHODS`; default 2-sigma).
+    """
     region = PROJECT_REGION if project_region is None else project_region
     price, source, cat_data, detail_map, used_categories, combined_detail = _compute_categories(
-        bidtabs, item_code, region, collect_details=include_details, target_quantity=target_quantity
+        bidtabs,
+        item_code,
+        region,
+        collect_details=include_details,
+        target_quantity=target_quantity,
+        mode=mode,
+        min_sample_target=min_sample_target,
+        trim=trim,
     )
     if include_details:
         return price, source, cat_data, detail_map, used_categories, combined_detail
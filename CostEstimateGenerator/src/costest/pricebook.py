@@ -0,0 +1,301 @@
+"""Precomputed statewide price book.
+
+Tools, spreadsheets and reviewers often need only "the current category
+prices for item X in district Y". :func:`pricebook_frame` answers that for
+every item code in the history and every region at once: it reads each
+item's window rows into :class:`costest.whatif.WindowStats` and prices all
+items and regions with :func:`costest.whatif.region_breakdown`.
+:func:`write_pricebook` saves the result to one SQLite file (:data:`PRICEBOOK_NAME`) with a row per item and region
+(:data:`STATEWIDE` for statewide-only pricing) keyed for direct lookup::
+
+    sqlite3 outputs/pricebook.sqlite \\
+        "SELECT FINAL_PRICE, DATA_POINTS FROM prices WHERE ITEM_CODE = '401-10258' AND REGION = 3"
+
+Its ``meta`` table stamps the store version and partition checksums, the
+date the windows were measured from and the pricing settings.
+:class:`PriceBook` opens the file read-only; :meth:`PriceBook.lookup`
+is a single primary-key query.
+
+For the MEDIAN and P40_P60 modes :func:`sketch_pricebook_frame` answers the
+same from the history store's quantile sketches (:mod:`costest.sketches`)
+without reading any rows, within the sketches' documented rank error.
+
+The book is quantity-independent: prices are computed without the run's
+quantity band (50-150% of the line quantity) and without a contract-size
+filter, so an item has one price per region whatever quantity is bid. They
+match a run only for lines whose quantity band and contract bounds keep
+every row; an estimate for a project still needs a run.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .price_logic import CATEGORY_DEFS
+from .range_index import ItemRangeIndex
+from .sketches import PriceSketches
+from .stats import MEAN_FLOOR
+from .whatif import available_regions, build_window_stats, region_breakdown
+
+PRICEBOOK_NAME = "pricebook.sqlite"
+PRICEBOOK_FORMAT = 1
+TABLE = "prices"
+# REGION value of statewide-only prices (and of regions the book lacks).
+STATEWIDE = 0
+CATEGORY_NAMES = [name for name, *_ in CATEGORY_DEFS]
+COLUMNS = (
+    ["ITEM_CODE", "REGION", "DESCRIPTION", "FINAL_PRICE", "SOURCE", "DATA_POINTS", "CONFIDENCE"]
+    + [f"{name}_{field}" for name in CATEGORY_NAMES for field in ("PRICE", "COUNT")]
+)
+
+
+@dataclass(frozen=True)
+class PriceBookEntry:
+    """One item's prices in one region.
+
+    ``extension_quantity`` only scales :attr:`extension`; the prices do not
+    depend on it.
+    """
+
+    item_code: str
+    region: int
+    description: Optional[str]
+    final_price: Optional[float]
+    source: str
+    data_points: int
+    confidence: float
+    category_prices: Dict[str, Optional[float]]
+    category_counts: Dict[str, int]
+    extension_quantity: Optional[float] = None
+
+    @property
+    def extension(self) -> Optional[float]:
+        if self.extension_quantity is None or self.final_price is None:
+            return None
+        return self.extension_quantity * self.final_price
+
+
+def _sql_type(column: str) -> str:
+    if column in ("ITEM_CODE", "DESCRIPTION", "SOURCE"):
+        return "TEXT"
+    if column in ("REGION", "DATA_POINTS") or column.endswith("_COUNT"):
+        return "INTEGER"
+    return "REAL"
+
+
+def _confidence(counts: np.ndarray, mean: np.ndarray, std: np.ndarray) -> np.ndarray:
+    """``stats.confidence_score`` of every price's rows."""
+    cv = std / np.maximum(np.abs(mean), MEAN_FLOOR)
+    with np.errstate(invalid="ignore"):
+        score = (1.0 - np.exp(-counts / 30.0)) / (1.0 + cv)
+    return np.where((counts > 0) & np.isfinite(score), score, 0.0)
+
+
+def pricebook_frame(
+    bid: pd.DataFrame,
+    regions: Optional[Sequence[int]] = None,
+    min_sample_target: int = 50,
+    mode: str = kernels.DEFAULT_MODE,
+    trim: str = kernels.DEFAULT_TRIM,
+    now: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """Price every item code of ``bid`` in every region (plus statewide).
+
+    ``regions`` defaults to every region in the history. Returns one row per
+    item and region with the columns of :data:`COLUMNS`.
+    """
+    codes = bid["ITEM_CODE"].astype(str)
+    descriptions = (
+        bid["DESCRIPTION"].astype(object).groupby(codes.to_numpy(), sort=True).first()
+        if "DESCRIPTION" in bid.columns
+        else pd.Series(dtype=object)
+    )
+    items = sorted(codes.unique())
+    lines = [
+        {"ITEM_CODE": code, "DESCRIPTION": descriptions.get(code), "UNIT": None, "QUANTITY": 0.0}
+        for code in items
+    ]
+    stats = build_window_stats(ItemRangeIndex(bid), lines, now=now)
+    regions = [STATEWIDE] + [r for r in (available_regions(stats) if regions is None else regions) if r != STATEWIDE]
+    batch = region_breakdown(stats, [None if r == STATEWIDE else r for r in regions], min_sample_target, mode, trim)
+
+    m, n = batch.prices.shape
+    counts = batch.counts.ravel()
+    sources = np.array(CATEGORY_NAMES + ["NO_DATA"], dtype=object)[np.where(counts > 0, batch.source.ravel(), -1)]
+    frame = pd.DataFrame({
+        "ITEM_CODE": np.tile(items, m),
+        "REGION": np.repeat(regions, n).astype(np.int64),
+        "DESCRIPTION": np.tile([line["DESCRIPTION"] for line in lines], m),
+        "FINAL_PRICE": batch.prices.ravel(),
+        "SOURCE": sources,
+        "DATA_POINTS": counts,
+        "CONFIDENCE": _confidence(batch.counts, batch.mean, batch.std).ravel(),
+    })
+    for c, name in enumerate(CATEGORY_NAMES):
+        frame[f"{name}_PRICE"] = batch.category_prices[..., c].ravel()
+        frame[f"{name}_COUNT"] = batch.category_counts[..., c].ravel()
+    return frame[COLUMNS]
+
+
+def sketch_pricebook_frame(
+    sketches: PriceSketches,
+    regions: Optional[Sequence[int]] = None,
+    min_sample_target: int = 50,
+    mode: str = "MEDIAN",
+    trim: str = kernels.DEFAULT_TRIM,
+    now: Optional[pd.Timestamp] = None,
+) -> pd.DataFrame:
+    """:func:`pricebook_frame` answered from merged quantile sketches.
+
+    ``mode`` must be one of :data:`costest.sketches.SKETCH_MODES`. Sketches
+    keep no descriptions, so DESCRIPTION is empty; CONFIDENCE uses the mean
+    and spread of the sketch points.
+    """
+    now = pd.Timestamp.today() if now is None else now
+    regions = [STATEWIDE] + [r for r in (sketches.regions() if regions is None else regions) if r != STATEWIDE]
+    records = []
+    for region in regions:
+        for code in sketches.item_codes():
+            price, source, data, values, weights = sketches.breakdown_points(
+                code, None if region == STATEWIDE else region, mode, min_sample_target, now, trim
+            )
+            n = float(weights.sum())
+            mean = float(np.average(values, weights=weights)) if n else np.nan
+            std = float(np.sqrt(np.sum(weights * (values - mean) ** 2) / (n - 1))) if n > 1 else np.nan
+            record = {
+                "ITEM_CODE": code,
+                "REGION": int(region),
+                "DESCRIPTION": None,
+                "FINAL_PRICE": price,
+                "SOURCE": source,
+                "DATA_POINTS": int(data["TOTAL_USED_COUNT"]),
+                "CONFIDENCE": float(_confidence(np.array([n]), np.array([mean]), np.array([std]))[0]),
+            }
+            for name in CATEGORY_NAMES:
+                record[f"{name}_PRICE"] = data[f"{name}_PRICE"]
+                record[f"{name}_COUNT"] = int(data[f"{name}_COUNT"])
+            records.append(record)
+    return pd.DataFrame.from_records(records, columns=COLUMNS)
+
+
+def write_pricebook(frame: pd.DataFrame, path: str | Path, meta: Dict[str, object]) -> Path:
+    """Write a price book frame and its version stamp to ``path`` (replaced atomically)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    conn = sqlite3.connect(tmp)
+    try:
+        columns = ", ".join(f"{name} {_sql_type(name)}" for name in COLUMNS)
+        conn.execute(f"CREATE TABLE {TABLE} ({columns}, PRIMARY KEY (ITEM_CODE, REGION)) WITHOUT ROWID")
+        records = frame[COLUMNS].astype(object).where(frame[COLUMNS].notna(), None)
+        conn.executemany(
+            f"INSERT INTO {TABLE} VALUES ({', '.join('?' * len(COLUMNS))})",
+            records.itertuples(index=False, name=None),
+        )
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        stamp = {"format": PRICEBOOK_FORMAT, **meta}
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [(k, json.dumps(v)) for k, v in stamp.items()])
+        conn.commit()
+    finally:
+        conn.close()
+    tmp.replace(path)
+    return path
+
+
+class PriceBook:
+    """Read-only view of a price book file.
+
+    Connections are opened per thread. ``meta`` holds the version stamp the
+    book was written with.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        if not self.path.is_file():
+            raise FileNotFoundError(f"No price book at {self.path}")
+        self._local = threading.local()
+        self.meta: Dict[str, object] = {
+            key: json.loads(value) for key, value in self._conn().execute("SELECT key, value FROM meta")
+        }
+        if self.meta.get("format") != PRICEBOOK_FORMAT:
+            raise ValueError(f"{self.path} is not a version {PRICEBOOK_FORMAT} price book")
+        self.regions: List[int] = [
+            row[0] for row in self._conn().execute(f"SELECT DISTINCT REGION FROM {TABLE} ORDER BY REGION")
+        ]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    @property
+    def store_version(self) -> Optional[int]:
+        version = self.meta.get("store_version")
+        return None if version is None else int(version)
+
+    def lookup(
+        self, code: str, region: Optional[int] = None, extension_quantity: Optional[float] = None
+    ) -> Optional[PriceBookEntry]:
+        """Prices of ``code`` in ``region``, or None when the book lacks the item.
+
+        A region the book has no rows for prices statewide only, as it would
+        in a run. The price is the same for every quantity;
+        ``extension_quantity`` is only multiplied into
+        :attr:`PriceBookEntry.extension`.
+        """
+        if region is None or region not in self.regions:
+            region = STATEWIDE
+        row = self._conn().execute(
+            f"SELECT * FROM {TABLE} WHERE ITEM_CODE = ? AND REGION = ?", (str(code), int(region))
+        ).fetchone()
+        if row is None:
+            return None
+        values = dict(zip(COLUMNS, row))
+        return PriceBookEntry(
+            item_code=values["ITEM_CODE"],
+            region=values["REGION"],
+            description=values["DESCRIPTION"],
+            final_price=values["FINAL_PRICE"],
+            source=values["SOURCE"],
+            data_points=values["DATA_POINTS"],
+            confidence=values["CONFIDENCE"],
+            category_prices={name: values[f"{name}_PRICE"] for name in CATEGORY_NAMES},
+            category_counts={name: values[f"{name}_COUNT"] for name in CATEGORY_NAMES},
+            extension_quantity=None if extension_quantity is None else float(extension_quantity),
+        )
+
+    def frame(self, code: Optional[str] = None) -> pd.DataFrame:
+        """Every row of the book (or of one item code) as a DataFrame."""
+        if code is None:
+            return pd.read_sql_query(f"SELECT * FROM {TABLE}", self._conn())
+        return pd.read_sql_query(f"SELECT * FROM {TABLE} WHERE ITEM_CODE = ?", self._conn(), params=(str(code),))
+
+    def is_current(self, store_version: Optional[int], as_of: Optional[date] = None) -> bool:
+        """Whether the book was built from ``store_version`` on ``as_of`` (default today)."""
+        as_of = date.today() if as_of is None else as_of
+        return self.store_version == store_version and self.meta.get("as_of") == as_of.isoformat()
+
+
+__all__ = [
+    "COLUMNS",
+    "PRICEBOOK_NAME",
+    "STATEWIDE",
+    "PriceBook",
+    "PriceBookEntry",
+    "pricebook_frame",
+    "sketch_pricebook_frame",
+    "write_pricebook",
+]
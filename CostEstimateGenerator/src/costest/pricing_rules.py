@@ -0,0 +1,44 @@
+"""Estimate-level pricing rules shared by runs and the what-if tools.
+
+Kept free of pandas so the CLI can import it without slowing start-up.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional
+
+# Items priced as a share of every other item's total (IDM Chapter 20).
+CONTRACT_PERCENT_ITEMS: Dict[str, float] = {"105-06845": 0.02, "110-01001": 0.05}
+
+
+def round_unit_price(value: Optional[float]) -> float:
+    """Round a unit price to two significant figures (cents below $1)."""
+    if value is None:
+        return 0.0
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    if math.isnan(numeric):  # pragma: no cover - defensive
+        return float("nan")
+    if numeric <= 0:
+        return 0.0
+    if numeric < 1.0:
+        return round(numeric, 2)
+    magnitude = math.floor(math.log10(numeric))
+    step = 10 ** max(magnitude - 1, -1)
+    rounded = round(numeric / step) * step
+    return round(rounded, 2)
+
+
+def contract_percent_amount(subtotal, percent: float):
+    """A contract-percent item's amount: ``percent`` of ``subtotal``, floored to $1,000.
+
+    ``subtotal`` may be a float or a NumPy array (one subtotal per bootstrap
+    replicate); floor division treats both alike.
+    """
+    return (subtotal * percent) // 1000.0 * 1000.0
+
+
+__all__ = ["CONTRACT_PERCENT_ITEMS", "contract_percent_amount", "round_unit_price"]
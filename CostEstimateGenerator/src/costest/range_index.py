@@ -0,0 +1,272 @@
+"""Per-item (letting month x quantity) range index over the BidTabs history.
+
+Pricing asks the same question six times per item: which of the item's rows
+were let inside a look-back window, fall within the quantity band and (for
+district categories) belong to the project region. Masking the history and
+copying the pool for every window dominates pricing time on large histories.
+
+:class:`ItemRangeIndex` sorts the dated rows once by ``(item, letting month,
+quantity)``. Each ``(item, month)`` pair is a contiguous block whose rows are
+sorted by quantity, so a window is the run of month blocks it covers and the
+quantity band is a ``searchsorted`` slice inside each block. Only the two
+boundary months need a day-level date check. Undated rows are kept per item
+for the 12-month windows. The selected positions are returned in original
+row order and materialized with a single ``take``, so results (and their
+floating-point sums) match the DataFrame path exactly.
+
+The index implements the same source protocol as
+:class:`costest.sql_store.SqlBidStore` (``columns``, ``item_pool``,
+``alternate_candidates``), so pricing and alternate-seek accept it in place
+of the history frame.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .bid_store import LETTING_MONTH, MONTH_NA, month_offsets
+
+LET_DT = "_LET_DT"
+
+
+def _month_of(ts: pd.Timestamp) -> int:
+    return int(np.datetime64(ts.to_datetime64(), "M").astype("int64"))
+
+
+class ItemRangeIndex:
+    """Searchsorted window and quantity-band lookups over one history frame.
+
+    ``frame`` must not be modified while the index is in use. ``let_dt`` holds
+    its letting dates as ``datetime64[ns]`` (NaT when missing).
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        n = len(frame)
+        if "ITEM_CODE" in frame.columns:
+            item_ids, uniques = pd.factorize(frame["ITEM_CODE"].astype(str).to_numpy())
+        else:
+            item_ids, uniques = np.zeros(n, dtype=np.int64), np.array([""], dtype=object)
+        self._items: Dict[str, int] = {str(code): i for i, code in enumerate(uniques)}
+
+        # Rows pricing drops up front (missing or non-numeric unit price).
+        usable = np.ones(n, dtype=bool)
+        if "UNIT_PRICE" in frame.columns:
+            usable = pd.to_numeric(frame["UNIT_PRICE"], errors="coerce").notna().to_numpy()
+
+        if "LETTING_DATE" in frame.columns:
+            dates = pd.to_datetime(frame["LETTING_DATE"], errors="coerce")
+            self._dates: Optional[pd.Series] = dates
+            self.let_dt = dates.to_numpy(dtype="datetime64[ns]")
+            ns = self.let_dt.view("i8")
+            if LETTING_MONTH in frame.columns:
+                months = frame[LETTING_MONTH].to_numpy(dtype=np.int64)
+            else:
+                months = month_offsets(dates).astype(np.int64)
+            dated = months != MONTH_NA
+        else:
+            self._dates = None
+            self.let_dt = np.full(n, np.datetime64("NaT"), dtype="datetime64[ns]")
+            ns = np.zeros(n, dtype=np.int64)
+            months = np.zeros(n, dtype=np.int64)
+            dated = np.zeros(n, dtype=bool)
+
+        self._has_quantity = "QUANTITY" in frame.columns
+        if self._has_quantity:
+            quantity = pd.to_numeric(frame["QUANTITY"], errors="coerce").to_numpy(dtype=float)
+        else:
+            quantity = np.zeros(n, dtype=float)
+        self._region = frame["REGION"].to_numpy() if "REGION" in frame.columns else None
+
+        # Dated rows sorted by (item, month, quantity); NaN quantities sort last.
+        sel = np.flatnonzero(usable & dated)
+        order = np.lexsort((quantity[sel], months[sel], item_ids[sel]))
+        self._pos = sel[order]
+        self._qty = quantity[self._pos]
+        self._ns = ns[self._pos]
+        block_item = item_ids[self._pos]
+        block_month = months[self._pos]
+        starts = np.flatnonzero(
+            np.r_[True, (block_item[1:] != block_item[:-1]) | (block_month[1:] != block_month[:-1])]
+        ) if len(self._pos) else np.zeros(0, dtype=np.int64)
+        self._block_start = np.r_[starts, len(self._pos)].astype(np.int64)
+        self._block_month = block_month[starts]
+        block_items = block_item[starts]
+        n_items = len(uniques)
+        self._item_blocks = np.searchsorted(block_items, np.arange(n_items + 1), side="left")
+
+        # Undated rows per item, in original order.
+        undated = np.flatnonzero(usable & ~dated)
+        undated = undated[np.argsort(item_ids[undated], kind="stable")]
+        self._undated = undated
+        self._undated_qty = quantity[undated]
+        self._item_undated = np.searchsorted(item_ids[undated], np.arange(n_items + 1), side="left")
+
+        self._item_ids = item_ids
+
+    # -- source protocol -------------------------------------------------
+
+    @property
+    def columns(self) -> pd.Index:
+        return self.frame.columns
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def pool_columns(self, item_code: str) -> List[str]:
+        """Columns of the pricing pool (``_LET_DT`` is added once rows exist)."""
+        columns = list(self.frame.columns)
+        if self.item_rows(item_code) > 0:
+            columns.append(LET_DT)
+        return columns
+
+    def item_rows(self, item_code: str) -> int:
+        """Usable (priced) rows of ``item_code``."""
+        i = self._items.get(str(item_code))
+        if i is None:
+            return 0
+        dated = self._block_start[self._item_blocks[i + 1]] - self._block_start[self._item_blocks[i]]
+        return int(dated + self._item_undated[i + 1] - self._item_undated[i])
+
+    def window(
+        self,
+        item_code: str,
+        min_months: Optional[int],
+        max_months: Optional[int],
+        quantity_range: Optional[Tuple[float, float]] = None,
+        region: Optional[int] = None,
+        regional: bool = False,
+        now: Optional[pd.Timestamp] = None,
+    ) -> pd.DataFrame:
+        """Rows of ``item_code`` let within ``[now - max_months, now - min_months]``.
+
+        Same bounds as :func:`costest.price_logic._window_mask`: the upper
+        bound is inclusive only for ``min_months == 0``, which also keeps
+        undated rows. ``quantity_range`` is inclusive on both ends. With
+        ``regional``, only rows whose REGION equals ``region`` are returned
+        (none when ``region`` is None or there is no REGION column).
+        """
+        return self._take(
+            self.window_positions(item_code, min_months, max_months, quantity_range, region, regional, now)
+        )
+
+    def window_positions(
+        self,
+        item_code: str,
+        min_months: Optional[int],
+        max_months: Optional[int],
+        quantity_range: Optional[Tuple[float, float]] = None,
+        region: Optional[int] = None,
+        regional: bool = False,
+        now: Optional[pd.Timestamp] = None,
+    ) -> np.ndarray:
+        """Ascending positions into :attr:`frame` of the rows :meth:`window` returns."""
+        if regional and (region is None or self._region is None):
+            return np.zeros(0, dtype=np.int64)
+        positions = self._window_positions(item_code, min_months, max_months, quantity_range, now)
+        if regional and len(positions):
+            positions = positions[self._region[positions] == region]
+        return positions
+
+    def item_pool(
+        self,
+        item_code: str,
+        since: Optional[pd.Timestamp] = None,
+        quantity_range: Optional[Tuple[float, float]] = None,
+        region: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Rows for one item, optionally let on/after ``since`` (undated kept)."""
+        i = self._items.get(str(item_code))
+        if i is None:
+            return self.frame.iloc[0:0]
+        mask = self._item_ids == i
+        if since is not None and self._dates is not None:
+            mask &= ~(self._dates < pd.Timestamp(since)).to_numpy()
+        if quantity_range is not None and self._has_quantity:
+            mask &= self.frame["QUANTITY"].between(*quantity_range, inclusive="both").to_numpy()
+        if region is not None and self._region is not None:
+            mask &= self._region == region
+        return self.frame.iloc[np.flatnonzero(mask)]
+
+    def alternate_candidates(
+        self,
+        prefix: str,
+        exclude_code: str,
+        area_range: Tuple[float, float],
+        shape: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Rows of other items sharing ``prefix`` whose area is within range."""
+        head = f"{prefix}-"
+        codes = {code: i for code, i in self._items.items() if code.startswith(head) and code != str(exclude_code)}
+        mask = np.isin(self._item_ids, np.fromiter(codes.values(), dtype=np.int64, count=len(codes)))
+        area = self.frame["GEOM_AREA_SQFT"]
+        mask &= (area.notna() & (area >= area_range[0]) & (area <= area_range[1])).to_numpy()
+        if shape:
+            mask &= (self.frame["GEOM_SHAPE"] == shape).to_numpy()
+        return self.frame.iloc[np.flatnonzero(mask)]
+
+    # -- internals -------------------------------------------------------
+
+    def _take(self, positions: np.ndarray) -> pd.DataFrame:
+        out = self.frame.take(positions)
+        out[LET_DT] = self.let_dt[positions]
+        return out
+
+    def _window_positions(
+        self,
+        item_code: str,
+        min_months: Optional[int],
+        max_months: Optional[int],
+        quantity_range: Optional[Tuple[float, float]],
+        now: Optional[pd.Timestamp],
+    ) -> np.ndarray:
+        i = self._items.get(str(item_code))
+        if i is None:
+            return np.zeros(0, dtype=np.int64)
+        now = pd.Timestamp.today() if now is None else now
+        band = quantity_range if self._has_quantity else None
+        lower = now - pd.DateOffset(months=max_months) if max_months is not None else None
+        upper = now - pd.DateOffset(months=min_months) if min_months is not None else None
+
+        b0, b1 = int(self._item_blocks[i]), int(self._item_blocks[i + 1])
+        months = self._block_month[b0:b1]
+        first = b0 + (int(np.searchsorted(months, _month_of(lower), side="left")) if lower is not None else 0)
+        last = b0 + (int(np.searchsorted(months, _month_of(upper), side="right")) if upper is not None else b1 - b0)
+
+        pieces: List[np.ndarray] = []
+        for b in range(first, last):
+            start, stop = int(self._block_start[b]), int(self._block_start[b + 1])
+            if band is not None:
+                qty = self._qty[start:stop]
+                start, stop = (
+                    start + int(np.searchsorted(qty, band[0], side="left")),
+                    start + int(np.searchsorted(qty, band[1], side="right")),
+                )
+            if stop > start:
+                pieces.append(np.arange(start, stop))
+        sorted_idx = np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.int64)
+        if len(sorted_idx):
+            # Day-level bounds; only rows in the boundary months can fail.
+            ns = self._ns[sorted_idx]
+            keep = np.ones(len(sorted_idx), dtype=bool)
+            if lower is not None:
+                keep &= ns >= lower.value
+            if upper is not None:
+                keep &= (ns <= upper.value) if min_months == 0 else (ns < upper.value)
+            sorted_idx = sorted_idx[keep]
+        positions = self._pos[sorted_idx]
+
+        if min_months == 0:
+            u0, u1 = int(self._item_undated[i]), int(self._item_undated[i + 1])
+            undated = self._undated[u0:u1]
+            if band is not None:
+                qty = self._undated_qty[u0:u1]
+                undated = undated[(qty >= band[0]) & (qty <= band[1])]
+            positions = np.concatenate([positions, undated])
+        return np.sort(positions)
+
+
+__all__ = ["ItemRangeIndex", "LET_DT"]
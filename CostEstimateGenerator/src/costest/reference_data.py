@@ -8,16 +8,7 @@ from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional, Mapping
 
-import pandas as pd
-
-try:
-    from PyPDF2 import PdfReader  # type: ignore
-except ImportError as exc:  # pragma: no cover - runtime guard
-    raise RuntimeError(
-        "PyPDF2 must be installed to parse the Standard Specifications PDF"
-    ) from exc
-
-from .bidtabs_io import normalize_item_code
+from .bidtabs_io import normalize_item_code, normalize_item_codes
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 DATA_DIR = BASE_DIR / "data_sample"
@@ -25,8 +16,8 @@ CACHE_DIR = DATA_DIR / "cache"
 PAYITEMS_XLSX = DATA_DIR / "CurrentEnglishPayItems" / "Current-English-Pay-Items9.3.xlsx"
 UNIT_PRICE_XLSX = DATA_DIR / "UnitPriceSummaries" / "CY2024-Unit-Price-Summary.xlsx"
 SPEC_PDF = DATA_DIR / "StandardSpecifications" / "2026-Standard-Specifications.pdf"
-
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
+# Sources whose contents feed alternate-seek pricing.
+SOURCE_FILES = (PAYITEMS_XLSX, UNIT_PRICE_XLSX, SPEC_PDF)
 
 PAYITEM_CACHE = CACHE_DIR / "payitem_catalog.json"
 UNIT_PRICE_CACHE = CACHE_DIR / "unit_price_summary.json"
@@ -35,6 +26,11 @@ SPEC_CACHE = CACHE_DIR / "spec_sections.json"
 SECTION_RE = re.compile(r"^SECTION\s+(\d{3}(?:\.\d+)*)(?:\s+[-–]\s+(.+))?", re.IGNORECASE)
 
 
+def _write_cache(cache: Path, payload: Mapping[str, object]) -> None:
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    cache.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+
+
 def _needs_refresh(source: Path, cache: Path) -> bool:
     if not cache.exists():
         return True
@@ -49,6 +45,8 @@ def load_payitem_catalog() -> Dict[str, Dict[str, object]]:
     if not PAYITEMS_XLSX.exists():
         return {}
     if _needs_refresh(PAYITEMS_XLSX, PAYITEM_CACHE):
+        import pandas as pd
+
         df = pd.read_excel(PAYITEMS_XLSX, header=1)
         df = df.rename(
             columns={
@@ -62,11 +60,13 @@ def load_payitem_catalog() -> Dict[str, Dict[str, object]]:
             }
         )
         cleaned: Dict[str, Dict[str, object]] = {}
+        raw_codes = df["item_code"] if "item_code" in df.columns else pd.Series("", index=df.index)
+        df["code"] = normalize_item_codes(raw_codes.astype(str).str.strip())
         for _, row in df.iterrows():
             raw_code = str(row.get("item_code", "")).strip()
             if not raw_code or raw_code.upper() == "ITEM":
                 continue
-            code = normalize_item_code(raw_code)
+            code = row["code"]
             cleaned[code] = {
                 "section": str(row.get("section", "")).strip(),
                 "description": str(row.get("description", "")).strip(),
@@ -75,7 +75,7 @@ def load_payitem_catalog() -> Dict[str, Dict[str, object]]:
                 "comments": str(row.get("comments", "")).strip(),
                 "mandatory_supplemental": str(row.get("mandatory_supplemental", "")).strip(),
             }
-        PAYITEM_CACHE.write_text(json.dumps(cleaned, indent=2), encoding="utf-8")
+        _write_cache(PAYITEM_CACHE, cleaned)
     return json.loads(PAYITEM_CACHE.read_text(encoding="utf-8"))
 
 
@@ -84,6 +84,8 @@ def load_unit_price_summary() -> Dict[str, Dict[str, object]]:
     if not UNIT_PRICE_XLSX.exists():
         return {}
     if _needs_refresh(UNIT_PRICE_XLSX, UNIT_PRICE_CACHE):
+        import pandas as pd
+
         df = pd.read_excel(UNIT_PRICE_XLSX, sheet_name=0, header=6)
         df.columns = [
             "year",
@@ -98,11 +100,12 @@ def load_unit_price_summary() -> Dict[str, Dict[str, object]]:
             "total_value",
         ]
         cleaned: Dict[str, Dict[str, object]] = {}
+        df["code"] = normalize_item_codes(df["item_code"].astype(str).str.strip())
         for _, row in df.iterrows():
             raw_code = str(row.get("item_code", "")).strip()
             if not raw_code or raw_code.upper().startswith("ITEM"):
                 continue
-            code = normalize_item_code(raw_code)
+            code = row["code"]
             try:
                 weighted = float(row.get("weighted_average", 0) or 0)
             except Exception:
@@ -118,7 +121,7 @@ def load_unit_price_summary() -> Dict[str, Dict[str, object]]:
                 "lowest": float(row.get("lowest", 0) or 0),
                 "highest": float(row.get("highest", 0) or 0),
             }
-        UNIT_PRICE_CACHE.write_text(json.dumps(cleaned, indent=2), encoding="utf-8")
+        _write_cache(UNIT_PRICE_CACHE, cleaned)
     return json.loads(UNIT_PRICE_CACHE.read_text(encoding="utf-8"))
 
 
@@ -127,6 +130,13 @@ def load_spec_sections() -> Dict[str, Dict[str, object]]:
     if not SPEC_PDF.exists():
         return {}
     if _needs_refresh(SPEC_PDF, SPEC_CACHE):
+        try:
+            from PyPDF2 import PdfReader  # type: ignore
+        except ImportError as exc:  # pragma: no cover - runtime guard
+            raise RuntimeError(
+                "PyPDF2 must be installed to parse the Standard Specifications PDF"
+            ) from exc
+
         reader = PdfReader(str(SPEC_PDF))
         sections: Dict[str, Dict[str, object]] = {}
         current_section: Optional[Dict[str, object]] = None
@@ -174,7 +184,7 @@ def load_spec_sections() -> Dict[str, Dict[str, object]]:
             if current_section is not None:
                 current_section["page_end"] = page_index
         _flush()
-        SPEC_CACHE.write_text(json.dumps(sections, indent=2), encoding="utf-8")
+        _write_cache(SPEC_CACHE, sections)
     return json.loads(SPEC_CACHE.read_text(encoding="utf-8"))
 
 
@@ -0,0 +1,277 @@
+"""Dependency tracking for incremental re-pricing.
+
+Every run saves :data:`STATE_NAME` next to its outputs. It holds the
+per-line pricing results, the settings and inputs they were computed from,
+the checksum of every history-store partition, the date the look-back
+windows were measured from and, per line, what its price depends on
+(:class:`LineDeps`).
+
+``costest reprice`` compares that state with the current store and date. A
+line is re-priced when rows of one of its items (or, for alternate-seek
+lines, of its item-code family) sit in a partition that was added or changed
+since the run, or let on a date that a window boundary has since crossed.
+Every other line reuses its saved result, and the outputs are rewritten from
+the merged results. Runs whose settings or input files changed are
+re-estimated in full. The settings include the package and
+:data:`PRICING_VERSION` and the digests of the alternate-seek reference
+files, so upgrading the code or editing a reference table also re-prices
+everything.
+
+Edits to the quantities workbook do not force a full run either. Each line
+is fingerprinted by its code, description, unit and quantity
+(:func:`line_fingerprint`), and an ordinary run reuses the saved result,
+including any alternate-seek outcome and AI selection, of every line whose
+fingerprint is unchanged and which no store change affects. Only added and
+edited lines are priced. Runs priced from a BidTabs folder rather than a
+store reuse lines while the folder's files and the as-of date are unchanged.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import pickle
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from .alternate_seek import _item_prefix
+from .history_store import UNDATED, partition_item_codes, read_manifest, store_exists
+from .price_logic import CATEGORY_DEFS
+
+STATE_NAME = "pricing_state.pkl"
+STATE_FORMAT = 2
+# Bump when a change to the pricing code alters results: saved results of
+# another version are never reused.
+PRICING_VERSION = 1
+# Settings a delta run may change: they only alter which lines are priced.
+DELTA_EXEMPT = frozenset({"quantities", "aliases"})
+
+
+@dataclass
+class LineDeps:
+    """What one estimate line's price was computed from."""
+
+    items: List[str]
+    prefixes: List[str] = field(default_factory=list)
+
+    def affected_by(self, items: Set[str]) -> bool:
+        if not items.isdisjoint(self.items):
+            return True
+        heads = tuple(f"{prefix}-" for prefix in self.prefixes)
+        return bool(heads) and any(code.startswith(heads) for code in items)
+
+
+@dataclass
+class PricingState:
+    """Saved per-line results of one run and what they depend on.
+
+    ``audit_template`` records that the audit CSV in the output directory was
+    seeded before the first run, so later runs keep updating it in place.
+    """
+
+    settings: Dict[str, object]
+    as_of: date
+    store_version: int
+    partitions: Dict[str, str]
+    lines: List[Dict[str, object]]
+    results: List[tuple]
+    deps: List[LineDeps]
+    audit_template: bool = False
+    format: int = STATE_FORMAT
+
+
+@dataclass
+class RepricePlan:
+    """Lines to re-price and why."""
+
+    lines: List[int]
+    changed_partitions: List[str]
+    shifted_partitions: List[str]
+    items: Set[str]
+
+
+def file_digest(path: Optional[str | Path]) -> Optional[str]:
+    """SHA-256 of a file, or None when there is no such file."""
+    if path is None or not Path(path).is_file():
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def folder_digest(directory: Optional[str | Path], patterns: Iterable[str] = ("*.csv", "*.xls", "*.xlsx")) -> Optional[str]:
+    """Digest of the name, size and modification time of a folder's BidTabs files."""
+    if directory is None or not Path(directory).is_dir():
+        return None
+    digest = hashlib.sha256()
+    files = sorted({path for pattern in patterns for path in Path(directory).glob(pattern)})
+    for path in files:
+        stat = path.stat()
+        digest.update(f"{path.name}\x1f{stat.st_size}\x1f{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def line_fingerprint(line: Dict[str, object]) -> str:
+    """Identity of a quantities line: code, description, unit and quantity."""
+    key = "\x1f".join(
+        [str(line["ITEM_CODE"]), str(line["DESCRIPTION"]), str(line["UNIT"]), repr(float(line["QUANTITY"]))]
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def reusable_lines(state: PricingState, lines: List[Dict[str, object]], stale: Iterable[int] = ()) -> Dict[int, int]:
+    """Map each line of ``lines`` to the saved line whose result it can reuse.
+
+    A saved line qualifies when its fingerprint matches and it is not in
+    ``stale``. Repeated lines are matched in order, each saved line once.
+    """
+    stale = set(stale)
+    saved: Dict[str, List[int]] = {}
+    for i, line in enumerate(state.lines):
+        if i not in stale:
+            saved.setdefault(line_fingerprint(line), []).append(i)
+    reuse: Dict[int, int] = {}
+    for j, line in enumerate(lines):
+        queue = saved.get(line_fingerprint(line))
+        if queue:
+            reuse[j] = queue.pop(0)
+    return reuse
+
+
+def line_dependencies(line: Dict[str, object], result: tuple) -> LineDeps:
+    """Items and alternate-seek prefixes behind one priced line.
+
+    Partitions are not recorded per line: a row that did not price a line
+    (unused or trimmed) can still enter its windows when a bound crosses it,
+    so shifted partitions are matched by item code instead.
+    """
+    row, detail, alt_report, _ = result
+    code = str(line["ITEM_CODE"])
+    items = {code}
+    for candidate in (alt_report or {}).get("candidates") or []:
+        items.add(str(candidate.get("item_code")))
+    if detail is not None and not detail.empty and "ITEM_CODE" in detail.columns:
+        items.update(detail["ITEM_CODE"].astype(str))
+    # Lines without own data searched their whole item family for alternates.
+    searched = "GEOM_SHAPE" in row and (row.get("ALTERNATE_USED") or not row.get("DATA_POINTS_USED"))
+    prefixes = [_item_prefix(code)] if searched else []
+    return LineDeps(items=sorted(items), prefixes=prefixes)
+
+
+def save_state(path: str | Path, state: PricingState) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def load_state(path: str | Path) -> Optional[PricingState]:
+    """The saved state, or None when missing, unreadable or of another format."""
+    try:
+        with open(path, "rb") as fh:
+            state = pickle.load(fh)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(state, PricingState) or state.format != STATE_FORMAT:
+        return None
+    return state
+
+
+def store_partitions(store_dir: Optional[str | Path]) -> Dict[str, str]:
+    """Partition key -> checksum of the store (empty without a store)."""
+    if not store_exists(store_dir):
+        return {}
+    partitions = read_manifest(store_dir).get("partitions") or {}
+    return {key: str(entry.get("sha256")) for key, entry in partitions.items()}
+
+
+def window_boundaries() -> List[int]:
+    """Month offsets of every look-back window bound."""
+    return sorted({m for _, _, lo, hi in CATEGORY_DEFS for m in (lo, hi) if m is not None})
+
+
+def shifted_ranges(old: date, new: date, months: Iterable[int]) -> List[Tuple[date, date]]:
+    """Letting-date ranges (inclusive) that a window bound crossed from ``old`` to ``new``."""
+    ranges = []
+    for m in months:
+        a = (pd.Timestamp(old) - pd.DateOffset(months=m)).date()
+        b = (pd.Timestamp(new) - pd.DateOffset(months=m)).date()
+        ranges.append((min(a, b), max(a, b)))
+    return ranges
+
+
+def plan_reprice(
+    state: Optional[PricingState],
+    store_dir: Optional[str | Path],
+    settings: Dict[str, object],
+    as_of: date,
+    exempt: Iterable[str] = (),
+) -> Tuple[Optional[RepricePlan], str]:
+    """Lines of ``state`` that the current store and date can change.
+
+    Settings named in ``exempt`` may differ from the saved ones. Returns
+    ``(None, reason)`` when the estimate has to be re-run in full.
+    """
+    if state is None:
+        return None, "no saved pricing state in the output directory"
+    exempt = set(exempt)
+    changed = sorted(
+        k
+        for k in set(settings) | set(state.settings)
+        if k not in exempt and settings.get(k) != state.settings.get(k)
+    )
+    if changed:
+        return None, f"run settings or inputs changed ({', '.join(changed)})"
+    if not store_exists(store_dir):
+        if as_of != state.as_of:
+            return None, "the pricing windows moved and the BidTabs folder has no partitions to check"
+        return RepricePlan(lines=[], changed_partitions=[], shifted_partitions=[], items=set()), ""
+
+    current = store_partitions(store_dir)
+    removed = sorted(set(state.partitions) - set(current))
+    if removed:
+        return None, f"{len(removed)} store partition(s) were removed"
+    changed = sorted(key for key, digest in current.items() if state.partitions.get(key) != digest)
+
+    shifted: List[str] = []
+    if as_of != state.as_of:
+        ranges = shifted_ranges(state.as_of, as_of, window_boundaries())
+        for key in current:
+            if key == UNDATED or key in changed:
+                continue
+            let = date.fromisoformat(key)
+            if any(lo <= let <= hi for lo, hi in ranges):
+                shifted.append(key)
+        shifted.sort()
+
+    items = partition_item_codes(store_dir, changed + shifted)
+    lines = [i for i, deps in enumerate(state.deps) if deps.affected_by(items)]
+    return RepricePlan(lines=lines, changed_partitions=changed, shifted_partitions=shifted, items=items), ""
+
+
+__all__ = [
+    "LineDeps",
+    "PricingState",
+    "RepricePlan",
+    "DELTA_EXEMPT",
+    "PRICING_VERSION",
+    "STATE_NAME",
+    "file_digest",
+    "folder_digest",
+    "line_dependencies",
+    "line_fingerprint",
+    "load_state",
+    "plan_reprice",
+    "reusable_lines",
+    "save_state",
+    "shifted_ranges",
+    "store_partitions",
+    "window_boundaries",
+]
@@ -0,0 +1,404 @@
+"""Mergeable quantile sketches of the BidTabs history.
+
+MEDIAN and P40_P60 category prices cannot be built from sums and counts, so
+answering them normally needs every raw row in the window. A sketch keeps,
+per ``(item, region, letting date)`` cell, at most ``k`` price points with
+integer weights, plus the cell's exact row count, price sum and sum of
+squares:
+
+* cells of ``k`` rows or fewer keep every price (weight 1) and are exact;
+* larger cells are sorted and cut into ``k`` equal-rank buckets, each kept as
+  its middle price weighted by the bucket size.
+
+A window query merges the cells it covers by concatenating their points;
+nothing is re-compacted, so errors do not grow with the number of merges.
+**Error bound:** a quantile ``q`` over ``N`` merged rows lies between the
+exact quantiles at ``q - 1/k`` and ``q + 1/k`` (each bucket moves a row's rank
+by at most half its size). It is exact when no covered cell exceeds ``k``
+rows. Every outlier rule of :data:`costest.kernels.TRIM_METHODS` applies:
+SIGMA bounds use exact means and standard deviations from the cell
+moments, MAD/IQR/PERCENTILE bounds are sketch quantiles and carry the same
+rank error. Trimming whole points can move at most one bucket per
+compacted cell across a bound.
+
+Cells are keyed by letting date rather than month, which matches the store
+partitions, so window boundaries are exact. Sketches have no quantity
+dimension and answer unbanded queries (no target quantity, no contract-size
+filter) only. ``costest pricebook --sketches`` prices from them; estimate
+runs, which band by line quantity and write the audit, keep using exact
+pricing over the rows.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .price_logic import CATEGORY_DEFS, MIN_SAMPLE_TARGET, _window_mask
+
+DEFAULT_K = 128
+SKETCH_MODES = ("MEDIAN", "P40_P60")
+
+
+@dataclass
+class CellSketches:
+    """Sketches of many cells as flat arrays.
+
+    Cell ``i`` owns ``values``/``weights`` entries
+    ``offsets[i]:offsets[i] + lengths[i]``, sorted by value.
+    """
+
+    items: np.ndarray  # str
+    regions: np.ndarray  # float, NaN when unknown
+    letting: np.ndarray  # datetime64[ns], NaT when undated
+    rows: np.ndarray  # exact row count per cell
+    total: np.ndarray  # exact price sum per cell
+    total_sq: np.ndarray  # exact sum of squared prices per cell
+    lengths: np.ndarray
+    values: np.ndarray
+    weights: np.ndarray
+    k: int = DEFAULT_K
+
+    @property
+    def offsets(self) -> np.ndarray:
+        return np.r_[0, np.cumsum(self.lengths)[:-1]].astype(np.int64)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @classmethod
+    def empty(cls, k: int = DEFAULT_K) -> "CellSketches":
+        return cls(
+            items=np.zeros(0, dtype=str),
+            regions=np.zeros(0),
+            letting=np.zeros(0, dtype="datetime64[ns]"),
+            rows=np.zeros(0, dtype=np.int64),
+            total=np.zeros(0),
+            total_sq=np.zeros(0),
+            lengths=np.zeros(0, dtype=np.int64),
+            values=np.zeros(0),
+            weights=np.zeros(0, dtype=np.int64),
+            k=k,
+        )
+
+    def take(self, cells: np.ndarray) -> "CellSketches":
+        """The given cells, in the given order."""
+        cells = np.asarray(cells, dtype=np.int64)
+        lengths = self.lengths[cells]
+        points = _ranges(self.offsets[cells], lengths)
+        return CellSketches(
+            items=self.items[cells],
+            regions=self.regions[cells],
+            letting=self.letting[cells],
+            rows=self.rows[cells],
+            total=self.total[cells],
+            total_sq=self.total_sq[cells],
+            lengths=lengths,
+            values=self.values[points],
+            weights=self.weights[points],
+            k=self.k,
+        )
+
+    @classmethod
+    def concat(cls, parts: Sequence["CellSketches"]) -> "CellSketches":
+        if not parts:
+            return cls.empty()
+        if len({part.k for part in parts}) > 1:
+            raise ValueError("Cannot merge sketches built with different k")
+        fields = ("items", "regions", "letting", "rows", "total", "total_sq", "lengths", "values", "weights")
+        return cls(**{name: np.concatenate([getattr(p, name) for p in parts]) for name in fields}, k=parts[0].k)
+
+    def save(self, path: str | Path) -> None:
+        with open(path, "wb") as fh:
+            np.savez(
+                fh,
+                items=self.items.astype(str),
+                regions=self.regions,
+                letting=self.letting.view("i8"),
+                rows=self.rows,
+                total=self.total,
+                total_sq=self.total_sq,
+                lengths=self.lengths,
+                values=self.values,
+                weights=self.weights,
+                k=np.int64(self.k),
+            )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "CellSketches":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                items=data["items"],
+                regions=data["regions"],
+                letting=data["letting"].view("datetime64[ns]"),
+                rows=data["rows"],
+                total=data["total"],
+                total_sq=data["total_sq"],
+                lengths=data["lengths"],
+                values=data["values"],
+                weights=data["weights"],
+                k=int(data["k"]),
+            )
+
+
+def _ranges(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatenated ``arange(start, start + length)`` for each pair."""
+    shift = starts - np.r_[0, np.cumsum(lengths)[:-1]]
+    return np.repeat(shift, lengths).astype(np.int64) + np.arange(int(lengths.sum()))
+
+
+def build_cell_sketches(frame: pd.DataFrame, k: int = DEFAULT_K) -> CellSketches:
+    """Sketch the rows of ``frame`` per (item, region, letting date).
+
+    Rows without a numeric unit price are skipped.
+    """
+    if k < 1:
+        raise ValueError("k must be positive")
+    if frame.empty or "UNIT_PRICE" not in frame.columns or "ITEM_CODE" not in frame.columns:
+        return CellSketches.empty(k)
+    prices = pd.to_numeric(frame["UNIT_PRICE"], errors="coerce").to_numpy(dtype=float)
+    keep = ~np.isnan(prices)
+    prices = prices[keep]
+    if not len(prices):
+        return CellSketches.empty(k)
+    item_ids, item_codes = pd.factorize(frame["ITEM_CODE"].astype(str).to_numpy()[keep])
+    if "REGION" in frame.columns:
+        regions = pd.to_numeric(frame["REGION"], errors="coerce").to_numpy(dtype=float)[keep]
+    else:
+        regions = np.full(len(prices), np.nan)
+    if "LETTING_DATE" in frame.columns:
+        letting = pd.to_datetime(frame["LETTING_DATE"], errors="coerce").to_numpy(dtype="datetime64[ns]")[keep]
+    else:
+        letting = np.full(len(prices), np.datetime64("NaT"), dtype="datetime64[ns]")
+    region_key = np.where(np.isnan(regions), -np.inf, regions)
+    date_key = letting.view("i8")
+
+    order = np.lexsort((prices, date_key, region_key, item_ids))
+    prices, item_ids, regions = prices[order], item_ids[order], regions[order]
+    region_key, date_key, letting = region_key[order], date_key[order], letting[order]
+    new_cell = np.r_[
+        True,
+        (item_ids[1:] != item_ids[:-1]) | (region_key[1:] != region_key[:-1]) | (date_key[1:] != date_key[:-1]),
+    ]
+    starts = np.flatnonzero(new_cell)
+    rows = np.diff(np.r_[starts, len(prices)])
+
+    lengths = np.minimum(rows, k)
+    offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+    values = np.empty(int(lengths.sum()))
+    weights = np.ones(len(values), dtype=np.int64)
+    exact = rows <= k
+    values[_ranges(offsets[exact], rows[exact])] = prices[_ranges(starts[exact], rows[exact])]
+    for start, n, out in zip(starts[~exact], rows[~exact], offsets[~exact]):
+        edges = np.linspace(0, n, k + 1).round().astype(np.int64)
+        values[out:out + k] = prices[start + (edges[:-1] + edges[1:] - 1) // 2]
+        weights[out:out + k] = np.diff(edges)
+
+    return CellSketches(
+        items=np.asarray(item_codes, dtype=str)[item_ids[starts]],
+        regions=regions[starts],
+        letting=letting[starts],
+        rows=rows.astype(np.int64),
+        total=np.add.reduceat(prices, starts),
+        total_sq=np.add.reduceat(prices * prices, starts),
+        lengths=lengths.astype(np.int64),
+        values=values,
+        weights=weights,
+        k=k,
+    )
+
+
+def weighted_quantile(values: np.ndarray, weights: np.ndarray, q: float) -> float:
+    """Linear quantile of ``values`` repeated ``weights`` times (as ``np.quantile``)."""
+    if not len(values):
+        return np.nan
+    order = np.argsort(values, kind="stable")
+    values, cum = values[order], np.cumsum(weights[order])
+    n = int(cum[-1])
+    virtual = q * (n - 1)
+    below = int(np.floor(virtual))
+    t = virtual - below
+    a, b = values[np.searchsorted(cum, [below, min(below + 1, n - 1)], side="right")]
+    if q == 0.5 and n % 2 == 0:
+        return float((a + b) / 2)  # np.median's midpoint
+    diff = b - a
+    return float(b - diff * (1 - t) if t >= 0.5 else a + diff * t)
+
+
+def _sketch_price(values: np.ndarray, weights: np.ndarray, mode: str) -> float:
+    if mode == "P40_P60":
+        return (weighted_quantile(values, weights, 0.40) + weighted_quantile(values, weights, 0.60)) / 2
+    return weighted_quantile(values, weights, 0.5)
+
+
+def _trim_bounds(
+    values: np.ndarray, weights: np.ndarray, n: int, total: float, total_sq: float, method: str
+) -> Optional[Tuple[float, float]]:
+    """``(lower, upper)`` kept by outlier rule ``method``, or None when nothing is trimmed.
+
+    Mirrors :func:`costest.kernels.segment_trim_mask` for the rows the
+    points stand for; ``total``/``total_sq`` are their exact moments.
+    """
+    if method == "NONE" or n < kernels.MIN_TRIM_SIZE:
+        return None
+    if method == "SIGMA":
+        center = total / n
+        spread = np.sqrt(max(total_sq / n - center * center, 0.0))
+        lower, upper = center - kernels.SIGMA_WIDTH * spread, center + kernels.SIGMA_WIDTH * spread
+    elif method == "MAD":
+        center = weighted_quantile(values, weights, 0.5)
+        spread = kernels.MAD_SCALE * weighted_quantile(np.abs(values - center), weights, 0.5)
+        lower, upper = center - kernels.MAD_WIDTH * spread, center + kernels.MAD_WIDTH * spread
+    else:
+        low_q, high_q = (0.25, 0.75) if method == "IQR" else kernels.PERCENTILE_BOUNDS
+        lower, upper = weighted_quantile(values, weights, low_q), weighted_quantile(values, weights, high_q)
+        spread = upper - lower
+        if method == "IQR":
+            lower, upper = lower - kernels.IQR_WIDTH * spread, upper + kernels.IQR_WIDTH * spread
+    if not spread > 0:
+        return None
+    return lower, upper
+
+
+class PriceSketches:
+    """Category prices answered from merged cell sketches.
+
+    :meth:`category_breakdown` mirrors
+    :func:`costest.price_logic.category_breakdown` (without a target quantity)
+    for the MEDIAN and P40_P60 modes and every outlier rule. Results carry
+    the error bound documented in this module.
+    """
+
+    def __init__(self, cells: CellSketches, store_version: Optional[int] = None):
+        order = np.argsort(cells.items, kind="stable")
+        self.cells = cells.take(order)
+        self.store_version = store_version
+        codes, starts = np.unique(self.cells.items, return_index=True)
+        bounds = np.r_[starts, len(self.cells)]
+        points = np.r_[self.cells.offsets, len(self.cells.values)]
+        # Cells and points of one item are contiguous after the sort.
+        self._items: Dict[str, Tuple[slice, slice]] = {
+            str(code): (
+                slice(int(bounds[i]), int(bounds[i + 1])),
+                slice(int(points[bounds[i]]), int(points[bounds[i + 1]])),
+            )
+            for i, code in enumerate(codes)
+        }
+        self._windows: Tuple[Optional[pd.Timestamp], Dict[str, np.ndarray]] = (None, {})
+
+    @property
+    def k(self) -> int:
+        return self.cells.k
+
+    def item_codes(self) -> List[str]:
+        return list(self._items)
+
+    def item_rows(self, item_code: str) -> int:
+        cells, _ = self._items.get(str(item_code), (slice(0, 0), slice(0, 0)))
+        return int(self.cells.rows[cells].sum())
+
+    def _window_masks(self, now: pd.Timestamp) -> Dict[str, np.ndarray]:
+        """Each category's date window over every cell, cached for the last ``now``."""
+        cached_now, masks = self._windows
+        if cached_now != now:
+            masks = {
+                name: _window_mask(self.cells.letting, min_months, max_months, now)
+                for name, _, min_months, max_months in CATEGORY_DEFS
+            }
+            self._windows = (now, masks)
+        return masks
+
+    def regions(self) -> List[int]:
+        """Regions with at least one sketched row."""
+        known = self.cells.regions[~np.isnan(self.cells.regions)]
+        return [int(region) for region in np.unique(known)]
+
+    def category_breakdown(
+        self,
+        item_code: str,
+        project_region: Optional[int] = None,
+        mode: str = "MEDIAN",
+        min_sample_target: Optional[int] = None,
+        now: Optional[pd.Timestamp] = None,
+        trim: str = kernels.DEFAULT_TRIM,
+    ) -> Tuple[float, str, Dict[str, float]]:
+        """``(price, source, cat_data)`` for ``item_code`` from its sketches."""
+        price, source, results, _, _ = self.breakdown_points(
+            item_code, project_region, mode, min_sample_target, now, trim
+        )
+        return price, source, results
+
+    def breakdown_points(
+        self,
+        item_code: str,
+        project_region: Optional[int] = None,
+        mode: str = "MEDIAN",
+        min_sample_target: Optional[int] = None,
+        now: Optional[pd.Timestamp] = None,
+        trim: str = kernels.DEFAULT_TRIM,
+    ) -> Tuple[float, str, Dict[str, float], np.ndarray, np.ndarray]:
+        """:meth:`category_breakdown` plus the used points and their weights."""
+        if mode not in SKETCH_MODES:
+            raise ValueError(f"Sketches answer {', '.join(SKETCH_MODES)} pricing; use exact pricing for {mode}")
+        trim = trim.upper()
+        if trim not in kernels.TRIM_METHODS:
+            raise ValueError(f"Unknown trim method {trim!r}; expected one of {', '.join(kernels.TRIM_METHODS)}")
+        min_sample_target = MIN_SAMPLE_TARGET if min_sample_target is None else min_sample_target
+        now = pd.Timestamp.today() if now is None else now
+
+        cell_slice, point_slice = self._items.get(str(item_code), (slice(0, 0), slice(0, 0)))
+        rows, total, total_sq = (
+            self.cells.rows[cell_slice], self.cells.total[cell_slice], self.cells.total_sq[cell_slice]
+        )
+        values, weights = self.cells.values[point_slice], self.cells.weights[point_slice]
+        cell_of_point = np.repeat(np.arange(len(rows)), self.cells.lengths[cell_slice])
+        windows = self._window_masks(now)
+        regions = self.cells.regions[cell_slice]
+        in_region = regions == project_region if project_region is not None else np.zeros(len(rows), dtype=bool)
+
+        results: Dict[str, float] = {}
+        kept: Dict[str, np.ndarray] = {}
+        for name, scope, *_ in CATEGORY_DEFS:
+            covered = windows[name][cell_slice].copy()
+            if scope == "REGION":
+                covered &= in_region
+            mask = covered[cell_of_point]
+            bounds = _trim_bounds(
+                values[mask], weights[mask], int(rows[covered].sum()),
+                float(total[covered].sum()), float(total_sq[covered].sum()), trim,
+            )
+            if bounds is not None:
+                mask &= (values >= bounds[0]) & (values <= bounds[1])
+            kept[name] = mask
+            count = int(weights[mask].sum())
+            results[f"{name}_PRICE"] = _sketch_price(values[mask], weights[mask], mode) if count else np.nan
+            results[f"{name}_COUNT"] = count
+
+        used = np.zeros(len(values), dtype=bool)
+        source = "NO_DATA"
+        for name, *_ in CATEGORY_DEFS:
+            new = kept[name] & ~used
+            if not new.any():
+                continue
+            used |= new
+            source = name
+            if weights[used].sum() >= min_sample_target:
+                break
+        results["TOTAL_USED_COUNT"] = int(weights[used].sum())
+        price = _sketch_price(values[used], weights[used], mode) if used.any() else np.nan
+        return price, source, results, values[used], weights[used]
+
+
+__all__ = [
+    "CellSketches",
+    "DEFAULT_K",
+    "PriceSketches",
+    "SKETCH_MODES",
+    "build_cell_sketches",
+    "weighted_quantile",
+]
@@ -0,0 +1,215 @@
+"""SQLite copy of the sanitized BidTabs history with indexed lookups.
+
+:func:`write_sql_store` saves the history the run prices against (after
+``_normalize_columns``/``_sanitize_bidtabs``) to a single SQLite file that can
+also be queried ad hoc::
+
+    sqlite3 outputs/bidtabs.sqlite \\
+        "SELECT LETTING_DATE, UNIT_PRICE FROM bids WHERE ITEM_CODE = '401-10258'"
+
+:class:`SqlBidStore` wraps that file for the pricing code:
+:func:`costest.price_logic.category_breakdown` and
+:func:`costest.alternate_seek.find_alternate_price` accept it in place of the
+BidTabs DataFrame and push their item, look-back window, quantity, area and
+contract-size filters down as indexed queries rather than masking the full
+frame. Rows come back with the original frame index (``ROW_ID``) and column
+order, so downstream audit output is unchanged.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+TABLE = "bids"
+ROW_ID = "ROW_ID"
+INDEXES = {
+    "ix_bids_item_date": ("ITEM_CODE", "LETTING_DATE"),
+    "ix_bids_region_item": ("REGION", "ITEM_CODE"),
+    "ix_bids_area": ("GEOM_AREA_SQFT",),
+}
+_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _column_kind(series: pd.Series) -> str:
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float"
+    return "text"
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Cheap content fingerprint used to decide whether a store is stale."""
+    hashed = pd.util.hash_pandas_object(df, index=True)
+    return f"{len(df)}:{list(df.columns)}:{int(hashed.sum()) & 0xFFFFFFFFFFFFFFFF:x}"
+
+
+def _read_meta(conn: sqlite3.Connection) -> Dict[str, str]:
+    try:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    except sqlite3.OperationalError:
+        return {}
+
+
+def write_sql_store(df: pd.DataFrame, path: str | Path, fingerprint: Optional[str] = None) -> bool:
+    """Write ``df`` to the SQLite file at ``path`` unless it is already current.
+
+    Returns True when the file was (re)written.
+    """
+    path = Path(path)
+    fingerprint = fingerprint or frame_fingerprint(df)
+    if path.exists():
+        with sqlite3.connect(path) as conn:
+            if _read_meta(conn).get("fingerprint") == fingerprint:
+                return False
+        path.unlink()
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    kinds = {str(name): _column_kind(df[name]) for name in df.columns}
+    table = pd.DataFrame(index=df.index)
+    for name in df.columns:
+        kind = kinds[str(name)]
+        series = df[name]
+        if kind == "datetime":
+            table[str(name)] = series.dt.strftime(_DATE_FORMAT).where(series.notna(), None)
+        elif kind == "text":
+            table[str(name)] = series.astype(object).where(series.notna(), None)
+        else:
+            table[str(name)] = series
+    table.index = pd.Index(df.index, name=ROW_ID)
+
+    conn = sqlite3.connect(path)
+    try:
+        table.to_sql(TABLE, conn, index=True, chunksize=50_000)
+        for name, columns in INDEXES.items():
+            if all(col in kinds for col in columns):
+                conn.execute(f"CREATE INDEX {name} ON {TABLE} ({', '.join(columns)})")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE columns (position INTEGER, name TEXT, kind TEXT)")
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", [("fingerprint", fingerprint)])
+        conn.executemany(
+            "INSERT INTO columns VALUES (?, ?, ?)",
+            [(pos, name, kind) for pos, (name, kind) in enumerate(kinds.items())],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return True
+
+
+class SqlBidStore:
+    """Read-only, thread-safe view of a SQLite BidTabs store.
+
+    ``job_size_range`` restricts every query to contracts in that size band,
+    mirroring the run's contract-cost filter. Instances pickle to their path
+    and settings, so pricing workers open their own connections.
+    """
+
+    def __init__(self, path: str | Path, job_size_range: Optional[Tuple[float, float]] = None):
+        self.path = Path(path)
+        self.job_size_range = job_size_range
+        self._local = threading.local()
+        conn = self._conn()
+        rows = conn.execute("SELECT name, kind FROM columns ORDER BY position").fetchall()
+        self._kinds: Dict[str, str] = dict(rows)
+        self.columns: List[str] = [name for name, _ in rows]
+
+    def __getstate__(self) -> Dict[str, object]:
+        return {"path": self.path, "job_size_range": self.job_size_range}
+
+    def __setstate__(self, state: Dict[str, object]) -> None:
+        self.__init__(state["path"], state["job_size_range"])  # type: ignore[misc]
+
+    def with_job_size_range(self, job_size_range: Optional[Tuple[float, float]]) -> "SqlBidStore":
+        return SqlBidStore(self.path, job_size_range)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        where, params = self._where([], [])
+        return int(self._conn().execute(f"SELECT COUNT(*) FROM {TABLE}{where}", params).fetchone()[0])
+
+    def _where(self, clauses: List[str], params: List[object]) -> Tuple[str, List[object]]:
+        clauses = list(clauses)
+        params = list(params)
+        if self.job_size_range is not None and "JOB_SIZE" in self._kinds:
+            clauses.append("JOB_SIZE BETWEEN ? AND ?")
+            params.extend(self.job_size_range)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def query(self, clauses: Sequence[str] = (), params: Sequence[object] = ()) -> pd.DataFrame:
+        """Rows matching all ``clauses`` as a frame shaped like the source."""
+        where, args = self._where(list(clauses), list(params))
+        select = ", ".join([ROW_ID] + [f'"{name}"' for name in self.columns])
+        cursor = self._conn().execute(f"SELECT {select} FROM {TABLE}{where} ORDER BY {ROW_ID}", args)
+        records = cursor.fetchall()
+        frame = pd.DataFrame.from_records(records, columns=[ROW_ID] + self.columns)
+        frame = frame.set_index(ROW_ID)
+        frame.index.name = None
+        for name, kind in self._kinds.items():
+            if kind == "datetime":
+                frame[name] = pd.to_datetime(frame[name], format=_DATE_FORMAT, errors="coerce")
+            elif kind == "float":
+                frame[name] = pd.to_numeric(frame[name], errors="coerce").astype(float)
+            elif kind == "bool":
+                frame[name] = frame[name].astype(bool)
+        return frame
+
+    def item_pool(
+        self,
+        item_code: str,
+        since: Optional[pd.Timestamp] = None,
+        quantity_range: Optional[Tuple[float, float]] = None,
+        region: Optional[int] = None,
+    ) -> pd.DataFrame:
+        """Rows for one item, optionally limited to lettings on/after ``since``.
+
+        Rows without a letting date are always kept (the 12-month windows
+        include them). ``region`` uses the (REGION, ITEM_CODE) index.
+        """
+        clauses = ["ITEM_CODE = ?"]
+        params: List[object] = [str(item_code)]
+        if region is not None and "REGION" in self._kinds:
+            clauses.insert(0, "REGION = ?")
+            params.insert(0, int(region))
+        if since is not None and "LETTING_DATE" in self._kinds:
+            clauses.append("(LETTING_DATE >= ? OR LETTING_DATE IS NULL)")
+            params.append(pd.Timestamp(since).strftime(_DATE_FORMAT))
+        if quantity_range is not None and "QUANTITY" in self._kinds:
+            clauses.append("QUANTITY BETWEEN ? AND ?")
+            params.extend(quantity_range)
+        return self.query(clauses, params)
+
+    def alternate_candidates(
+        self,
+        prefix: str,
+        exclude_code: str,
+        area_range: Tuple[float, float],
+        shape: Optional[str] = None,
+    ) -> pd.DataFrame:
+        """Rows of other items sharing ``prefix`` whose area is within range."""
+        head = f"{prefix}-"
+        clauses = ["GEOM_AREA_SQFT BETWEEN ? AND ?", "substr(ITEM_CODE, 1, ?) = ?", "ITEM_CODE != ?"]
+        params: List[object] = [area_range[0], area_range[1], len(head), head, str(exclude_code)]
+        if shape:
+            clauses.append("GEOM_SHAPE = ?")
+            params.append(shape)
+        return self.query(clauses, params)
+
+
+__all__ = ["SqlBidStore", "frame_fingerprint", "write_sql_store"]
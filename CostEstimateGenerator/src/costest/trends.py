@@ -0,0 +1,198 @@
+"""Per-item price escalation trends.
+
+The pricing categories treat every bid inside a look-back window alike, so
+in inflationary periods 24-36 month old lettings pull estimates down.
+:func:`fit_trends` fits ``log(UNIT_PRICE) = a + b * years`` for every item
+code of the history in one pass: the least-squares sums of all items are
+accumulated with ``np.bincount`` and each slope ``b`` (the annual log
+growth) follows in closed form. Section slopes (the item-code prefix, e.g.
+``401``) pool the centred sums of their items, so differences in price level
+between the items of a section do not masquerade as a trend.
+
+An item's own slope is used when it has :data:`MIN_POINTS` dated prices
+spanning :data:`MIN_SPAN_YEARS`; otherwise its section's slope when that
+qualifies, and no escalation otherwise. Rates are capped at
+:data:`MAX_RATE` per year either way. :func:`escalate_prices` scales each
+historical price by ``exp(b * age)`` to the as-of date before any trimming
+or aggregation; undated rows are left as they are.
+"""
+
+from __future__ import annotations
+
+import pickle
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .alternate_seek import _item_prefix
+
+TRENDS_NAME = "price_trends.pkl"
+TRENDS_FORMAT = 1
+MIN_POINTS = 12
+MIN_SPAN_YEARS = 1.0
+MAX_RATE = 0.25
+DAYS_PER_YEAR = 365.25
+
+
+@dataclass
+class PriceTrends:
+    """Fitted slopes per item code and section, measured to ``as_of``.
+
+    ``items`` is indexed by ITEM_CODE with columns SECTION, POINTS,
+    SPAN_YEARS, ITEM_RATE, RATE (the annual rate applied) and BASIS (ITEM,
+    SECTION or NONE); ``sections`` is indexed by SECTION with POINTS,
+    SPAN_YEARS and RATE.
+    """
+
+    as_of: date
+    items: pd.DataFrame
+    sections: pd.DataFrame
+    key: Dict[str, object] = field(default_factory=dict)
+    format: int = TRENDS_FORMAT
+
+    def slopes(self, codes: Sequence[object]) -> np.ndarray:
+        """Annual log slope applied to each code (0.0 for unknown codes)."""
+        slope = np.log1p(self.items["RATE"].to_numpy(dtype=float))
+        lookup = pd.Series(slope, index=self.items.index)
+        return lookup.reindex(pd.Index(codes).astype(str)).fillna(0.0).to_numpy(dtype=float)
+
+    def factors(self, codes: Sequence[object], dates: Sequence[object]) -> np.ndarray:
+        """Escalation factor of each (code, letting date) to ``as_of``."""
+        age = _years_before(pd.to_datetime(pd.Series(dates), errors="coerce").to_numpy(), self.as_of)
+        return np.exp(self.slopes(codes) * np.nan_to_num(age, nan=0.0))
+
+
+def _years_before(dates: np.ndarray, as_of: date) -> np.ndarray:
+    """Years from each datetime64 to ``as_of`` (NaN for missing dates)."""
+    dates = dates.astype("datetime64[ns]")
+    delta = np.datetime64(pd.Timestamp(as_of).to_datetime64()) - dates
+    years = delta.astype("timedelta64[s]").astype(float) / (DAYS_PER_YEAR * 86400.0)
+    return np.where(np.isnat(dates), np.nan, years)
+
+
+def _centred_sums(group: np.ndarray, t: np.ndarray, y: np.ndarray, size: int) -> Dict[str, np.ndarray]:
+    n = np.bincount(group, minlength=size).astype(float)
+    st, sy = np.bincount(group, t, size), np.bincount(group, y, size)
+    stt, sty = np.bincount(group, t * t, size), np.bincount(group, t * y, size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxx = np.where(n > 0, stt - st * st / n, 0.0)
+        sxy = np.where(n > 0, sty - st * sy / n, 0.0)
+    tmin = np.full(size, np.inf)
+    tmax = np.full(size, -np.inf)
+    np.minimum.at(tmin, group, t)
+    np.maximum.at(tmax, group, t)
+    return {"n": n, "sxx": sxx, "sxy": sxy, "span": np.where(n > 0, tmax - tmin, 0.0)}
+
+
+def fit_trends(bid: pd.DataFrame, as_of: Optional[date] = None, key: Optional[Dict[str, object]] = None) -> PriceTrends:
+    """Fit every item's and section's price trend in one vectorized pass."""
+    as_of = date.today() if as_of is None else as_of
+    prices = pd.to_numeric(bid["UNIT_PRICE"], errors="coerce").to_numpy(dtype=float)
+    dates = pd.to_datetime(bid["LETTING_DATE"], errors="coerce").to_numpy()
+    codes = bid["ITEM_CODE"].astype(str).to_numpy()
+    usable = (prices > 0) & ~np.isnat(dates)
+
+    item_codes, group = np.unique(codes[usable], return_inverse=True)
+    t = -_years_before(dates[usable], as_of)
+    y = np.log(prices[usable])
+    items = _centred_sums(group, t, y, len(item_codes))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        item_slope = np.where(items["sxx"] > 0, items["sxy"] / items["sxx"], np.nan)
+
+    sections_of = np.array([_item_prefix(code) for code in item_codes], dtype=object)
+    section_names, section_group = np.unique(sections_of.astype(str), return_inverse=True)
+    size = len(section_names)
+    section_n = np.bincount(section_group, items["n"], size)
+    section_sxx = np.bincount(section_group, items["sxx"], size)
+    section_sxy = np.bincount(section_group, items["sxy"], size)
+    section_span = np.zeros(size)
+    np.maximum.at(section_span, section_group, items["span"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        section_slope = np.where(section_sxx > 0, section_sxy / section_sxx, np.nan)
+
+    cap = np.log1p(MAX_RATE)
+    section_ok = (section_n >= MIN_POINTS) & (section_span >= MIN_SPAN_YEARS) & np.isfinite(section_slope)
+    item_ok = (items["n"] >= MIN_POINTS) & (items["span"] >= MIN_SPAN_YEARS) & np.isfinite(item_slope)
+    fallback_ok = section_ok[section_group]
+    applied = np.where(item_ok, item_slope, np.where(fallback_ok, section_slope[section_group], 0.0))
+    applied = np.clip(applied, -cap, cap)
+
+    item_frame = pd.DataFrame(
+        {
+            "SECTION": section_names[section_group],
+            "POINTS": items["n"].astype(np.int64),
+            "SPAN_YEARS": items["span"],
+            "ITEM_RATE": np.expm1(item_slope),
+            "RATE": np.expm1(applied),
+            "BASIS": np.where(item_ok, "ITEM", np.where(fallback_ok, "SECTION", "NONE")),
+        },
+        index=pd.Index(item_codes, name="ITEM_CODE"),
+    )
+    section_frame = pd.DataFrame(
+        {
+            "POINTS": section_n.astype(np.int64),
+            "SPAN_YEARS": section_span,
+            "RATE": np.where(section_ok, np.expm1(np.clip(section_slope, -cap, cap)), np.nan),
+        },
+        index=pd.Index(section_names, name="SECTION"),
+    )
+    return PriceTrends(as_of=as_of, items=item_frame, sections=section_frame, key=dict(key or {}))
+
+
+def escalate_prices(bid: pd.DataFrame, trends: PriceTrends) -> pd.DataFrame:
+    """Copy of ``bid`` with every dated price escalated to ``trends.as_of``.
+
+    Adds an ``ESCALATION`` column with the factor applied to each row.
+    """
+    codes = bid["ITEM_CODE"]
+    if isinstance(codes.dtype, pd.CategoricalDtype):
+        # One lookup per category rather than per row.
+        slopes = trends.slopes(codes.cat.categories)
+        slope = np.where(codes.cat.codes.to_numpy() >= 0, slopes[codes.cat.codes.to_numpy()], 0.0)
+    else:
+        slope = trends.slopes(codes.astype(str))
+    age = _years_before(pd.to_datetime(bid["LETTING_DATE"], errors="coerce").to_numpy(), trends.as_of)
+    factor = np.exp(slope * np.nan_to_num(age, nan=0.0))
+    out = bid.copy()
+    prices = out["UNIT_PRICE"]
+    out["UNIT_PRICE"] = (prices.to_numpy(dtype=float) * factor).astype(prices.dtype)
+    out["ESCALATION"] = factor
+    return out
+
+
+def save_trends(path: str | Path, trends: PriceTrends) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        pickle.dump(trends, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def load_trends(path: str | Path, key: Dict[str, object]) -> Optional[PriceTrends]:
+    """The cached trends, or None when missing, unreadable or fitted to other data."""
+    try:
+        with open(path, "rb") as fh:
+            trends = pickle.load(fh)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(trends, PriceTrends) or trends.format != TRENDS_FORMAT or trends.key != key:
+        return None
+    return trends
+
+
+__all__ = [
+    "MAX_RATE",
+    "MIN_POINTS",
+    "MIN_SPAN_YEARS",
+    "TRENDS_NAME",
+    "PriceTrends",
+    "escalate_prices",
+    "fit_trends",
+    "load_trends",
+    "save_trends",
+]
@@ -0,0 +1,611 @@
+"""What-if pricing over cached per-item window statistics.
+
+Comparing project regions, sample targets, pricing modes, outlier rules or
+contract-size bounds used to take one full estimate run per variant. Those
+parameters only decide which of a line's history rows feed which pricing
+category. :func:`build_window_stats` therefore reads each quantities line's
+rows once: the unit price, weight, region and contract size of every row in
+one of the three look-back windows and the line's quantity band.
+:func:`evaluate` prices every line under every :class:`Scenario` from those
+arrays with the segment kernels, without touching the history again.
+
+A line priced from its own history gets the price an estimate run with the
+same settings computes. Lines with no rows under a scenario are priced from
+alternates in a run; here they take ``fallback_prices`` (``costest whatif``
+passes the last run's alternate prices) or contribute nothing.
+Contract-percent items are recomputed from each scenario's subtotal, as in a
+run.
+
+:func:`price_regions` prices every line for many project regions at once,
+for corridor projects and planning studies. Each row of the history belongs
+to one region, so the DIST_* categories of all regions partition the rows
+and are trimmed in one kernel call; the STATE_* categories are the same for
+every region and are trimmed once and shared. :func:`evaluate_regions` turns
+that into a line x region price matrix.
+"""
+
+from __future__ import annotations
+
+import itertools
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import kernels
+from .price_logic import CATEGORY_DEFS, _category_positions, _quantity_range
+from .pricing_rules import CONTRACT_PERCENT_ITEMS, contract_percent_amount, round_unit_price
+from .range_index import ItemRangeIndex
+
+STATS_NAME = "whatif_stats.pkl"
+STATS_FORMAT = 1
+
+# Run settings the cached statistics depend on (see costest.cli._run_settings).
+STATS_SETTINGS = (
+    "quantities",
+    "project_attributes",
+    "aliases",
+    "region_map",
+    "bid_store",
+    "bidtabs_dir",
+    "bidtabs_files",
+    "float_dtype",
+    "partition_pruning",
+    "as_of",
+    "escalate",
+)
+
+# Columns of the history the scenarios read.
+_COLUMNS = {"prices": "UNIT_PRICE", "weights": "WEIGHT", "regions": "REGION", "job_sizes": "JOB_SIZE"}
+
+# Look-back windows, and per category (in CATEGORY_DEFS order) its window and
+# whether it is limited to the project region.
+WINDOWS = [(lo, hi) for _, scope, lo, hi in CATEGORY_DEFS if scope == "STATE"]
+_CATEGORIES = [(scope == "REGION", WINDOWS.index((lo, hi))) for _, scope, lo, hi in CATEGORY_DEFS]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    """One set of pricing parameters."""
+
+    region: Optional[int]
+    min_sample_target: int
+    mode: str = kernels.DEFAULT_MODE
+    trim: str = kernels.DEFAULT_TRIM
+    job_size_range: Optional[Tuple[float, float]] = None
+
+    @property
+    def label(self) -> str:
+        region = "state" if self.region is None else self.region
+        if self.job_size_range is None:
+            bounds = "any"
+        else:
+            bounds = f"{self.job_size_range[0]:,.0f}-{self.job_size_range[1]:,.0f}"
+        return f"region={region} target={self.min_sample_target} mode={self.mode} trim={self.trim} job_size={bounds}"
+
+
+@dataclass
+class WindowStats:
+    """Every line's history rows, grouped by look-back window.
+
+    ``lengths`` holds three segment lengths per line (its 0-12, 12-24 and
+    24-36 month windows); the row arrays hold those segments in order, each
+    in history order. ``weights``, ``regions`` and ``job_sizes`` are None when
+    the history has no such column.
+    """
+
+    lines: List[Dict[str, object]]
+    lengths: np.ndarray
+    prices: np.ndarray
+    weights: Optional[np.ndarray]
+    regions: Optional[np.ndarray]
+    job_sizes: Optional[np.ndarray]
+    now: pd.Timestamp
+    key: Dict[str, object] = field(default_factory=dict)
+    format: int = STATS_FORMAT
+
+
+@dataclass
+class RegionBreakdown:
+    """Per region and line (arrays of shape ``(regions, lines)``) pricing detail.
+
+    ``prices``, ``counts`` and ``source`` are what :func:`price_scenario`
+    returns; ``category_prices``/``category_counts`` add a last axis with the
+    six categories in ``CATEGORY_DEFS`` order, and ``mean``/``std`` (sample
+    standard deviation) describe the rows behind each price.
+    """
+
+    prices: np.ndarray
+    counts: np.ndarray
+    source: np.ndarray
+    category_prices: np.ndarray
+    category_counts: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+
+
+@dataclass
+class RegionPricing:
+    """Unit prices of every line in every region.
+
+    ``matrix`` has one row per line and one ``REGION_<r>`` column per region
+    (``STATE`` for statewide-only pricing); ``items`` holds the same prices in
+    long form with data points and deciding category, and ``totals`` the
+    project total per region.
+    """
+
+    regions: List[Optional[int]]
+    matrix: pd.DataFrame
+    items: pd.DataFrame
+    totals: pd.DataFrame
+
+
+@dataclass
+class WhatIfResult:
+    """Project totals per scenario and per-line results in long form.
+
+    The first scenario is the baseline every ``DELTA`` is measured against.
+    """
+
+    scenarios: List[Scenario]
+    totals: pd.DataFrame
+    items: pd.DataFrame
+
+
+def _row_arrays(pool: pd.DataFrame, columns: Sequence[str]) -> Dict[str, Optional[np.ndarray]]:
+    """Float arrays of the columns scenarios read (None when absent)."""
+    arrays: Dict[str, Optional[np.ndarray]] = {}
+    for name, column in _COLUMNS.items():
+        if column in columns:
+            arrays[name] = pd.to_numeric(pool[column], errors="coerce").to_numpy(dtype=float)
+        elif name == "prices":
+            arrays[name] = np.full(len(pool), np.nan)
+        else:
+            arrays[name] = None
+    return arrays
+
+
+def build_window_stats(
+    source,
+    lines: Sequence[Dict[str, object]],
+    now: Optional[pd.Timestamp] = None,
+    key: Optional[Dict[str, object]] = None,
+) -> WindowStats:
+    """Read each line's window rows from ``source`` once.
+
+    ``source`` is anything pricing accepts: the history frame, an
+    :class:`~costest.range_index.ItemRangeIndex` or a SQLite store. It should
+    not be filtered by contract size; scenarios apply their own bounds.
+    """
+    now = pd.Timestamp.today() if now is None else now
+    columns = list(source.columns)
+    shared = _row_arrays(source.frame, columns) if isinstance(source, ItemRangeIndex) else None
+    pieces: Dict[str, List[np.ndarray]] = {name: [] for name in _COLUMNS}
+    lengths: List[int] = []
+    for line in lines:
+        pool, _, positions, _ = _category_positions(
+            source, str(line["ITEM_CODE"]), None, _quantity_range(float(line["QUANTITY"])), now=now
+        )
+        arrays = shared if shared is not None else _row_arrays(pool, columns)
+        for name, scope, _, _ in CATEGORY_DEFS:
+            if scope != "STATE":
+                continue
+            rows = positions[name]
+            lengths.append(len(rows))
+            for column, values in arrays.items():
+                if values is not None:
+                    pieces[column].append(values[rows])
+
+    flat = {
+        column: np.concatenate(pieces[column]) if pieces[column] else np.zeros(0, dtype=float)
+        for column in _COLUMNS
+    }
+    return WindowStats(
+        lines=[dict(line) for line in lines],
+        lengths=np.asarray(lengths, dtype=np.int64),
+        prices=flat["prices"],
+        weights=flat["weights"] if "WEIGHT" in columns else None,
+        regions=flat["regions"] if "REGION" in columns else None,
+        job_sizes=flat["job_sizes"] if "JOB_SIZE" in columns else None,
+        now=now,
+        key=dict(key or {}),
+    )
+
+
+def save_window_stats(path: str | Path, stats: WindowStats) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as fh:
+        pickle.dump(stats, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    tmp.replace(path)
+
+
+def load_window_stats(path: str | Path, key: Dict[str, object]) -> Optional[WindowStats]:
+    """The cached statistics, or None when missing, unreadable or built for other inputs."""
+    try:
+        with open(path, "rb") as fh:
+            stats = pickle.load(fh)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(stats, WindowStats) or stats.format != STATS_FORMAT or stats.key != key:
+        return None
+    return stats
+
+
+def scenario_grid(
+    base: Scenario,
+    regions: Optional[Sequence[Optional[int]]] = None,
+    min_sample_targets: Optional[Sequence[int]] = None,
+    modes: Optional[Sequence[str]] = None,
+    trims: Optional[Sequence[str]] = None,
+    job_size_ranges: Optional[Sequence[Optional[Tuple[float, float]]]] = None,
+) -> List[Scenario]:
+    """``base`` followed by every other combination of the given values.
+
+    A parameter left as None keeps the value of ``base``.
+    """
+    axes = [
+        [base.region] if regions is None else list(regions),
+        [base.min_sample_target] if min_sample_targets is None else list(min_sample_targets),
+        [base.mode] if modes is None else list(modes),
+        [base.trim] if trims is None else list(trims),
+        [base.job_size_range] if job_size_ranges is None else list(job_size_ranges),
+    ]
+    grid = [Scenario(*values) for values in itertools.product(*axes)]
+    return [base] + [scenario for scenario in dict.fromkeys(grid) if scenario != base]
+
+
+def price_scenario(stats: WindowStats, scenario: Scenario) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Price every line of ``stats`` under ``scenario``.
+
+    Returns the unrounded price (NaN without data), the number of rows used
+    and the index into ``CATEGORY_DEFS`` of the last category used (-1).
+    Categories are trimmed, then combined in order until the sample target
+    is met, exactly as :func:`costest.price_logic.category_breakdown` does.
+    """
+    n = len(stats.lines)
+    segment = np.repeat(np.arange(3 * n), stats.lengths)
+    line_of, window_of = segment // 3, segment % 3
+    usable = np.ones(len(segment), dtype=bool)
+    if scenario.job_size_range is not None and stats.job_sizes is not None:
+        low, high = scenario.job_size_range
+        usable &= (stats.job_sizes >= low) & (stats.job_sizes <= high)
+    if scenario.region is not None and stats.regions is not None:
+        in_region = usable & (stats.regions == scenario.region)
+    else:
+        in_region = np.zeros(len(segment), dtype=bool)
+
+    # Category c of line i is segment 6 * i + c; rows stay in history order.
+    rows, keys = [], []
+    for c, (regional, window) in enumerate(_CATEGORIES):
+        idx = np.flatnonzero((in_region if regional else usable) & (window_of == window))
+        rows.append(idx)
+        keys.append(6 * line_of[idx] + c)
+    rows, keys = np.concatenate(rows), np.concatenate(keys)
+    order = np.argsort(keys, kind="stable")
+    rows, keys = rows[order], keys[order]
+    keep = kernels.segment_trim_mask(stats.prices[rows], np.bincount(keys, minlength=6 * n), scenario.trim)
+    rows, keys = rows[keep], keys[keep]
+
+    taken = np.zeros(len(segment), dtype=bool)
+    done = np.zeros(n, dtype=bool)
+    counts = np.zeros(n, dtype=np.int64)
+    source = np.full(n, -1, dtype=np.int64)
+    combined_rows, combined_lines = [], []
+    category, line = keys % 6, keys // 6
+    for c in range(len(_CATEGORIES)):
+        sel = category == c
+        r, i = rows[sel], line[sel]
+        new = ~done[i] & ~taken[r]
+        r, i = r[new], i[new]
+        taken[r] = True
+        added = np.bincount(i, minlength=n)
+        counts += added
+        source[added > 0] = c
+        done |= (added > 0) & (counts >= scenario.min_sample_target)
+        combined_rows.append(r)
+        combined_lines.append(i)
+    combined = np.concatenate(combined_rows)[np.argsort(np.concatenate(combined_lines), kind="stable")]
+    weights = None if stats.weights is None else stats.weights[combined]
+    prices = kernels.segment_prices(stats.prices[combined], counts, weights, scenario.mode)
+    return prices, counts, source
+
+
+def available_regions(stats: WindowStats) -> List[int]:
+    """Regions with at least one row in the statistics."""
+    if stats.regions is None:
+        return []
+    regions = stats.regions[np.isfinite(stats.regions)]
+    return [int(region) for region in np.unique(regions) if region == int(region)]
+
+
+def price_regions(
+    stats: WindowStats,
+    regions: Sequence[Optional[int]],
+    min_sample_target: int,
+    mode: str = kernels.DEFAULT_MODE,
+    trim: str = kernels.DEFAULT_TRIM,
+    job_size_range: Optional[Tuple[float, float]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Price every line of ``stats`` for every region of ``regions`` in one pass.
+
+    Returns arrays of shape ``(len(regions), lines)`` with what
+    :func:`price_scenario` returns for each region (None prices statewide
+    only). See :func:`region_breakdown`.
+    """
+    batch = region_breakdown(stats, regions, min_sample_target, mode, trim, job_size_range)
+    return batch.prices, batch.counts, batch.source
+
+
+def region_breakdown(
+    stats: WindowStats,
+    regions: Sequence[Optional[int]],
+    min_sample_target: int,
+    mode: str = kernels.DEFAULT_MODE,
+    trim: str = kernels.DEFAULT_TRIM,
+    job_size_range: Optional[Tuple[float, float]] = None,
+) -> RegionBreakdown:
+    """Category and final prices of every line for every region in one pass.
+
+    DIST_* rows of every region are trimmed and priced in one kernel call,
+    STATE_* rows once for all regions, and the final prices of every line
+    and region in one more :func:`costest.kernels.segment_prices` call.
+    """
+    n, m = len(stats.lines), len(regions)
+    segment = np.repeat(np.arange(3 * n), stats.lengths)
+    line_of, window_of = segment // 3, segment % 3
+    usable = np.ones(len(segment), dtype=bool)
+    if job_size_range is not None and stats.job_sizes is not None:
+        low, high = job_size_range
+        usable &= (stats.job_sizes >= low) & (stats.job_sizes <= high)
+
+    # Index of each row's region in ``regions`` (-1 when not requested).
+    region_of = np.full(len(segment), -1, dtype=np.int64)
+    if stats.regions is not None:
+        for r, region in enumerate(regions):
+            if region is not None:
+                region_of[usable & (stats.regions == region)] = r
+
+    # DIST category c of line i in region r is segment 6 * (r * n + i) + c;
+    # STATE categories are keyed per line (6 * i + c) and trimmed once.
+    dist = np.flatnonzero(region_of >= 0)
+    dist_keys = 6 * (region_of[dist] * n + line_of[dist]) + window_of[dist]
+    order = np.argsort(dist_keys, kind="stable")
+    dist, dist_keys = dist[order], dist_keys[order]
+    keep = kernels.segment_trim_mask(stats.prices[dist], np.bincount(dist_keys, minlength=6 * m * n), trim)
+    dist, dist_keys = dist[keep], dist_keys[keep]
+
+    state = np.flatnonzero(usable)
+    state_keys = 6 * line_of[state] + 3 + window_of[state]
+    order = np.argsort(state_keys, kind="stable")
+    state, state_keys = state[order], state_keys[order]
+    keep = kernels.segment_trim_mask(stats.prices[state], np.bincount(state_keys, minlength=6 * n), trim)
+    state, state_keys = state[keep], state_keys[keep]
+
+    groups = m * n
+    taken = np.zeros(len(segment), dtype=bool)  # rows used by their own region's DIST categories
+    done = np.zeros(groups, dtype=bool)
+    counts = np.zeros(groups, dtype=np.int64)
+    source = np.full(groups, -1, dtype=np.int64)
+    combined_rows, combined_groups = [], []
+
+    def _add(r: np.ndarray, g: np.ndarray, c: int) -> None:
+        nonlocal done, counts
+        added = np.bincount(g, minlength=groups)
+        counts += added
+        source[added > 0] = c
+        done |= (added > 0) & (counts >= min_sample_target)
+        combined_rows.append(r)
+        combined_groups.append(g)
+
+    for c in range(3):
+        sel = dist_keys % 6 == c
+        r, g = dist[sel], dist_keys[sel] // 6
+        r, g = r[~done[g]], g[~done[g]]
+        taken[r] = True
+        _add(r, g, c)
+    for c in range(3, 6):
+        sel = state_keys % 6 == c
+        r, i = state[sel], state_keys[sel] // 6
+        g = (np.arange(m)[:, None] * n + i).ravel()
+        r = np.tile(r, m)
+        # Skip rows this region already took in its DIST categories.
+        new = ~done[g] & ~(taken[r] & (region_of[r] == g // n))
+        _add(r[new], g[new], c)
+
+    combined = np.concatenate(combined_rows)[np.argsort(np.concatenate(combined_groups), kind="stable")]
+    values = stats.prices[combined]
+    prices = kernels.segment_prices(values, counts, None if stats.weights is None else stats.weights[combined], mode)
+    mean = kernels.segment_mean(values, counts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.where(counts > 1, kernels.segment_std(values, counts, mean) * np.sqrt(counts / (counts - 1)), 0.0)
+
+    def _categories(rows: np.ndarray, keys: np.ndarray, segments: int) -> Tuple[np.ndarray, np.ndarray]:
+        lengths = np.bincount(keys, minlength=segments)
+        weights = None if stats.weights is None else stats.weights[rows]
+        return kernels.segment_prices(stats.prices[rows], lengths, weights, mode), lengths
+
+    category_prices = np.empty((m, n, 6))
+    category_counts = np.empty((m, n, 6), dtype=np.int64)
+    dist_prices, dist_counts = _categories(dist, dist_keys, 6 * m * n)
+    state_prices, state_counts = _categories(state, state_keys, 6 * n)
+    category_prices[..., :3] = dist_prices.reshape(m, n, 6)[..., :3]
+    category_counts[..., :3] = dist_counts.reshape(m, n, 6)[..., :3]
+    category_prices[..., 3:] = state_prices.reshape(n, 6)[:, 3:]
+    category_counts[..., 3:] = state_counts.reshape(n, 6)[:, 3:]
+    return RegionBreakdown(
+        prices=prices.reshape(m, n),
+        counts=counts.reshape(m, n),
+        source=source.reshape(m, n),
+        category_prices=category_prices,
+        category_counts=category_counts,
+        mean=mean.reshape(m, n),
+        std=std.reshape(m, n),
+    )
+
+
+def _finish_prices(
+    codes: Sequence[str],
+    quantities: Sequence[float],
+    prices: np.ndarray,
+    counts: np.ndarray,
+    source: np.ndarray,
+    fallback: Sequence[Optional[float]],
+) -> Tuple[List[float], List[str]]:
+    """Rounded unit prices and their sources, as a run would write them.
+
+    Lines without rows take their fallback price (or zero), and
+    contract-percent items are priced from the subtotal of the others.
+    """
+    names = [name for name, *_ in CATEGORY_DEFS]
+    unit_prices, sources = [], []
+    for i, (price, count) in enumerate(zip(prices, counts)):
+        if count:
+            unit_prices.append(round_unit_price(price))
+            sources.append(names[source[i]])
+        elif fallback[i] is not None:
+            unit_prices.append(float(fallback[i]))
+            sources.append("FALLBACK")
+        else:
+            unit_prices.append(0.0)
+            sources.append("NO_DATA")
+    for code, percent in CONTRACT_PERCENT_ITEMS.items():
+        if code not in codes:
+            continue
+        i = list(codes).index(code)
+        if quantities[i] <= 0:
+            continue
+        subtotal = 0.0
+        for other, (qty, unit) in enumerate(zip(quantities, unit_prices)):
+            if codes[other] not in CONTRACT_PERCENT_ITEMS:
+                subtotal += qty * unit
+        amount = contract_percent_amount(subtotal, percent)
+        unit_prices[i] = round(amount / quantities[i], 2)
+        sources[i] = "CONTRACT_PERCENT"
+    return unit_prices, sources
+
+
+def evaluate_regions(
+    stats: WindowStats,
+    regions: Sequence[Optional[int]],
+    min_sample_target: int,
+    mode: str = kernels.DEFAULT_MODE,
+    trim: str = kernels.DEFAULT_TRIM,
+    job_size_range: Optional[Tuple[float, float]] = None,
+    fallback_prices: Optional[Sequence[Optional[float]]] = None,
+) -> RegionPricing:
+    """Price every line in every region (see :func:`price_regions`)."""
+    codes = [str(line["ITEM_CODE"]) for line in stats.lines]
+    quantities = [float(line["QUANTITY"] or 0) for line in stats.lines]
+    fallback = list(fallback_prices) if fallback_prices is not None else [None] * len(codes)
+    prices, counts, source = price_regions(stats, regions, min_sample_target, mode, trim, job_size_range)
+
+    matrix = pd.DataFrame({
+        "LINE": range(len(codes)),
+        "ITEM_CODE": codes,
+        "DESCRIPTION": [line.get("DESCRIPTION") for line in stats.lines],
+        "UNIT": [line.get("UNIT") for line in stats.lines],
+        "QUANTITY": quantities,
+    })
+    items, totals = [], []
+    for r, region in enumerate(regions):
+        label = "STATE" if region is None else f"REGION_{region}"
+        unit_prices, sources = _finish_prices(codes, quantities, prices[r], counts[r], source[r], fallback)
+        matrix[label] = unit_prices
+        extensions = [qty * unit for qty, unit in zip(quantities, unit_prices)]
+        totals.append({
+            "REGION": region,
+            "PROJECT_TOTAL": sum(extensions),
+            "LINES_NO_DATA": sources.count("NO_DATA") + sources.count("FALLBACK"),
+        })
+        for i, code in enumerate(codes):
+            items.append({
+                "REGION": region,
+                "LINE": i,
+                "ITEM_CODE": code,
+                "UNIT_PRICE_EST": unit_prices[i],
+                "DATA_POINTS_USED": int(counts[r, i]),
+                "SOURCE": sources[i],
+                "EXTENSION": extensions[i],
+            })
+    return RegionPricing(
+        regions=list(regions), matrix=matrix, items=pd.DataFrame(items), totals=pd.DataFrame(totals)
+    )
+
+
+def evaluate(
+    stats: WindowStats,
+    scenarios: Sequence[Scenario],
+    fallback_prices: Optional[Sequence[Optional[float]]] = None,
+) -> WhatIfResult:
+    """Price every scenario and compare it with the first one.
+
+    ``fallback_prices`` holds, per line, the unit price to use when a
+    scenario finds no rows for it (None to leave the line at zero).
+    """
+    codes = [str(line["ITEM_CODE"]) for line in stats.lines]
+    quantities = [float(line["QUANTITY"] or 0) for line in stats.lines]
+    fallback = list(fallback_prices) if fallback_prices is not None else [None] * len(codes)
+
+    totals, items = [], []
+    baseline: Optional[List[float]] = None
+    for number, scenario in enumerate(scenarios):
+        prices, counts, source = price_scenario(stats, scenario)
+        unit_prices, sources = _finish_prices(codes, quantities, prices, counts, source, fallback)
+        extensions = [qty * unit for qty, unit in zip(quantities, unit_prices)]
+        if baseline is None:
+            baseline = extensions
+        total, base_total = sum(extensions), sum(baseline)
+        low, high = scenario.job_size_range or (np.nan, np.nan)
+        totals.append({
+            "SCENARIO": number,
+            "REGION": scenario.region,
+            "MIN_SAMPLE_TARGET": scenario.min_sample_target,
+            "PRICE_MODE": scenario.mode,
+            "PRICE_TRIM": scenario.trim,
+            "JOB_SIZE_MIN": low,
+            "JOB_SIZE_MAX": high,
+            "PROJECT_TOTAL": total,
+            "DELTA": total - base_total,
+            "DELTA_PCT": (total - base_total) / base_total * 100 if base_total else np.nan,
+            "LINES_CHANGED": sum(ext != base for ext, base in zip(extensions, baseline)),
+            "LINES_NO_DATA": sources.count("NO_DATA") + sources.count("FALLBACK"),
+        })
+        for i, code in enumerate(codes):
+            items.append({
+                "SCENARIO": number,
+                "LINE": i,
+                "ITEM_CODE": code,
+                "QUANTITY": quantities[i],
+                "UNIT_PRICE_EST": unit_prices[i],
+                "DATA_POINTS_USED": int(counts[i]),
+                "SOURCE": sources[i],
+                "EXTENSION": extensions[i],
+                "DELTA": extensions[i] - baseline[i],
+            })
+    return WhatIfResult(scenarios=list(scenarios), totals=pd.DataFrame(totals), items=pd.DataFrame(items))
+
+
+__all__ = [
+    "STATS_NAME",
+    "STATS_SETTINGS",
+    "RegionBreakdown",
+    "RegionPricing",
+    "Scenario",
+    "WhatIfResult",
+    "WindowStats",
+    "available_regions",
+    "build_window_stats",
+    "evaluate",
+    "evaluate_regions",
+    "load_window_stats",
+    "price_regions",
+    "price_scenario",
+    "region_breakdown",
+    "save_window_stats",
+    "scenario_grid",
+]
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from costest.bid_store import (
+    MONTH_NA,
+    SharedBidStore,
+    attach_bid_store,
+    compact_bidtabs,
+    compaction_report,
+    detach_bid_store,
+    restore_encoded_columns,
+)
+
+
+def test_shared_bid_store_round_trip_is_zero_copy():
+    df = pd.DataFrame(
+        {
+            "ITEM_CODE": ["401-00000", "401-01000", None, "401-00000"],
+            "UNIT_PRICE": [10.5, 12.0, 9.0, 11.0],
+            "REGION": [1, 2, 3, 1],
+            "LETTING_DATE": pd.to_datetime(["2024-01-10", None, "2023-05-01", "2024-02-14"]),
+        },
+        index=[3, 7, 8, 12],
+    )
+    with SharedBidStore.from_frame(df) as store:
+        attached = attach_bid_store(store.handle)
+        try:
+            assert attached.index.tolist() == [3, 7, 8, 12]
+            assert isinstance(attached["ITEM_CODE"].dtype, pd.CategoricalDtype)
+            assert store.handle.encoded_columns == ["ITEM_CODE"]
+            pd.testing.assert_frame_equal(restore_encoded_columns(attached, store.handle), df)
+
+            # A second attach views the same memory rather than copying it.
+            again = attach_bid_store(store.handle)
+            assert np.shares_memory(again["UNIT_PRICE"].to_numpy(), attached["UNIT_PRICE"].to_numpy())
+            del again
+        finally:
+            del attached
+            detach_bid_store()
+
+
+def test_compact_bidtabs_prunes_columns_and_shrinks_dtypes():
+    df = pd.DataFrame(
+        {
+            "ITEM_CODE": ["401-00000", "401-01000", "401-00000"],
+            "UNIT_PRICE": ["10.5", "12", "bad"],
+            "QUANTITY": [100, 200, 300],
+            "LETTING_DATE": pd.to_datetime(["1970-02-15", None, "2024-05-09"]),
+            "BIDDER": ["A", "B", "A"],
+            "REGION": [1, 2, 1],
+            "BIDDER2NAME": ["X", "Y", "Z"],
+        }
+    )
+
+    compact = compact_bidtabs(df)
+
+    assert "BIDDER2NAME" not in compact.columns
+    assert isinstance(compact["ITEM_CODE"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["BIDDER"].dtype, pd.CategoricalDtype)
+    assert compact["UNIT_PRICE"].dtype == np.float64
+    assert compact["UNIT_PRICE"].isna().tolist() == [False, False, True]
+    assert compact["LETTING_MONTH"].tolist() == [1, MONTH_NA, 652]
+    assert compact["REGION"].tolist() == [1, 2, 1]
+    assert compact_bidtabs(df, float_dtype="float32")["QUANTITY"].dtype == np.float32
+
+    report = compaction_report(df, compact)
+    assert report["rows"] == 3
+    assert report["bytes_per_row_after"] < report["bytes_per_row_before"]
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+from costest import bidtabs_io
+from costest.bidtabs_cache import cached_frames, sidecar_path
+from costest.bidtabs_io import load_bidtabs_files, read_bidtabs_file
+
+
+def _write_workbook(path: Path, price: str) -> Path:
+    pd.DataFrame(
+        {"Pay Item": ["40101000"], "Unit Price": [price], "Bid Date": ["2024-05-09"], "Pos": ["1"]}
+    ).to_excel(path, index=False)
+    return path
+
+
+def test_excel_sidecar_is_reused_and_invalidated_by_content(tmp_path: Path, monkeypatch):
+    workbook = _write_workbook(tmp_path / "2024-05-09.xlsx", "50")
+    cache = tmp_path / "cache"
+    calls = []
+    real_read = bidtabs_io.read_bidtabs_excel
+
+    def counting_read(path, columns=bidtabs_io.INGEST_COLUMNS):
+        calls.append(Path(path).name)
+        return real_read(path, columns)
+
+    monkeypatch.setattr(bidtabs_io, "read_bidtabs_excel", counting_read)
+
+    (first,) = read_bidtabs_file(workbook, cache_dir=cache)
+    (second,) = read_bidtabs_file(workbook, cache_dir=cache)
+    assert calls == ["2024-05-09.xlsx"]  # the second read came from the sidecar
+    pd.testing.assert_frame_equal(first, second)
+    assert sidecar_path(cache, workbook, bidtabs_io.INGEST_COLUMNS).exists()
+
+    _write_workbook(workbook, "65")
+    (changed,) = read_bidtabs_file(workbook, cache_dir=cache)
+    assert changed["UNIT_PRICE"].tolist() == [65]
+    assert len(calls) == 2
+    assert len(list(cache.glob("2024-05-09.*.pkl"))) == 1  # superseded sidecar removed
+
+    history = load_bidtabs_files(tmp_path, cache_dir=cache)
+    assert len(calls) == 2
+    assert history["UNIT_PRICE"].tolist() == [65]
+
+
+def test_sidecars_of_sibling_workbooks_and_selections_coexist(tmp_path: Path):
+    cache = tmp_path / "cache"
+    xls = tmp_path / "2024-05-09.xls"
+    xlsx = tmp_path / "2024-05-09.xlsx"
+    xls.write_bytes(b"legacy export")
+    xlsx.write_bytes(b"modern export")
+    reads = []
+
+    def reader(name):
+        def read():
+            reads.append(name)
+            return [pd.DataFrame({"UNIT_PRICE": [1.0]})]
+        return read
+
+    for _ in range(2):
+        cached_frames(xls, cache, reader("xls"))
+        cached_frames(xlsx, cache, reader("xlsx"))
+        cached_frames(xlsx, cache, reader("xlsx-price"), columns=["UNIT_PRICE"])
+    assert reads == ["xls", "xlsx", "xlsx-price"]
+    assert len(list(cache.glob("*.pkl"))) == 3
+
+    xlsx.write_bytes(b"modern export, revised")
+    cached_frames(xlsx, cache, reader("xlsx"))
+    assert len(list(cache.glob("*.pkl"))) == 3  # only the superseded xlsx sidecar was replaced
+    assert sidecar_path(cache, xls).exists()
+    assert len(list(cache.glob("2024-05-09.xlsx.*.pkl"))) == 2
+
+
+def test_convert_bidtabs_command(tmp_path: Path, capsys):
+    from costest import cli
+
+    _write_workbook(tmp_path / "2024-05-09.xlsx", "50")
+    cache = tmp_path / "cache"
+    assert cli.main(["convert-bidtabs", str(tmp_path), "--cache-dir", str(cache)]) == 0
+    assert "1 workbook(s) converted" in capsys.readouterr().out
+    assert cli.main(["convert-bidtabs", str(tmp_path), "--cache-dir", str(cache)]) == 0
+    out = capsys.readouterr().out
+    assert "up to date" in out and "0 workbook(s) converted" in out
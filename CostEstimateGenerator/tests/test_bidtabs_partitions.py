@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest.bidtabs_io import load_bidtabs_files, partition_date_range
+
+
+def _write_bidtab(path: Path, letting: str) -> None:
+    pd.DataFrame(
+        {
+            "Pay Item": ["40101000"],
+            "Unit Price": ["50"],
+            "Quantity": ["10"],
+            "Bid Date": [letting],
+        }
+    ).to_csv(path, index=False)
+
+
+def test_partitions_outside_window_are_skipped(tmp_path: Path):
+    _write_bidtab(tmp_path / "2020-01-15.csv", "2020-01-15")
+    _write_bidtab(tmp_path / "2023-06-01.csv", "2023-06-01")
+    _write_bidtab(tmp_path / "legacy_export.csv", "2019-03-01")
+    _write_bidtab(tmp_path / "statewide_2019.csv", "2019-05-01")
+    (tmp_path / "partitions.json").write_text(
+        json.dumps({"partitions": {"statewide_2019.csv": {"start": "2019-01-01", "end": "2019-12-31"}}})
+    )
+
+    df = load_bidtabs_files(tmp_path, as_of=date(2024, 1, 1), max_months=36)
+
+    assert df.attrs["skipped_partitions"] == ["2020-01-15.csv", "statewide_2019.csv"]
+    # Undated files without a manifest entry are always loaded.
+    assert sorted(df["LETTING_DATE"]) == ["2019-03-01", "2023-06-01"]
+
+    everything = load_bidtabs_files(tmp_path)
+    assert len(everything) == 4
+    assert everything.attrs["skipped_partitions"] == []
+
+
+def test_partition_date_range_from_file_name():
+    assert partition_date_range("2024-05-09.xls") == (date(2024, 5, 9), date(2024, 5, 9))
+    assert partition_date_range("2024-13-40.xls") is None
+    assert partition_date_range("bidtabs.xls") is None
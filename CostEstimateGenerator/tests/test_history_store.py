@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest import cli
+from costest.history_store import ingest_file, load_history_store, read_manifest
+
+
+def _write_bidtab(path: Path, rows: list[tuple[str, str, str]]) -> Path:
+    pd.DataFrame(
+        {
+            "Pay Item": [code for code, _, _ in rows],
+            "Unit Price": [price for _, price, _ in rows],
+            "Quantity": ["10"] * len(rows),
+            "Bid Date": [letting for _, _, letting in rows],
+            "Bidder Name": ["ACME"] * len(rows),
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+def test_ingest_appends_deduplicates_and_versions(tmp_path: Path):
+    store = tmp_path / "store"
+    first = _write_bidtab(
+        tmp_path / "2024-05-09.csv",
+        [("40101000", "50", "2024-05-09"), ("40101000", "50", "2024-05-09"), ("40102000", "60", "2024-05-09")],
+    )
+    second = _write_bidtab(
+        tmp_path / "2024-06-12.csv",
+        [("40101000", "50", "2024-05-09"), ("40101000", "55", "2024-06-12")],
+    )
+
+    result = ingest_file(store, first)
+    assert (result.rows_read, result.rows_added, result.version) == (3, 2, 1)
+
+    result = ingest_file(store, second)
+    assert (result.rows_added, result.duplicates, result.version) == (1, 1, 2)
+    assert result.partitions == ["2024-06-12"]
+
+    # Re-ingesting changes nothing, including the version.
+    assert ingest_file(store, second).version == 2
+
+    manifest = read_manifest(store)
+    assert sorted(manifest["partitions"]) == ["2024-05-09", "2024-06-12"]
+    assert all(len(entry["sha256"]) == 64 for entry in manifest["partitions"].values())
+
+    history = load_history_store(store)
+    assert len(history) == 3
+    assert history.attrs["store_version"] == 2
+
+    pruned = load_history_store(store, as_of=date(2027, 6, 1), max_months=36)
+    assert pruned.attrs["skipped_partitions"] == ["2024-05-09"]
+    assert len(pruned) == 1
+
+
+def test_corrupted_partition_is_rejected(tmp_path: Path):
+    store = tmp_path / "store"
+    ingest_file(store, _write_bidtab(tmp_path / "a.csv", [("40101000", "50", "2024-05-09")]))
+    manifest = read_manifest(store)
+    entry = manifest["partitions"]["2024-05-09"]
+    entry["sha256"] = "0" * 64
+    (store / "manifest.json").write_text(json.dumps(manifest))
+
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        load_history_store(store)
+
+
+def test_cli_ingest_subcommand(tmp_path: Path, capsys):
+    source = _write_bidtab(tmp_path / "2024-05-09.csv", [("40101000", "50", "2024-05-09")])
+
+    assert cli.main(["ingest", str(source), "--store", str(tmp_path / "store")]) == 0
+
+    assert "1 added" in capsys.readouterr().out
+    assert read_manifest(tmp_path / "store")["version"] == 1
+
+
+def test_csv_ingest_streams_chunks_and_drops_unusable_rows(tmp_path: Path, monkeypatch):
+    from costest import history_store
+
+    rows = [
+        ("40101000", "50", "2024-05-09"),
+        ("40101000", "0", "2024-05-09"),  # non-positive price
+        ("40102000", "", "2024-05-09"),  # missing price
+        ("40103000", "70", "2019-01-15"),  # before the cutoff
+        ("40104000", "80", ""),  # undated rows are kept
+        ("40101000", "50", "2024-05-09"),  # duplicate in a later chunk
+        ("40105000", "90", "2024-06-12"),
+    ]
+    source = _write_bidtab(tmp_path / "statewide.csv", rows)
+    chunk_sizes = []
+    real_iter = history_store.iter_bidtabs_csv
+
+    def spy(path, chunksize):
+        for chunk in real_iter(path, chunksize=chunksize):
+            chunk_sizes.append(len(chunk))
+            yield chunk
+
+    monkeypatch.setattr(history_store, "iter_bidtabs_csv", spy)
+    result = ingest_file(tmp_path / "store", source, chunksize=2, cutoff=date(2023, 1, 1))
+
+    assert chunk_sizes == [2, 2, 2, 1]
+    assert (result.rows_read, result.rows_dropped, result.rows_added, result.duplicates) == (7, 3, 3, 1)
+    assert result.version == 1  # one bump for the whole file
+    history = load_history_store(tmp_path / "store")
+    assert sorted(history["ITEM_CODE"]) == ["401-01000", "401-04000", "401-05000"]
+    assert history["UNIT_PRICE"].dtype == float
+
+
+def test_chunked_ingest_writes_each_partition_once_per_flush(tmp_path: Path, monkeypatch):
+    from collections import Counter
+
+    from costest import history_store
+
+    rows = [(f"4010{i:04d}", str(50 + i), "2024-05-09" if i % 4 else "2024-06-12") for i in range(40)]
+    source = _write_bidtab(tmp_path / "statewide.csv", rows)
+    writes = Counter()
+    real_write = history_store._write_sketches
+
+    def spy(store_dir, key, partition):
+        writes[key] += 1
+        return real_write(store_dir, key, partition)
+
+    monkeypatch.setattr(history_store, "_write_sketches", spy)
+    result = ingest_file(tmp_path / "chunked", source, chunksize=3)
+    assert writes == {"2024-05-09": 1, "2024-06-12": 1}
+    assert (result.rows_added, result.version) == (40, 1)
+
+    writes.clear()
+    monkeypatch.setattr(history_store, "FLUSH_ROWS", 12)
+    bounded = ingest_file(tmp_path / "bounded", source, chunksize=3)
+    assert bounded.version == 1 and sum(writes.values()) <= 8
+
+    whole = ingest_file(tmp_path / "whole", source)
+    for store in ("chunked", "bounded"):
+        pd.testing.assert_frame_equal(
+            load_history_store(tmp_path / store).sort_values("ITEM_CODE").reset_index(drop=True),
+            load_history_store(tmp_path / "whole").sort_values("ITEM_CODE").reset_index(drop=True),
+        )
+    assert whole.rows_added == 40
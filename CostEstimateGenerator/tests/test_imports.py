@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[1] / "src"
+HEAVY_MODULES = ["pandas", "openpyxl", "openai", "reportlab", "PyPDF2", "dotenv"]
+
+
+def _modules_after(code: str) -> set[str]:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH", "")]))
+    script = code + "\nimport json, sys\nprint(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+    return set(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+
+def test_cli_import_has_no_heavy_dependencies():
+    loaded = _modules_after("import costest.cli, costest.config")
+    assert [name for name in HEAVY_MODULES if name in loaded] == []
+
+
+def test_cli_help_does_not_load_pandas():
+    loaded = _modules_after(
+        "import contextlib, io\n"
+        "import costest.cli\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    try:\n"
+        "        costest.cli.main(['--help'])\n"
+        "    except SystemExit:\n"
+        "        pass\n"
+    )
+    assert "pandas" not in loaded
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest.bidtabs_io import load_bidtabs_files
+from costest.history_store import ingest_file
+from costest.ingest_report import IngestReport
+
+
+def _write_bidtab(path: Path, rows) -> Path:
+    pd.DataFrame(rows, columns=["Pay Item", "Unit Price", "Quantity", "Bid Date"]).to_csv(path, index=False)
+    return path
+
+
+def test_load_bidtabs_files_quarantines_rows_with_reasons(tmp_path: Path):
+    _write_bidtab(
+        tmp_path / "2024-05-09.csv",
+        [
+            ("40101000", "50", "10", "2024-05-09"),
+            ("", "60", "10", "2024-05-09"),  # blank item code
+            ("40102000", "N/A", "10", "2024-05-09"),  # non-numeric price
+            ("40103000", "0", "ten", "2024-05-09"),  # non-positive price
+            ("40104000", "70", "ten", "someday"),  # kept; coercion failures only
+        ],
+    )
+    _write_bidtab(
+        tmp_path / "2024-06-12.csv",
+        [
+            ("40105000", "80", "5", "2024-06-12"),
+            ("40105000", "80.0", "5", "2024-06-12"),  # duplicate bid row
+        ],
+    )
+
+    df = load_bidtabs_files(tmp_path)
+    report = df.attrs["ingest_report"]
+
+    assert sorted(df["ITEM_CODE"]) == ["401-01000", "401-04000", "401-05000"]
+    assert df.index.is_unique
+    first, second = sorted(report.files, key=lambda f: f.source)
+    assert (first.rows_read, first.rows_kept, first.rows_quarantined) == (5, 2, 3)
+    assert first.quarantined == {"missing_item_code": 1, "non_numeric_price": 1, "non_positive_price": 1}
+    assert first.coercion_failures == {"QUANTITY": 2, "LETTING_DATE": 1}
+    assert second.quarantined == {"duplicate": 1}
+    assert first.bytes == (tmp_path / "2024-05-09.csv").stat().st_size
+    assert first.parse_seconds > 0
+
+    paths = report.write(tmp_path / "out")
+    payload = json.loads(paths["json"].read_text())
+    assert payload["totals"] == {"files": 2, "rows_read": 7, "rows_quarantined": 4}
+    table = pd.read_csv(paths["csv"])
+    assert set(table["source"]) == {"2024-05-09.csv", "2024-06-12.csv"}
+    quarantine = pd.read_csv(paths["quarantine"], dtype=str, keep_default_na=False)
+    assert sorted(quarantine["QUARANTINE_REASON"]) == [
+        "duplicate",
+        "missing_item_code",
+        "non_numeric_price",
+        "non_positive_price",
+    ]
+    # The offending raw value is preserved in the side file.
+    assert "N/A" in quarantine["UNIT_PRICE"].tolist()
+
+
+def test_ingest_file_reports_quarantine_and_store_duplicates(tmp_path: Path):
+    source = _write_bidtab(
+        tmp_path / "statewide.csv",
+        [
+            ("40101000", "50", "10", "2024-05-09"),
+            ("40102000", "", "10", "2024-05-09"),
+            ("40103000", "70", "10", "2019-01-15"),
+        ],
+    )
+    report = IngestReport()
+    ingest_file(tmp_path / "store", source, cutoff=date(2023, 1, 1), report=report)
+    ingest_file(tmp_path / "store", source, cutoff=date(2023, 1, 1), report=report)
+
+    first, again = report.files
+    assert (first.rows_read, first.rows_kept, first.duplicates) == (3, 1, 0)
+    assert first.quarantined == {"non_positive_price": 1, "outside_window": 1}
+    assert (again.rows_kept, again.duplicates) == (0, 1)
+    assert len(report.quarantine) == 2
+    assert "statewide.csv" in report.summary()
+
+
+def test_ingest_file_times_the_excel_read(tmp_path: Path, monkeypatch):
+    from costest import history_store
+
+    source = tmp_path / "2024-05-09.xlsx"
+    pd.DataFrame(
+        [("40101000", 50, 10, "2024-05-09"), ("40102000", 60, 5, "2024-05-09")],
+        columns=["Pay Item", "Unit Price", "Quantity", "Bid Date"],
+    ).to_excel(source, index=False)
+    real_read = history_store.read_bidtabs_file
+
+    def slow_read(path):
+        time.sleep(0.05)
+        return real_read(path)
+
+    monkeypatch.setattr(history_store, "read_bidtabs_file", slow_read)
+    report = IngestReport()
+    ingest_file(tmp_path / "store", source, report=report)
+
+    (entry,) = report.files
+    assert (entry.rows_read, entry.rows_kept) == (2, 2)
+    assert entry.parse_seconds >= 0.05
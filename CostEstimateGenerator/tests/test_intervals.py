@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from costest.intervals import estimate_intervals
+from costest.pricing_rules import contract_percent_amount, round_unit_price
+
+
+def _detail(prices):
+    return pd.DataFrame({"UNIT_PRICE": prices, "WEIGHT": np.nan})
+
+
+def _rows():
+    rng = np.random.default_rng(1)
+    wide, tight = rng.normal(100.0, 20.0, 60), rng.normal(50.0, 1.0, 60)
+    rows = [
+        {"ITEM_CODE": "A", "QUANTITY": 10.0, "UNIT_PRICE_EST": round_unit_price(wide.mean()), "DATA_POINTS_USED": 60},
+        {"ITEM_CODE": "B", "QUANTITY": 10.0, "UNIT_PRICE_EST": round_unit_price(tight.mean()), "DATA_POINTS_USED": 60},
+        {"ITEM_CODE": "C", "QUANTITY": 2.0, "UNIT_PRICE_EST": 75.0, "DATA_POINTS_USED": 9, "ALTERNATE_USED": True},
+        {"ITEM_CODE": "MOB", "QUANTITY": 1.0, "UNIT_PRICE_EST": 1000.0, "DATA_POINTS_USED": 0},
+    ]
+    details = [_detail(wide), _detail(tight), _detail([70.0, 80.0]), None]
+    return rows, details
+
+
+def test_intervals_bracket_estimates_and_scale_with_spread():
+    rows, details = _rows()
+    got = estimate_intervals(rows, details, mode="MEAN", samples=400)
+    low, high = np.array(got.low), np.array(got.high)
+    assert (low[:2] <= [r["UNIT_PRICE_EST"] for r in rows[:2]]).all()
+    assert (high[:2] >= [r["UNIT_PRICE_EST"] for r in rows[:2]]).all()
+    assert low[0] < rows[0]["UNIT_PRICE_EST"] < high[0]
+    assert high[0] - low[0] > 5 * (high[1] - low[1])
+    # Alternates and lines without history keep their estimate only.
+    assert np.isnan(low[2:]).all() and np.isnan(high[2:]).all()
+    total = sum(r["QUANTITY"] * r["UNIT_PRICE_EST"] for r in rows)
+    assert got.total_low < total < got.total_high
+
+    again = estimate_intervals(rows, details, mode="MEAN", samples=400)
+    assert again.low[:2] == got.low[:2] and again.total_high == got.total_high
+
+
+def test_percent_items_follow_the_subtotal():
+    rows, details = _rows()
+    rows[0]["QUANTITY"] = rows[1]["QUANTITY"] = 1000.0
+    subtotal = sum(r["QUANTITY"] * r["UNIT_PRICE_EST"] for r in rows[:3])
+    rows[3]["UNIT_PRICE_EST"] = contract_percent_amount(subtotal, 0.5)
+    got = estimate_intervals(rows, details, mode="MEAN", samples=400, percent_items={"MOB": 0.5})
+    plain = estimate_intervals(rows, details, mode="MEAN", samples=400)
+    plain_subtotal_low = plain.total_low - rows[3]["UNIT_PRICE_EST"]
+    assert got.low[3] == pytest.approx(np.floor(0.5 * plain_subtotal_low / 1000) * 1000, abs=1000)
+    assert got.low[3] % 1000 == 0
+    assert got.total_high - got.total_low > plain.total_high - plain.total_low
+
+
+def test_replicates_round_like_the_run():
+    from costest.intervals import round_unit_prices
+
+    values = np.concatenate([np.random.default_rng(5).lognormal(2.0, 3.0, 500), [0.0, -3.0, 0.004, 0.995, 99.5]])
+    assert round_unit_prices(values).tolist() == [round_unit_price(v) for v in values]
+
+
+@pytest.mark.parametrize("mode", ["WGT_AVG", "MEAN", "MEDIAN", "P40_P60"])
+def test_run_estimates_fall_within_their_intervals(mode):
+    from costest import cli
+
+    rng = np.random.default_rng(11)
+    today = pd.Timestamp.today().normalize()
+    frames = []
+    # Skewed prices and a spread of sample sizes, down to a handful of bids.
+    for i, n in enumerate([3, 4, 6, 9, 15, 40, 120]):
+        frames.append(pd.DataFrame({
+            "ITEM_CODE": f"401-0{i}000",
+            "DESCRIPTION": "HMA SURFACE",
+            "UNIT": "TON",
+            "QUANTITY": rng.lognormal(5.0, 1.0, n),
+            "UNIT_PRICE": rng.lognormal(3.5, 0.8, n),
+            "LETTING_DATE": today - pd.to_timedelta(rng.integers(0, 900, n), unit="D"),
+            "REGION": rng.integers(1, 4, n),
+            "BIDDER": "BIDDER",
+        }))
+    bid = pd.concat(frames, ignore_index=True)
+    context = cli.build_run_context(min_sample_target=50, price_mode=mode, disable_ai=True)
+    lines = [
+        {"ITEM_CODE": f"401-0{i}000", "DESCRIPTION": "HMA SURFACE", "UNIT": "TON", "QUANTITY": 150.0}
+        for i in range(len(frames))
+    ]
+    results = [cli._price_line(bid, line, 2, context) for line in lines]
+    rows = [result[0] for result in results]
+
+    got = estimate_intervals(rows, [result[1] for result in results], mode=mode, samples=300)
+    estimates = np.array([row["UNIT_PRICE_EST"] for row in rows])
+    low, high = np.array(got.low), np.array(got.high)
+    assert not np.isnan(low).any()
+    assert (low <= estimates).all() and (estimates <= high).all()
+    total = float(np.sum(estimates * 150.0))
+    assert got.total_low <= total <= got.total_high
+
+
+def test_contract_percent_rule_is_shared_by_scalars_and_replicates():
+    subtotals = np.array([0.0, 19_999.99, 20_000.0, 682_357.2, 1.5e7 + 0.1])
+    amounts = contract_percent_amount(subtotals, 0.05)
+    assert amounts.tolist() == [contract_percent_amount(float(x), 0.05) for x in subtotals]
+    assert amounts.tolist() == [0.0, 0.0, 1000.0, 34000.0, 750000.0]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from costest.bidtabs_io import _normalize_columns, normalize_item_code, normalize_item_codes
+
+
+def test_normalize_item_codes_matches_scalar_version():
+    values = [
+        "30608033",
+        " 306–08033 ",
+        "306-08033",
+        30608033,
+        "401-10258 (A)",
+        "ABC—123",
+        None,
+        np.nan,
+        "",
+        "30608033",
+    ]
+    series = pd.Series(values, index=range(10, 20), name="ITEM_CODE", dtype=object)
+    result = normalize_item_codes(series)
+
+    assert result.tolist() == [normalize_item_code(v) for v in values]
+    assert result.index.equals(series.index)
+    assert result.name == "ITEM_CODE"
+    assert result.tolist()[:4] == ["306-08033"] * 4
+    assert result.tolist()[6:8] == ["", "nan"]
+
+
+def test_normalize_item_codes_accepts_categoricals_and_lists():
+    codes = pd.Series(pd.Categorical(["30608033", "401-10258", "30608033"]))
+    assert normalize_item_codes(codes).tolist() == ["306-08033", "401-10258", "306-08033"]
+    assert normalize_item_codes(["71512345"]).tolist() == ["715-12345"]
+
+
+def test_normalize_columns_uses_vectorized_codes():
+    df = pd.DataFrame({"Item No": ["30608033", "306 08033"], "Unit Price": [1.0, 2.0]})
+    out = _normalize_columns(df)
+    assert out["ITEM_CODE"].tolist() == ["306-08033", "306-08033"]
+
+
+def test_normalize_columns_resolves_each_header_layout_once():
+    from costest.bidtabs_io import _resolve_headers
+
+    _resolve_headers.cache_clear()
+    df = pd.DataFrame({"Pay Item": ["30608033"], "Bid Date": ["2024-05-09"], "Unit Price": ["12.5"]})
+    for _ in range(3):
+        out = _normalize_columns(df)
+    assert list(out.columns) == ["ITEM_CODE", "LETTING_DATE", "UNIT_PRICE"]
+    info = _resolve_headers.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+    # The input frame is not modified.
+    assert list(df.columns) == ["Pay Item", "Bid Date", "Unit Price"]
+    assert df["Unit Price"].tolist() == ["12.5"]
+
+
+def test_read_bidtabs_file_parses_only_ingest_columns(tmp_path):
+    from costest.bidtabs_io import read_bidtabs_file
+
+    path = tmp_path / "2024-05-09.csv"
+    pd.DataFrame(
+        {
+            "Pay Item": ["30608033"],
+            "Unit Price": ["12.5"],
+            "Job Size": ["1000"],
+            "Bidder2Name": ["OTHER"],
+            "Pos": ["1"],
+        }
+    ).to_csv(path, index=False)
+
+    (frame,) = read_bidtabs_file(path)
+    assert list(frame.columns) == ["ITEM_CODE", "UNIT_PRICE", "JOB_SIZE"]
+    assert frame["UNIT_PRICE"].tolist() == [12.5]
+
+    (full,) = read_bidtabs_file(path, columns=None)
+    assert "BIDDER2NAME" in full.columns
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from costest import kernels
+from costest.price_logic import _aggregate_values
+
+
+def _batch(seed: int = 3):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(0, 9, size=300)
+    lengths[:4] = [0, 1, 2, 0]
+    values = rng.lognormal(3.0, 0.7, size=lengths.sum()).round(2)
+    values[::7] = values[0]  # ties
+    weights = rng.choice([1.0, 2.0, 5.0, np.nan], size=len(values))
+    return values, weights, lengths
+
+
+@pytest.mark.parametrize("mode", ["WGT_AVG", "MEAN", "MEDIAN", "P40_P60"])
+def test_segment_prices_match_per_sample_aggregation(mode):
+    values, weights, lengths = _batch()
+    weights[: lengths[:6].sum()] = np.nan  # leading segments without weights
+    got = kernels.segment_prices(values, lengths, weights, mode=mode)
+
+    for i, start in enumerate(kernels.segment_offsets(lengths)):
+        seg = slice(start, start + lengths[i])
+        if lengths[i] == 0:
+            assert np.isnan(got[i])
+        else:
+            assert got[i] == pytest.approx(_aggregate_values(values[seg], weights[seg], mode), rel=1e-12)
+
+
+def test_quantiles_and_medians_are_exact():
+    values, _, lengths = _batch(5)
+    ordered = kernels.sort_segments(values, lengths)
+    for q in (0.0, 0.1, 0.4, 0.5, 0.6, 1.0):
+        got = kernels.segment_quantile(ordered, lengths, q, presorted=True)
+        for i, start in enumerate(kernels.segment_offsets(lengths)):
+            if lengths[i]:
+                assert got[i] == np.quantile(values[start:start + lengths[i]], q)
+    median = kernels.segment_median(values, lengths)
+    for i, start in enumerate(kernels.segment_offsets(lengths)):
+        if lengths[i]:
+            assert median[i] == np.median(values[start:start + lengths[i]])
+
+
+def test_segment_moments_and_empty_batches():
+    values, _, lengths = _batch(9)
+    mean = kernels.segment_mean(values, lengths)
+    std = kernels.segment_std(values, lengths, mean)
+    for i, start in enumerate(kernels.segment_offsets(lengths)):
+        seg = values[start:start + lengths[i]]
+        if len(seg):
+            assert mean[i] == pytest.approx(seg.mean(), rel=1e-12)
+            assert std[i] == pytest.approx(seg.std(), rel=1e-9, abs=1e-12)
+    assert kernels.segment_sum(values, lengths)[0] == 0.0
+    assert kernels.segment_prices([], [0, 0], mode="P40_P60").shape == (2,)
+    assert kernels.segment_prices([], [], mode="MEDIAN").shape == (0,)
+
+
+def _reference_trim(seg, method):
+    if len(seg) < 3:
+        return np.ones(len(seg), dtype=bool)
+    if method == "SIGMA":
+        lower, upper = seg.mean() - 2 * seg.std(), seg.mean() + 2 * seg.std()
+    elif method == "MAD":
+        med = np.median(seg)
+        mad = 1.4826 * np.median(np.abs(seg - med))
+        lower, upper = med - 3 * mad, med + 3 * mad
+    elif method == "IQR":
+        q1, q3 = np.quantile(seg, [0.25, 0.75])
+        lower, upper = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+    else:
+        lower, upper = np.quantile(seg, [0.05, 0.95])
+    if not upper > lower:
+        return np.ones(len(seg), dtype=bool)
+    return (seg >= lower) & (seg <= upper)
+
+
+@pytest.mark.parametrize("method", ["SIGMA", "MAD", "IQR", "PERCENTILE"])
+def test_segment_trim_matches_per_segment_rules(method):
+    values, _, lengths = _batch(13)
+    values[5] = 1e6  # a gross outlier
+    keep = kernels.segment_trim_mask(values, lengths, method.lower())
+    for i, start in enumerate(kernels.segment_offsets(lengths)):
+        seg = slice(start, start + lengths[i])
+        assert keep[seg].tolist() == _reference_trim(values[seg], method).tolist(), i
+    assert kernels.segment_trim_mask(values, lengths, "NONE").all()
+    with pytest.raises(ValueError):
+        kernels.segment_trim_mask(values, lengths, "3SIGMA")
+
+
+def test_robust_trim_removes_outliers_sigma_keeps():
+    pd = pytest.importorskip("pandas")
+    from costest.price_logic import category_breakdown
+
+    today = pd.Timestamp.today().normalize()
+    bid = pd.DataFrame(
+        {
+            "ITEM_CODE": "401-10258",
+            "UNIT_PRICE": [10.0, 10.5, 11.0, 9.5, 10.2, 500.0, 480.0],
+            "QUANTITY": 10.0,
+            "REGION": 1.0,
+            "LETTING_DATE": today - pd.Timedelta(days=30),
+        }
+    )
+    sigma = category_breakdown(bid, "401-10258", 1, mode="MEAN")[2]
+    mad = category_breakdown(bid, "401-10258", 1, mode="MEAN", trim="MAD")[2]
+    assert sigma["DIST_12M_COUNT"] == 7  # two outliers inflate sigma enough to survive it
+    assert mad["DIST_12M_COUNT"] == 5 and mad["DIST_12M_PRICE"] == pytest.approx(10.24)
+
+
+def test_segment_bootstrap_is_seeded_and_block_independent(monkeypatch):
+    values, weights, lengths = _batch(17)
+    boot = kernels.segment_bootstrap(values, lengths, weights, "WGT_AVG", samples=50, seed=4)
+    assert boot.shape == (50, len(lengths))
+    assert np.isnan(boot[:, lengths == 0]).all()
+    one = lengths == 1
+    assert (boot[:, one] == values[kernels.segment_offsets(lengths)[one]]).all()
+
+    monkeypatch.setattr(kernels, "BOOTSTRAP_BLOCK", int(lengths.sum()) * 3)
+    again = kernels.segment_bootstrap(values, lengths, weights, "WGT_AVG", samples=50, seed=4)
+    np.testing.assert_array_equal(boot, again)
+    other = kernels.segment_bootstrap(values, lengths, weights, "WGT_AVG", samples=50, seed=5)
+    assert not np.array_equal(np.nan_to_num(boot), np.nan_to_num(other))
+
+
+@pytest.mark.parametrize("mode", ["WGT_AVG", "MEDIAN", "P40_P60"])
+def test_segment_bootstrap_prices_each_resample(mode):
+    values, weights, lengths = _batch(19)
+    weights[: lengths[:6].sum()] = np.nan
+    boot = kernels.segment_bootstrap(values, lengths, weights, mode, samples=20, seed=2)
+
+    # Replay the draws: positions into the segment-sorted values.
+    order = np.lexsort((values, kernels.segment_ids(lengths)))
+    values, weights = values[order], weights[order]
+    draws = np.random.default_rng(2).random((20, lengths.sum()))
+    for i, start in enumerate(kernels.segment_offsets(lengths)):
+        if not lengths[i]:
+            continue
+        for s in range(20):
+            picks = start + (draws[s, start:start + lengths[i]] * lengths[i]).astype(np.int64)
+            expected = _aggregate_values(values[picks], weights[picks], mode)
+            assert boot[s, i] == pytest.approx(expected, rel=1e-12)
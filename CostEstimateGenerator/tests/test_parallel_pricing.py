@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest import cli
+
+
+def _synthetic_bidtabs() -> pd.DataFrame:
+    today = pd.Timestamp.today().normalize()
+    rows = []
+    for idx in range(40):
+        rows.append(
+            {
+                "ITEM_CODE": f"401-0{idx % 4}000",
+                "DESCRIPTION": "HMA SURFACE",
+                "UNIT": "TON",
+                "QUANTITY": 100.0 + idx,
+                "UNIT_PRICE": 50.0 + idx,
+                "LETTING_DATE": today - pd.DateOffset(months=idx % 30),
+                "REGION": 1 + idx % 3,
+                "BIDDER": f"BIDDER {idx % 5}",
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def test_parallel_pricing_matches_serial():
+    bid = _synthetic_bidtabs()
+    lines = [
+        {"ITEM_CODE": f"401-0{i}000", "DESCRIPTION": "HMA SURFACE", "UNIT": "TON", "QUANTITY": 110.0}
+        for i in range(4)
+    ]
+    serial = [cli._price_line(bid, line, 2) for line in lines]
+    parallel = cli._price_lines_parallel(bid, lines, 2, workers=2)
+
+    assert len(parallel) == len(serial)
+    for (row_s, detail_s, _, _), (row_p, detail_p, _, _) in zip(serial, parallel):
+        assert row_p == pytest.approx(row_s, nan_ok=True)
+        if detail_s is None:
+            assert detail_p is None
+        else:
+            pd.testing.assert_frame_equal(detail_s, detail_p)
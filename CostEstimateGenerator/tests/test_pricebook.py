@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest.price_logic import category_breakdown
+from costest.pricebook import STATEWIDE, PriceBook, pricebook_frame, sketch_pricebook_frame, write_pricebook
+from costest.sketches import PriceSketches, build_cell_sketches
+from costest.stats import coefficient_of_variation, confidence_score, mean, std_dev
+
+TODAY = pd.Timestamp.today().normalize()
+
+
+def _history() -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    rows = []
+    for code, base in [("401-01000", 50.0), ("609-00010", 8.0), ("714-00001", 900.0)]:
+        for idx in range(90 if code != "714-00001" else 4):
+            rows.append(
+                {
+                    "ITEM_CODE": code,
+                    "DESCRIPTION": f"ITEM {code}",
+                    "UNIT_PRICE": base * (1 + rng.normal(0, 0.2)),
+                    "QUANTITY": float(rng.integers(20, 200)),
+                    "LETTING_DATE": TODAY - pd.DateOffset(days=int(rng.integers(0, 1150))),
+                    "REGION": 1 + idx % 3,
+                    "WEIGHT": float(rng.integers(1, 4)),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def test_pricebook_matches_category_breakdown_for_every_region(tmp_path: Path):
+    bid = _history()
+    path = write_pricebook(pricebook_frame(bid, min_sample_target=20), tmp_path / "book.sqlite", {"store_version": 4})
+    book = PriceBook(path)
+    assert book.regions == [STATEWIDE, 1, 2, 3]
+    assert book.store_version == 4
+
+    for code in bid["ITEM_CODE"].unique():
+        for region in (None, 1, 2, 3, 7):
+            price, source, data, _, _, rows = category_breakdown(
+                bid, code, project_region=region, include_details=True, min_sample_target=20
+            )
+            entry = book.lookup(code, region, extension_quantity=3)
+            assert entry.final_price == pytest.approx(price, rel=1e-12)
+            assert (entry.source, entry.data_points) == (source, data["TOTAL_USED_COUNT"])
+            assert entry.extension == pytest.approx(3 * price)
+            values = rows["UNIT_PRICE"].tolist()
+            expected = confidence_score(len(values), coefficient_of_variation(mean(values), std_dev(values)))
+            assert entry.confidence == pytest.approx(expected, rel=1e-9)
+            for name, count in entry.category_counts.items():
+                assert count == data[f"{name}_COUNT"]
+                if count:
+                    assert entry.category_prices[name] == pytest.approx(data[f"{name}_PRICE"], rel=1e-12)
+                else:
+                    assert entry.category_prices[name] is None
+    assert book.lookup("999-99999") is None
+    assert len(book.frame("401-01000")) == 4
+
+
+@pytest.mark.parametrize("mode,trim", [("MEDIAN", "SIGMA"), ("P40_P60", "IQR")])
+def test_sketch_pricebook_matches_rows(mode, trim):
+    bid = _history()
+    exact = pricebook_frame(bid, min_sample_target=20, mode=mode, trim=trim, now=TODAY)
+    sketched = sketch_pricebook_frame(
+        PriceSketches(build_cell_sketches(bid)), min_sample_target=20, mode=mode, trim=trim, now=TODAY
+    )
+    key = ["REGION", "ITEM_CODE"]
+    exact, sketched = exact.sort_values(key, ignore_index=True), sketched.sort_values(key, ignore_index=True)
+    pd.testing.assert_frame_equal(
+        sketched.drop(columns=["DESCRIPTION", "CONFIDENCE"]), exact.drop(columns=["DESCRIPTION", "CONFIDENCE"]),
+        check_dtype=False,
+    )
+    np.testing.assert_allclose(sketched["CONFIDENCE"], exact["CONFIDENCE"], rtol=1e-9)
+
+
+def test_pricebook_rejects_other_files(tmp_path: Path):
+    with pytest.raises(FileNotFoundError):
+        PriceBook(tmp_path / "missing.sqlite")
+    path = write_pricebook(pricebook_frame(_history()), tmp_path / "book.sqlite", {"format": 0})
+    with pytest.raises(ValueError):
+        PriceBook(path)
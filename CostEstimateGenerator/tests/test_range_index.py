@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from costest.alternate_seek import find_alternate_price
+from costest.bid_store import compact_bidtabs
+from costest.geometry import GeometryInfo
+from costest.price_logic import category_breakdown
+from costest.range_index import ItemRangeIndex
+
+
+def _history(rows: int = 600) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    today = pd.Timestamp.today().normalize()
+    dates = pd.Series(today - pd.to_timedelta(rng.integers(0, 40 * 31, size=rows), unit="D"))
+    # Lettings exactly on window boundaries and undated rows.
+    for i, months in enumerate([12, 24, 36, 0]):
+        dates.iloc[i] = today - pd.DateOffset(months=months)
+    dates.iloc[4:20] = pd.NaT
+    quantity = rng.choice([10.0, 50.0, 100.0, 150.0, 200.0, np.nan], size=rows)
+    price = rng.lognormal(3.0, 0.6, size=rows).round(2)
+    price[20:25] = np.nan
+    df = pd.DataFrame(
+        {
+            "ITEM_CODE": rng.choice(["401-10258", "401-10259", "715-00", "715-01"], size=rows),
+            "DESCRIPTION": "ITEM",
+            "UNIT_PRICE": price,
+            "QUANTITY": quantity,
+            "WEIGHT": rng.choice([1.0, 2.0, np.nan], size=rows),
+            "REGION": rng.choice([1.0, 2.0, np.nan], size=rows),
+            "LETTING_DATE": dates,
+            "GEOM_SHAPE": "round",
+            "GEOM_AREA_SQFT": rng.choice([1.0, 1.1, 3.0, np.nan], size=rows),
+        }
+    )
+    df.index = df.index * 2 + 3  # non-contiguous, like the sanitized history
+    return compact_bidtabs(df)
+
+
+@pytest.mark.parametrize("target_quantity", [None, 100.0, 7.0])
+@pytest.mark.parametrize("region", [None, 1, 2])
+def test_range_index_matches_frame_path(target_quantity, region):
+    bid = _history()
+    index = ItemRangeIndex(bid)
+    for code in ["401-10258", "715-01", "999-99999"]:
+        expected = category_breakdown(bid, code, region, True, target_quantity, "WGT_AVG", 40)
+        actual = category_breakdown(index, code, region, True, target_quantity, "WGT_AVG", 40)
+
+        assert actual[1] == expected[1]
+        assert actual[2] == pytest.approx(expected[2], nan_ok=True)
+        assert actual[4] == expected[4]
+        for name, frame in expected[3].items():
+            got = actual[3][name]
+            assert got.index.tolist() == frame.index.tolist(), name
+            if not frame.empty:
+                pd.testing.assert_frame_equal(got, frame)
+        if not expected[5].empty:
+            pd.testing.assert_frame_equal(actual[5], expected[5])
+        else:
+            assert actual[5].empty and list(actual[5].columns) == list(expected[5].columns)
+
+
+def test_range_index_source_protocol_matches_frame():
+    bid = _history()
+    index = ItemRangeIndex(bid)
+    assert len(index) == len(bid) and list(index.columns) == list(bid.columns)
+
+    pool = index.item_pool("401-10258", region=1)
+    expected = bid.loc[(bid["ITEM_CODE"] == "401-10258") & (bid["REGION"] == 1)]
+    assert pool.index.tolist() == expected.index.tolist()
+
+    geometry = GeometryInfo(shape="round", area_sqft=1.05, source_text="PIPE")
+    frame_result = find_alternate_price(bid, "715-09", geometry, reference_bundle={}, ai_enabled=False)
+    index_result = find_alternate_price(index, "715-09", geometry, reference_bundle={}, ai_enabled=False)
+    assert frame_result is not None and index_result is not None
+    assert index_result.final_price == pytest.approx(frame_result.final_price)
+    assert [c.item_code for c in index_result.candidates] == [c.item_code for c in frame_result.candidates]
+
+
+def test_window_mask_bounds_and_read_only_pool():
+    from costest.price_logic import _window_mask
+
+    now = pd.Timestamp("2026-06-15 10:30")
+    dates = pd.to_datetime(
+        ["2026-06-15", "2025-06-15 10:30", "2025-06-15 10:29", "2024-06-15 10:30", None]
+    ).to_numpy(dtype="datetime64[ns]")
+    assert _window_mask(dates, 0, 12, now).tolist() == [True, True, False, False, True]
+    assert _window_mask(dates, 12, 24, now).tolist() == [False, False, True, True, False]
+
+    bid = _history()
+    before = bid.copy()
+    price, source, cat_data = category_breakdown(bid, "401-10258", 1, False, 100.0, "WGT_AVG", 40)
+    pd.testing.assert_frame_equal(bid, before)
+    assert source != "NO_DATA" and cat_data["TOTAL_USED_COUNT"] > 0
+
+
+def test_float32_history_is_converted_only_at_selected_rows():
+    from costest.price_logic import _column_at
+
+    bid32 = _history().astype({"UNIT_PRICE": "float32", "WEIGHT": "float32"})
+    bid64 = bid32.astype({"UNIT_PRICE": float, "WEIGHT": float})
+    picked = _column_at(bid32, "UNIT_PRICE", np.array([5, 40, 41]))
+    assert picked.dtype == np.float64 and len(picked) == 3
+    assert _column_at(bid32, "BIDDER", np.array([0])) is None
+
+    index32, index64 = ItemRangeIndex(bid32), ItemRangeIndex(bid64)
+    for code in ["401-10258", "715-01"]:
+        for mode in ["WGT_AVG", "MEDIAN"]:
+            got = category_breakdown(index32, code, 1, False, 100.0, mode, 40)
+            expected = category_breakdown(index64, code, 1, False, 100.0, mode, 40)
+            assert got[:2] == expected[:2]
+            assert got[2] == pytest.approx(expected[2], nan_ok=True)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest import cli
+from costest.history_store import ingest_frame
+from costest.reprice import (
+    DELTA_EXEMPT,
+    LineDeps,
+    PricingState,
+    line_dependencies,
+    line_fingerprint,
+    plan_reprice,
+    reusable_lines,
+    shifted_ranges,
+    store_partitions,
+)
+
+
+def _rows(code: str, letting: date, price: float = 10.0) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "ITEM_CODE": [code],
+            "DESCRIPTION": ["ITEM"],
+            "UNIT_PRICE": [price],
+            "QUANTITY": [5.0],
+            "LETTING_DATE": [pd.Timestamp(letting)],
+        }
+    )
+
+
+def _state(store: Path, as_of: date, settings: dict) -> PricingState:
+    deps = [
+        LineDeps(items=["401-01000"]),
+        LineDeps(items=["401-02000"]),
+        LineDeps(items=["715-00001"], prefixes=["715"]),
+    ]
+    return PricingState(
+        settings=settings,
+        as_of=as_of,
+        store_version=1,
+        partitions=store_partitions(store),
+        lines=[{"ITEM_CODE": d.items[0]} for d in deps],
+        results=[None] * len(deps),
+        deps=deps,
+    )
+
+
+def test_plan_reprices_lines_touched_by_changed_partitions(tmp_path: Path):
+    store = tmp_path / "store"
+    today = date.today()
+    ingest_frame(store, pd.concat([_rows("401-01000", today - timedelta(days=40)),
+                                   _rows("401-02000", today - timedelta(days=70))]), source="a.csv")
+    settings = {"price_mode": "WGT_AVG"}
+    state = _state(store, today, settings)
+
+    plan, _ = plan_reprice(state, store, settings, today)
+    assert plan is not None and plan.lines == []
+
+    # A new letting with rows for the second item and another 715 family member.
+    ingest_frame(store, pd.concat([_rows("401-02000", today - timedelta(days=5)),
+                                   _rows("715-00009", today - timedelta(days=5))]), source="b.csv")
+    plan, _ = plan_reprice(state, store, settings, today)
+    assert plan.lines == [1, 2]
+    assert plan.changed_partitions == [(today - timedelta(days=5)).isoformat()]
+
+    assert plan_reprice(state, store, {"price_mode": "MEDIAN"}, today)[0] is None
+    assert "no saved pricing state" in plan_reprice(None, store, settings, today)[1]
+    state.partitions["2001-01-01"] = "gone"
+    assert "removed" in plan_reprice(state, store, settings, today)[1]
+
+
+def test_window_shift_reprices_lines_with_lettings_crossing_a_bound(tmp_path: Path):
+    store = tmp_path / "store"
+    today = date.today()
+    year_ago = (pd.Timestamp(today) - pd.DateOffset(months=12)).date()
+    ingest_frame(store, pd.concat([_rows("401-01000", year_ago - timedelta(days=3)),
+                                   _rows("401-02000", year_ago - timedelta(days=60))]), source="a.csv")
+    settings = {"price_mode": "WGT_AVG"}
+    state = _state(store, today - timedelta(days=10), settings)
+
+    plan, _ = plan_reprice(state, store, settings, today)
+    assert plan.changed_partitions == []
+    assert plan.shifted_partitions == [(year_ago - timedelta(days=3)).isoformat()]
+    assert plan.lines == [0]
+    [(lo, hi)] = shifted_ranges(today - timedelta(days=10), today, [12])
+    assert lo < year_ago - timedelta(days=3) <= hi
+
+
+def test_line_dependencies_and_reprice_command():
+    row = {"ITEM_CODE": "715-00002", "GEOM_SHAPE": "round", "ALTERNATE_USED": True, "DATA_POINTS_USED": 12}
+    detail = pd.DataFrame(
+        {"ITEM_CODE": ["715-00001", "715-00003"], "LETTING_DATE": [pd.Timestamp("2025-01-08"), pd.NaT]}
+    )
+    alt_report = {"candidates": [{"item_code": "715-00004"}]}
+    deps = line_dependencies({"ITEM_CODE": "715-00002"}, (row, detail, alt_report, None))
+    assert deps.items == ["715-00001", "715-00002", "715-00003", "715-00004"]
+    assert deps.prefixes == ["715"]
+    assert deps.affected_by({"715-09999"}) and not deps.affected_by({"401-00001"})
+    assert "reprice" in cli.SUBCOMMANDS
+
+
+def _line(code: str, quantity: float) -> dict:
+    return {"ITEM_CODE": code, "DESCRIPTION": "ITEM", "UNIT": "EACH", "QUANTITY": quantity}
+
+
+def test_reusable_lines_match_unchanged_fingerprints():
+    saved = [_line("401-01000", 5.0), _line("401-02000", 3.0), _line("401-01000", 5.0), _line("715-00001", 1.0)]
+    state = PricingState(
+        settings={}, as_of=date.today(), store_version=1, partitions={}, lines=saved,
+        results=[None] * 4, deps=[LineDeps(items=[line["ITEM_CODE"]]) for line in saved],
+    )
+    edited = [
+        _line("715-00001", 1.0),   # moved
+        _line("401-02000", 4.0),   # quantity edited
+        _line("401-01000", 5.0),
+        _line("401-01000", 5.0),
+        _line("401-01000", 5.0),   # one copy more than before
+        _line("609-00001", 2.0),   # added
+    ]
+    assert line_fingerprint(edited[2]) == line_fingerprint(saved[0])
+    assert line_fingerprint(edited[1]) != line_fingerprint(saved[1])
+    assert reusable_lines(state, edited) == {0: 3, 2: 0, 3: 2}
+    # Lines a store change affects are never reused.
+    assert reusable_lines(state, edited, stale=[3]) == {2: 0, 3: 2}
+
+
+def test_delta_plan_ignores_exempt_settings_and_checks_folder_runs(tmp_path: Path):
+    today = date.today()
+    settings = {"quantities": "a", "bidtabs_files": "x"}
+    state = PricingState(
+        settings=settings, as_of=today, store_version=0, partitions={}, lines=[], results=[], deps=[],
+    )
+    edited = dict(settings, quantities="b")
+    assert plan_reprice(state, tmp_path / "none", edited, today)[0] is None
+    plan, _ = plan_reprice(state, tmp_path / "none", edited, today, exempt=DELTA_EXEMPT)
+    assert plan is not None and plan.lines == []
+    assert plan_reprice(state, tmp_path / "none", dict(edited, bidtabs_files="y"), today, exempt=DELTA_EXEMPT)[0] is None
+    assert plan_reprice(state, tmp_path / "none", edited, today + timedelta(days=1), exempt=DELTA_EXEMPT)[0] is None
+
+
+def test_settings_track_reference_files_and_pricing_version(tmp_path: Path, monkeypatch):
+    from costest import reference_data, reprice
+
+    table = tmp_path / "unit_prices.xlsx"
+    table.write_bytes(b"v1")
+    monkeypatch.setattr(reference_data, "SOURCE_FILES", (table,))
+    ctx = cli.build_run_context(output_dir=tmp_path, disable_ai=True)
+    qty = tmp_path / "qty.xlsx"
+    qty.write_bytes(b"qty")
+    saved = cli._run_settings(ctx, qty, 1, None)
+    state = PricingState(
+        settings=saved, as_of=date.today(), store_version=0, partitions={}, lines=[], results=[], deps=[],
+    )
+    assert plan_reprice(state, tmp_path / "none", saved, date.today(), exempt=DELTA_EXEMPT)[0] is not None
+
+    table.write_bytes(b"v2")
+    plan, reason = plan_reprice(state, tmp_path / "none", cli._run_settings(ctx, qty, 1, None), date.today())
+    assert plan is None and "reference_data" in reason
+
+    table.write_bytes(b"v1")
+    monkeypatch.setattr(reprice, "PRICING_VERSION", reprice.PRICING_VERSION + 1)
+    plan, reason = plan_reprice(state, tmp_path / "none", cli._run_settings(ctx, qty, 1, None), date.today())
+    assert plan is None and "pricing_version" in reason
+
+
+def test_reused_run_rewrites_the_audit_after_a_quantity_edit(tmp_path: Path):
+    as_of = date(2025, 6, 30)
+    store = tmp_path / "store"
+    for i, code in enumerate(["401-01000", "401-02000"]):
+        frame = pd.concat([_rows(code, as_of - timedelta(days=30 * k + i), 10.0 + k) for k in range(8)])
+        ingest_frame(store, frame.assign(UNIT="TON", REGION=1), source=f"{code}.csv")
+    qty = tmp_path / "qty.xlsx"
+
+    def write_quantities(first: float) -> None:
+        pd.DataFrame(
+            {"ITEM_CODE": ["401-01000", "401-02000"], "DESCRIPTION": ["ITEM"] * 2, "UNIT": ["TON"] * 2,
+             "QUANTITY": [first, 5.0]}
+        ).to_excel(qty, index=False)
+
+    def audit(out: Path, reuse: bool = True) -> pd.DataFrame:
+        ctx = cli.build_run_context(
+            bid_store_dir=store, quantities_path=qty, as_of=as_of, min_sample_target=3,
+            bootstrap_samples=0, disable_ai=True,
+        ).with_output_dir(out)
+        assert cli.run(context=ctx, reuse=reuse) == 0
+        return pd.read_csv(out / "Estimate_Audit.csv")
+
+    write_quantities(5.0)
+    audit(tmp_path / "a")
+    write_quantities(15.0)
+    reused = audit(tmp_path / "a")
+    assert reused.loc[reused["ITEM_CODE"] == "401-01000", "QUANTITY"].item() == 15.0
+    pd.testing.assert_frame_equal(reused, audit(tmp_path / "b", reuse=False))
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest import cli
+from costest.config import CLIConfig
+
+
+def _bidtabs() -> pd.DataFrame:
+    today = pd.Timestamp.today().normalize()
+    rows = [
+        {
+            "ITEM_CODE": "401-01000",
+            "DESCRIPTION": "HMA SURFACE",
+            "QUANTITY": 100.0,
+            "UNIT_PRICE": 50.0 + idx,
+            "LETTING_DATE": today - pd.DateOffset(months=idx % 30),
+            "REGION": 1 + idx % 2,
+        }
+        for idx in range(30)
+    ]
+    return pd.DataFrame(rows)
+
+
+def test_context_is_immutable_and_config_redirects_outputs(tmp_path: Path):
+    cfg = CLIConfig(
+        input_payitems=tmp_path / "payitems",
+        estimate_audit_csv=tmp_path / "Estimate_Audit.csv",
+        estimate_xlsx=tmp_path / "Estimate_Draft.xlsx",
+        payitems_workbook=tmp_path / "PayItems_Audit.xlsx",
+        mapping_debug_csv=tmp_path / "payitem_mapping_debug.csv",
+    )
+    before = cli.OUTPUT_DIR
+    context = cli.build_run_context(cfg, min_sample_target=7)
+
+    assert context.output_dir == tmp_path
+    assert context.output_audit == cfg.estimate_audit_csv
+    assert context.min_sample_target == 7
+    assert context.disable_ai is True
+    assert cli.OUTPUT_DIR == before
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        context.min_sample_target = 1  # type: ignore[misc]
+
+
+def test_context_from_args_leaves_module_defaults_untouched(tmp_path: Path):
+    args = cli.parse_args(["--output-dir", str(tmp_path), "--min-sample-target", "5", "--workers", "3"])
+    before = (cli.OUTPUT_DIR, cli.MIN_SAMPLE_TARGET, cli.WORKERS)
+
+    context = cli.context_from_args(args)
+
+    assert context.output_xlsx == tmp_path.resolve() / "Estimate_Draft.xlsx"
+    assert (context.min_sample_target, context.workers) == (5, 3)
+    assert (cli.OUTPUT_DIR, cli.MIN_SAMPLE_TARGET, cli.WORKERS) == before
+
+
+def test_concurrent_runs_use_their_own_context():
+    bid = _bidtabs()
+    line = {"ITEM_CODE": "401-01000", "DESCRIPTION": "HMA SURFACE", "UNIT": "TON", "QUANTITY": 100.0}
+    contexts = [
+        cli.build_run_context(min_sample_target=target, price_mode=mode, disable_ai=True)
+        for target, mode in [(5, "MEAN"), (500, "MEDIAN")] * 4
+    ]
+    expected = [cli._price_line(bid, line, 2, ctx)[0] for ctx in contexts]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        actual = list(pool.map(lambda ctx: cli._price_line(bid, line, 2, ctx)[0], contexts))
+
+    assert actual == expected
+    assert expected[0]["DATA_POINTS_USED"] < expected[1]["DATA_POINTS_USED"]
+    assert "target 500" in expected[1]["NOTES"]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from costest.history_store import MANIFEST_NAME, ingest_frame, load_price_sketches
+from costest.price_logic import CATEGORY_DEFS, category_breakdown
+from costest.sketches import CellSketches, PriceSketches, build_cell_sketches, weighted_quantile
+
+
+def _history(rows: int = 900) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    today = pd.Timestamp.today().normalize()
+    lettings = today - pd.to_timedelta(rng.integers(0, 40, size=24) * 31, unit="D")
+    dates = pd.Series(lettings[rng.integers(0, len(lettings), size=rows)])
+    dates.iloc[:15] = pd.NaT
+    return pd.DataFrame(
+        {
+            "ITEM_CODE": rng.choice(["401-10258", "401-10259", "715-00"], size=rows),
+            "UNIT_PRICE": rng.lognormal(3.0, 0.6, size=rows).round(2),
+            "QUANTITY": 10.0,
+            "REGION": rng.choice([1.0, 2.0, np.nan], size=rows),
+            "LETTING_DATE": dates,
+        }
+    )
+
+
+@pytest.mark.parametrize("mode", ["MEDIAN", "P40_P60"])
+@pytest.mark.parametrize("region", [None, 1])
+@pytest.mark.parametrize("trim", ["SIGMA", "MAD", "IQR", "PERCENTILE", "NONE"])
+def test_uncompacted_sketches_match_exact_pricing(mode, region, trim):
+    bid = _history()
+    sketches = PriceSketches(build_cell_sketches(bid, k=10_000))
+    for code in ["401-10258", "715-00", "999-99999"]:
+        price, source, cat_data = category_breakdown(bid, code, region, mode=mode, min_sample_target=60, trim=trim)
+        got_price, got_source, got_data = sketches.category_breakdown(
+            code, region, mode=mode, min_sample_target=60, trim=trim
+        )
+        assert got_source == source
+        assert got_price == pytest.approx(price, nan_ok=True)
+        for name, *_ in CATEGORY_DEFS:
+            assert got_data[f"{name}_COUNT"] == cat_data[f"{name}_COUNT"]
+            assert got_data[f"{name}_PRICE"] == pytest.approx(cat_data[f"{name}_PRICE"], nan_ok=True)
+        assert got_data["TOTAL_USED_COUNT"] == cat_data["TOTAL_USED_COUNT"]
+
+
+def test_compacted_quantiles_stay_within_rank_bound():
+    rng = np.random.default_rng(4)
+    k = 32
+    frame = pd.DataFrame(
+        {
+            "ITEM_CODE": "401-10258",
+            "UNIT_PRICE": rng.lognormal(3.0, 1.0, size=6000),
+            "REGION": rng.choice([1.0, 2.0, 3.0], size=6000),
+            "LETTING_DATE": pd.Timestamp("2025-01-15") + pd.to_timedelta(rng.integers(0, 4, size=6000) * 30, unit="D"),
+        }
+    )
+    cells = build_cell_sketches(frame, k=k)
+    assert len(cells) == 12 and cells.lengths.max() == k and cells.rows.sum() == 6000
+    exact = np.sort(frame["UNIT_PRICE"].to_numpy())
+    n, slack = len(exact), int(np.ceil(len(exact) / k))
+    for q in (0.1, 0.4, 0.5, 0.6, 0.9):
+        got = weighted_quantile(cells.values, cells.weights, q)
+        rank = q * (n - 1)
+        assert exact[max(int(np.floor(rank)) - slack, 0)] <= got <= exact[min(int(np.ceil(rank)) + slack, n - 1)]
+    assert weighted_quantile(np.array([3.0, 1.0, 2.0, 4.0]), np.ones(4, dtype=int), 0.5) == 2.5
+
+
+def test_store_persists_sketches_and_backfills_old_partitions(tmp_path: Path):
+    store = tmp_path / "store"
+    bid = _history(300)
+    ingest_frame(store, bid, source="history.csv")
+    manifest = json.loads((store / MANIFEST_NAME).read_text())
+    assert all((store / "sketches" / entry["sketch"]).exists() for entry in manifest["partitions"].values())
+
+    persisted = load_price_sketches(store)
+    for entry in manifest["partitions"].values():
+        del entry["sketch"]
+    (store / MANIFEST_NAME).write_text(json.dumps(manifest))
+    rebuilt = load_price_sketches(store)
+    assert persisted.store_version == rebuilt.store_version == 1
+    for code in persisted.item_codes():
+        assert persisted.category_breakdown(code, 2) == pytest.approx(rebuilt.category_breakdown(code, 2), nan_ok=True)
+    assert isinstance(CellSketches.concat([]), CellSketches)
+    with pytest.raises(ValueError):
+        persisted.category_breakdown("401-10258", mode="WGT_AVG")
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import sqlite3
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from costest.alternate_seek import find_alternate_price
+from costest.bid_store import compact_bidtabs
+from costest.geometry import GeometryInfo
+from costest.price_logic import category_breakdown
+from costest.sql_store import SqlBidStore, write_sql_store
+
+
+def _history() -> pd.DataFrame:
+    today = pd.Timestamp.today().normalize()
+    rows = []
+    for i in range(12):
+        rows.append(
+            {
+                "ITEM_CODE": "401-10258",
+                "DESCRIPTION": "QC/QA HMA, 3, 76, BASE, 25.0 mm",
+                "UNIT_PRICE": 50.0 + i,
+                "QUANTITY": 100.0 + 10 * i,
+                "WEIGHT": 1.0 + i,
+                "JOB_SIZE": 1_000_000.0 * (1 + i % 3),
+                "REGION": 1 + i % 2,
+                "LETTING_DATE": today - pd.DateOffset(months=3 * i),
+                "GEOM_AREA_SQFT": np.nan,
+            }
+        )
+    rows.append({**rows[0], "UNIT_PRICE": 48.0, "LETTING_DATE": pd.NaT})
+    rows.append({**rows[0], "UNIT_PRICE": 47.0, "LETTING_DATE": today - pd.DateOffset(months=60)})
+    for i, area in enumerate([1.0, 1.1, 3.0]):
+        rows.append(
+            {
+                "ITEM_CODE": f"715-0{i}",
+                "DESCRIPTION": f"PIPE {i}",
+                "UNIT_PRICE": 100.0 + i,
+                "QUANTITY": 10.0,
+                "WEIGHT": 1.0,
+                "JOB_SIZE": 1_000_000.0,
+                "REGION": 1,
+                "LETTING_DATE": today - pd.DateOffset(months=2),
+                "GEOM_SHAPE": "round",
+                "GEOM_AREA_SQFT": area,
+            }
+        )
+    df = pd.DataFrame(rows)
+    df.index = df.index * 3 + 5  # non-contiguous, like the sanitized history
+    return compact_bidtabs(df)
+
+
+def _drop_internal(frame: pd.DataFrame) -> pd.DataFrame:
+    out = frame.drop(columns=["_LET_DT"], errors="ignore").copy()
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object)
+    return out
+
+
+def test_sql_store_creates_indexes_and_is_reused(tmp_path):
+    bid = _history()
+    path = tmp_path / "bids.sqlite"
+    assert write_sql_store(bid, path) is True
+    assert write_sql_store(bid, path) is False
+
+    with sqlite3.connect(path) as conn:
+        indexes = {row[1]: row[2] for row in conn.execute("PRAGMA index_list(bids)")}
+        assert {"ix_bids_item_date", "ix_bids_region_item", "ix_bids_area"} <= set(indexes)
+        cols = [row[2] for row in conn.execute("PRAGMA index_info(ix_bids_item_date)")]
+        assert cols == ["ITEM_CODE", "LETTING_DATE"]
+        plan = " ".join(
+            str(row[-1])
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM bids WHERE ITEM_CODE = ? AND LETTING_DATE >= ?",
+                ("401-10258", "2024-01-01"),
+            )
+        )
+        assert "ix_bids_item_date" in plan
+
+    store = SqlBidStore(path)
+    assert len(store) == len(bid)
+    assert store.columns == list(bid.columns)
+    assert len(store.item_pool("401-10258", region=2)) == 6
+
+
+@pytest.mark.parametrize("target_quantity", [None, 150.0])
+def test_category_breakdown_pushdown_matches_dataframe(tmp_path, target_quantity):
+    bid = _history()
+    write_sql_store(bid, tmp_path / "bids.sqlite")
+    store = SqlBidStore(tmp_path / "bids.sqlite")
+
+    expected = category_breakdown(bid, "401-10258", 1, True, target_quantity, "WGT_AVG", 5)
+    actual = category_breakdown(store, "401-10258", 1, True, target_quantity, "WGT_AVG", 5)
+
+    assert actual[0] == pytest.approx(expected[0])
+    assert actual[1] == expected[1]
+    assert actual[2] == pytest.approx(expected[2], nan_ok=True)
+    assert actual[4] == expected[4]
+    pd.testing.assert_frame_equal(
+        _drop_internal(actual[5]), _drop_internal(expected[5]), check_dtype=False
+    )
+
+
+def test_job_size_range_filters_every_query(tmp_path):
+    bid = _history()
+    write_sql_store(bid, tmp_path / "bids.sqlite")
+    store = SqlBidStore(tmp_path / "bids.sqlite", job_size_range=(500_000.0, 1_500_000.0))
+    filtered = bid.loc[bid["JOB_SIZE"].between(500_000.0, 1_500_000.0)]
+
+    expected = category_breakdown(filtered, "401-10258", 1, mode="MEDIAN", min_sample_target=50)
+    actual = category_breakdown(store, "401-10258", 1, mode="MEDIAN", min_sample_target=50)
+    assert actual[0] == pytest.approx(expected[0])
+    assert actual[2] == pytest.approx(expected[2], nan_ok=True)
+
+
+def test_alternate_candidates_use_area_range(tmp_path):
+    bid = _history()
+    write_sql_store(bid, tmp_path / "bids.sqlite")
+    store = SqlBidStore(tmp_path / "bids.sqlite")
+
+    rows = store.alternate_candidates("715", "715-09", (0.8, 1.2), shape="round")
+    assert sorted(rows["ITEM_CODE"].unique()) == ["715-00", "715-01"]
+
+    geometry = GeometryInfo(shape="round", area_sqft=1.05, source_text="PIPE")
+    expected = find_alternate_price(bid, "715-09", geometry, reference_bundle={}, ai_enabled=False)
+    actual = find_alternate_price(store, "715-09", geometry, reference_bundle={}, ai_enabled=False)
+    assert expected is not None and actual is not None
+    assert actual.final_price == pytest.approx(expected.final_price)
+    assert [c.item_code for c in actual.candidates] == [c.item_code for c in expected.candidates]
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from costest.trends import MAX_RATE, escalate_prices, fit_trends, load_trends, save_trends
+
+AS_OF = date(2025, 6, 30)
+
+
+def _history():
+    rng = np.random.default_rng(3)
+    frames = []
+    # code, true annual rate, rows, price level
+    for code, rate, n, level in [
+        ("401-01000", 0.08, 200, 100.0),
+        ("401-02000", 0.02, 150, 900.0),
+        ("401-03000", 0.50, 5, 40.0),
+        ("609-00010", 0.60, 120, 10.0),
+        ("999-00001", 0.10, 3, 5.0),
+    ]:
+        days = rng.integers(0, 1100, n)
+        prices = level * (1 + rate) ** (-days / 365.25) * np.exp(rng.normal(0.0, 0.03, n))
+        frames.append(pd.DataFrame({
+            "ITEM_CODE": code,
+            "UNIT_PRICE": prices,
+            "LETTING_DATE": pd.Timestamp(AS_OF) - pd.to_timedelta(days, unit="D"),
+        }))
+    bid = pd.concat(frames, ignore_index=True)
+    bid.loc[0, "LETTING_DATE"] = pd.NaT
+    return bid
+
+
+def test_fit_recovers_item_rates_with_section_fallback_and_cap():
+    trends = fit_trends(_history(), as_of=AS_OF)
+    items = trends.items
+
+    assert items.loc["401-01000", "BASIS"] == "ITEM"
+    assert items.loc["401-01000", "RATE"] == pytest.approx(0.08, abs=0.01)
+    assert items.loc["401-02000", "RATE"] == pytest.approx(0.02, abs=0.01)
+    # Too few points: the section's pooled slope, which the two items' very
+    # different price levels do not distort.
+    assert items.loc["401-03000", "BASIS"] == "SECTION"
+    assert 0.02 < items.loc["401-03000", "RATE"] < 0.08
+    assert items.loc["401-03000", "RATE"] == pytest.approx(trends.sections.loc["401", "RATE"])
+    assert items.loc["609-00010", "RATE"] == pytest.approx(MAX_RATE)
+    assert items.loc["999-00001", "BASIS"] == "NONE" and items.loc["999-00001", "RATE"] == 0.0
+    assert np.isnan(trends.sections.loc["999", "RATE"])
+
+
+def test_escalation_moves_prices_to_as_of_and_round_trips(tmp_path):
+    bid = _history()
+    trends = fit_trends(bid, as_of=AS_OF, key={"store_version": 4})
+    bid["ITEM_CODE"] = bid["ITEM_CODE"].astype("category")
+    bid["UNIT_PRICE"] = bid["UNIT_PRICE"].astype("float32")
+    escalated = escalate_prices(bid, trends)
+
+    assert escalated["UNIT_PRICE"].dtype == np.float32
+    assert escalated.loc[0, "UNIT_PRICE"] == bid.loc[0, "UNIT_PRICE"]  # undated
+    expected = trends.factors(bid["ITEM_CODE"].astype(str), bid["LETTING_DATE"])
+    np.testing.assert_allclose(escalated["ESCALATION"], expected)
+    item = escalated["ITEM_CODE"] == "401-01000"
+    before = bid.loc[item, "UNIT_PRICE"]
+    after = escalated.loc[item, "UNIT_PRICE"]
+    # Escalated prices cluster around today's level.
+    assert after.std() / after.mean() < 0.5 * before.std() / before.mean()
+    assert after.mean() == pytest.approx(100.0, rel=0.03)
+
+    path = tmp_path / "price_trends.pkl"
+    save_trends(path, trends)
+    assert load_trends(path, {"store_version": 4}).items.equals(trends.items)
+    assert load_trends(path, {"store_version": 5}) is None
+
+
+def test_reused_escalated_run_matches_a_full_run(tmp_path):
+    from datetime import timedelta
+
+    from costest import cli
+    from costest.history_store import ingest_frame
+
+    def rows(code, days, prices):
+        return pd.DataFrame({
+            "ITEM_CODE": code,
+            "DESCRIPTION": "HMA",
+            "UNIT": "TON",
+            "UNIT_PRICE": prices,
+            "QUANTITY": 100.0,
+            "REGION": 1,
+            "LETTING_DATE": [pd.Timestamp(AS_OF - timedelta(days=int(d))) for d in days],
+        })
+
+    rng = np.random.default_rng(8)
+    store = tmp_path / "store"
+    days = rng.integers(20, 1000, 60)
+    ingest_frame(store, rows("401-01000", days, 100.0 * 1.05 ** (-days / 365.25)), source="a.csv")
+    # Too few prices for its own trend: escalated with section 401's.
+    ingest_frame(store, rows("401-02000", [600, 650, 700, 750, 800], 50.0), source="b.csv")
+    qty = tmp_path / "qty.xlsx"
+    pd.DataFrame({"ITEM_CODE": ["401-02000"], "DESCRIPTION": ["HMA"], "UNIT": ["TON"], "QUANTITY": [100.0]}).to_excel(
+        qty, index=False
+    )
+
+    def estimate(out, reuse=True):
+        ctx = cli.build_run_context(
+            bid_store_dir=store, quantities_path=qty, as_of=AS_OF, escalate=True,
+            min_sample_target=3, bootstrap_samples=0, disable_ai=True,
+        ).with_output_dir(out)
+        assert cli.run(context=ctx, reuse=reuse) == 0
+        sheet = pd.read_excel(out / "Estimate_Draft.xlsx", sheet_name="Estimate")
+        return sheet.loc[sheet["ITEM_CODE"] == "401-02000", "UNIT_PRICE_EST"].item()
+
+    before = estimate(tmp_path / "a")
+    # A new letting of the other item steepens the section trend.
+    ingest_frame(store, rows("401-01000", [10] * 20, 160.0), source="c.csv")
+    reused = estimate(tmp_path / "a")
+    assert reused == estimate(tmp_path / "b", reuse=False)
+    assert reused != before
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+pd = pytest.importorskip("pandas")
+
+from costest.price_logic import category_breakdown
+from costest.range_index import ItemRangeIndex
+from costest.whatif import (
+    Scenario,
+    available_regions,
+    build_window_stats,
+    evaluate,
+    evaluate_regions,
+    load_window_stats,
+    price_regions,
+    price_scenario,
+    save_window_stats,
+    scenario_grid,
+)
+
+TODAY = pd.Timestamp.today().normalize()
+
+
+def _history() -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    rows = []
+    for code, base in [("401-01000", 50.0), ("609-00010", 8.0)]:
+        for idx in range(120):
+            rows.append(
+                {
+                    "ITEM_CODE": code,
+                    "UNIT_PRICE": base * (1 + rng.normal(0, 0.2)) * (6 if idx % 37 == 0 else 1),
+                    "QUANTITY": float(rng.integers(20, 200)),
+                    "LETTING_DATE": TODAY - pd.DateOffset(days=int(rng.integers(0, 1150))),
+                    "REGION": 1 + idx % 3,
+                    "JOB_SIZE": float(rng.integers(1, 40)) * 100_000,
+                    "WEIGHT": float(rng.integers(1, 4)) if idx % 5 else np.nan,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+LINES = [
+    {"ITEM_CODE": "401-01000", "DESCRIPTION": "HMA", "UNIT": "TON", "QUANTITY": 100.0},
+    {"ITEM_CODE": "609-00010", "DESCRIPTION": "CURB", "UNIT": "LFT", "QUANTITY": 0.0},
+    {"ITEM_CODE": "999-99999", "DESCRIPTION": "NEW ITEM", "UNIT": "EACH", "QUANTITY": 2.0},
+    {"ITEM_CODE": "105-06845", "DESCRIPTION": "CONSTRUCTION ENGINEERING", "UNIT": "LS", "QUANTITY": 1.0},
+]
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        Scenario(region=2, min_sample_target=50),
+        Scenario(region=1, min_sample_target=10, mode="MEDIAN", trim="MAD"),
+        Scenario(region=3, min_sample_target=500, mode="P40_P60", trim="IQR", job_size_range=(5e5, 2e6)),
+        Scenario(region=None, min_sample_target=5, mode="MEAN", trim="NONE"),
+    ],
+)
+def test_scenarios_match_category_breakdown(scenario: Scenario):
+    bid = _history()
+    stats = build_window_stats(ItemRangeIndex(bid), LINES)
+    prices, counts, _ = price_scenario(stats, scenario)
+
+    if scenario.job_size_range is not None:
+        bid = bid.loc[bid["JOB_SIZE"].between(*scenario.job_size_range)]
+    index = ItemRangeIndex(bid)
+    for i, line in enumerate(LINES):
+        quantity = line["QUANTITY"]
+        price, _, data = category_breakdown(
+            index,
+            line["ITEM_CODE"],
+            project_region=scenario.region,
+            target_quantity=quantity if quantity > 0 else None,
+            mode=scenario.mode,
+            min_sample_target=scenario.min_sample_target,
+            trim=scenario.trim,
+        )
+        assert counts[i] == data["TOTAL_USED_COUNT"]
+        if np.isnan(price):
+            assert np.isnan(prices[i])
+        else:
+            assert prices[i] == price
+
+
+def test_evaluate_reports_totals_and_deltas_against_the_first_scenario(tmp_path: Path):
+    stats = build_window_stats(ItemRangeIndex(_history()), LINES, key={"quantities": "a"})
+    base = Scenario(region=2, min_sample_target=50)
+    scenarios = scenario_grid(base, regions=[2, 1], modes=["WGT_AVG", "MEDIAN"])
+    assert scenarios[0] == base and len(scenarios) == 4
+
+    result = evaluate(stats, scenarios, fallback_prices=[None, None, 125.0, None])
+    items = result.items.set_index(["SCENARIO", "LINE"])
+    assert items.loc[(0, 2), "SOURCE"] == "FALLBACK" and items.loc[(0, 2), "EXTENSION"] == 250.0
+    assert items.loc[(0, 3), "SOURCE"] == "CONTRACT_PERCENT"
+    subtotal = items.loc[[(0, 0), (0, 1), (0, 2)], "EXTENSION"].sum()
+    assert items.loc[(0, 3), "UNIT_PRICE_EST"] == np.floor(subtotal * 0.02 / 1000) * 1000
+    totals = result.totals.set_index("SCENARIO")
+    assert totals.loc[0, "DELTA"] == 0
+    for number in totals.index:
+        assert totals.loc[number, "PROJECT_TOTAL"] == pytest.approx(items.loc[number, "EXTENSION"].sum())
+        assert totals.loc[number, "DELTA"] == pytest.approx(items.loc[number, "DELTA"].sum())
+
+    path = tmp_path / "whatif_stats.pkl"
+    save_window_stats(path, stats)
+    assert load_window_stats(path, {"quantities": "a"}).lengths.tolist() == stats.lengths.tolist()
+    assert load_window_stats(path, {"quantities": "b"}) is None
+
+
+@pytest.mark.parametrize(
+    "scenario",
+    [
+        Scenario(region=None, min_sample_target=50),
+        Scenario(region=None, min_sample_target=15, mode="MEDIAN", trim="MAD"),
+        Scenario(region=None, min_sample_target=500, mode="P40_P60", trim="IQR", job_size_range=(5e5, 2e6)),
+    ],
+)
+def test_all_regions_in_one_pass_match_per_region_pricing(scenario: Scenario):
+    stats = build_window_stats(ItemRangeIndex(_history()), LINES)
+    regions = available_regions(stats) + [4, None]
+    assert regions[:3] == [1, 2, 3]
+    prices, counts, source = price_regions(
+        stats, regions, scenario.min_sample_target, scenario.mode, scenario.trim, scenario.job_size_range
+    )
+    assert prices.shape == (len(regions), len(LINES))
+    for r, region in enumerate(regions):
+        expected = price_scenario(stats, replace(scenario, region=region))
+        np.testing.assert_array_equal(counts[r], expected[1])
+        np.testing.assert_array_equal(source[r], expected[2])
+        np.testing.assert_allclose(prices[r], expected[0], rtol=1e-12)
+
+
+def test_evaluate_regions_builds_a_line_by_region_matrix():
+    stats = build_window_stats(ItemRangeIndex(_history()), LINES)
+    result = evaluate_regions(stats, [1, 2, None], min_sample_target=20, fallback_prices=[None, None, 75.0, None])
+    assert list(result.matrix.columns[-3:]) == ["REGION_1", "REGION_2", "STATE"]
+    assert result.matrix.loc[2, ["REGION_1", "REGION_2", "STATE"]].tolist() == [75.0] * 3
+    single = evaluate(stats, [Scenario(region=2, min_sample_target=20)], fallback_prices=[None, None, 75.0, None])
+    assert result.matrix["REGION_2"].tolist() == single.items["UNIT_PRICE_EST"].tolist()
+    assert result.totals.loc[1, "PROJECT_TOTAL"] == pytest.approx(single.totals.loc[0, "PROJECT_TOTAL"])
+    assert len(result.items) == 3 * len(LINES)